@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+"""
+Aggregate request profiles into a table and flame-graph input.
+
+Merges the cProfile files written by request profiling (modules/profiling.py,
+``PROFILING_DIR``) and prints the functions with the most cumulative time.
+With ``--collapsed`` it also writes collapsed stacks (``a;b;c <microseconds>``
+per line), the input format of flamegraph.pl, speedscope and inferno.
+
+cProfile records caller/callee pairs, not whole stacks, so stacks are rebuilt
+by walking the merged call graph from its roots and splitting each function's
+time between its callers in proportion to the time each call edge took. The
+result is exact for functions reached along one path and an estimate for
+functions called from several places; recursive calls are folded into the
+first frame of the cycle.
+
+Usage (from backend/ai_service):
+    python aggregate_profiles.py                          # every profile in PROFILING_DIR
+    python aggregate_profiles.py --label assessment --top 40
+    python aggregate_profiles.py logs/profiles/*.prof --collapsed assessment.folded
+    flamegraph.pl assessment.folded > assessment.svg
+"""
+
+import argparse
+import glob
+import os
+import pstats
+import sys
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+Function = Tuple[str, int, str]
+
+# Deeper stacks are cut off (and cycles broken) when rebuilding collapsed stacks
+MAX_DEPTH = 64
+
+
+def find_profiles(paths: List[str], label: Optional[str] = None) -> List[str]:
+    """Profile files named on the command line (files or directories), filtered by label"""
+    from modules.profiling import PROFILE_SUFFIX, PROFILING_DIR
+
+    found = []
+    for path in paths or [PROFILING_DIR]:
+        if os.path.isdir(path):
+            found.extend(glob.glob(os.path.join(path, f"*{PROFILE_SUFFIX}")))
+        elif os.path.isfile(path):
+            found.append(path)
+    if label:
+        found = [path for path in found if f"-{label}-" in os.path.basename(path)]
+    return sorted(found)
+
+
+def load_stats(paths: List[str]) -> pstats.Stats:
+    """Merged stats of several profiles; raises ValueError when there are none"""
+    if not paths:
+        raise ValueError("No profiles found; enable PROFILING_ENABLED and send X-Profile requests first")
+    stats = pstats.Stats(paths[0])
+    for path in paths[1:]:
+        stats.add(path)
+    return stats
+
+
+def frame_name(func: Function) -> str:
+    """Readable frame label: file.py:function, or the name of a builtin"""
+    filename, _, name = func
+    if filename == "~":
+        return name.strip("<>").replace("built-in method ", "")
+    return f"{os.path.basename(filename)}:{name}"
+
+
+def is_profiler_frame(func: Function) -> bool:
+    """The profiler's own disable() call, recorded at the end of every profile"""
+    return func[0] == "~" and "_lsprof.Profiler" in func[2]
+
+
+def top_functions(stats: pstats.Stats, top: int = 25) -> List[Dict[str, object]]:
+    """Functions with the most cumulative time"""
+    rows = []
+    for func, (_, calls, own, cumulative, _) in stats.stats.items():
+        if is_profiler_frame(func):
+            continue
+        rows.append({
+            "function": frame_name(func),
+            "calls": calls,
+            "own_ms": round(own * 1000, 3),
+            "cumulative_ms": round(cumulative * 1000, 3),
+        })
+    rows.sort(key=lambda row: row["cumulative_ms"], reverse=True)
+    return rows[:top]
+
+
+def collapsed_stacks(stats: pstats.Stats) -> Iterator[Tuple[str, int]]:
+    """(semicolon-joined stack, own time in microseconds) for each rebuilt stack"""
+    entries = stats.stats
+    children: Dict[Function, List[Tuple[Function, float]]] = {}
+    roots = []
+    for func, (_, _, _, _, callers) in entries.items():
+        if is_profiler_frame(func):
+            continue
+        known = [caller for caller in callers if caller in entries]
+        if not known:
+            roots.append(func)
+        for caller in known:
+            # callers[caller][3] is the cumulative time of func when called from caller
+            children.setdefault(caller, []).append((func, callers[caller][3]))
+
+    def walk(func: Function, seconds: float, stack: List[Function]):
+        _, _, own, cumulative, _ = entries[func]
+        share = seconds / cumulative if cumulative > 0 else 0.0
+        stack = stack + [func]
+        if share * own > 0:
+            yield ";".join(frame_name(f) for f in stack), share * own
+        if len(stack) >= MAX_DEPTH:
+            return
+        for child, edge_seconds in children.get(func, []):
+            if child not in stack and edge_seconds > 0:
+                yield from walk(child, edge_seconds * share, stack)
+
+    totals: Dict[str, float] = {}
+    for root in roots:
+        for stack, seconds in walk(root, entries[root][3], []):
+            totals[stack] = totals.get(stack, 0.0) + seconds
+    for stack, seconds in sorted(totals.items()):
+        microseconds = round(seconds * 1e6)
+        if microseconds > 0:
+            yield stack, microseconds
+
+
+def write_collapsed(stats: pstats.Stats, path: str) -> int:
+    """Write collapsed stacks to path and return the number of lines"""
+    lines = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, microseconds in collapsed_stacks(stats):
+            f.write(f"{stack} {microseconds}\n")
+            lines += 1
+    return lines
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Aggregate request profiles into a table and collapsed stacks")
+    parser.add_argument("paths", nargs="*", help="Profile files or directories (default PROFILING_DIR)")
+    parser.add_argument("--label", help="Only profiles of this endpoint label (assessment, query)")
+    parser.add_argument("--top", type=int, default=25, help="Functions to list")
+    parser.add_argument("--collapsed", help="Write collapsed stacks for flame graphs to this file")
+    args = parser.parse_args(argv)
+
+    paths = find_profiles(args.paths, args.label)
+    try:
+        stats = load_stats(paths)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+
+    print(f"{len(paths)} profiles, {stats.total_tt * 1000:.1f} ms profiled\n")
+    print(f"  {'cumulative ms':>14} {'own ms':>10} {'calls':>8}  function")
+    for row in top_functions(stats, args.top):
+        print(f"  {row['cumulative_ms']:>14.1f} {row['own_ms']:>10.1f} {row['calls']:>8}  {row['function']}")
+
+    if args.collapsed:
+        lines = write_collapsed(stats, args.collapsed)
+        print(f"\nCollapsed stacks ({lines} lines) written to {args.collapsed}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,32 +1,72 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, Header, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
-from contextlib import asynccontextmanager
+from typing import List, Dict, Any, Optional, Tuple
+from contextlib import AsyncExitStack, asynccontextmanager
 import os
 import json
+import asyncio
 import logging
+import time
+import uuid
 from datetime import datetime
 from dotenv import load_dotenv
 
-from modules.rag_pipeline import process_farm_assessment, query_farm_knowledge
+try:
+    import orjson
+except ImportError:  # pydantic's serializer is used instead
+    orjson = None
+
+from modules.rag_pipeline import (
+    assessment_collection, loaded_vector_db, lookup_cached_answer, lookup_cached_assessment, lookup_faq_answer,
+    process_farm_assessment, query_farm_knowledge, record_query_turn, stream_answer
+)
 from modules.schemas import AssessmentData, AIRecommendation, CategoryAssessment, FarmStatusAssessment
+from modules.metrics import REQUEST_LATENCY, record_error, render_metrics, start_stage_timings
+from modules.logging_config import (
+    configure_logging, shutdown_logging, log_event, should_log_payload, stage_timings_ms
+)
+from modules.kb_collections import COLLECTIONS, CollectionNotFound
+from modules.profiling import PROFILER
+from modules.tracing import configure_tracing, request_span, shutdown_tracing
+from modules.warmup import READINESS, WARMUP_ENABLED, run_warmup, mark_warmup_disabled
+from modules.admission import (
+    ASSESSMENT_POOL, CHAT_POOL, AdmissionRejected, admit, is_upstream_overload, parse_priority
+)
+from modules.session_store import SESSIONS
+from modules.faq_store import FAQ_ENABLED
+from modules.singleflight import (
+    QUERY_FLIGHT, QUERY_SINGLEFLIGHT_ENABLED, QUERY_STREAM_FLIGHT, normalize_question
+)
 
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
+# Configure logging (queue-based, off the event loop thread)
+configure_logging()
 logger = logging.getLogger(__name__)
 
+def warm_up_pipeline():
+    """Warm up pipeline components and log the per-component result"""
+    # Workers forked by serve.py inherit the parent's warm components and keep them
+    state = run_warmup(resume=True)
+    snapshot = state.snapshot()
+    log_event(
+        logger, "warmup_completed",
+        level=logging.INFO if state.is_ready else logging.ERROR,
+        status=snapshot["status"],
+        warmup_ms=snapshot["warmup_ms"],
+        components=snapshot["components"],
+    )
+
 # Lifespan event handler (replaces deprecated on_event)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    configure_logging()
+    configure_tracing()
     logger.info("=" * 80)
     logger.info("🚀 FARM ASSESSMENT AI BACKEND STARTING UP")
     logger.info("=" * 80)
@@ -34,15 +74,29 @@ async def lifespan(app: FastAPI):
     logger.info("Health: http://0.0.0.0:8000/health")
     logger.info("API Docs: http://0.0.0.0:8000/docs")
     logger.info("Assessment Endpoint: http://0.0.0.0:8000/process-assessment")
+    logger.info("Readiness: http://0.0.0.0:8000/ready")
+    logger.info("Metrics: http://0.0.0.0:8000/metrics")
     logger.info("Model: llama-3.1-8b-instant (Groq)")
     logger.info("=" * 80)
     logger.info("⏳ Waiting for requests from frontend...")
     logger.info("=" * 80)
+    
+    # Warm up in a background thread: /health answers immediately (liveness)
+    # while /ready reports 503 until the model and vector store are loaded
+    if WARMUP_ENABLED:
+        warmup_task = asyncio.create_task(asyncio.to_thread(warm_up_pipeline))
+    else:
+        warmup_task = None
+        mark_warmup_disabled()
     yield
+    if warmup_task is not None and not warmup_task.done():
+        logger.warning("Shutting down before warm-up finished")
     # Shutdown
     logger.info("=" * 80)
     logger.info("🛑 FARM ASSESSMENT AI BACKEND SHUTTING DOWN")
     logger.info("=" * 80)
+    shutdown_tracing()
+    shutdown_logging()
 
 app = FastAPI(title="Farm Assessment AI API", lifespan=lifespan)
 
@@ -55,22 +109,58 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Middleware to log all requests
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    """Shed load with a fast 429/503 and a Retry-After hint instead of a 500"""
+    log_event(
+        logger, "request_shed", level=logging.WARNING,
+        path=request.url.path, pool=exc.pool, reason=exc.reason,
+        status=exc.status_code, retry_after=exc.retry_after,
+    )
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": f"Server busy ({exc.reason}), please retry", "retry_after": exc.retry_after},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+def upstream_overload_error(pool) -> HTTPException:
+    """503 with Retry-After when the LLM provider is rate limiting or overloaded"""
+    return HTTPException(
+        status_code=503,
+        detail="AI service is temporarily overloaded, please retry",
+        headers={"Retry-After": str(pool.retry_after())},
+    )
+
+# Middleware to log all requests (one access event per request)
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    start_time = datetime.now()
-    
-    # Log incoming request
-    logger.info(f"🌐 {request.method} {request.url.path} - Client: {request.client.host}")
+    start_time = time.perf_counter()
     
-    # Process request
-    response = await call_next(request)
+    # Process request (pipeline stages become child spans of the request span)
+    with request_span(request.method, request.url.path, request.headers) as span:
+        response = await call_next(request)
+        
+        # Record latency against the route template to keep label cardinality bounded
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        if span is not None:
+            span.update_name(f"{request.method} {path}")
+            span.set_attributes({"http.route": path, "http.response.status_code": response.status_code})
     
     # Calculate processing time
-    process_time = (datetime.now() - start_time).total_seconds()
+    process_time = time.perf_counter() - start_time
+    REQUEST_LATENCY.labels(
+        method=request.method, path=path, status=str(response.status_code)
+    ).observe(process_time)
     
-    # Log response
-    logger.info(f"⏱️  Completed in {process_time:.2f}s - Status: {response.status_code}")
+    log_event(
+        logger, "http_request",
+        method=request.method,
+        path=request.url.path,
+        status=response.status_code,
+        duration_ms=round(process_time * 1000, 1),
+        client=request.client.host if request.client else None,
+    )
     
     return response
 
@@ -109,151 +199,301 @@ class RecommendationResponse(BaseModel):
     overallScore: int
     overallStatus: str
     summary: str
-    categories: Dict[str, Dict[str, Any]]
+    categories: Dict[str, CategoryAssessment]
     tasks: List[AIRecommendation]
 
+def assessment_response(assessment: FarmStatusAssessment) -> Response:
+    """
+    Serialize an assessment once, straight to JSON bytes (orjson when
+    installed, pydantic's serializer otherwise). The assessment was validated
+    when it was parsed, so the response model is constructed without
+    validating it a second time, and returning a Response skips FastAPI's own
+    validate-and-encode pass.
+    """
+    response = RecommendationResponse.model_construct(
+        overallScore=assessment.overallScore,
+        overallStatus=assessment.overallStatus,
+        summary=assessment.summary,
+        categories=assessment.categories,
+        tasks=assessment.recommendations,
+    )
+    body = orjson.dumps(response.model_dump()) if orjson is not None else response.model_dump_json()
+    return Response(content=body, media_type="application/json")
+
 @app.post("/process-assessment", response_model=RecommendationResponse)
-async def analyze_assessment(request: AssessmentRequest):
+async def analyze_assessment(request: AssessmentRequest, x_priority: Optional[str] = Header(None),
+                             x_priority_token: Optional[str] = Header(None),
+                             x_profile: Optional[str] = Header(None)):
+    request_id = uuid.uuid4().hex[:12]
+    timings = start_stage_timings()
+    profile_id = None
     try:
-        # Log incoming request
-        logger.info("=" * 80)
-        logger.info("📥 INCOMING REQUEST FROM FRONTEND")
-        logger.info("=" * 80)
-        
         request_dict = request.model_dump()
-        logger.info(f"Farm Name: {request_dict.get('farmName')}")
-        logger.info(f"Location: {request_dict.get('location')}")
-        logger.info(f"Species: {request_dict.get('primarySpecies')}")
-        logger.info(f"Farm Type: {request_dict.get('farmType')}")
-        logger.info(f"Farm Size: {request_dict.get('farmSize')}")
-        logger.info(f"New/Existing: {request_dict.get('isNewFarmer')}")
-        logger.info(f"Top Concerns: {request_dict.get('topConcerns')}")
-        
-        # Log full request as JSON
-        logger.info("\n📋 FULL REQUEST DATA:")
-        logger.info(json.dumps(request_dict, indent=2, ensure_ascii=False))
-        logger.info("-" * 80)
         
         # Convert request to internal schema
-        assessment_data = AssessmentData(**request.model_dump())
-        
-        logger.info("🤖 Processing assessment with RAG pipeline...")
+        assessment_data = AssessmentData(**request_dict)
         
-        # Process with RAG pipeline
-        farm_assessment = process_farm_assessment(assessment_data)
+        # Same answers as an earlier assessment: reuse it without taking a slot
+        farm_assessment = await run_in_threadpool(lookup_cached_assessment, assessment_data)
+        cached = farm_assessment is not None
+        if not cached:
+            # Process with RAG pipeline (off the event loop, within the assessment pool's capacity)
+            async with admit(ASSESSMENT_POOL, parse_priority(x_priority, x_priority_token)):
+                farm_assessment, profile_id = await run_in_threadpool(
+                    PROFILER.run, PROFILER.wants_profile(x_profile), "assessment",
+                    process_farm_assessment, assessment_data,
+                )
         
-        # Convert FarmStatusAssessment to response format
-        response_data = {
-            "overallScore": farm_assessment.overallScore,
-            "overallStatus": farm_assessment.overallStatus,
-            "summary": farm_assessment.summary,
-            "categories": {
-                key: {
-                    "score": cat.score,
-                    "status": cat.status,
-                    "issues": cat.issues,
-                    "strengths": cat.strengths
-                }
-                for key, cat in farm_assessment.categories.items()
-            },
-            "tasks": farm_assessment.recommendations
-        }
-        
-        # Log outgoing response
-        logger.info("=" * 80)
-        logger.info("📤 SENDING RESPONSE TO FRONTEND")
-        logger.info("=" * 80)
-        logger.info(f"Overall Score: {response_data['overallScore']}/100")
-        logger.info(f"Overall Status: {response_data['overallStatus']}")
-        logger.info(f"Summary: {response_data['summary'][:100]}...")
-        
-        # Log category scores
-        logger.info("\n📊 CATEGORY SCORES:")
-        for cat_name, cat_data in response_data['categories'].items():
-            logger.info(f"  • {cat_name.replace('_', ' ').title()}: {cat_data['score']}/100 ({cat_data['status']})")
+        response = assessment_response(farm_assessment)
+        if profile_id is not None:
+            response.headers["X-Profile-Id"] = profile_id
         
-        logger.info(f"\n✅ Generated {len(response_data['tasks'])} recommendations")
-        
-        # Log first recommendation as sample
-        if response_data['tasks']:
-            first_task = response_data['tasks'][0]
-            logger.info(f"\n📝 Sample Recommendation:")
-            logger.info(f"  Title: {first_task.title}")
-            logger.info(f"  Priority: {first_task.priority}")
-            logger.info(f"  Category: {first_task.category}")
+        log_event(
+            logger, "assessment_completed",
+            request_id=request_id,
+            farm_type=assessment_data.farmType,
+            species=assessment_data.primarySpecies,
+            is_new_farmer=assessment_data.isNewFarmer,
+            concerns=len(assessment_data.topConcerns),
+            overall_score=farm_assessment.overallScore,
+            overall_status=farm_assessment.overallStatus,
+            categories={key: cat.score for key, cat in farm_assessment.categories.items()},
+            recommendations=len(farm_assessment.recommendations),
+            collection=assessment_collection(assessment_data),
+            cached=cached,
+            profile_id=profile_id,
+            stages_ms=stage_timings_ms(timings),
+        )
         
-        # Log full response as JSON
-        logger.info("\n📋 FULL RESPONSE DATA:")
-        # Create serializable version of response
-        serializable_response = {
-            "overallScore": response_data["overallScore"],
-            "overallStatus": response_data["overallStatus"],
-            "summary": response_data["summary"],
-            "categories": response_data["categories"],
-            "tasks": [
-                {
-                    "title": task.title,
-                    "description": task.description,
-                    "priority": task.priority,
-                    "category": task.category,
-                    "estimatedCost": task.estimatedCost,
-                    "timeframe": task.timeframe,
-                    "adaptationReason": task.adaptationReason
-                }
-                for task in response_data["tasks"]
-            ]
-        }
-        logger.info(json.dumps(serializable_response, indent=2, ensure_ascii=False))
-        logger.info("=" * 80)
-        logger.info("✅ REQUEST COMPLETED SUCCESSFULLY")
-        logger.info("=" * 80)
+        # Full payloads are opt-in (LOG_PAYLOAD_SAMPLE_RATE) and logged at most once
+        if should_log_payload():
+            log_event(
+                logger, "assessment_payload",
+                request_id=request_id,
+                request=request_dict,
+                response=farm_assessment.model_dump(),
+            )
         
-        return response_data
+        return response
+    except AdmissionRejected:
+        raise
     except Exception as e:
-        logger.error("=" * 80)
-        logger.error("❌ ERROR PROCESSING REQUEST")
-        logger.error("=" * 80)
-        logger.error(f"Error: {str(e)}")
-        logger.error("=" * 80)
+        log_event(
+            logger, "assessment_failed", level=logging.ERROR,
+            request_id=request_id,
+            error_type=type(e).__name__,
+            error=str(e),
+            stages_ms=stage_timings_ms(timings),
+        )
+        record_error("/process-assessment", e)
+        if is_upstream_overload(e):
+            raise upstream_overload_error(ASSESSMENT_POOL)
         raise HTTPException(status_code=500, detail=f"Error processing assessment: {str(e)}")
 
 class QueryRequest(BaseModel):
     question: str
     session_id: Optional[str] = None
+    # Knowledge-base collection: named explicitly, or routed by the farm's location and species
+    collection: Optional[str] = None
+    location: Optional[str] = None
+    primarySpecies: Optional[str] = None
 
 class QueryResponse(BaseModel):
     answer: str
     question: str
     timestamp: str
 
+def query_collection(request: QueryRequest) -> Optional[str]:
+    """Collection a question is answered from (None: the default); 404 for an unknown name"""
+    try:
+        return COLLECTIONS.select(
+            request.collection, {"location": request.location, "primarySpecies": request.primarySpecies}
+        )
+    except CollectionNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+def coalescing_key(request: QueryRequest, collection: Optional[str] = None) -> Optional[str]:
+    """Key under which identical in-flight questions share one answer, or None.
+    Session questions depend on the conversation so far and are never shared."""
+    if not QUERY_SINGLEFLIGHT_ENABLED or request.session_id:
+        return None
+    key = normalize_question(request.question)
+    return f"{collection}:{key}" if collection else key
+
+def find_stored_answer(question: str, collection: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
+    # FAQ answers were generated from the default collection
+    answer = lookup_faq_answer(question) if FAQ_ENABLED and collection is None else None
+    if answer is not None:
+        return answer, "precomputed"
+    answer = lookup_cached_answer(question, collection)
+    return answer, "cached" if answer is not None else None
+
+async def stored_answer(request: QueryRequest, collection: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
+    """Precomputed or cached answer for a question asked outside a session, and which of the two it is"""
+    if request.session_id:
+        return None, None
+    return await run_in_threadpool(find_stored_answer, request.question, collection)
+
 @app.post("/query", response_model=QueryResponse)
-async def query_knowledge(request: QueryRequest):
+async def query_knowledge(request: QueryRequest, response: Response, x_priority: Optional[str] = Header(None),
+                          x_priority_token: Optional[str] = Header(None),
+                          x_profile: Optional[str] = Header(None)):
     """
     Query the RAG system for farm-related knowledge.
     Includes guardrails to only answer aquaculture-related questions.
+    Frequently asked questions are answered from precomputed answers, questions
+    answered before from the answer cache, and identical questions already
+    being answered share that answer. Questions are answered from the
+    collection the request names or is routed to by location and species.
     """
+    timings = start_stage_timings()
+    profile_id = None
+    collection = query_collection(request)
+    
+    async def compute() -> str:
+        nonlocal profile_id
+        # Get answer from RAG system (off the event loop, within the chat pool's capacity)
+        async with admit(CHAT_POOL, parse_priority(x_priority, x_priority_token)):
+            answer, profile_id = await run_in_threadpool(
+                PROFILER.run, PROFILER.wants_profile(x_profile), "query",
+                query_farm_knowledge, request.question, session_id=request.session_id, collection=collection,
+            )
+            return answer
+    
     try:
-        logger.info("=" * 80)
-        logger.info("🤖 CHATBOT QUERY REQUEST")
-        logger.info("=" * 80)
-        logger.info(f"Question: {request.question}")
-        logger.info(f"Session ID: {request.session_id or 'N/A'}")
+        answer, stored = await stored_answer(request, collection)
+        coalesced = False
+        if stored is None:
+            key = coalescing_key(request, collection)
+            if key is None:
+                answer = await compute()
+            else:
+                answer, coalesced = await QUERY_FLIGHT.do(key, compute)
         
-        # Get answer from RAG system
-        answer = query_farm_knowledge(request.question)
-        
-        logger.info(f"✅ Generated answer ({len(answer)} characters)")
-        logger.info("=" * 80)
+        log_event(
+            logger, "query_completed",
+            session_id=request.session_id,
+            question_chars=len(request.question),
+            answer_chars=len(answer),
+            collection=collection,
+            coalesced=coalesced,
+            precomputed=stored == "precomputed",
+            cached=stored == "cached",
+            streamed=False,
+            profile_id=profile_id,
+            stages_ms=stage_timings_ms(timings),
+        )
+        if should_log_payload():
+            log_event(logger, "query_payload", session_id=request.session_id, question=request.question, answer=answer)
+        if profile_id is not None:
+            response.headers["X-Profile-Id"] = profile_id
         
         return QueryResponse(
             answer=answer,
             question=request.question,
             timestamp=datetime.now().isoformat()
         )
+    except AdmissionRejected:
+        raise
     except Exception as e:
-        logger.error(f"❌ Error processing query: {str(e)}")
+        log_event(
+            logger, "query_failed", level=logging.ERROR,
+            session_id=request.session_id,
+            error_type=type(e).__name__,
+            error=str(e),
+            stages_ms=stage_timings_ms(timings),
+        )
+        record_error("/query", e)
+        if is_upstream_overload(e):
+            raise upstream_overload_error(CHAT_POOL)
         raise HTTPException(status_code=500, detail=f"Error processing query: {str(e)}")
 
+def sse_event(data: str) -> str:
+    return f"data: {data}\n\n"
+
+async def single_piece(answer: str):
+    yield answer
+
+@app.post("/query/stream")
+async def query_knowledge_stream(request: QueryRequest, x_priority: Optional[str] = Header(None),
+                                 x_priority_token: Optional[str] = Header(None)):
+    """
+    Like /query, but streams the answer as server-sent events while it is generated:
+    one `data: {"token": "..."}` event per piece, then `data: [DONE]`.
+    Identical questions already being streamed join that stream from its start.
+    A precomputed or cached answer is sent as a single piece.
+    """
+    timings = start_stage_timings()
+    collection = query_collection(request)
+    key = coalescing_key(request, collection)
+    session = SESSIONS.get(request.session_id) if request.session_id else None
+    
+    answer, stored = await stored_answer(request, collection)
+    if stored is not None:
+        subscription = None
+        source = single_piece(answer)
+    else:
+        subscription = QUERY_STREAM_FLIGHT.join(key)
+        if subscription is None:
+            # Only the stream's producer holds a chat slot, from before it starts until it
+            # finishes or is cancelled; rejections raise before streaming starts
+            slot = AsyncExitStack()
+            await slot.enter_async_context(admit(CHAT_POOL, parse_priority(x_priority, x_priority_token)))
+            loop = asyncio.get_running_loop()
+            subscription = QUERY_STREAM_FLIGHT.subscribe(
+                key, lambda: stream_answer(request.question, session, collection),
+                on_done=lambda: asyncio.run_coroutine_threadsafe(slot.aclose(), loop),
+            )
+            if subscription.shared:
+                # Another request started the stream after join: it holds the slot
+                await slot.aclose()
+        source = subscription
+    
+    async def events():
+        pieces = []
+        try:
+            async for piece in source:
+                pieces.append(piece)
+                yield sse_event(json.dumps({"token": piece}))
+            answer = "".join(pieces).strip()
+            if request.session_id:
+                await run_in_threadpool(record_query_turn, request.session_id, request.question,
+                                        answer, subscription.result)
+            
+            log_event(
+                logger, "query_completed",
+                session_id=request.session_id,
+                question_chars=len(request.question),
+                answer_chars=len(answer),
+                collection=collection,
+                coalesced=subscription is not None and subscription.shared,
+                precomputed=stored == "precomputed",
+                cached=stored == "cached",
+                streamed=True,
+                stages_ms=stage_timings_ms(timings),
+            )
+            if should_log_payload():
+                log_event(logger, "query_payload", session_id=request.session_id, question=request.question, answer=answer)
+            yield sse_event("[DONE]")
+        except Exception as e:
+            # Headers are already sent, so the failure is reported in the stream itself
+            log_event(
+                logger, "query_failed", level=logging.ERROR,
+                session_id=request.session_id,
+                error_type=type(e).__name__,
+                error=str(e),
+                streamed=True,
+                stages_ms=stage_timings_ms(timings),
+            )
+            record_error("/query/stream", e)
+            yield sse_event(json.dumps({"error": f"Error processing query: {str(e)}"}))
+        finally:
+            if subscription is not None:
+                # When the last listener disconnects, the producer stops and gives back its slot
+                subscription.close()
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
 @app.get("/")
 async def root():
     """Root endpoint - API information"""
@@ -263,18 +503,51 @@ async def root():
         "model": "llama-3.1-8b-instant (Groq)",
         "endpoints": {
             "health": "/health",
+            "ready": "/ready",
             "assessment": "/process-assessment (POST)",
             "query": "/query (POST)",
+            "query_stream": "/query/stream (POST, server-sent events)",
+            "collections": "/collections",
+            "metrics": "/metrics",
             "docs": "/docs"
         }
     }
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
-    logger.info("💚 Health check requested")
+    """Health check endpoint (liveness: the process is up and serving HTTP)"""
     return {"status": "healthy", "service": "farm-ai"}
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness endpoint: 200 once warm-up has loaded every component, 503 before"""
+    snapshot = READINESS.snapshot()
+    return JSONResponse(status_code=200 if READINESS.is_ready else 503, content=snapshot)
+
+@app.get("/collections")
+async def collections():
+    """Knowledge-base collections: residency, size, and load/eviction/retrieval counts in this worker"""
+    stats = await run_in_threadpool(COLLECTIONS.stats)
+    default_db = loaded_vector_db()
+    stats["default"].update(resident=default_db is not None, index_version=getattr(default_db, "version", None))
+    return stats
+
+@app.get("/profiles/{profile_id}")
+async def download_profile(profile_id: str, x_profile: Optional[str] = Header(None)):
+    """Download a request profile (pstats format); needs the X-Profile admin token"""
+    if not PROFILER.authorized(x_profile):
+        raise HTTPException(status_code=403, detail="Profiling is disabled or the X-Profile token is wrong")
+    path = PROFILER.path_for(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Profile {profile_id} not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=os.path.basename(path))
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics endpoint (per-stage latency, cache, token and error counters)"""
+    payload, content_type = render_metrics()
+    return Response(content=payload, media_type=content_type)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
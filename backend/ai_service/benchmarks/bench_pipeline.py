@@ -0,0 +1,287 @@
+"""
+Offline end-to-end benchmark for the RAG pipeline.
+
+Runs process_farm_assessment and query_farm_knowledge on synthetic farm
+profiles and questions against the stub LLM (no Groq key or network needed),
+then reports per-stage p50/p95/p99 latency, throughput and peak RSS as JSON
+so results can be compared across commits.
+
+Usage (from backend/ai_service):
+    python -m benchmarks.bench_pipeline --assessments 20 --queries 50 --output bench.json
+    python -m benchmarks.bench_pipeline --fake-embeddings --llm-latency-ms 0
+    python -m benchmarks.bench_pipeline --compare baseline.json bench.json
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+from .synthetic import generate_chunks, generate_profiles, generate_questions
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Summarize latency samples (seconds) as milliseconds"""
+    return {
+        "count": len(samples),
+        "mean": round(sum(samples) / len(samples) * 1000, 3) if samples else 0.0,
+        "p50": round(percentile(samples, 50) * 1000, 3),
+        "p95": round(percentile(samples, 95) * 1000, 3),
+        "p99": round(percentile(samples, 99) * 1000, 3),
+        "max": round(max(samples) * 1000, 3) if samples else 0.0,
+    }
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / divisor, 1)
+
+
+def git_commit() -> str:
+    """Short hash of the current commit, if available"""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=SERVICE_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def build_synthetic_index(index_dir: str, chunk_count: int, seed: int):
+    """Embed synthetic chunks into a fresh Chroma index"""
+    try:
+        from langchain_chroma import Chroma
+    except ImportError:
+        from langchain_community.vectorstores import Chroma
+    from modules.embedding import get_embeddings_model
+
+    chunks = generate_chunks(chunk_count, seed=seed)
+    Chroma.from_texts(
+        texts=[chunk["text"] for chunk in chunks],
+        metadatas=[chunk["metadata"] for chunk in chunks],
+        embedding=get_embeddings_model(),
+        persist_directory=index_dir,
+    )
+
+
+def build_synthetic_artifact(index_dir: str, chunk_count: int, seed: int):
+    """Embed synthetic chunks into an index artifact with its segment table (see build_index.py)"""
+    from modules.embedding import embedding_model_id, get_embeddings_model
+    from modules.index_artifact import build_artifact, load_artifact
+    from modules.segment_cache import build_segment_table, write_segment_table
+
+    chunks = generate_chunks(chunk_count, seed=seed)
+    embeddings = get_embeddings_model()
+    manifest = build_artifact(
+        index_dir,
+        [chunk["text"] for chunk in chunks],
+        [chunk["metadata"] for chunk in chunks],
+        embeddings=embeddings,
+        embedding_model=embedding_model_id(),
+        overwrite=True,
+    )
+    index = load_artifact(index_dir, embeddings, verify=False)
+    write_segment_table(index_dir, build_segment_table(index, embeddings))
+    return manifest
+
+
+def run_workload(func: Callable[[Any], Any], items: List[Any], concurrency: int, warmup: int) -> Dict[str, Any]:
+    """Run func over items and collect total and per-stage latencies"""
+    from modules.metrics import start_stage_timings
+
+    def run_one(item):
+        timings = start_stage_timings()
+        start = time.perf_counter()
+        try:
+            func(item)
+            ok = True
+        except Exception as e:
+            print(f"  error: {type(e).__name__}: {e}")
+            ok = False
+        return ok, time.perf_counter() - start, dict(timings)
+
+    for item in items[:warmup]:
+        run_one(item)
+    measured = items[warmup:]
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(run_one, measured))
+    wall = time.perf_counter() - wall_start
+
+    totals = [total for ok, total, _ in results if ok]
+    stages: Dict[str, List[float]] = {}
+    for ok, _, timings in results:
+        if not ok:
+            continue
+        for stage, seconds in timings.items():
+            stages.setdefault(stage, []).append(seconds)
+
+    return {
+        "count": len(measured),
+        "errors": sum(1 for ok, _, _ in results if not ok),
+        "concurrency": concurrency,
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(totals) / wall, 3) if wall > 0 else 0.0,
+        "latency_ms": {
+            "total": summarize(totals),
+            "stages": {stage: summarize(samples) for stage, samples in sorted(stages.items())},
+        },
+    }
+
+
+def run_benchmark(args) -> Dict[str, Any]:
+    """Configure the offline environment, run both workloads and collect results"""
+    os.environ["LLM_PROVIDER"] = "stub"
+    os.environ["STUB_LLM_LATENCY_MS"] = str(args.llm_latency_ms)
+    os.environ["STUB_LLM_TOKENS_PER_SEC"] = str(args.llm_tokens_per_sec)
+    if args.fake_embeddings:
+        os.environ["EMBEDDING_BACKEND"] = "fake"
+
+    temp_dir = None
+    index_dir = args.index_dir
+    if not index_dir or not (os.path.isdir(index_dir) and os.listdir(index_dir)):
+        temp_dir = tempfile.TemporaryDirectory(prefix="likai-bench-")
+        index_dir = temp_dir.name
+        print(f"Building synthetic index ({args.synthetic_chunks} chunks) in {index_dir}")
+        build_synthetic_index(index_dir, args.synthetic_chunks, args.seed)
+    os.environ["VECTOR_DB_PATH"] = index_dir
+
+    # Imported after the environment is configured (module-level settings)
+    from modules.rag_pipeline import process_farm_assessment, query_farm_knowledge
+    from modules.schemas import AssessmentData
+
+    profiles = [AssessmentData(**p) for p in generate_profiles(args.assessments + args.warmup, seed=args.seed)]
+    questions = generate_questions(args.queries + args.warmup, seed=args.seed)
+
+    results: Dict[str, Any] = {}
+    if args.assessments:
+        print(f"Running {args.assessments} assessments (concurrency {args.concurrency})...")
+        results["assessment"] = run_workload(process_farm_assessment, profiles, args.concurrency, args.warmup)
+    if args.queries:
+        print(f"Running {args.queries} queries (concurrency {args.concurrency})...")
+        results["query"] = run_workload(query_farm_knowledge, questions, args.concurrency, args.warmup)
+
+    if temp_dir is not None:
+        temp_dir.cleanup()
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {
+                "assessments": args.assessments,
+                "queries": args.queries,
+                "concurrency": args.concurrency,
+                "warmup": args.warmup,
+                "seed": args.seed,
+                "llm_latency_ms": args.llm_latency_ms,
+                "llm_tokens_per_sec": args.llm_tokens_per_sec,
+                "embedding_backend": os.getenv("EMBEDDING_BACKEND", "huggingface"),
+                "index": "synthetic" if temp_dir is not None else index_dir,
+            },
+        },
+        "results": results,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    """Print a human readable summary of a benchmark report"""
+    print("\n" + "=" * 80)
+    print(f"  PIPELINE BENCHMARK ({report['meta']['commit']})")
+    print("=" * 80)
+    for workload, result in report["results"].items():
+        total = result["latency_ms"]["total"]
+        print(f"\n{workload}: {result['count']} runs, {result['errors']} errors, "
+              f"{result['throughput_rps']} req/s")
+        print(f"  {'stage':<20} {'p50':>10} {'p95':>10} {'p99':>10}")
+        print(f"  {'total':<20} {total['p50']:>10} {total['p95']:>10} {total['p99']:>10}")
+        for stage, stats in result["latency_ms"]["stages"].items():
+            print(f"  {stage:<20} {stats['p50']:>10} {stats['p95']:>10} {stats['p99']:>10}")
+    print(f"\nPeak RSS: {report['peak_rss_mb']} MB")
+
+
+def compare_reports(old_path: str, new_path: str):
+    """Print p50/p95 deltas between two benchmark reports"""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    print(f"Comparing {old['meta']['commit']} -> {new['meta']['commit']} (ms)")
+    for workload, new_result in new["results"].items():
+        old_result = old["results"].get(workload)
+        if not old_result:
+            continue
+        print(f"\n{workload}:")
+        rows = {"total": (old_result["latency_ms"]["total"], new_result["latency_ms"]["total"])}
+        for stage, stats in new_result["latency_ms"]["stages"].items():
+            if stage in old_result["latency_ms"]["stages"]:
+                rows[stage] = (old_result["latency_ms"]["stages"][stage], stats)
+        for name, (before, after) in rows.items():
+            for pct in ("p50", "p95"):
+                delta = after[pct] - before[pct]
+                change = f"{delta / before[pct] * 100:+.1f}%" if before[pct] else "n/a"
+                print(f"  {name:<20} {pct} {before[pct]:>10} -> {after[pct]:>10} ({change})")
+    print(f"\nPeak RSS: {old['peak_rss_mb']} -> {new['peak_rss_mb']} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline RAG pipeline benchmark")
+    parser.add_argument("--assessments", type=int, default=20, help="Assessments to run")
+    parser.add_argument("--queries", type=int, default=50, help="Chatbot queries to run")
+    parser.add_argument("--concurrency", type=int, default=1, help="Worker threads")
+    parser.add_argument("--warmup", type=int, default=2, help="Unmeasured runs per workload")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for synthetic data")
+    parser.add_argument("--llm-latency-ms", type=float, default=300, help="Stub LLM time to first token")
+    parser.add_argument("--llm-tokens-per-sec", type=float, default=800, help="Stub LLM output token rate")
+    parser.add_argument("--fake-embeddings", action="store_true", help="Use deterministic fake embeddings")
+    parser.add_argument("--index-dir", help="Existing Chroma index (default: build a synthetic one)")
+    parser.add_argument("--synthetic-chunks", type=int, default=300, help="Chunks in the synthetic index")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two JSON reports")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_reports(*args.compare)
+        return 0
+
+    report = run_benchmark(args)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+    return 0 if all(r["errors"] == 0 for r in report["results"].values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
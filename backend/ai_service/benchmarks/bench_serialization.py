@@ -0,0 +1,135 @@
+"""
+Serialization CPU benchmark for /process-assessment responses.
+
+Measures the CPU time spent turning a typical assessment (the stub LLM's
+report: 5 categories, 8 recommendations) into response bytes, per request:
+
+    dict_revalidate    the old path: hand-built dict, validated against the
+                       response model, then jsonable_encoder + json.dumps (what
+                       FastAPI does with a returned dict before its pydantic
+                       fast path, e.g. the 0.115 minimum in requirements.txt)
+    dict_dump_json     hand-built dict validated and dumped by pydantic in one
+                       step (FastAPI's fast path on recent versions)
+    pydantic_single    response model constructed from the already-validated
+                       assessment and dumped once by pydantic
+    single_pass        assessment_response() as served: the same, encoded with
+                       orjson when it is installed
+
+Usage (from backend/ai_service):
+    python -m benchmarks.bench_serialization --iterations 20000
+"""
+
+import argparse
+import json
+import time
+from typing import Any, Callable, Dict
+
+from .bench_pipeline import git_commit
+
+
+def typical_assessment():
+    """The stub LLM's assessment, parsed as the pipeline would"""
+    from modules.rag_pipeline import parse_ai_response
+    from modules.stub_llm import build_stub_assessment
+
+    return parse_ai_response(build_stub_assessment())
+
+
+def legacy_response_dict(assessment) -> Dict[str, Any]:
+    """The response dict /process-assessment used to build by hand"""
+    return {
+        "overallScore": assessment.overallScore,
+        "overallStatus": assessment.overallStatus,
+        "summary": assessment.summary,
+        "categories": {
+            key: {"score": cat.score, "status": cat.status, "issues": cat.issues, "strengths": cat.strengths}
+            for key, cat in assessment.categories.items()
+        },
+        "tasks": assessment.recommendations,
+    }
+
+
+def serializers(assessment) -> Dict[str, Callable[[], bytes]]:
+    from fastapi.encoders import jsonable_encoder
+    from app import RecommendationResponse, assessment_response
+
+    def dict_revalidate() -> bytes:
+        model = RecommendationResponse.model_validate(legacy_response_dict(assessment))
+        return json.dumps(jsonable_encoder(model), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def dict_dump_json() -> bytes:
+        return RecommendationResponse.model_validate(legacy_response_dict(assessment)).model_dump_json().encode()
+
+    def pydantic_single() -> bytes:
+        return RecommendationResponse.model_construct(
+            overallScore=assessment.overallScore,
+            overallStatus=assessment.overallStatus,
+            summary=assessment.summary,
+            categories=assessment.categories,
+            tasks=assessment.recommendations,
+        ).model_dump_json().encode()
+
+    def single_pass() -> bytes:
+        return assessment_response(assessment).body
+
+    return {
+        "dict_revalidate": dict_revalidate,
+        "dict_dump_json": dict_dump_json,
+        "pydantic_single": pydantic_single,
+        "single_pass": single_pass,
+    }
+
+
+def measure(func: Callable[[], bytes], iterations: int) -> Dict[str, float]:
+    """CPU and wall time per call in microseconds"""
+    for _ in range(min(iterations, 100)):
+        func()
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    for _ in range(iterations):
+        func()
+    cpu, wall = time.process_time() - cpu_start, time.perf_counter() - wall_start
+    return {
+        "cpu_us": round(cpu / iterations * 1e6, 2),
+        "wall_us": round(wall / iterations * 1e6, 2),
+        "bytes": len(func()),
+    }
+
+
+def run_benchmark(iterations: int) -> Dict[str, Any]:
+    assessment = typical_assessment()
+    candidates = serializers(assessment)
+
+    # Every path must produce the same document
+    expected = json.loads(candidates["single_pass"]())
+    for name, func in candidates.items():
+        if json.loads(func()) != expected:
+            raise AssertionError(f"{name} serialized a different document")
+
+    results = {name: measure(func, iterations) for name, func in candidates.items()}
+    baseline = results["dict_revalidate"]["cpu_us"]
+    for result in results.values():
+        result["speedup"] = round(baseline / result["cpu_us"], 2) if result["cpu_us"] else 0.0
+    return {
+        "commit": git_commit(),
+        "iterations": iterations,
+        "recommendations": len(assessment.recommendations),
+        "categories": len(assessment.categories),
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark assessment response serialization")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.iterations)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Retrieval evaluation: recall@k versus query latency.
+
+Runs the questions of a gold set against a vector index and scores the top-k
+chunks for each k. The gold set is JSON lines, one question per line, listing
+the (source, page) pairs that answer it:
+
+    {"question": "...", "relevant": [{"source": "Explanatory-Manual-for-GAqP.pdf", "page": 15}]}
+
+``page`` is the 0-based page number stored in chunk metadata (for the GAqP
+manual, the printed page label minus one). A retrieved chunk is relevant when
+its source and page match a gold pair. For each k the report has:
+
+    recall      mean fraction of a question's gold pairs in the top k
+    hit_rate    fraction of questions with at least one relevant chunk in the top k
+    mrr         mean reciprocal rank of the first relevant chunk (0 beyond k)
+    search_ms   p50/p95 of the similarity search alone
+    query_ms    p50/p95 of query embedding plus search, as /query pays them
+
+plus the index size (chunks, MB on disk), embedding model and chunker.
+
+Backends:
+    artifact   the prebuilt index at --index or INDEX_ARTIFACT_PATH (default)
+    chroma     the Chroma DB at --index or VECTOR_DB_PATH
+    build      a temporary artifact built from data/pdfs (or --from-chunks) with
+               the current EMBEDDING_MODEL and EMBEDDING_MAX_TOKENS /
+               CHUNK_OVERLAP_TOKENS, to compare chunking settings before
+               rebuilding the served index
+
+Usage (from backend/ai_service):
+    python -m benchmarks.eval_retrieval --k 1 2 4 8
+    python -m benchmarks.eval_retrieval --backend chroma --repeats 5 --output eval.json
+    EMBEDDING_MAX_TOKENS=128 python -m benchmarks.eval_retrieval --backend build
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .bench_pipeline import git_commit, percentile
+
+DEFAULT_GOLD_SET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "retrieval_gold.jsonl")
+DEFAULT_K = [1, 2, 3, 4, 6, 8]
+
+BACKENDS = ("artifact", "chroma", "build")
+
+
+def load_gold_set(path: str) -> List[Dict[str, Any]]:
+    """Gold questions with their relevant (source, page) pairs; raises ValueError"""
+    gold = []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if not entry.get("question") or not entry.get("relevant"):
+                raise ValueError(f"{path}:{number}: a gold entry needs a question and relevant pages")
+            gold.append({
+                "question": entry["question"],
+                "relevant": {(r["source"], int(r["page"])) for r in entry["relevant"]},
+            })
+    return gold
+
+
+def directory_size_mb(path: str) -> float:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(dirpath, name)) for name in filenames)
+    return round(total / (1024 * 1024), 2)
+
+
+def open_backend(backend: str, path: Optional[str] = None, workdir: Optional[str] = None,
+                 from_chunks: bool = False) -> Tuple[Any, Dict[str, Any]]:
+    """The index to evaluate and a description of it; raises ValueError"""
+    from modules.embedding import embedding_model_id, get_embeddings_model
+
+    if backend == "build":
+        import build_index
+        from modules.chunking import get_chunker
+        from modules.index_artifact import build_artifact_from_documents
+
+        path = os.path.join(workdir or tempfile.mkdtemp(prefix="likai-eval-"), "index")
+        sources, chunks = build_index.stream_chunks(from_chunks=from_chunks)
+        build_artifact_from_documents(path, chunks, get_embeddings_model(), embedding_model_id(),
+                                      sources=sources, build={"chunker": get_chunker()})
+        backend = "artifact"
+
+    if backend == "artifact":
+        from modules.index_generations import resolve_index_dir
+        from modules.rag_pipeline import INDEX_ARTIFACT_PATH, load_index_artifact
+
+        index_dir = resolve_index_dir(path or INDEX_ARTIFACT_PATH)
+        if index_dir is None:
+            raise ValueError(f"No index artifact at {path or INDEX_ARTIFACT_PATH}; run build_index.py")
+        index = load_index_artifact(index_dir)
+        manifest = index.manifest
+        return index, {
+            "backend": "artifact",
+            "path": index_dir,
+            "index_version": index.version,
+            "embedding_model": manifest.get("embedding_model"),
+            "chunker": manifest.get("build", {}).get("chunker"),
+            "chunks": len(index),
+            "size_mb": directory_size_mb(index_dir),
+        }
+
+    if backend == "chroma":
+        from modules.rag_pipeline import VECTOR_DB_PATH, load_chroma_class
+
+        path = path or VECTOR_DB_PATH
+        if not (os.path.isdir(path) and os.listdir(path)):
+            raise ValueError(f"No Chroma DB at {path}")
+        index = load_chroma_class()(persist_directory=path, embedding_function=get_embeddings_model())
+        return index, {
+            "backend": "chroma",
+            "path": path,
+            "embedding_model": embedding_model_id(),
+            "chunks": index._collection.count(),
+            "size_mb": directory_size_mb(path),
+        }
+
+    raise ValueError(f"Unknown backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+
+
+def score(docs: List[Any], relevant: set) -> Tuple[float, float]:
+    """Recall and reciprocal rank of one ranked result list"""
+    found, first_rank = set(), 0
+    for rank, doc in enumerate(docs, 1):
+        key = (doc.metadata.get("source"), doc.metadata.get("page"))
+        if key in relevant:
+            found.add(key)
+            first_rank = first_rank or rank
+    return len(found) / len(relevant), (1.0 / first_rank if first_rank else 0.0)
+
+
+def evaluate(index: Any, gold: List[Dict[str, Any]], ks: List[int], repeats: int = 3) -> List[Dict[str, Any]]:
+    """Quality and latency of the top-k results for each k"""
+    embeddings = index.embeddings
+    embeddings.embed_query(gold[0]["question"])  # model warm-up
+
+    embedded = []
+    for entry in gold:
+        start = time.perf_counter()
+        vector = embeddings.embed_query(entry["question"])
+        embedded.append((entry, vector, time.perf_counter() - start))
+
+    rows = []
+    for k in sorted(set(ks)):
+        recalls, ranks, search, total = [], [], [], []
+        for entry, vector, embed_seconds in embedded:
+            for _ in range(max(1, repeats)):
+                start = time.perf_counter()
+                docs = index.similarity_search_by_vector(vector, k=k)
+                seconds = time.perf_counter() - start
+                search.append(seconds)
+                total.append(embed_seconds + seconds)
+            recall, reciprocal_rank = score(docs, entry["relevant"])
+            recalls.append(recall)
+            ranks.append(reciprocal_rank)
+        rows.append({
+            "k": k,
+            "recall": round(sum(recalls) / len(recalls), 3),
+            "hit_rate": round(sum(1 for r in ranks if r) / len(ranks), 3),
+            "mrr": round(sum(ranks) / len(ranks), 3),
+            "search_ms": {"p50": round(percentile(search, 50) * 1000, 3),
+                          "p95": round(percentile(search, 95) * 1000, 3)},
+            "query_ms": {"p50": round(percentile(total, 50) * 1000, 3),
+                         "p95": round(percentile(total, 95) * 1000, 3)},
+        })
+    return rows
+
+
+def run_evaluation(backend: str = "artifact", path: Optional[str] = None, gold_path: str = DEFAULT_GOLD_SET,
+                   ks: Optional[List[int]] = None, repeats: int = 3, from_chunks: bool = False) -> Dict[str, Any]:
+    gold = load_gold_set(gold_path)
+    if not gold:
+        raise ValueError(f"Gold set {gold_path} is empty")
+    with tempfile.TemporaryDirectory(prefix="likai-eval-") as workdir:
+        index, info = open_backend(backend, path, workdir=workdir, from_chunks=from_chunks)
+        results = evaluate(index, gold, ks or DEFAULT_K, repeats=repeats)
+    return {
+        "commit": git_commit(),
+        "gold_set": os.path.abspath(gold_path),
+        "questions": len(gold),
+        "repeats": repeats,
+        "index": info,
+        "results": results,
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    """Print the evaluation as one table"""
+    info = report["index"]
+    print("\n" + "=" * 80)
+    print(f"  RETRIEVAL EVALUATION ({report['commit']}, {report['questions']} questions)")
+    print("=" * 80)
+    print(f"  {info['backend']} index {info['path']}")
+    print(f"  embedding model {info['embedding_model']}, chunker {json.dumps(info.get('chunker'))}")
+    print(f"\n  {'k':>3} {'recall':>8} {'hit':>6} {'mrr':>6} {'search p50':>11} {'p95':>8} "
+          f"{'query p50':>10} {'p95':>8} {'chunks':>7} {'MB':>7}")
+    for row in report["results"]:
+        print(f"  {row['k']:>3} {row['recall']:>8.3f} {row['hit_rate']:>6.3f} {row['mrr']:>6.3f} "
+              f"{row['search_ms']['p50']:>11.3f} {row['search_ms']['p95']:>8.3f} "
+              f"{row['query_ms']['p50']:>10.3f} {row['query_ms']['p95']:>8.3f} "
+              f"{info['chunks']:>7} {info['size_mb']:>7.2f}")
+    print("\n  Latencies in ms; query = query embedding + similarity search")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate retrieval recall@k against query latency")
+    parser.add_argument("--backend", choices=BACKENDS, default="artifact", help="Vector store to evaluate")
+    parser.add_argument("--index", help="Index path (default INDEX_ARTIFACT_PATH or VECTOR_DB_PATH)")
+    parser.add_argument("--gold", default=DEFAULT_GOLD_SET, help="Gold set (JSON lines)")
+    parser.add_argument("--k", type=int, nargs="+", default=DEFAULT_K, help="Values of k to evaluate")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed searches per question and k")
+    parser.add_argument("--from-chunks", action="store_true", help="With --backend build, index stored chunks")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    try:
+        report = run_evaluation(args.backend, args.index, args.gold, args.k, args.repeats, args.from_chunks)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
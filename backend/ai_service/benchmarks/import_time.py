@@ -0,0 +1,138 @@
+"""
+Cold start measurement for the API process.
+
+Reports how long ``import app`` takes (via ``python -X importtime``), the
+slowest modules by cumulative import time, whether any ingestion-only or
+model dependencies were imported eagerly, and how long uvicorn takes from
+process start until ``/health`` answers.
+
+Usage (from backend/ai_service):
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --max-import-ms 800 --output cold_start.json
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+from .bench_pipeline import SERVICE_DIR, git_commit
+from .load_test import free_port
+
+# Modules that serving must not import until a request (or warm-up) needs them
+DEFERRED_MODULES = [
+    "torch",
+    "transformers",
+    "sentence_transformers",
+    "langchain_huggingface",
+    "chromadb",
+    "langchain_chroma",
+    "langchain_community",
+    "langchain_groq",
+    "langchain_text_splitters",
+    "pypdf",
+]
+
+
+def measure_import(target: str = "app") -> Dict[str, Any]:
+    """Import the target in a fresh interpreter and parse -X importtime output"""
+    check = (
+        f"import sys, time; start = time.perf_counter(); import {target}; "
+        f"elapsed = time.perf_counter() - start; "
+        f"print(elapsed); print(','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", check],
+        cwd=SERVICE_DIR, capture_output=True, text=True, check=True,
+    )
+    lines = result.stdout.strip().splitlines()
+    wall = float(lines[0])
+    eager = [m for m in lines[1].split(",") if m] if len(lines) > 1 else []
+
+    modules: List[Dict[str, Any]] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # Nesting depth is encoded as extra leading spaces before the module name
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.rstrip()[1:]
+        modules.append({
+            "module": name,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+
+    top_level = [m for m in modules if not m["module"].startswith(" ")]
+    slowest = sorted(modules, key=lambda m: m["cumulative_ms"], reverse=True)
+
+    return {
+        "target": target,
+        "wall_ms": round(wall * 1000, 1),
+        "modules_imported": len(modules),
+        "eager_deferred_modules": eager,
+        "top_level": sorted(top_level, key=lambda m: m["cumulative_ms"], reverse=True)[:10],
+        "slowest": [{**m, "module": m["module"].strip()} for m in slowest[:15]],
+    }
+
+
+def measure_health_ready(timeout: float = 60.0) -> float:
+    """Seconds from launching uvicorn until /health returns 200"""
+    port = free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=SERVICE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1.0).status_code == 200:
+                    return time.perf_counter() - start
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.02)
+        raise TimeoutError("/health did not respond")
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API import time and cold start")
+    parser.add_argument("--target", default="app", help="Module to import")
+    parser.add_argument("--skip-server", action="store_true", help="Only measure the import")
+    parser.add_argument("--max-import-ms", type=float, help="Fail if the import takes longer")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = {"commit": git_commit(), "import": measure_import(args.target)}
+    if not args.skip_server:
+        report["health_ready_ms"] = round(measure_health_ready() * 1000, 1)
+
+    imported = report["import"]
+    print(f"import {args.target}: {imported['wall_ms']} ms ({imported['modules_imported']} modules)")
+    for module in imported["slowest"][:10]:
+        print(f"  {module['cumulative_ms']:>9.1f} ms  {module['module']}")
+    if imported["eager_deferred_modules"]:
+        print(f"Eagerly imported heavy modules: {', '.join(imported['eager_deferred_modules'])}")
+    if "health_ready_ms" in report:
+        print(f"uvicorn start -> /health 200: {report['health_ready_ms']} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    failed = bool(imported["eager_deferred_modules"])
+    if args.max_import_ms is not None and imported["wall_ms"] > args.max_import_ms:
+        print(f"Import exceeded budget of {args.max_import_ms} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
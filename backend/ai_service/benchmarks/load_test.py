@@ -0,0 +1,320 @@
+"""
+HTTP load test for app.py against a local Groq-compatible stub server.
+
+Starts the stub LLM server and the FastAPI app as subprocesses, then drives
+``/query`` and ``/process-assessment`` with open-loop (Poisson) arrivals at
+increasing rates. Requests are sent on schedule whether or not earlier ones
+have finished, so queueing shows up as latency instead of being hidden by the
+client. Reports latency percentiles, error rates and the saturation point as
+JSON. Runs entirely on localhost.
+
+Most farmers ask one-off questions, so only ``--session-ratio`` of /query
+requests (default 10%) carry a ``session_id``, drawn from a pool of
+``--sessions`` conversations; the rest can hit the answer cache, the FAQ
+store and single-flight coalescing like real traffic. The server is pinned to
+a synthetic index artifact built for the run (or ``--index-dir``), never an
+artifact that happens to be deployed locally, and the report records which.
+
+Usage (from backend/ai_service):
+    python -m benchmarks.load_test --rates 1 2 4 8 --duration 20 --output load.json
+    python -m benchmarks.load_test --fake-embeddings --llm-latency-ms 800 --query-ratio 0.7
+    python -m benchmarks.load_test --session-ratio 1.0    # every question within a conversation
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from .bench_pipeline import SERVICE_DIR, build_synthetic_artifact, git_commit, summarize
+from .synthetic import generate_profiles, generate_questions
+
+ENDPOINTS = ("/query", "/process-assessment")
+
+
+def free_port() -> int:
+    """Ask the OS for an unused TCP port"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(target: str, port: int, env: Dict[str, str], workers: int = 1) -> subprocess.Popen:
+    """Start a uvicorn server for the given app in a subprocess"""
+    command = [
+        sys.executable, "-m", "uvicorn", target,
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning",
+    ]
+    return subprocess.Popen(command, cwd=SERVICE_DIR, env=env)
+
+
+def wait_until_healthy(url: str, timeout: float = 120.0):
+    """Poll a /health or /ready endpoint until it returns 200 or the timeout expires"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=2.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"Server did not become healthy: {url}")
+
+
+async def send_request(client: httpx.AsyncClient, endpoint: str, payload: Dict[str, Any],
+                       scheduled: float, results: List[Dict[str, Any]]):
+    """Send one request and record latency measured from its scheduled start"""
+    status: Optional[int] = None
+    error: Optional[str] = None
+    try:
+        response = await client.post(endpoint, json=payload)
+        status = response.status_code
+    except httpx.HTTPError as e:
+        error = type(e).__name__
+    results.append({
+        "endpoint": endpoint,
+        "status": status,
+        "error": error,
+        "latency": time.perf_counter() - scheduled,
+    })
+
+
+def query_payload(rng: random.Random, questions: List[str], session_ratio: float, sessions: int) -> Dict[str, Any]:
+    """A /query body; a session_ratio fraction continue one of the pool's conversations"""
+    payload: Dict[str, Any] = {"question": rng.choice(questions)}
+    if rng.random() < session_ratio:
+        payload["session_id"] = f"load-{rng.randint(1, sessions)}"
+    return payload
+
+
+async def run_step(base_url: str, rate: float, duration: float, query_ratio: float,
+                   questions: List[str], profiles: List[Dict[str, Any]], timeout: float,
+                   rng: random.Random, session_ratio: float = 0.1,
+                   sessions: int = 50) -> Tuple[List[Dict[str, Any]], float]:
+    """Fire requests with exponential inter-arrival times; return results and elapsed time"""
+    results: List[Dict[str, Any]] = []
+    tasks = []
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        start = time.perf_counter()
+        next_arrival = start
+        while next_arrival - start < duration:
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if rng.random() < query_ratio:
+                endpoint = "/query"
+                payload = query_payload(rng, questions, session_ratio, sessions)
+            else:
+                endpoint = "/process-assessment"
+                payload = rng.choice(profiles)
+            tasks.append(asyncio.create_task(send_request(client, endpoint, payload, next_arrival, results)))
+            next_arrival += rng.expovariate(rate)
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+    return results, elapsed
+
+
+def summarize_step(rate: float, elapsed: float, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Aggregate one step's results overall and per endpoint"""
+    def block(items):
+        ok = [r["latency"] for r in items if r["status"] == 200]
+        statuses: Dict[str, int] = {}
+        for r in items:
+            key = str(r["status"]) if r["status"] is not None else (r["error"] or "error")
+            statuses[key] = statuses.get(key, 0) + 1
+        return {
+            "sent": len(items),
+            "ok": len(ok),
+            "error_rate": round(1 - len(ok) / len(items), 4) if items else 0.0,
+            "statuses": statuses,
+            "latency_ms": summarize(ok),
+        }
+
+    overall = block(results)
+    overall["offered_rps"] = rate
+    overall["achieved_rps"] = round(overall["ok"] / elapsed, 3) if elapsed > 0 else 0.0
+    overall["endpoints"] = {
+        endpoint: block([r for r in results if r["endpoint"] == endpoint])
+        for endpoint in ENDPOINTS
+        if any(r["endpoint"] == endpoint for r in results)
+    }
+    return overall
+
+
+def is_saturated(step: Dict[str, Any], slo_ms: float, max_error_rate: float) -> bool:
+    """A step is saturated when errors, tail latency or throughput fall out of bounds"""
+    return (
+        step["error_rate"] > max_error_rate
+        or step["latency_ms"]["p95"] > slo_ms
+        or step["achieved_rps"] < 0.9 * step["offered_rps"]
+    )
+
+
+def read_index_version(path: str) -> str:
+    """Version of the artifact served from path (a generations root or a single artifact)"""
+    from modules.index_artifact import read_manifest
+    from modules.index_generations import resolve_index_dir
+
+    index_dir = resolve_index_dir(path)
+    if index_dir is None:
+        raise ValueError(f"No index artifact at {path}; run build_index.py")
+    return read_manifest(index_dir)["index_version"]
+
+
+def run_load_test(args) -> Dict[str, Any]:
+    """Start the stub and API servers, sweep the offered rates and collect results"""
+    env = dict(os.environ)
+    env.update({
+        "GROQ_API_KEY": "stub-key",
+        "STUB_LLM_LATENCY_MS": str(args.llm_latency_ms),
+        "STUB_LLM_TOKENS_PER_SEC": str(args.llm_tokens_per_sec),
+        "LOG_LEVEL": "WARNING",
+    })
+    if args.fake_embeddings:
+        env["EMBEDDING_BACKEND"] = "fake"
+        os.environ["EMBEDDING_BACKEND"] = "fake"
+
+    temp_dir = tempfile.TemporaryDirectory(prefix="likai-load-")
+    if args.index_dir:
+        index_dir = args.index_dir
+    else:
+        index_dir = os.path.join(temp_dir.name, "index")
+        print(f"Building synthetic index artifact ({args.synthetic_chunks} chunks) in {index_dir}")
+        build_synthetic_artifact(index_dir, args.synthetic_chunks, args.seed)
+    # Serve exactly this index: no locally deployed artifact, no Chroma fallback built on demand
+    env["INDEX_ARTIFACT_PATH"] = index_dir
+    env["VECTOR_DB_PATH"] = os.path.join(temp_dir.name, "vectordb")
+    env["INDEX_BUILD_ON_DEMAND"] = "false"
+    index_version = read_index_version(index_dir)
+    print(f"Serving index {index_dir} (version {index_version})")
+
+    stub_port, api_port = free_port(), free_port()
+    env["GROQ_BASE_URL"] = f"http://127.0.0.1:{stub_port}"
+    base_url = f"http://127.0.0.1:{api_port}"
+
+    processes = [
+        start_server("benchmarks.stub_groq_server:app", stub_port, env),
+        start_server("app:app", api_port, env, workers=args.workers),
+    ]
+    steps = []
+    try:
+        wait_until_healthy(f"http://127.0.0.1:{stub_port}/health")
+        wait_until_healthy(f"{base_url}/ready")
+
+        rng = random.Random(args.seed)
+        questions = generate_questions(200, seed=args.seed)
+        profiles = generate_profiles(100, seed=args.seed)
+
+        # Warm the pipeline so the first step does not pay cold-start costs
+        httpx.post(f"{base_url}/query", json={"question": questions[0]}, timeout=args.timeout)
+
+        for rate in args.rates:
+            print(f"Offering {rate} req/s for {args.duration}s...")
+            results, elapsed = asyncio.run(run_step(
+                base_url, rate, args.duration, args.query_ratio,
+                questions, profiles, args.timeout, rng, args.session_ratio, args.sessions
+            ))
+            step = summarize_step(rate, elapsed, results)
+            step["saturated"] = is_saturated(step, args.slo_ms, args.max_error_rate)
+            steps.append(step)
+            print(f"  achieved {step['achieved_rps']} req/s, p95 {step['latency_ms']['p95']} ms, "
+                  f"errors {step['error_rate'] * 100:.1f}%")
+            if step["saturated"] and args.stop_on_saturation:
+                break
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=30)
+        temp_dir.cleanup()
+
+    sustainable = [step["offered_rps"] for step in steps if not step["saturated"]]
+    saturated = [step["offered_rps"] for step in steps if step["saturated"]]
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(),
+            "config": {
+                "rates": args.rates,
+                "duration": args.duration,
+                "query_ratio": args.query_ratio,
+                "session_ratio": args.session_ratio,
+                "sessions": args.sessions,
+                "workers": args.workers,
+                "llm_latency_ms": args.llm_latency_ms,
+                "llm_tokens_per_sec": args.llm_tokens_per_sec,
+                "slo_ms": args.slo_ms,
+                "max_error_rate": args.max_error_rate,
+                "embedding_backend": env.get("EMBEDDING_BACKEND", "huggingface"),
+                "index": args.index_dir or f"synthetic ({args.synthetic_chunks} chunks)",
+                "index_version": index_version,
+                "seed": args.seed,
+            },
+        },
+        "steps": steps,
+        "max_sustainable_rps": max(sustainable) if sustainable else None,
+        "saturation_rps": min(saturated) if saturated else None,
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    """Print a human readable summary of a load test report"""
+    print("\n" + "=" * 80)
+    print(f"  LOAD TEST ({report['meta']['commit']})")
+    print("=" * 80)
+    print(f"  {'offered':>8} {'achieved':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'errors':>7}")
+    for step in report["steps"]:
+        latency = step["latency_ms"]
+        flag = "  SATURATED" if step["saturated"] else ""
+        print(f"  {step['offered_rps']:>8} {step['achieved_rps']:>9} {latency['p50']:>9} "
+              f"{latency['p95']:>9} {latency['p99']:>9} {step['error_rate'] * 100:>6.1f}%{flag}")
+    print(f"\nMax sustainable rate: {report['max_sustainable_rps']} req/s")
+    print(f"Saturation rate: {report['saturation_rps']} req/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Open-loop HTTP load test for the AI API")
+    parser.add_argument("--rates", type=float, nargs="+", default=[1, 2, 4, 8], help="Offered req/s per step")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds per step")
+    parser.add_argument("--query-ratio", type=float, default=0.8, help="Fraction of /query requests")
+    parser.add_argument("--session-ratio", type=float, default=0.1,
+                        help="Fraction of /query requests sent with a session_id")
+    parser.add_argument("--sessions", type=int, default=50, help="Conversations the sessioned requests belong to")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for app.py")
+    parser.add_argument("--timeout", type=float, default=60, help="Client timeout per request (s)")
+    parser.add_argument("--slo-ms", type=float, default=5000, help="p95 latency SLO for saturation")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="Error rate for saturation")
+    parser.add_argument("--stop-on-saturation", action="store_true", help="Stop after the first saturated step")
+    parser.add_argument("--llm-latency-ms", type=float, default=300, help="Stub LLM time to first token")
+    parser.add_argument("--llm-tokens-per-sec", type=float, default=800, help="Stub LLM output token rate")
+    parser.add_argument("--fake-embeddings", action="store_true", help="Use deterministic fake embeddings")
+    parser.add_argument("--index-dir", help="Existing index artifact (default: build a synthetic one)")
+    parser.add_argument("--synthetic-chunks", type=int, default=300, help="Chunks in the synthetic index")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for arrivals and payloads")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = run_load_test(args)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""
+Local Groq/OpenAI-compatible chat completions server.
+
+Serves ``POST /openai/v1/chat/completions`` (the path the Groq client calls)
+with the same canned responses as ``modules.stub_llm``, including SSE
+streaming, after a configurable time-to-first-token and token rate. Point the
+API at it with ``GROQ_BASE_URL=http://127.0.0.1:<port>`` to load test
+``app.py`` without network access.
+
+Usage (from backend/ai_service):
+    STUB_LLM_LATENCY_MS=500 uvicorn benchmarks.stub_groq_server:app --port 8100
+"""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from modules.stub_llm import ASSESSMENT_MARKER, STUB_ANSWER, build_stub_assessment, estimate_tokens
+
+LATENCY_MS = float(os.getenv("STUB_LLM_LATENCY_MS", "300"))
+TOKENS_PER_SEC = float(os.getenv("STUB_LLM_TOKENS_PER_SEC", "800"))
+
+app = FastAPI(title="Groq Stub Server")
+
+
+def completion_text(messages) -> str:
+    """Pick the canned response matching the prompt type"""
+    prompt = "\n".join(str(message.get("content", "")) for message in messages)
+    return build_stub_assessment() if ASSESSMENT_MARKER in prompt else STUB_ANSWER
+
+
+def usage_for(messages, text: str) -> dict:
+    """Token usage block in OpenAI format"""
+    prompt_tokens = sum(estimate_tokens(str(message.get("content", ""))) for message in messages)
+    completion_tokens = estimate_tokens(text)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    messages = body.get("messages", [])
+    model = body.get("model", "llama-3.1-8b-instant")
+    text = completion_text(messages)
+    usage = usage_for(messages, text)
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+    created = int(time.time())
+
+    if body.get("stream"):
+        async def events():
+            await asyncio.sleep(LATENCY_MS / 1000)
+            words = text.split(" ")
+            delay = usage["completion_tokens"] / TOKENS_PER_SEC / len(words)
+            for index, word in enumerate(words):
+                await asyncio.sleep(delay)
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "delta": {"role": "assistant", "content": word if index == 0 else " " + word},
+                        "finish_reason": None,
+                    }],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            final = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                "x_groq": {"usage": usage},
+            }
+            yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    await asyncio.sleep(LATENCY_MS / 1000 + usage["completion_tokens"] / TOKENS_PER_SEC)
+    return JSONResponse({
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": created,
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": text},
+            "finish_reason": "stop",
+        }],
+        "usage": usage,
+    })
+
+
+@app.get("/health")
+async def health_check():
+    return {"status": "healthy", "service": "groq-stub"}
@@ -0,0 +1,137 @@
+"""
+Synthetic farm profiles, farmer questions and knowledge-base chunks.
+
+Option lists mirror the choices offered by the frontend assessment form
+(frontend/src/features/assessment/farm-assessment-form.tsx) so generated
+payloads look like real traffic.
+"""
+
+import random
+from typing import Any, Dict, List
+
+from modules.segment_cache import CONCERNS, FARM_TYPES, FARMER_STATUS, SPECIES
+
+POND_YEARS = ["<1", "1-2", "3-5", "5+"]
+WATER_SOURCES = ["Groundwater/Artesian Well", "River", "Creek", "Sea Water", "Municipal Water Supply"]
+BUDGETS = ["<50k", "50k-100k", "100k-500k", "500k+"]
+ELECTRICITY = ["Yes", "No", "Limited"]
+LOCATIONS = [
+    "Pampanga", "Bulacan", "Bataan", "Pangasinan", "Negros Occidental",
+    "Iloilo", "Capiz", "Bohol", "Zamboanga del Sur", "Misamis Oriental",
+]
+
+# Answer options for the existing-pond practice questions
+PRACTICES = {
+    "pondDrainSunDry": ["Always", "Sometimes", "Never"],
+    "removeMuckLayer": ["Always", "Sometimes", "Never"],
+    "disinfectPond": ["Always", "Sometimes", "Never"],
+    "filterIncomingWater": ["Yes, always", "Sometimes", "No"],
+    "separateReservoir": ["Yes", "No", "Planning to build"],
+    "waterMonitoringFrequency": ["Daily", "Weekly", "Monthly", "Rarely"],
+    "plSource": ["Certified hatchery", "Local hatchery", "Wild catch", "Mixed sources"],
+    "acclimatePLs": ["Yes, always", "Sometimes", "No"],
+    "quarantinePLs": ["Yes, always", "Sometimes", "No"],
+    "hasFencing": ["Complete fencing", "Partial fencing", "No fencing"],
+    "useFootbaths": ["Yes, always", "Sometimes", "No"],
+    "equipmentSharing": ["Never share", "Disinfect before use", "Share without cleaning"],
+    "visitorManagement": ["No visitors allowed", "Restricted access with protocols", "Open access"],
+    "wasteDisposal": ["Proper composting/burial", "Burn or bury on-site", "Throw in water body"],
+    "controlFeeding": ["Scheduled feeding with monitoring", "Regular feeding schedule", "Feed as available"],
+    "healthMonitoring": ["Daily visual checks", "Weekly checks", "Only when problems occur"],
+    "keepRecords": ["Detailed records", "Basic records", "No records"],
+}
+
+FARM_QUESTIONS = [
+    "How do I prepare my pond before stocking vannamei post-larvae?",
+    "What should I do when ammonia levels are high in my pond?",
+    "How can I prevent white spot syndrome virus on my farm?",
+    "What is the right stocking density for a semi-intensive shrimp pond?",
+    "How often should I check dissolved oxygen and pH?",
+    "How do I acclimate PLs from the hatchery?",
+    "What disinfectant should I use on my pond after harvest?",
+    "How much feed should I give my shrimp each day?",
+    "What are the GAqP requirements for farm record keeping?",
+    "How do I set up a footbath for biosecurity?",
+    "Why are my shrimp dying after a heavy rain?",
+    "How do I lower salinity in a brackish water pond?",
+    "What are the signs of early mortality syndrome in shrimp?",
+    "How should I dispose of dead shrimp safely?",
+    "Is it safe to use river water directly in my grow-out pond?",
+]
+
+OFF_TOPIC_QUESTIONS = [
+    "What's the weather like today?",
+    "Who won the basketball game last night?",
+    "Can you recommend a good movie?",
+    "How do I fix my phone screen?",
+]
+
+CHUNK_TOPICS = {
+    "pond preparation": "Drain the pond completely and sun-dry the bottom for at least two weeks. Remove the black muck layer and apply agricultural lime to correct soil pH before refilling.",
+    "water quality": "Monitor dissolved oxygen, pH, salinity, temperature and ammonia daily. Keep dissolved oxygen above 4 mg/L and pH between 7.5 and 8.5 throughout the culture period.",
+    "biosecurity": "Install footbaths and hand-washing stations at every pond entrance. Restrict visitor access, fence the farm perimeter and use dedicated equipment for each pond.",
+    "stock quality": "Source post-larvae only from BFAR-accredited hatcheries and request PCR test results for WSSV and other pathogens. Quarantine and acclimate PLs before stocking.",
+    "feeding": "Use feed trays to check consumption and adjust daily rations. Overfeeding degrades water quality and increases ammonia and nitrite in the pond.",
+    "health monitoring": "Inspect shrimp daily for soft shells, discoloration and erratic swimming. Record mortality and report unusual die-offs to the local fisheries office.",
+    "waste management": "Bury or compost dead shrimp away from water bodies. Never discharge untreated sludge or pond water directly into rivers or the sea.",
+    "record keeping": "GAqP certification requires records of stocking, feeding, water quality, chemical use and harvest for every culture cycle.",
+}
+
+
+def generate_profile(rng: random.Random) -> Dict[str, Any]:
+    """Generate one assessment request payload matching the frontend form"""
+    is_new = rng.choice(FARMER_STATUS)
+    profile: Dict[str, Any] = {
+        "farmName": f"{rng.choice(LOCATIONS)} Shrimp Farm {rng.randint(1, 999)}",
+        "location": rng.choice(LOCATIONS),
+        "primarySpecies": rng.choice(SPECIES),
+        "farmType": rng.choice(FARM_TYPES),
+        "farmSize": str(rng.choice([0.5, 1, 2, 3, 5, 8, 10, 20])),
+        "isNewFarmer": is_new,
+        "waterSource": rng.sample(WATER_SOURCES, rng.randint(1, 2)),
+        "initialBudget": rng.choice(BUDGETS),
+        "hasElectricity": rng.choice(ELECTRICITY),
+        "topConcerns": rng.sample(CONCERNS, rng.randint(1, 3)),
+    }
+    if is_new == "Existing Pond":
+        profile["existingPondYears"] = rng.choice(POND_YEARS)
+        for field, options in PRACTICES.items():
+            profile[field] = rng.choice(options)
+    return profile
+
+
+def generate_profiles(count: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """Generate a reproducible list of assessment payloads"""
+    rng = random.Random(seed)
+    return [generate_profile(rng) for _ in range(count)]
+
+
+def generate_questions(count: int, seed: int = 42, off_topic_ratio: float = 0.1) -> List[str]:
+    """Generate a reproducible mix of farm and off-topic chatbot questions"""
+    rng = random.Random(seed)
+    questions = []
+    for _ in range(count):
+        if rng.random() < off_topic_ratio:
+            questions.append(rng.choice(OFF_TOPIC_QUESTIONS))
+        else:
+            questions.append(rng.choice(FARM_QUESTIONS))
+    return questions
+
+
+def generate_chunks(count: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """Generate knowledge-base chunks (text + metadata) resembling the GAqP manuals"""
+    rng = random.Random(seed)
+    topics = list(CHUNK_TOPICS.items())
+    chunks = []
+    for index in range(count):
+        topic, text = topics[index % len(topics)]
+        sentences = [text] + [rng.choice(topics)[1] for _ in range(rng.randint(1, 3))]
+        chunks.append({
+            "text": " ".join(sentences),
+            "metadata": {
+                "source": "synthetic-gaqp-manual.pdf",
+                "category": topic,
+                "page": index // 3,
+            },
+        })
+    return chunks
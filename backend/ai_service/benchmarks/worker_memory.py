@@ -0,0 +1,145 @@
+"""
+Per-worker memory of the pre-fork server.
+
+Starts ``serve.py`` with N workers twice, once loading the model and index in
+the parent before fork (default) and once with ``--no-preload`` so each worker
+loads its own copy. After serving a few queries it reads RSS, PSS and USS of
+the parent and every worker from /proc and reports the marginal cost of one
+more worker (mean USS) and the real footprint (sum of PSS). Linux only.
+
+Usage (from backend/ai_service):
+    python -m benchmarks.worker_memory --workers 4
+    python -m benchmarks.worker_memory --workers 4 --fake-embeddings --chunks 20000 --output memory.json
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict
+
+import httpx
+
+from modules.process_memory import child_pids, memory_usage, workers_memory
+
+from .bench_pipeline import SERVICE_DIR, build_synthetic_artifact, git_commit
+from .load_test import free_port, wait_until_healthy
+from .synthetic import generate_questions
+
+
+def measure_mode(workers: int, preload: bool, env: Dict[str, str], requests: int, timeout: float) -> Dict[str, Any]:
+    """Run serve.py in one mode, send queries and read the memory of every process"""
+    port = free_port()
+    command = [sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(port),
+               "--workers", str(workers), "--memory-log-seconds", "0"]
+    if not preload:
+        command.append("--no-preload")
+    process = subprocess.Popen(command, cwd=SERVICE_DIR, env=env)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_healthy(f"{base_url}/ready", timeout=timeout)
+        # Without preload every worker warms up separately; wait until all answer ready
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            statuses = [httpx.get(f"{base_url}/ready", timeout=5).status_code for _ in range(workers * 4)]
+            if all(status == 200 for status in statuses):
+                break
+            time.sleep(0.5)
+
+        for question in generate_questions(requests, seed=7):
+            httpx.post(f"{base_url}/query", json={"question": question}, timeout=timeout)
+        time.sleep(1.0)
+
+        report = workers_memory(child_pids(process.pid))
+        report["parent"] = memory_usage(process.pid)
+        parent_pss = report["parent"]["pss_mb"] or 0.0
+        report["server_pss_mb"] = round(report["total_pss_mb"] + parent_pss, 1)
+        report["workers"] = {str(pid): usage for pid, usage in report["workers"].items()}
+        return report
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def print_report(report: Dict[str, Any]):
+    print("\n" + "=" * 80)
+    print(f"  WORKER MEMORY ({report['meta']['commit']}, {report['meta']['workers']} workers)")
+    print("=" * 80)
+    print(f"  {'mode':<12} {'mean USS':>10} {'sum PSS':>10} {'sum RSS':>10} {'server PSS':>11}")
+    for mode, result in report["modes"].items():
+        print(f"  {mode:<12} {result['mean_uss_mb']:>10} {result['total_pss_mb']:>10} "
+              f"{result['total_rss_mb']:>10} {result['server_pss_mb']:>11}")
+    if "saved_pss_mb" in report:
+        print(f"\nPreloading saves {report['saved_pss_mb']} MB PSS; "
+              f"each extra worker costs about {report['modes']['preload']['mean_uss_mb']} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure per-worker memory of the pre-fork server")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=20, help="Queries sent before measuring")
+    parser.add_argument("--chunks", type=int, default=2000, help="Synthetic chunks in the index artifact")
+    parser.add_argument("--index", help="Existing index artifact to serve instead of a synthetic one")
+    parser.add_argument("--fake-embeddings", action="store_true", help="Use deterministic fake embeddings")
+    parser.add_argument("--skip-no-preload", action="store_true", help="Only measure the preload mode")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.update({"LLM_PROVIDER": "stub", "STUB_LLM_LATENCY_MS": "0", "LOG_LEVEL": "WARNING"})
+    env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    if args.fake_embeddings:
+        env["EMBEDDING_BACKEND"] = os.environ["EMBEDDING_BACKEND"] = "fake"
+
+    temp_dir = None
+    if args.index:
+        env["INDEX_ARTIFACT_PATH"] = args.index
+    else:
+        temp_dir = tempfile.TemporaryDirectory(prefix="likai-memory-")
+        index_dir = os.path.join(temp_dir.name, "index")
+        print(f"Building synthetic index artifact ({args.chunks} chunks)")
+        build_synthetic_artifact(index_dir, args.chunks, seed=42)
+        env["INDEX_ARTIFACT_PATH"] = index_dir
+
+    modes = {"preload": True} if args.skip_no_preload else {"preload": True, "no_preload": False}
+    report: Dict[str, Any] = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(),
+            "workers": args.workers,
+            "embedding_backend": env.get("EMBEDDING_BACKEND", "huggingface"),
+            "chunks": None if args.index else args.chunks,
+        },
+        "modes": {},
+    }
+    try:
+        for mode, preload in modes.items():
+            print(f"Measuring {mode} with {args.workers} workers...")
+            report["modes"][mode] = measure_mode(args.workers, preload, env, args.requests, args.timeout)
+    finally:
+        if temp_dir is not None:
+            temp_dir.cleanup()
+
+    if "no_preload" in report["modes"]:
+        report["saved_pss_mb"] = round(
+            report["modes"]["no_preload"]["server_pss_mb"] - report["modes"]["preload"]["server_pss_mb"], 1
+        )
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+"""
+Headless index build.
+
+Streams every PDF in data/pdfs page by page through the splitter (reusing
+chunks already in the chunk store, see modules/chunk_store.py), embeds the
+chunks in batches as they arrive and writes a versioned, checksummed index
+artifact (see modules/index_artifact.py), so memory stays bounded by the batch
+size rather than the size of the manuals. A build that crashed mid-PDF resumes
+parsing after the last committed page. It then precomputes assessment
+retrieval for every farm-profile segment of the assessment form
+(modules/segment_cache.py), so each rebuild refreshes that table.
+
+Every build is a new generation next to the one being served
+(modules/index_generations.py). It is validated with a chunk count check and
+smoke queries, then promoted by atomically replacing the CURRENT pointer;
+running servers swap it in without a restart, and old generations are
+garbage-collected. Build once in CI or on a build host, then ship the
+directory to every replica and point INDEX_ARTIFACT_PATH at it. Never prompts
+for input.
+
+Usage (from backend/ai_service):
+    python build_index.py
+    python build_index.py --output /srv/likai/index --batch-size 128
+    python build_index.py --from-chunks    # re-embed stored chunks, no PDFs needed
+    python build_index.py --rollback       # serve the previous generation again
+    python build_index.py --output data/collections/vannamei --pdfs Vannamei-Culture-Guide.pdf
+                                           # a knowledge-base collection (modules/kb_collections.py)
+
+Environment variables:
+    INDEX_KEEP_GENERATIONS    Generations kept on disk, including the current one (default 2)
+"""
+
+import argparse
+import itertools
+import json
+import os
+import shutil
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+KEEP_GENERATIONS = int(os.getenv("INDEX_KEEP_GENERATIONS", "2"))
+
+
+def stream_chunks(from_chunks: bool = False, reparse: bool = False, pdfs: Optional[List[str]] = None):
+    """Source manifest entries and a lazy stream of every chunk to index (of only some PDFs if given)"""
+    from modules.chunk_store import CHUNK_STORE
+    from modules.chunking import get_chunker
+    from modules.document_loader import PDF_DIR, get_pdf_files, ingest_pdf
+    from modules.index_artifact import file_sha256
+
+    if from_chunks:
+        chunker = get_chunker()
+        stored = [h for h in CHUNK_STORE.sources()
+                  if h.get("chunker") == chunker and (pdfs is None or h["source"] in pdfs)]
+        if not stored:
+            raise ValueError(f"No chunks stored in {CHUNK_STORE.root} for the current chunker settings")
+        sources = [{"filename": h["source"], "sha256": h["sha256"], "size": h["size"]} for h in stored]
+        chunks = itertools.chain.from_iterable(CHUNK_STORE.read(h["sha256"]) for h in stored)
+    else:
+        pdf_files = sorted(get_pdf_files())
+        if pdfs is not None:
+            missing = sorted(set(pdfs) - set(pdf_files))
+            if missing:
+                raise ValueError(f"PDF files not found in {PDF_DIR}: {', '.join(missing)}")
+            pdf_files = [filename for filename in pdf_files if filename in pdfs]
+        if not pdf_files:
+            raise ValueError(f"No PDF files found in {PDF_DIR}")
+        sources = []
+        for filename in pdf_files:
+            path = os.path.join(PDF_DIR, filename)
+            sources.append({"filename": filename, "sha256": file_sha256(path), "size": os.path.getsize(path)})
+        chunks = itertools.chain.from_iterable(ingest_pdf(filename, reparse=reparse) for filename in pdf_files)
+    return sources, chunks
+
+
+def build_generation(root: str, batch_size: int = 64, from_chunks: bool = False, reparse: bool = False,
+                     force: bool = False, keep: int = KEEP_GENERATIONS, pdfs: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Build, validate and promote a new index generation under root; raises ValueError"""
+    from modules.chunking import ChunkStats, get_chunker
+    from modules.embedding import embedding_model_id, get_embeddings_model
+    from modules.index_artifact import IndexArtifactError, build_artifact_from_documents, is_artifact, load_artifact
+    from modules.index_generations import (
+        collect_garbage, current_generation, generation_manifest, new_generation_dir, promote, validate_generation
+    )
+    from modules.segment_cache import build_segment_table, write_segment_table
+
+    if is_artifact(root):
+        raise IndexArtifactError(
+            f"{root} is a single index artifact, not a generations directory; move it away or choose another --output"
+        )
+
+    start = time.perf_counter()
+    sources, chunks = stream_chunks(from_chunks, reparse, pdfs)
+    chunk_stats = ChunkStats()
+
+    print(f"Embedding chunks from {len(sources)} sources with {embedding_model_id()}...")
+    embeddings = get_embeddings_model()
+    os.makedirs(root, exist_ok=True)
+    generation_dir = new_generation_dir(root)
+    manifest = build_artifact_from_documents(
+        generation_dir, chunk_stats.track(chunks),
+        embeddings=embeddings,
+        embedding_model=embedding_model_id(),
+        sources=sources,
+        batch_size=batch_size,
+        build={"batch_size": batch_size, "chunker": get_chunker()},
+    )
+
+    try:
+        index = load_artifact(generation_dir, embeddings, verify=False)
+        segments = build_segment_table(index, embeddings)
+        write_segment_table(generation_dir, segments)
+
+        previous = current_generation(root)
+        validation = validate_generation(
+            generation_dir, embeddings, embedding_model_id(),
+            previous=None if force else generation_manifest(root, previous),
+        )
+    except Exception:
+        # A generation that failed validation must never be promoted or kept for rollback
+        shutil.rmtree(generation_dir, ignore_errors=True)
+        raise
+
+    generation = os.path.basename(generation_dir)
+    promote(root, generation)
+    removed = collect_garbage(root, keep=keep)
+
+    return {
+        "output": os.path.abspath(root),
+        "generation": generation,
+        "previous_generation": previous,
+        "index_version": manifest["index_version"],
+        "embedding_model": manifest["embedding_model"],
+        "chunk_count": manifest["chunk_count"],
+        "sources": len(manifest["sources"]),
+        "chunk_tokens": chunk_stats.summary(),
+        "segments": len(segments),
+        "validation": validation,
+        "removed_generations": removed,
+        "build_seconds": round(time.perf_counter() - start, 1),
+    }
+
+
+def rollback(root: str) -> Dict[str, Any]:
+    """Promote the generation before the current one again"""
+    from modules.index_generations import current_generation, previous_generation, promote
+
+    current = current_generation(root)
+    previous = previous_generation(root)
+    if previous is None:
+        raise ValueError(f"No generation older than {current} in {root}")
+    promote(root, previous)
+    return {"output": os.path.abspath(root), "generation": previous, "previous_generation": current}
+
+
+def main(argv=None):
+    from modules.rag_pipeline import INDEX_ARTIFACT_PATH
+
+    parser = argparse.ArgumentParser(description="Build a portable index artifact from the knowledge base PDFs")
+    parser.add_argument("--output", default=INDEX_ARTIFACT_PATH, help="Generations directory to write")
+    parser.add_argument("--batch-size", type=int, default=64, help="Chunks embedded per call")
+    parser.add_argument("--force", action="store_true", help="Promote even if the index shrank by more than half")
+    parser.add_argument("--from-chunks", action="store_true", help="Build from the chunk store instead of the PDFs")
+    parser.add_argument("--reparse", action="store_true", help="Parse the PDFs even if their chunks are stored")
+    parser.add_argument("--keep", type=int, default=KEEP_GENERATIONS, help="Generations kept on disk")
+    parser.add_argument("--rollback", action="store_true", help="Promote the previous generation instead of building")
+    parser.add_argument("--pdfs", nargs="+", help="Index only these files of data/pdfs (e.g. for a collection)")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.rollback:
+            report = rollback(args.output)
+        else:
+            report = build_generation(args.output, batch_size=args.batch_size, from_chunks=args.from_chunks,
+                                      reparse=args.reparse, force=args.force, keep=args.keep, pdfs=args.pdfs)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -188,11 +188,12 @@ def initialize_vector_database():
         print("\nInitializing vector database...")
         print("   This may take a few minutes depending on PDF size")
         
-        from modules.rag_pipeline import initialize_or_load_vectordb
+        from modules.rag_pipeline import INDEX_ARTIFACT_PATH, initialize_or_load_vectordb
+        from modules.index_generations import resolve_index_dir
         
         # Check if DB already exists
         vectordb_dir = os.path.join(os.path.dirname(__file__), "data", "vectordb")
-        db_exists = os.path.exists(vectordb_dir) and os.listdir(vectordb_dir)
+        db_exists = resolve_index_dir(INDEX_ARTIFACT_PATH) or (os.path.exists(vectordb_dir) and os.listdir(vectordb_dir))
         
         if db_exists:
             print("Vector database already exists")
@@ -207,10 +208,12 @@ def initialize_vector_database():
                 print(f"✅ Vector database loaded: {doc_count} document chunks")
                 return True
             
-            # Delete old DB
-            import shutil
-            shutil.rmtree(vectordb_dir)
-            print("Removed old vector database")
+            # Build a new index generation next to the current one; a running
+            # server keeps answering from the old index until the new one is
+            # validated and swapped in
+            from build_index import build_generation
+            report = build_generation(INDEX_ARTIFACT_PATH)
+            print(f"Promoted index generation {report['generation']} ({report['chunk_count']} chunks)")
         
         # Initialize new DB
         print("Processing PDFs and creating embeddings...")
@@ -0,0 +1,244 @@
+"""
+Admission control in front of the LLM.
+
+Chat (``/query``) and assessment (``/process-assessment``) requests each get
+their own pool: at most ``max_concurrency`` requests run the pipeline at once,
+and up to ``max_queue`` more wait in a priority queue. A request is shed
+instead of piling up when:
+
+- the queue is full and nothing lower-priority is waiting to be displaced
+  (429 Too Many Requests)
+- it waited longer than ``max_queue_wait`` seconds for a slot
+  (503 Service Unavailable)
+
+Both responses carry a ``Retry-After`` estimated from the pool's recent
+service time and queue depth, so clients back off instead of retrying
+immediately, and the latency of admitted requests stays bounded.
+
+Callers choose a priority with the ``X-Priority`` header (``high``,
+``normal`` or ``low``); higher priorities are admitted first and may
+displace queued lower-priority requests when the queue is full. Anyone can
+ask for ``low``, but ``high`` is honoured only with an ``X-Priority-Token``
+header matching ``ADMISSION_PRIORITY_TOKEN``; otherwise the request runs at
+``normal``, so clients cannot jump the queue during the overload it is for.
+
+Environment variables:
+    ADMISSION_ENABLED                     Enable admission control (default true)
+    CHAT_MAX_CONCURRENCY                  Concurrent /query pipelines (default 8)
+    CHAT_MAX_QUEUE                        Queued /query requests (default 32)
+    CHAT_MAX_QUEUE_WAIT_SECONDS           Longest a /query request may wait (default 10)
+    ASSESSMENT_MAX_CONCURRENCY            Concurrent /process-assessment pipelines (default 4)
+    ASSESSMENT_MAX_QUEUE                  Queued assessments (default 16)
+    ASSESSMENT_MAX_QUEUE_WAIT_SECONDS     Longest an assessment may wait (default 30)
+    ADMISSION_PRIORITY_TOKEN              Value of X-Priority-Token that allows ``X-Priority: high``
+                                          (default unset: high priority is never granted)
+"""
+
+import asyncio
+import heapq
+import hmac
+import itertools
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from .metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_QUEUE_WAIT, ADMISSION_REJECTIONS
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+ADMISSION_PRIORITY_TOKEN = os.getenv("ADMISSION_PRIORITY_TOKEN") or None
+
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+DEFAULT_PRIORITY = PRIORITIES["normal"]
+
+# Smoothing factor for the moving average of service time used in Retry-After
+SERVICE_TIME_ALPHA = 0.2
+
+
+class AdmissionRejected(Exception):
+    """A request was shed by an admission pool"""
+
+    def __init__(self, pool: str, reason: str, status_code: int, retry_after: int):
+        super().__init__(f"{pool} pool rejected request: {reason}")
+        self.pool = pool
+        self.reason = reason
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def parse_priority(value: Optional[str], token: Optional[str] = None) -> int:
+    """
+    Map an X-Priority header value to a priority (lower is served first).
+    Priorities above normal need ``token`` (the X-Priority-Token header) to
+    match ``ADMISSION_PRIORITY_TOKEN``.
+    """
+    if not value:
+        return DEFAULT_PRIORITY
+    priority = PRIORITIES.get(value.strip().lower(), DEFAULT_PRIORITY)
+    if priority < DEFAULT_PRIORITY and not priority_authorized(token):
+        return DEFAULT_PRIORITY
+    return priority
+
+
+def priority_authorized(token: Optional[str]) -> bool:
+    """Whether an X-Priority-Token header carries the configured token"""
+    return (ADMISSION_PRIORITY_TOKEN is not None and token is not None
+            and hmac.compare_digest(token.encode(), ADMISSION_PRIORITY_TOKEN.encode()))
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "future", "active")
+
+    def __init__(self, priority: int, seq: int, future: asyncio.Future):
+        self.priority = priority
+        self.seq = seq
+        self.future = future
+        self.active = True
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class AdmissionPool:
+    """Concurrency limit with a bounded priority queue and a maximum queue wait"""
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, max_queue_wait: float,
+                 initial_service_time: float = 1.0):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_queue_wait = max_queue_wait
+        self.in_flight = 0
+        self.queued = 0
+        self.service_time = initial_service_time
+        self._heap: List[_Waiter] = []
+        self._seq = itertools.count()
+
+    def retry_after(self) -> int:
+        """Seconds until a new request would likely get a slot"""
+        backlog = (self.queued + self.in_flight + 1) / max(self.max_concurrency, 1)
+        return max(1, math.ceil(self.service_time * backlog))
+
+    @asynccontextmanager
+    async def slot(self, priority: int = DEFAULT_PRIORITY):
+        """Hold one of the pool's slots for the duration of the block"""
+        wait_start = time.perf_counter()
+        await self._acquire(priority)
+        ADMISSION_QUEUE_WAIT.labels(pool=self.name).observe(time.perf_counter() - wait_start)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.service_time += SERVICE_TIME_ALPHA * (elapsed - self.service_time)
+            self._release()
+
+    async def _acquire(self, priority: int):
+        if self.in_flight < self.max_concurrency and self.queued == 0:
+            self.in_flight += 1
+            self._update_gauges()
+            return
+
+        if self.queued >= self.max_queue:
+            # Make room by shedding the lowest-priority, most recent waiter if this request outranks it
+            victim = max((w for w in self._heap if w.active), default=None, key=lambda w: (w.priority, w.seq))
+            if victim is None or victim.priority <= priority:
+                raise self._reject("queue_full", 429)
+            self._remove(victim)
+            victim.future.set_exception(self._reject("displaced", 429))
+
+        waiter = _Waiter(priority, next(self._seq), asyncio.get_running_loop().create_future())
+        heapq.heappush(self._heap, waiter)
+        self.queued += 1
+        self._update_gauges()
+
+        try:
+            await asyncio.wait_for(waiter.future, self.max_queue_wait)
+        except asyncio.TimeoutError:
+            if self._granted(waiter):
+                return
+            self._remove(waiter)
+            raise self._reject("queue_timeout", 503)
+        except asyncio.CancelledError:
+            # The client went away; give back a slot granted in the meantime
+            if self._granted(waiter):
+                self._release()
+            else:
+                self._remove(waiter)
+            raise
+
+    def _granted(self, waiter: _Waiter) -> bool:
+        future = waiter.future
+        return future.done() and not future.cancelled() and future.exception() is None
+
+    def _release(self):
+        self.in_flight -= 1
+        while self._heap:
+            waiter = heapq.heappop(self._heap)
+            if not waiter.active:
+                continue
+            waiter.active = False
+            self.queued -= 1
+            if waiter.future.done():
+                continue
+            self.in_flight += 1
+            waiter.future.set_result(None)
+            break
+        self._update_gauges()
+
+    def _remove(self, waiter: _Waiter):
+        if waiter.active:
+            waiter.active = False
+            self.queued -= 1
+            self._update_gauges()
+
+    def _reject(self, reason: str, status_code: int) -> AdmissionRejected:
+        ADMISSION_REJECTIONS.labels(pool=self.name, reason=reason).inc()
+        return AdmissionRejected(self.name, reason, status_code, self.retry_after())
+
+    def _update_gauges(self):
+        ADMISSION_IN_FLIGHT.labels(pool=self.name).set(self.in_flight)
+        ADMISSION_QUEUE_DEPTH.labels(pool=self.name).set(self.queued)
+
+    def snapshot(self):
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "service_time_s": round(self.service_time, 3),
+        }
+
+
+def is_upstream_overload(error: BaseException) -> bool:
+    """Whether an exception is the LLM provider rejecting us for rate or capacity reasons"""
+    name = type(error).__name__
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return name in ("RateLimitError", "InternalServerError", "APITimeoutError") or status in (429, 503)
+
+
+CHAT_POOL = AdmissionPool(
+    "chat",
+    max_concurrency=int(os.getenv("CHAT_MAX_CONCURRENCY", "8")),
+    max_queue=int(os.getenv("CHAT_MAX_QUEUE", "32")),
+    max_queue_wait=float(os.getenv("CHAT_MAX_QUEUE_WAIT_SECONDS", "10")),
+)
+
+ASSESSMENT_POOL = AdmissionPool(
+    "assessment",
+    max_concurrency=int(os.getenv("ASSESSMENT_MAX_CONCURRENCY", "4")),
+    max_queue=int(os.getenv("ASSESSMENT_MAX_QUEUE", "16")),
+    max_queue_wait=float(os.getenv("ASSESSMENT_MAX_QUEUE_WAIT_SECONDS", "30")),
+    initial_service_time=5.0,
+)
+
+
+@asynccontextmanager
+async def admit(pool: AdmissionPool, priority: int = DEFAULT_PRIORITY):
+    """Hold a slot in the pool, or pass straight through when admission control is off"""
+    if not ADMISSION_ENABLED:
+        yield
+        return
+    async with pool.slot(priority):
+        yield
@@ -1,7 +1,7 @@
 import os
+import threading
 from typing import Dict, Any, List
 from dotenv import load_dotenv
-from langchain_groq import ChatGroq
 
 from .schemas import AssessmentData
 
@@ -10,14 +10,48 @@ load_dotenv()
 # Get Groq API token
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
+# "groq" (default) or "stub" for the offline stand-in used by benchmarks
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "groq").lower()
+
+# Groq chat model used for answers and assessments
+GROQ_MODEL = "llama-3.1-8b-instant"
+
+# Override the Groq API endpoint (e.g. a local Groq-compatible stub server)
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL")
+
+# One client per process so HTTP connections to Groq are pooled and reused
+_llm = None
+_llm_lock = threading.Lock()
+
 def get_llm():
-    """Get the language model from Groq API"""
+    """Get the shared language model client, creating it on first use"""
+    global _llm
+    if _llm is None:
+        with _llm_lock:
+            if _llm is None:
+                _llm = create_llm()
+    return _llm
+
+def llm_model_id() -> str:
+    """Identifier of the configured LLM, part of the cache keys of generated answers"""
+    return "stub" if LLM_PROVIDER == "stub" else GROQ_MODEL
+
+def create_llm():
+    """Create the language model from Groq API"""
+    if LLM_PROVIDER == "stub":
+        from .stub_llm import StubChatModel
+        return StubChatModel()
+    
     if not GROQ_API_KEY:
         raise ValueError("GROQ_API_KEY not found in .env file. Get one at https://console.groq.com/keys")
     
+    # Imported lazily so the API process starts without loading the Groq client
+    from langchain_groq import ChatGroq
+    
     return ChatGroq(
-        model="llama-3.1-8b-instant",
+        model=GROQ_MODEL,
         groq_api_key=GROQ_API_KEY,
+        base_url=GROQ_BASE_URL,
         temperature=0.7,
         max_tokens=2048,
     )
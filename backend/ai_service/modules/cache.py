@@ -0,0 +1,357 @@
+"""
+Two-tier cache for values the pipeline would otherwise recompute on every
+replica: query embeddings, answers to questions asked outside a session, and
+assessments.
+
+Each ``TieredCache`` checks an in-process LRU first and then, when
+``CACHE_REDIS_URL`` is set, a tier shared by every replica that speaks the
+Redis protocol. A value computed on one node is then served from memory by
+the others. Entries expire after the cache's TTL in both tiers.
+
+Keys carry a version: answers and assessments are keyed by the knowledge-base
+index version (``manifest.json``'s ``index_version``) and the LLM, embeddings
+by the embedding model. Promoting a new index generation switches every
+replica to new keys at once, and the old entries age out. Without a versioned
+index (the Chroma fallback) answers and assessments are not cached.
+
+``get_or_compute`` protects against stampedes. Within a process, concurrent
+callers for a missing key wait for the first one's computation. Across
+replicas, caches created with ``lock=True`` (answers and assessments, which
+cost an LLM call) make the first one to miss take a short lock in the shared
+tier (``SET NX PX``), and the others poll for its value for up to
+``CACHE_LOCK_SECONDS`` before computing it themselves. The lock is released
+with a compare-and-delete script, so a replica whose lock expired never
+deletes another's. Query embeddings take milliseconds to recompute and skip
+the lock: a miss costs one GET and one SET.
+
+The shared tier is best effort: if it is unreachable the cache logs
+``cache_shared_unavailable``, carries on with the local tier and retries after
+``CACHE_SHARED_RETRY_SECONDS``. Values cross it as JSON, never pickles.
+
+``CACHE_REDIS_URL=memory://`` uses ``InMemoryRedis``, a process-local stand-in
+implementing the commands used here, for development and tests without a
+Redis server. Other URLs need the ``redis`` package.
+
+Environment variables:
+    CACHE_ENABLED                   Cache embeddings, answers and assessments (default true)
+    CACHE_REDIS_URL                 Shared tier, e.g. redis://cache:6379/0 (default: local only)
+    CACHE_LOCAL_MAX_ENTRIES         Entries kept in each local LRU (default 1024)
+    CACHE_EMBEDDING_TTL_SECONDS     Query embedding TTL (default 86400)
+    CACHE_ANSWER_TTL_SECONDS        Answer TTL (default 3600)
+    CACHE_ASSESSMENT_TTL_SECONDS    Assessment TTL (default 3600)
+    CACHE_LOCK_SECONDS              Longest a replica waits for another's value (default 30)
+    CACHE_SHARED_RETRY_SECONDS      Back-off after a shared tier error (default 30)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .logging_config import log_event
+from .metrics import record_cache_lookup
+from .schemas import FarmStatusAssessment
+
+logger = logging.getLogger(__name__)
+
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "")
+CACHE_LOCAL_MAX_ENTRIES = int(os.getenv("CACHE_LOCAL_MAX_ENTRIES", "1024"))
+CACHE_EMBEDDING_TTL_SECONDS = float(os.getenv("CACHE_EMBEDDING_TTL_SECONDS", "86400"))
+CACHE_ANSWER_TTL_SECONDS = float(os.getenv("CACHE_ANSWER_TTL_SECONDS", "3600"))
+CACHE_ASSESSMENT_TTL_SECONDS = float(os.getenv("CACHE_ASSESSMENT_TTL_SECONDS", "3600"))
+CACHE_LOCK_SECONDS = float(os.getenv("CACHE_LOCK_SECONDS", "30"))
+CACHE_SHARED_RETRY_SECONDS = float(os.getenv("CACHE_SHARED_RETRY_SECONDS", "30"))
+
+KEY_PREFIX = "likai"
+
+# Interval at which a replica polls for a value another replica is computing
+LOCK_POLL_SECONDS = 0.05
+
+# Delete the lock only if it still holds this replica's token
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+_MISSING = object()
+
+
+class InMemoryRedis:
+    """Process-local stand-in for the Redis commands the cache uses (GET, SET EX/PX/NX, DELETE, lock-release EVAL)"""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[bytes, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def _live(self, name: str) -> Optional[bytes]:
+        item = self._data.get(name)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and time.monotonic() >= expires_at:
+            del self._data[name]
+            return None
+        return value
+
+    def ping(self) -> bool:
+        return True
+
+    def get(self, name: str) -> Optional[bytes]:
+        with self._lock:
+            return self._live(name)
+
+    def set(self, name: str, value: Any, ex: Optional[float] = None, px: Optional[int] = None,
+            nx: bool = False) -> Optional[bool]:
+        if isinstance(value, str):
+            value = value.encode("utf-8")
+        ttl = px / 1000 if px is not None else ex
+        with self._lock:
+            if nx and self._live(name) is not None:
+                return None
+            self._data[name] = (bytes(value), time.monotonic() + ttl if ttl is not None else None)
+            return True
+
+    def delete(self, *names: str) -> int:
+        with self._lock:
+            return sum(1 for name in names if self._data.pop(name, None) is not None)
+
+    def eval(self, script: str, numkeys: int, *keys_and_args: Any) -> int:
+        """Runs RELEASE_LOCK_SCRIPT only: delete the key if it holds the token"""
+        if script != RELEASE_LOCK_SCRIPT or numkeys != 1:
+            raise NotImplementedError("InMemoryRedis only evaluates the lock release script")
+        name, token = keys_and_args
+        if isinstance(token, str):
+            token = token.encode("utf-8")
+        with self._lock:
+            if self._live(name) != token:
+                return 0
+            del self._data[name]
+            return 1
+
+    def flushall(self) -> bool:
+        with self._lock:
+            self._data.clear()
+        return True
+
+
+def connect_shared(url: str = CACHE_REDIS_URL) -> Optional[Any]:
+    """A client for the shared tier, or None to cache locally only"""
+    if not url:
+        return None
+    if url.startswith("memory://"):
+        return InMemoryRedis()
+    try:
+        import redis
+    except ImportError:
+        log_event(logger, "cache_shared_unavailable", level=logging.WARNING, error="redis package not installed")
+        return None
+    return redis.Redis.from_url(url, socket_timeout=1.0, socket_connect_timeout=1.0)
+
+
+class LocalLRU:
+    """Bounded in-process tier with per-entry expiry"""
+
+    def __init__(self, max_entries: int = CACHE_LOCAL_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return _MISSING
+            expires_at, value = item
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class _Flight:
+    """One in-process computation of a missing key"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class TieredCache:
+    """Local LRU in front of an optional shared Redis-protocol tier"""
+
+    def __init__(self, name: str, ttl_seconds: float, shared: Any = None,
+                 max_entries: int = CACHE_LOCAL_MAX_ENTRIES, enabled: bool = CACHE_ENABLED,
+                 encode: Callable[[Any], Any] = lambda value: value,
+                 decode: Callable[[Any], Any] = lambda data: data,
+                 lock_seconds: float = CACHE_LOCK_SECONDS, lock: bool = True):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.shared = shared
+        self.enabled = enabled
+        self.local = LocalLRU(max_entries)
+        self.lock_seconds = lock_seconds
+        # Take the shared-tier lock on a miss; only worth it for values that are expensive to compute
+        self.lock = lock
+        # Converts values to and from JSON-serializable data for the shared tier
+        self._encode = encode
+        self._decode = decode
+        self._flights: Dict[str, _Flight] = {}
+        self._flights_lock = threading.Lock()
+        self._shared_retry_at = 0.0
+
+    def key(self, version: Any, *parts: Any) -> str:
+        """Cache key for a value derived from parts under a version (index, model)"""
+        digest = hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        return f"{KEY_PREFIX}:{self.name}:{version}:{digest[:32]}"
+
+    def _shared_call(self, method: str, *args, **kwargs) -> Any:
+        """Run a shared tier command; errors switch the tier off for a while"""
+        if self.shared is None or time.monotonic() < self._shared_retry_at:
+            return None
+        try:
+            return getattr(self.shared, method)(*args, **kwargs)
+        except Exception as e:
+            self._shared_retry_at = time.monotonic() + CACHE_SHARED_RETRY_SECONDS
+            log_event(logger, "cache_shared_unavailable", level=logging.WARNING, cache=self.name,
+                      error_type=type(e).__name__, error=str(e))
+            return None
+
+    def _get_shared(self, key: str) -> Any:
+        data = self._shared_call("get", key)
+        if data is None:
+            return _MISSING
+        try:
+            return self._decode(json.loads(data))
+        except (ValueError, TypeError, KeyError) as e:
+            log_event(logger, "cache_value_unreadable", level=logging.WARNING, cache=self.name, error=str(e))
+            return _MISSING
+
+    def _lookup(self, key: str) -> Any:
+        value = self.local.get(key)
+        if value is _MISSING and self.shared is not None:
+            value = self._get_shared(key)
+            record_cache_lookup(f"{self.name}_shared", value is not _MISSING)
+            if value is not _MISSING:
+                self.local.set(key, value, self.ttl_seconds)
+        return value
+
+    def get(self, key: str) -> Optional[Any]:
+        """The cached value, or None"""
+        if not self.enabled:
+            return None
+        value = self._lookup(key)
+        record_cache_lookup(self.name, value is not _MISSING)
+        return None if value is _MISSING else value
+
+    def set(self, key: str, value: Any):
+        if not self.enabled:
+            return
+        self.local.set(key, value, self.ttl_seconds)
+        if self.shared is not None:
+            data = json.dumps(self._encode(value), ensure_ascii=False, separators=(",", ":"))
+            self._shared_call("set", key, data.encode("utf-8"), px=max(1, int(self.ttl_seconds * 1000)))
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any],
+                       cacheable: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        The cached value, or compute and cache it once however many callers
+        miss at the same time. Computed values for which ``cacheable`` returns
+        False are returned but not stored.
+        """
+        if not self.enabled:
+            return compute()
+        value = self._lookup(key)
+        record_cache_lookup(self.name, value is not _MISSING)
+        if value is not _MISSING:
+            return value
+
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = self._fill(key, compute, cacheable)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._flights_lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def _fill(self, key: str, compute: Callable[[], Any],
+              cacheable: Optional[Callable[[Any], bool]] = None) -> Any:
+        """Compute a value, or wait for the replica already computing it"""
+        if not self.lock or self.shared is None:
+            value = compute()
+            if cacheable is None or cacheable(value):
+                self.set(key, value)
+            return value
+
+        lock_key = f"{key}:lock"
+        token = uuid.uuid4().hex
+        locked = self._shared_call("set", lock_key, token, px=max(1, int(self.lock_seconds * 1000)), nx=True)
+        if not locked and time.monotonic() >= self._shared_retry_at:
+            deadline = time.monotonic() + self.lock_seconds
+            while time.monotonic() < deadline:
+                time.sleep(LOCK_POLL_SECONDS)
+                value = self._get_shared(key)
+                if value is not _MISSING:
+                    self.local.set(key, value, self.ttl_seconds)
+                    return value
+                if self._shared_call("get", lock_key) is None:
+                    break
+        try:
+            value = compute()
+            if cacheable is None or cacheable(value):
+                self.set(key, value)
+            return value
+        finally:
+            if locked:
+                self._shared_call("eval", RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+
+    def clear(self):
+        """Drop the local tier (shared entries age out by TTL)"""
+        self.local.clear()
+
+
+SHARED_CACHE = connect_shared()
+
+EMBEDDING_CACHE = TieredCache("query_embedding", CACHE_EMBEDDING_TTL_SECONDS, shared=SHARED_CACHE, lock=False)
+ANSWER_CACHE = TieredCache("answer", CACHE_ANSWER_TTL_SECONDS, shared=SHARED_CACHE)
+ASSESSMENT_CACHE = TieredCache(
+    "assessment", CACHE_ASSESSMENT_TTL_SECONDS, shared=SHARED_CACHE,
+    encode=lambda assessment: assessment.model_dump(), decode=FarmStatusAssessment.model_validate,
+)
@@ -0,0 +1,267 @@
+"""
+On-disk store of parsed PDF chunks.
+
+Parsing the manuals with pypdf is the slowest step of indexing. Chunks
+are stored once per source file, keyed by the SHA-256 of the PDF, so changing
+the embedding model, switching the index backend or running a retrieval
+evaluation starts straight from chunks instead of re-parsing every PDF:
+
+    data/processed/chunks/<sha256>.jsonl.zst
+
+The first line of each file is a header (source filename, size, hash and the
+chunker settings that produced it); every following line is one
+``{"text", "metadata"}`` chunk, page number included in the metadata. Files
+are compressed with zstd when the ``zstandard`` package is installed and with
+gzip otherwise, written to a temporary name and moved into place only once
+complete, and read back one chunk at a time.
+
+Stored chunks are only reused when the chunker settings match, so changing the
+chunk size re-parses the PDFs instead of serving chunks cut the old way.
+
+While a PDF is being parsed, ``ChunkWriter`` appends each page's chunks to an
+uncompressed ``.partial.jsonl`` file and records the last committed page in a
+checkpoint. If ingestion crashes, the next run replays the committed chunks
+and resumes parsing at the following page. The partial file is compressed
+into the store once the whole PDF is done.
+
+Environment variables:
+    CHUNK_STORE_DIR    Store directory (default data/processed/chunks)
+"""
+
+import gzip
+import io
+import json
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from langchain_core.documents import Document
+
+try:
+    import zstandard
+except ImportError:  # gzip from the standard library is used instead
+    zstandard = None
+
+FORMAT_VERSION = 1
+ZSTD_SUFFIX = ".jsonl.zst"
+GZIP_SUFFIX = ".jsonl.gz"
+PARTIAL_SUFFIX = ".partial.jsonl"
+CHECKPOINT_SUFFIX = ".checkpoint.json"
+
+CHUNK_STORE_DIR = os.getenv(
+    "CHUNK_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "processed", "chunks")
+)
+
+
+def _open_write(path: str):
+    if path.endswith(ZSTD_SUFFIX):
+        raw = open(path, "wb")
+        return io.TextIOWrapper(zstandard.ZstdCompressor(level=10).stream_writer(raw), encoding="utf-8")
+    return gzip.open(path, "wt", encoding="utf-8")
+
+
+def _open_read(path: str):
+    if path.endswith(ZSTD_SUFFIX):
+        if zstandard is None:
+            raise RuntimeError(f"{path} is zstd-compressed; install zstandard to read it")
+        raw = open(path, "rb")
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(raw, closefd=True), encoding="utf-8")
+    return gzip.open(path, "rt", encoding="utf-8")
+
+
+class ChunkStore:
+    """Parsed chunks per source file, keyed by the file's SHA-256"""
+
+    def __init__(self, root: str = CHUNK_STORE_DIR):
+        self.root = root
+
+    def path(self, sha256: str) -> Optional[str]:
+        """Path of the stored chunks for a source hash, or None"""
+        for suffix in (ZSTD_SUFFIX, GZIP_SUFFIX):
+            path = os.path.join(self.root, sha256 + suffix)
+            if os.path.isfile(path):
+                return path
+        return None
+
+    def header(self, sha256: str) -> Optional[Dict[str, Any]]:
+        path = self.path(sha256)
+        if path is None:
+            return None
+        with _open_read(path) as f:
+            return json.loads(f.readline())
+
+    def has(self, sha256: str, chunker: Dict[str, Any]) -> bool:
+        """Whether chunks for this source were stored with these chunker settings"""
+        header = self.header(sha256)
+        return (header is not None and header.get("format_version") == FORMAT_VERSION
+                and header.get("chunker") == chunker)
+
+    def write(self, sha256: str, source: str, chunks: Iterable[Document], chunker: Dict[str, Any],
+              size: Optional[int] = None) -> int:
+        """Stream chunks to the store, replacing any earlier version; returns the chunk count"""
+        os.makedirs(self.root, exist_ok=True)
+        suffix = ZSTD_SUFFIX if zstandard is not None else GZIP_SUFFIX
+        path = os.path.join(self.root, sha256 + suffix)
+        tmp_path = os.path.join(self.root, f".{sha256}.{uuid.uuid4().hex[:8]}.tmp{suffix}")
+        header = {
+            "format_version": FORMAT_VERSION,
+            "source": source,
+            "sha256": sha256,
+            "size": size,
+            "chunker": chunker,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+        count = 0
+        try:
+            with _open_write(tmp_path) as f:
+                f.write(json.dumps(header) + "\n")
+                for chunk in chunks:
+                    f.write(json.dumps({"text": chunk.page_content, "metadata": chunk.metadata}, ensure_ascii=False) + "\n")
+                    count += 1
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        # A store written without zstd leaves no stale copy in the other format behind
+        for other in (ZSTD_SUFFIX, GZIP_SUFFIX):
+            stale = os.path.join(self.root, sha256 + other)
+            if stale != path and os.path.exists(stale):
+                os.remove(stale)
+        return count
+
+    def read(self, sha256: str) -> Iterator[Document]:
+        """Stream the stored chunks of one source"""
+        path = self.path(sha256)
+        if path is None:
+            raise KeyError(f"No stored chunks for {sha256}")
+        with _open_read(path) as f:
+            f.readline()
+            for line in f:
+                record = json.loads(line)
+                yield Document(page_content=record["text"], metadata=record["metadata"])
+
+    def sources(self) -> List[Dict[str, Any]]:
+        """Headers of every stored source, sorted by filename"""
+        headers = []
+        if os.path.isdir(self.root):
+            for name in os.listdir(self.root):
+                if name.startswith(".") or not name.endswith((ZSTD_SUFFIX, GZIP_SUFFIX)):
+                    continue
+                header = self.header(name.split(".", 1)[0])
+                if header is not None:
+                    headers.append(header)
+        return sorted(headers, key=lambda h: h["source"])
+
+    def iter_chunks(self, chunker: Optional[Dict[str, Any]] = None) -> Iterator[Document]:
+        """Stream every stored chunk, optionally only those cut with the given chunker settings"""
+        for header in self.sources():
+            if chunker is None or header.get("chunker") == chunker:
+                yield from self.read(header["sha256"])
+
+    def remove(self, sha256: str):
+        path = self.path(sha256)
+        if path is not None:
+            os.remove(path)
+
+    def open_writer(self, sha256: str, source: str, chunker: Dict[str, Any], size: Optional[int] = None,
+                    resume: bool = True) -> "ChunkWriter":
+        """Writer that commits chunks page by page and resumes an interrupted run"""
+        return ChunkWriter(self, sha256, source, chunker, size=size, resume=resume)
+
+
+class ChunkWriter:
+    """Append chunks of one source page by page, with a checkpoint after every page"""
+
+    def __init__(self, store: ChunkStore, sha256: str, source: str, chunker: Dict[str, Any],
+                 size: Optional[int] = None, resume: bool = True):
+        os.makedirs(store.root, exist_ok=True)
+        self.store = store
+        self.sha256 = sha256
+        self.source = source
+        self.chunker = chunker
+        self.size = size
+        self.partial_path = os.path.join(store.root, sha256 + PARTIAL_SUFFIX)
+        self.checkpoint_path = os.path.join(store.root, sha256 + CHECKPOINT_SUFFIX)
+
+        checkpoint = self._read_checkpoint() if resume else None
+        if checkpoint is not None and os.path.isfile(self.partial_path):
+            self.next_page = checkpoint["next_page"]
+            self.chunk_count = checkpoint["chunks"]
+            self._committed_bytes = checkpoint["bytes"]
+            # Drop anything written after the last checkpoint
+            with open(self.partial_path, "r+b") as f:
+                f.truncate(self._committed_bytes)
+        else:
+            self.next_page = 0
+            self.chunk_count = 0
+            self._committed_bytes = 0
+            open(self.partial_path, "wb").close()
+            if os.path.exists(self.checkpoint_path):
+                os.remove(self.checkpoint_path)
+        self._file = open(self.partial_path, "ab")
+
+    @property
+    def resumed(self) -> bool:
+        return self.next_page > 0
+
+    def _read_checkpoint(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.checkpoint_path, encoding="utf-8") as f:
+                checkpoint = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if checkpoint.get("format_version") != FORMAT_VERSION or checkpoint.get("chunker") != self.chunker:
+            return None
+        return checkpoint
+
+    def committed_chunks(self) -> Iterator[Document]:
+        """Stream the chunks committed so far"""
+        with open(self.partial_path, "rb") as f:
+            remaining = self._committed_bytes
+            for line in f:
+                if remaining <= 0:
+                    break
+                remaining -= len(line)
+                record = json.loads(line)
+                yield Document(page_content=record["text"], metadata=record["metadata"])
+
+    def add_page(self, page: int, chunks: List[Document]):
+        """Append one page's chunks and commit them; the page is never parsed again"""
+        for chunk in chunks:
+            line = json.dumps({"text": chunk.page_content, "metadata": chunk.metadata}, ensure_ascii=False) + "\n"
+            self._file.write(line.encode("utf-8"))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.chunk_count += len(chunks)
+        self.next_page = page + 1
+        self._committed_bytes = self._file.tell()
+
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "format_version": FORMAT_VERSION,
+                "chunker": self.chunker,
+                "next_page": self.next_page,
+                "chunks": self.chunk_count,
+                "bytes": self._committed_bytes,
+            }, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def finish(self) -> int:
+        """Compress the committed chunks into the store and drop the partial files"""
+        self._file.close()
+        count = self.store.write(self.sha256, self.source, self.committed_chunks(), self.chunker, size=self.size)
+        os.remove(self.partial_path)
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        return count
+
+    def close(self):
+        """Stop writing, keeping the partial file and checkpoint for a later resume"""
+        self._file.close()
+
+
+CHUNK_STORE = ChunkStore()
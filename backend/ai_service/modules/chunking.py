@@ -0,0 +1,160 @@
+"""
+Token-aware chunking.
+
+Chunks are measured in the embedding model's own tokenizer units, so none
+exceeds the model's sequence limit (256 tokens for all-MiniLM-L6-v2). Text
+past the limit would be silently truncated when embedded, and a character
+budget cannot guarantee the limit:
+
+    chunk_tokens = EMBEDDING_MAX_TOKENS - special tokens ([CLS], [SEP])
+
+The fast (Rust) tokenizer is loaded once per process from the same Hugging
+Face cache as the model. With ``EMBEDDING_BACKEND=fake`` an offline
+approximation stands in, so tests and benchmarks never download anything.
+
+The chunker settings, tokenizer included, are recorded with every stored
+chunk file, so switching the embedding model re-chunks the PDFs.
+``ChunkStats`` reports the token-size and truncation distribution of the
+chunks a build embeds.
+
+Environment variables:
+    EMBEDDING_MAX_TOKENS    Sequence limit of the embedding model (default 256)
+    CHUNK_OVERLAP_TOKENS    Tokens shared by neighbouring chunks (default 32)
+"""
+
+import os
+import re
+import threading
+from typing import Any, Dict, Iterable, Iterator, List
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from . import embedding
+from .metrics import record_cache_lookup
+
+EMBEDDING_MAX_TOKENS = int(os.getenv("EMBEDDING_MAX_TOKENS", "256"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+
+SEPARATORS = ["\n\n", "\n", " ", ""]
+
+
+class HuggingFaceTokenCounter:
+    """Counts tokens with the embedding model's fast tokenizer"""
+
+    def __init__(self, model_name: str):
+        # Imported lazily; the tokenizers package ships with sentence-transformers
+        from tokenizers import Tokenizer
+
+        repo = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+        self.tokenizer = Tokenizer.from_pretrained(repo)
+        self.tokenizer.no_truncation()
+        self.tokenizer.no_padding()
+        self.special_tokens = len(self.tokenizer.encode("", add_special_tokens=True).ids)
+
+    def count(self, text: str) -> int:
+        return len(self.tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+class ApproxTokenCounter:
+    """Offline stand-in: word pieces of up to six characters and punctuation"""
+
+    special_tokens = 2
+    _pieces = re.compile(r"\w{1,6}|[^\w\s]")
+
+    def count(self, text: str) -> int:
+        return len(self._pieces.findall(text))
+
+
+# One tokenizer per process, keyed by tokenizer ID
+_counters: Dict[str, Any] = {}
+_counters_lock = threading.Lock()
+
+
+def tokenizer_id() -> str:
+    """Identifier of the tokenizer chunks are measured with"""
+    if embedding.EMBEDDING_BACKEND == "fake":
+        return "approx-wordpiece"
+    return embedding.MODEL_NAME
+
+
+def get_token_counter():
+    """Get the shared token counter, loading the tokenizer on first use"""
+    key = tokenizer_id()
+    counter = _counters.get(key)
+    if counter is not None:
+        record_cache_lookup("tokenizer", hit=True)
+        return counter
+
+    with _counters_lock:
+        counter = _counters.get(key)
+        if counter is None:
+            record_cache_lookup("tokenizer", hit=False)
+            counter = ApproxTokenCounter() if key == "approx-wordpiece" else HuggingFaceTokenCounter(key)
+            _counters[key] = counter
+    return counter
+
+
+def get_chunker() -> Dict[str, Any]:
+    """Chunker settings; stored chunks are reused only while these match"""
+    return {
+        "splitter": "recursive_token",
+        "tokenizer": tokenizer_id(),
+        "max_tokens": EMBEDDING_MAX_TOKENS,
+        "chunk_overlap": CHUNK_OVERLAP_TOKENS,
+    }
+
+
+def get_text_splitter() -> RecursiveCharacterTextSplitter:
+    """Splitter whose chunks fit the embedding model's sequence limit"""
+    counter = get_token_counter()
+    return RecursiveCharacterTextSplitter(
+        chunk_size=EMBEDDING_MAX_TOKENS - counter.special_tokens,
+        chunk_overlap=CHUNK_OVERLAP_TOKENS,
+        length_function=counter.count,
+        separators=SEPARATORS,
+    )
+
+
+def percentile(values: List[int], pct: float) -> int:
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return 0
+    return values[min(len(values) - 1, max(0, int(round(pct / 100 * len(values))) - 1))]
+
+
+class ChunkStats:
+    """Token-size and truncation distribution of chunks as they stream past"""
+
+    def __init__(self, max_tokens: int = EMBEDDING_MAX_TOKENS):
+        self.max_tokens = max_tokens
+        self.counter = get_token_counter()
+        self.tokens: List[int] = []
+        self.characters = 0
+
+    def observe(self, chunk: Document):
+        self.tokens.append(self.counter.count(chunk.page_content) + self.counter.special_tokens)
+        self.characters += len(chunk.page_content)
+
+    def track(self, chunks: Iterable[Document]) -> Iterator[Document]:
+        """Pass chunks through, observing each one"""
+        for chunk in chunks:
+            self.observe(chunk)
+            yield chunk
+
+    def summary(self) -> Dict[str, Any]:
+        tokens = sorted(self.tokens)
+        truncated = [t - self.max_tokens for t in tokens if t > self.max_tokens]
+        total = sum(tokens)
+        return {
+            "chunks": len(tokens),
+            "max_tokens": self.max_tokens,
+            "tokens_total": total,
+            "tokens_mean": round(total / len(tokens), 1) if tokens else 0.0,
+            "tokens_p50": percentile(tokens, 50),
+            "tokens_p95": percentile(tokens, 95),
+            "tokens_max": tokens[-1] if tokens else 0,
+            "chars_mean": round(self.characters / len(tokens), 1) if tokens else 0.0,
+            "truncated_chunks": len(truncated),
+            "truncated_tokens": sum(truncated),
+        }
@@ -1,24 +1,30 @@
 import os
 import hashlib
-from typing import List, Dict, Any
+from typing import Any, Dict, Iterator, List
 import json
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from pypdf import PdfReader
 from langchain_core.documents import Document
 
+from .chunk_store import CHUNK_STORE
+from .chunking import get_chunker, get_text_splitter
+from .index_artifact import file_sha256
+
 # Define paths
 PDF_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "pdfs")
 PROCESSED_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "processed")
 
-# Create directories if they don't exist
-os.makedirs(PDF_DIR, exist_ok=True)
-os.makedirs(PROCESSED_DIR, exist_ok=True)
+def ensure_data_dirs():
+    """Create the PDF and processed-data directories if they don't exist"""
+    os.makedirs(PDF_DIR, exist_ok=True)
+    os.makedirs(PROCESSED_DIR, exist_ok=True)
 
 def get_pdf_hash(filepath: str) -> str:
     """Generate a hash for a PDF file to track changes"""
+    file_hash = hashlib.md5()
     with open(filepath, "rb") as f:
-        file_hash = hashlib.md5(f.read()).hexdigest()
-    return file_hash
+        for block in iter(lambda: f.read(1 << 20), b""):
+            file_hash.update(block)
+    return file_hash.hexdigest()
 
 def get_pdf_files():
     """Get list of PDF files in the PDF directory"""
@@ -27,67 +33,105 @@ def get_pdf_files():
     
     return [f for f in os.listdir(PDF_DIR) if f.lower().endswith('.pdf')]
 
-def process_single_pdf(filename: str) -> List[Document]:
-    """Process a single PDF file and return its chunks"""
+def _pdf_metadata(reader: PdfReader) -> Dict[str, Any]:
+    """Document info of a PDF, with keys normalized the way PyPDFLoader does"""
+    metadata: Dict[str, Any] = {"producer": "PyPDF", "creator": "PyPDF", "creationdate": ""}
+    for key, value in (reader.metadata or {}).items():
+        value = value if isinstance(value, (str, int)) else str(value)
+        metadata[key.lstrip("/").lower()] = value.strip() if isinstance(value, str) else value
+    return metadata
+
+def iter_pdf_pages(filepath: str, filename: str, start_page: int = 0) -> Iterator[Document]:
+    """
+    Yield the pages of a PDF one at a time, starting at start_page. Only one
+    page's text is held in memory, and pages before start_page are never
+    extracted. The reader works on the open file rather than the path (given
+    a path, pypdf reads the whole file into memory first), so page objects
+    are read from disk as they are needed.
+    """
+    category = filename.split('_')[0] if '_' in filename else 'general'
+    category = category.replace('.pdf', '')
+    with open(filepath, "rb") as f:
+        reader = PdfReader(f)
+        metadata = _pdf_metadata(reader)
+        metadata.update(source=filename, category=category, total_pages=len(reader.pages))
+        # pypdf rebuilds the whole label list on every page_labels access
+        page_labels = reader.page_labels
+
+        for page_number in range(start_page, len(reader.pages)):
+            text = reader.pages[page_number].extract_text().strip()
+            yield Document(
+                page_content=text,
+                metadata=dict(metadata, page=page_number, page_label=page_labels[page_number]),
+            )
+
+def ingest_pdf(filename: str, reparse: bool = False) -> Iterator[Document]:
+    """
+    Stream the chunks of a single PDF file. Chunks stored for the same file
+    contents and chunker settings are read from the chunk store; otherwise the
+    PDF is parsed page by page, each page's chunks are committed to the store
+    before they are yielded, and a run that was interrupted resumes after the
+    last committed page.
+    """
     filepath = os.path.join(PDF_DIR, filename)
     if not os.path.exists(filepath):
         print(f"File not found: {filepath}")
-        return []
-    
-    print(f"Loading PDF: {filename}")
-    # Load PDF tracking data
+        return
+
+    ensure_data_dirs()
+    source_hash = file_sha256(filepath)
+    chunker = get_chunker()
+
+    if not reparse and CHUNK_STORE.has(source_hash, chunker):
+        print(f"Loading stored chunks for {filename}")
+        yield from CHUNK_STORE.read(source_hash)
+        return
+
+    writer = CHUNK_STORE.open_writer(source_hash, filename, chunker, size=os.path.getsize(filepath),
+                                     resume=not reparse)
+    try:
+        if writer.resumed:
+            print(f"Resuming {filename} at page {writer.next_page + 1} ({writer.chunk_count} chunks committed)")
+            yield from writer.committed_chunks()
+        else:
+            print(f"Extracting text from {filename}...")
+
+        text_splitter = get_text_splitter()
+        for page in iter_pdf_pages(filepath, filename, start_page=writer.next_page):
+            page_chunks = text_splitter.split_documents([page])
+            writer.add_page(page.metadata["page"], page_chunks)
+            yield from page_chunks
+
+        count = writer.finish()
+    finally:
+        writer.close()
+    print(f"Stored {count} chunks for {filename}")
+
+    # Update tracking
     tracking_file = os.path.join(PROCESSED_DIR, "pdf_tracking.json")
     if os.path.exists(tracking_file):
         with open(tracking_file, "r") as f:
             tracking = json.load(f)
     else:
         tracking = {}
-    
-    file_hash = get_pdf_hash(filepath)
-    
-    # Force processing of the PDF regardless of tracking
-    print(f"Extracting text from {filename}...")
-    loader = PyPDFLoader(filepath)
-    
+    tracking[filepath] = get_pdf_hash(filepath)
+    with open(tracking_file, "w") as f:
+        json.dump(tracking, f)
+
+def process_single_pdf(filename: str, reparse: bool = False) -> List[Document]:
+    """Return the chunks of a single PDF file (see ingest_pdf)"""
+    print(f"Loading PDF: {filename}")
     try:
-        documents = loader.load()
-        print(f"Extracted {len(documents)} pages from {filename}")
-        
-        if not documents:
-            print(f"Warning: No text content found in {filename}")
-            return []
-            
-        # Get metadata from filename (e.g., category_name.pdf)
-        category = filename.split('_')[0] if '_' in filename else 'general'
-        category = category.replace('.pdf', '')
-        
-        # Add metadata
-        for doc in documents:
-            doc.metadata["source"] = filename
-            doc.metadata["category"] = category
-        
-        # Split into chunks
-        print(f"Splitting {filename} into chunks...")
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            separators=["\n\n", "\n", " ", ""]
-        )
-        document_chunks = text_splitter.split_documents(documents)
-        print(f"Created {len(document_chunks)} chunks from {filename}")
-        
-        # Update tracking
-        tracking[filepath] = file_hash
-        with open(tracking_file, "w") as f:
-            json.dump(tracking, f)
-            
-        return document_chunks
-    
+        document_chunks = list(ingest_pdf(filename, reparse=reparse))
     except Exception as e:
         print(f"Error processing {filename}: {str(e)}")
         return []
 
-def process_pdfs() -> List[Document]:
+    if not document_chunks:
+        print(f"Warning: No text content found in {filename}")
+    return document_chunks
+
+def process_pdfs(reparse: bool = False) -> List[Document]:
     """Process all PDFs in the PDF directory and chunk them"""
     all_chunks = []
     
@@ -95,18 +139,11 @@ def process_pdfs() -> List[Document]:
     pdf_files = get_pdf_files()
     
     for filename in pdf_files:
-        chunks = process_single_pdf(filename)
+        chunks = process_single_pdf(filename, reparse=reparse)
         all_chunks.extend(chunks)
     
     return all_chunks
 
-def save_processed_chunks(chunks: List[Dict[str, Any]], source: str):
-    """Save processed chunks to disk"""
-    filename = source.replace('.pdf', '')
-    processed_file = os.path.join(PROCESSED_DIR, f"{filename}_chunks.json")
-    with open(processed_file, "w") as f:
-        json.dump(chunks, f)
-
 if __name__ == "__main__":
     # Run this script directly to process PDFs
     chunks = process_pdfs()
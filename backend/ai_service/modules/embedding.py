@@ -1,15 +1,52 @@
 import os
+import threading
 from typing import List, Dict, Any
 from dotenv import load_dotenv
-from langchain_huggingface import HuggingFaceEmbeddings
+
+from .cache import EMBEDDING_CACHE
+from .metrics import record_cache_lookup
 
 load_dotenv()
 
 # Define embedding model
 MODEL_NAME = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
 
+# "huggingface" (default) or "fake" for deterministic offline vectors (benchmarks/tests)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "huggingface").lower()
+FAKE_EMBEDDING_SIZE = 384
+
+# The model is loaded once per process and shared by all requests
+_embeddings_model = None
+_embeddings_lock = threading.Lock()
+
 def get_embeddings_model():
-    """Get the embeddings model using SentenceTransformers (local model)"""
+    """Get the shared embeddings model, loading it on first use"""
+    global _embeddings_model
+    if _embeddings_model is not None:
+        record_cache_lookup("embedding_model", hit=True)
+        return _embeddings_model
+    
+    with _embeddings_lock:
+        if _embeddings_model is None:
+            record_cache_lookup("embedding_model", hit=False)
+            _embeddings_model = load_embeddings_model()
+    return _embeddings_model
+
+def embedding_model_id() -> str:
+    """Identifier of the configured embedding model, recorded in index artifacts"""
+    if EMBEDDING_BACKEND == "fake":
+        return f"fake-{FAKE_EMBEDDING_SIZE}"
+    return MODEL_NAME
+
+def load_embeddings_model():
+    """Load the embeddings model using SentenceTransformers (local model)"""
+    if EMBEDDING_BACKEND == "fake":
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        return DeterministicFakeEmbedding(size=FAKE_EMBEDDING_SIZE)
+    
+    # Imported lazily: pulls in sentence-transformers and torch
+    from langchain_huggingface import HuggingFaceEmbeddings
+    
     return HuggingFaceEmbeddings(model_name=MODEL_NAME)
 
 def embed_texts(texts: List[str]) -> List[List[float]]:
@@ -19,5 +56,27 @@ def embed_texts(texts: List[str]) -> List[List[float]]:
 
 def embed_query(query: str) -> List[float]:
     """Embed a single query"""
-    embeddings = get_embeddings_model()
-    return embeddings.embed_query(query)
\ No newline at end of file
+    return embed_query_with(get_embeddings_model(), query)
+
+def embed_query_with(embeddings: Any, query: str) -> List[float]:
+    """Embed a query with the given model, reusing the vector if this or another replica embedded the same text"""
+    key = EMBEDDING_CACHE.key(embedding_model_id(), query)
+    return EMBEDDING_CACHE.get_or_compute(key, lambda: embeddings.embed_query(query))
+
+def embed_queries_with(embeddings: Any, queries: List[str]) -> List[List[float]]:
+    """
+    Embed several queries with the given model in one batched call. Vectors
+    already in the embedding cache are reused and only the rest are embedded.
+    """
+    keys = [EMBEDDING_CACHE.key(embedding_model_id(), query) for query in queries]
+    vectors = [EMBEDDING_CACHE.get(key) for key in keys]
+    missing = list(dict.fromkeys(query for query, vector in zip(queries, vectors) if vector is None))
+    if missing:
+        # embed_documents batches the texts through the model; for the sentence-transformers
+        # models used here it returns the same vectors as embed_query
+        computed = dict(zip(missing, embeddings.embed_documents(missing)))
+        for i, (key, query) in enumerate(zip(keys, queries)):
+            if vectors[i] is None:
+                vectors[i] = computed[query]
+                EMBEDDING_CACHE.set(key, vectors[i])
+    return vectors
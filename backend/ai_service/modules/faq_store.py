@@ -0,0 +1,133 @@
+"""
+Precomputed answers to frequently asked chat questions.
+
+Part of the ``/query`` traffic is predictable (pond preparation, ammonia,
+white spot, stocking density). ``precompute_faq.py`` answers such questions
+offline, with bounded concurrency against the LLM, and stores each answer
+with the chunk IDs it was generated from and the index version:
+
+    data/processed/faq_answers.json
+        {"format_version", "entries": {normalized question: {question, answer,
+         chunk_ids, index_version, generated_at}}}
+
+At request time a question without a session whose normalized form matches
+an entry is answered from the store, with no admission slot, retrieval or LLM
+call. An entry is served only while every chunk it was generated from is in
+the current index. Chunk IDs hash the chunk's source, page and text, so an
+entry whose source chunks changed stops being served, and the next job run
+regenerates it. Entries whose retrieval is unchanged only get the new index
+version and are not sent to the LLM again.
+
+Environment variables:
+    FAQ_ENABLED        Answer matching questions from the store (default true)
+    FAQ_STORE_PATH     Store file (default data/processed/faq_answers.json)
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
+from .logging_config import log_event
+from .metrics import record_cache_lookup
+from .singleflight import normalize_question
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+FAQ_ENABLED = os.getenv("FAQ_ENABLED", "true").lower() == "true"
+FAQ_STORE_PATH = os.getenv(
+    "FAQ_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "processed", "faq_answers.json")
+)
+
+
+@dataclass
+class FaqEntry:
+    question: str
+    answer: str
+    chunk_ids: List[str]
+    index_version: str
+    generated_at: str = ""
+
+    def is_valid_for(self, index: Any) -> bool:
+        """Whether every chunk the answer was generated from is in this index"""
+        version = getattr(index, "version", None)
+        if version is None:
+            return False
+        return version == self.index_version or index.has_ids(self.chunk_ids)
+
+
+class FaqStore:
+    """FAQ answers keyed by normalized question, reloaded when the file changes"""
+
+    def __init__(self, path: str = FAQ_STORE_PATH, reload_seconds: float = 10.0):
+        self.path = path
+        self.reload_seconds = reload_seconds
+        self.entries: Dict[str, FaqEntry] = {}
+        self._mtime: Optional[float] = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def load(self) -> Dict[str, FaqEntry]:
+        """Read the store file; a missing file is an empty store"""
+        try:
+            mtime = os.path.getmtime(self.path)
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            mtime, data = None, {}
+        except ValueError as e:
+            log_event(logger, "faq_store_unreadable", level=logging.WARNING, path=self.path, error=str(e))
+            mtime, data = os.path.getmtime(self.path), {}
+        entries = {}
+        if data.get("format_version") == FORMAT_VERSION:
+            entries = {key: FaqEntry(**entry) for key, entry in data["entries"].items()}
+        self.entries, self._mtime = entries, mtime
+        return entries
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        with self._lock:
+            if now < self._next_check:
+                return
+            self._next_check = now + self.reload_seconds
+            try:
+                mtime = os.path.getmtime(self.path)
+            except FileNotFoundError:
+                mtime = None
+            if mtime != self._mtime:
+                self.load()
+
+    def get(self, question: str) -> Optional[FaqEntry]:
+        self._refresh()
+        return self.entries.get(normalize_question(question))
+
+    def lookup(self, question: str, index: Any) -> Optional[FaqEntry]:
+        """The stored answer for a question, if it was generated from chunks still in the index"""
+        entry = self.get(question)
+        hit = entry is not None and entry.is_valid_for(index)
+        record_cache_lookup("faq_answer", hit)
+        return entry if hit else None
+
+    def save(self, entries: Dict[str, FaqEntry]):
+        """Replace the store file atomically"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "format_version": FORMAT_VERSION,
+                "entries": {key: asdict(entry) for key, entry in sorted(entries.items())},
+            }, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+        with self._lock:
+            self.entries, self._mtime = dict(entries), os.path.getmtime(self.path)
+
+
+FAQ_STORE = FaqStore()
@@ -0,0 +1,187 @@
+"""
+Topic guardrail for the LikAI Coach chatbot.
+
+Questions are checked in three tiers, cheapest first:
+
+1. A single precompiled regex of farm keywords with word boundaries (so short
+   terms like "pl" and "ph" no longer match inside "please" or "phone").
+   A hit accepts the question immediately.
+2. A precompiled regex of clearly off-topic phrases. A hit rejects the
+   question in microseconds, before any embedding or LLM work.
+3. Otherwise the question is embedded and compared with farm and off-topic
+   topic centroids. The embedding is returned with the verdict so retrieval
+   reuses it instead of embedding the question a second time.
+
+Environment variables:
+    GUARDRAIL_MODE             ``hybrid`` (default) or ``keywords`` (tiers 1-2 only;
+                               questions without a farm keyword are rejected)
+    GUARDRAIL_MIN_SIMILARITY   Minimum cosine similarity to the farm centroid (default 0.35)
+"""
+
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import List, Optional
+
+from .embedding import embed_query_with, get_embeddings_model
+from .metrics import GUARDRAIL_DECISIONS, track_stage
+from .tracing import set_span_attributes
+
+GUARDRAIL_MODE = os.getenv("GUARDRAIL_MODE", "hybrid").lower()
+GUARDRAIL_MIN_SIMILARITY = float(os.getenv("GUARDRAIL_MIN_SIMILARITY", "0.35"))
+
+OFF_TOPIC_MESSAGE = (
+    "I'm LikAI Coach, specialized in aquaculture and shrimp farming practices. "
+    "I can only answer questions related to shrimp farming, pond management, "
+    "biosecurity, water quality, feeding, disease prevention, and GAqP best practices. "
+    "Please ask me something about your shrimp farm! 🦐"
+)
+
+FARM_KEYWORDS = [
+    'shrimp', 'prawn', 'aquaculture', 'pond', 'water', 'feed', 'disease',
+    'biosecurity', 'gaqp', 'farm', 'harvest', 'culture', 'post-larvae', 'pl', 'pls',
+    'stocking', 'stocked', 'mortality', 'growth', 'vannamei', 'monodon', 'oxygen',
+    'ph', 'salinity', 'temperature', 'ammonia', 'nitrite', 'treatment',
+    'hatchery', 'hatcheries', 'nursery', 'grow-out', 'fry', 'nauplii', 'larvae',
+    'crab', 'white spot', 'wssv', 'bfar', 'aerator', 'aeration', 'probiotic',
+]
+
+OFF_TOPIC_PHRASES = [
+    'weather like', 'weather today', 'weather forecast', 'movie', 'song', 'lyrics',
+    'basketball', 'football', 'soccer', 'celebrity', 'election', 'president',
+    'bitcoin', 'crypto', 'stock market', 'homework', 'poem', 'joke', 'horoscope',
+    'video game', 'smartphone', 'phone screen', 'dating',
+]
+
+# Example questions whose mean embedding defines each topic
+FARM_TOPIC_EXAMPLES = [
+    "How do I prepare my shrimp pond before stocking?",
+    "What should I do about high ammonia in the pond water?",
+    "How can I prevent white spot disease on my farm?",
+    "What stocking density is right for vannamei shrimp?",
+    "How often should I check dissolved oxygen and salinity?",
+    "Where should I buy healthy post-larvae?",
+    "How do I disinfect equipment between ponds?",
+    "How much feed should I give my shrimp every day?",
+    "What records do I need for GAqP certification?",
+    "Why are my shrimp dying after heavy rain?",
+    "How do I protect my farm from typhoons and flooding?",
+    "How do I dispose of dead shrimp safely?",
+]
+
+OFF_TOPIC_EXAMPLES = [
+    "What's the weather forecast for tomorrow?",
+    "Who won the basketball game last night?",
+    "Recommend a good movie to watch this weekend.",
+    "How do I fix my phone screen?",
+    "Write me a poem about love.",
+    "What is the price of bitcoin today?",
+    "Help me with my math homework.",
+    "Who will win the next election?",
+    "Tell me a funny joke.",
+    "How do I cook adobo?",
+]
+
+# Short keywords must match whole words; all keywords allow common inflections
+_KEYWORD_PATTERN = re.compile(
+    r"\b(?:" + "|".join(re.escape(k) for k in sorted(FARM_KEYWORDS, key=len, reverse=True)) + r")"
+    r"(?:s|es|d|ed|ing|er|ers)?\b",
+    re.IGNORECASE,
+)
+_OFF_TOPIC_PATTERN = re.compile(
+    r"\b(?:" + "|".join(re.escape(p) for p in sorted(OFF_TOPIC_PHRASES, key=len, reverse=True)) + r")s?\b",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class GuardrailVerdict:
+    """Outcome of the topic check for one question"""
+    on_topic: bool
+    reason: str  # keyword / off_topic_phrase / embedding / no_keyword
+    similarity: Optional[float] = None
+    query_vector: Optional[List[float]] = None
+
+
+class TopicCentroids:
+    """Normalized mean embeddings of the farm and off-topic example questions"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.farm = None
+        self.off_topic = None
+
+    def ensure_loaded(self):
+        if self.farm is not None:
+            return
+        with self._lock:
+            if self.farm is not None:
+                return
+            import numpy as np
+
+            embeddings = get_embeddings_model()
+            vectors = np.asarray(embeddings.embed_documents(FARM_TOPIC_EXAMPLES + OFF_TOPIC_EXAMPLES), dtype=np.float32)
+            split = len(FARM_TOPIC_EXAMPLES)
+            farm = vectors[:split].mean(axis=0)
+            off_topic = vectors[split:].mean(axis=0)
+            self.off_topic = off_topic / np.linalg.norm(off_topic)
+            self.farm = farm / np.linalg.norm(farm)
+
+    def score(self, query_vector: List[float]):
+        """Cosine similarity of a query vector to the farm and off-topic centroids"""
+        import numpy as np
+
+        self.ensure_loaded()
+        vector = np.asarray(query_vector, dtype=np.float32)
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+        return float(vector @ self.farm), float(vector @ self.off_topic)
+
+
+CENTROIDS = TopicCentroids()
+
+
+def match_keywords(question: str) -> Optional[GuardrailVerdict]:
+    """Fast regex tiers: accept on a farm keyword, reject on an off-topic phrase"""
+    if _KEYWORD_PATTERN.search(question):
+        return GuardrailVerdict(on_topic=True, reason="keyword")
+    if _OFF_TOPIC_PATTERN.search(question):
+        return GuardrailVerdict(on_topic=False, reason="off_topic_phrase")
+    return None
+
+
+def check_question(question: str) -> GuardrailVerdict:
+    """Decide whether a question is about shrimp farming"""
+    with track_stage("guardrail"):
+        verdict = match_keywords(question)
+        if verdict is None and GUARDRAIL_MODE == "keywords":
+            verdict = GuardrailVerdict(on_topic=False, reason="no_keyword")
+        if verdict is not None:
+            _record_verdict(verdict)
+
+    if verdict is None:
+        with track_stage("query_embedding"):
+            query_vector = embed_query_with(get_embeddings_model(), question)
+        with track_stage("guardrail_classifier"):
+            farm_similarity, off_topic_similarity = CENTROIDS.score(query_vector)
+            verdict = GuardrailVerdict(
+                on_topic=farm_similarity >= GUARDRAIL_MIN_SIMILARITY and farm_similarity > off_topic_similarity,
+                reason="embedding",
+                similarity=round(farm_similarity, 4),
+                query_vector=query_vector,
+            )
+            _record_verdict(verdict)
+
+    GUARDRAIL_DECISIONS.labels(
+        decision="accepted" if verdict.on_topic else "rejected", reason=verdict.reason
+    ).inc()
+    return verdict
+
+
+def _record_verdict(verdict: GuardrailVerdict):
+    """Put the verdict on the span of the stage that reached it"""
+    set_span_attributes({
+        "guardrail.on_topic": verdict.on_topic,
+        "guardrail.reason": verdict.reason,
+        "guardrail.similarity": verdict.similarity,
+    })
@@ -0,0 +1,279 @@
+"""
+Versioned, checksummed index artifacts.
+
+An artifact is a directory built once by ``build_index.py`` and copied to
+every replica, so servers never embed PDFs themselves:
+
+    manifest.json   format and index version, embedding model, dimension,
+                    chunk count, source manifest and file checksums
+    vectors.f32     unit-normalized float32 vectors, row-major (chunk_count, dimension)
+    chunks.jsonl    one {"id", "text", "metadata"} object per line, in vector order
+
+Artifacts are written to a temporary directory and moved into place only
+once complete. ``load_artifact`` verifies the checksums, refuses artifacts
+built with a different embedding model and maps the vectors read-only.
+numpy is imported on first use so importing this module stays cheap.
+"""
+
+import hashlib
+import itertools
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+VECTORS_FILE = "vectors.f32"
+CHUNKS_FILE = "chunks.jsonl"
+
+
+class IndexArtifactError(ValueError):
+    """The artifact is missing, corrupt or incompatible with this server"""
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_id(text: str, metadata: Dict[str, Any]) -> str:
+    """Stable ID of a chunk, derived from its source, page and text"""
+    key = f"{metadata.get('source', '')}\0{metadata.get('page', '')}\0{text}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+def is_artifact(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, MANIFEST_FILE))
+
+
+def read_manifest(path: str) -> Dict[str, Any]:
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    if not os.path.isfile(manifest_path):
+        raise IndexArtifactError(f"No index artifact at {path}")
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise IndexArtifactError(
+            f"Unsupported artifact format {manifest.get('format_version')} (expected {FORMAT_VERSION})"
+        )
+    return manifest
+
+
+def check_embedding_model(manifest: Dict[str, Any], expected_model: str):
+    """Refuse an artifact whose vectors came from a different embedding model"""
+    if manifest["embedding_model"] != expected_model:
+        raise IndexArtifactError(
+            f"Index artifact was built with embedding model {manifest['embedding_model']!r} "
+            f"but this server uses {expected_model!r}; rebuild the index or change EMBEDDING_MODEL"
+        )
+
+
+class ArtifactWriter:
+    """Append embedded chunks batch by batch, then publish the artifact atomically"""
+
+    def __init__(self, output_dir: str, embedding_model: str, overwrite: bool = False):
+        self.output_dir = os.path.abspath(output_dir)
+        if os.path.exists(self.output_dir) and not overwrite:
+            raise IndexArtifactError(f"{self.output_dir} already exists")
+        self.embedding_model = embedding_model
+        self.overwrite = overwrite
+        self.tmp_dir = f"{self.output_dir}.tmp-{uuid.uuid4().hex[:8]}"
+        os.makedirs(self.tmp_dir)
+        self.dimension: Optional[int] = None
+        self.chunk_count = 0
+        self.sources: Dict[str, Dict[str, Any]] = {}
+        self._seen = set()
+        self._ids = hashlib.sha256()
+        self._vector_digest = hashlib.sha256()
+        self._chunk_digest = hashlib.sha256()
+        self._vector_file = open(os.path.join(self.tmp_dir, VECTORS_FILE), "wb")
+        self._chunk_file = open(os.path.join(self.tmp_dir, CHUNKS_FILE), "wb")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+
+    def add_source(self, filename: str, sha256: str, size: int, **fields: Any):
+        """Record a source document in the manifest"""
+        self.sources[filename] = {"file": filename, "sha256": sha256, "bytes": size, "chunks": 0, **fields}
+
+    def add_batch(self, texts: List[str], metadatas: List[Dict[str, Any]], vectors: Iterable[List[float]]) -> int:
+        """Append a batch of chunks and their vectors; duplicate chunks are skipped"""
+        import numpy as np
+
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(vectors) != len(texts):
+            raise ValueError("Each chunk needs exactly one vector")
+        if len(vectors) == 0:
+            return 0
+        if self.dimension is None:
+            self.dimension = int(vectors.shape[1])
+        elif vectors.shape[1] != self.dimension:
+            raise IndexArtifactError(f"Vector dimension changed from {self.dimension} to {vectors.shape[1]}")
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1.0, norms)
+
+        added = 0
+        for text, metadata, vector in zip(texts, metadatas, vectors):
+            cid = chunk_id(text, metadata)
+            if cid in self._seen:
+                continue
+            self._seen.add(cid)
+            self._ids.update(cid.encode())
+
+            row = np.ascontiguousarray(vector, dtype="<f4").tobytes()
+            line = (json.dumps({"id": cid, "text": text, "metadata": metadata}, ensure_ascii=False) + "\n").encode("utf-8")
+            self._vector_file.write(row)
+            self._vector_digest.update(row)
+            self._chunk_file.write(line)
+            self._chunk_digest.update(line)
+
+            source = metadata.get("source")
+            if source in self.sources:
+                self.sources[source]["chunks"] += 1
+            added += 1
+
+        self.chunk_count += added
+        return added
+
+    def finalize(self, build: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Write the manifest and move the finished artifact into place"""
+        self._vector_file.close()
+        self._chunk_file.close()
+        if self.chunk_count == 0:
+            self.abort()
+            raise IndexArtifactError("No chunks were added to the artifact")
+
+        version_key = hashlib.sha256()
+        version_key.update(self.embedding_model.encode())
+        version_key.update(self._ids.digest())
+        version_key.update(self._vector_digest.digest())
+
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "index_version": version_key.hexdigest()[:12],
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "embedding_model": self.embedding_model,
+            "dimension": self.dimension,
+            "chunk_count": self.chunk_count,
+            "sources": sorted(self.sources.values(), key=lambda s: s["file"]),
+            "files": {
+                VECTORS_FILE: {"sha256": self._vector_digest.hexdigest(), "bytes": self.chunk_count * self.dimension * 4},
+                CHUNKS_FILE: {"sha256": self._chunk_digest.hexdigest()},
+            },
+            "build": build or {},
+        }
+        with open(os.path.join(self.tmp_dir, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        previous = None
+        if os.path.exists(self.output_dir):
+            previous = f"{self.output_dir}.old-{uuid.uuid4().hex[:8]}"
+            os.rename(self.output_dir, previous)
+        os.rename(self.tmp_dir, self.output_dir)
+        if previous:
+            shutil.rmtree(previous, ignore_errors=True)
+        return manifest
+
+    def abort(self):
+        """Discard the partially written artifact"""
+        self._vector_file.close()
+        self._chunk_file.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+
+def build_artifact(
+    output_dir: str,
+    texts: List[str],
+    metadatas: List[Dict[str, Any]],
+    embeddings: Any,
+    embedding_model: str,
+    sources: Optional[List[Dict[str, Any]]] = None,
+    batch_size: int = 64,
+    overwrite: bool = False,
+    build: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Embed chunks in batches and write them as an artifact; returns the manifest"""
+    with ArtifactWriter(output_dir, embedding_model, overwrite=overwrite) as writer:
+        for source in sources or []:
+            writer.add_source(**source)
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            writer.add_batch(batch, metadatas[start:start + batch_size], embeddings.embed_documents(batch))
+        return writer.finalize(build)
+
+
+def build_artifact_from_documents(
+    output_dir: str,
+    documents: Iterable[Any],
+    embeddings: Any,
+    embedding_model: str,
+    sources: Optional[List[Dict[str, Any]]] = None,
+    batch_size: int = 64,
+    overwrite: bool = False,
+    build: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Like ``build_artifact`` for a stream of Documents; holds one batch in memory at a time"""
+    documents = iter(documents)
+    with ArtifactWriter(output_dir, embedding_model, overwrite=overwrite) as writer:
+        for source in sources or []:
+            writer.add_source(**source)
+        while True:
+            batch = list(itertools.islice(documents, batch_size))
+            if not batch:
+                break
+            texts = [doc.page_content for doc in batch]
+            writer.add_batch(texts, [doc.metadata for doc in batch], embeddings.embed_documents(texts))
+        return writer.finalize(build)
+
+
+def verify_artifact(path: str, manifest: Optional[Dict[str, Any]] = None):
+    """Check file sizes and checksums against the manifest"""
+    manifest = manifest or read_manifest(path)
+    for name, expected in manifest["files"].items():
+        file_path = os.path.join(path, name)
+        if not os.path.isfile(file_path):
+            raise IndexArtifactError(f"Artifact file {name} is missing")
+        if "bytes" in expected and os.path.getsize(file_path) != expected["bytes"]:
+            raise IndexArtifactError(f"Artifact file {name} has the wrong size")
+        if file_sha256(file_path) != expected["sha256"]:
+            raise IndexArtifactError(f"Checksum mismatch for artifact file {name}")
+
+
+def load_artifact(path: str, embeddings: Any, expected_model: Optional[str] = None, verify: bool = True):
+    """Load an artifact as a read-only ``NumpyVectorIndex``"""
+    import numpy as np
+    from .vector_index import NumpyVectorIndex
+
+    manifest = read_manifest(path)
+    if expected_model is not None:
+        check_embedding_model(manifest, expected_model)
+    if verify:
+        verify_artifact(path, manifest)
+
+    vectors = np.memmap(
+        os.path.join(path, VECTORS_FILE), dtype="<f4", mode="r",
+        shape=(manifest["chunk_count"], manifest["dimension"]),
+    )
+
+    ids, texts, metadatas = [], [], []
+    with open(os.path.join(path, CHUNKS_FILE), encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            ids.append(record["id"])
+            texts.append(record["text"])
+            metadatas.append(record["metadata"])
+    if len(ids) != manifest["chunk_count"]:
+        raise IndexArtifactError("Chunk count does not match the manifest")
+
+    return NumpyVectorIndex(vectors, ids, texts, metadatas, embeddings, manifest=manifest)
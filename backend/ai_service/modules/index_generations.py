@@ -0,0 +1,165 @@
+"""
+Blue-green index generations.
+
+Instead of rebuilding the index in place, every build writes a new artifact
+directory (a generation) next to the one being served. The new generation is
+validated before anything points at it:
+
+- the checksums and embedding model match (``load_artifact``)
+- it holds at least ``min_chunks`` chunks and did not shrink by more than
+  ``max_shrink`` compared with the generation it replaces
+- a handful of smoke queries each return results
+
+Only then is the ``CURRENT`` pointer file replaced, atomically, with
+``os.replace``. Servers notice the new pointer, load the generation in the
+background and swap it in, while requests already running finish on the old
+index. Older generations are garbage-collected, keeping the previous ones for
+rollback:
+
+    data/index/
+        CURRENT                                name of the generation being served
+        gen-20261019T134501123456-55cd5367/    index artifact (manifest.json, vectors.f32, ...)
+        gen-20261012T090000654321-1f2e3d4c/    previous generation, kept for rollback
+
+Removing a generation is safe while a process still has it loaded: its vectors
+stay mapped until that process drops the old index.
+"""
+
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+from .index_artifact import IndexArtifactError, is_artifact, load_artifact, read_manifest
+
+CURRENT_FILE = "CURRENT"
+GENERATION_PREFIX = "gen-"
+
+# Builds that crashed leave "<generation>.tmp-*" directories; removed once this old
+STALE_TMP_SECONDS = 3600
+
+SMOKE_QUERIES = [
+    "pond preparation and biosecurity",
+    "water quality monitoring",
+    "feeding management for shrimp",
+]
+
+
+def current_generation(root: str) -> Optional[str]:
+    """Name of the generation the CURRENT pointer names, or None"""
+    try:
+        with open(os.path.join(root, CURRENT_FILE), encoding="utf-8") as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return name or None
+
+
+def resolve_index_dir(path: str) -> Optional[str]:
+    """The artifact directory to serve: the current generation under a generations
+    root, the path itself if it is a single artifact, or None"""
+    name = current_generation(path)
+    if name is not None:
+        return os.path.join(path, name)
+    if is_artifact(path):
+        return path
+    return None
+
+
+def list_generations(root: str) -> List[str]:
+    """Complete generations under root, oldest first"""
+    if not os.path.isdir(root):
+        return []
+    names = [
+        name for name in os.listdir(root)
+        if name.startswith(GENERATION_PREFIX) and ".tmp-" not in name and is_artifact(os.path.join(root, name))
+    ]
+    return sorted(names)
+
+
+def new_generation_dir(root: str) -> str:
+    """Path for a new generation; names sort in build order"""
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    return os.path.join(root, f"{GENERATION_PREFIX}{stamp}-{uuid.uuid4().hex[:8]}")
+
+
+def validate_generation(
+    path: str,
+    embeddings: Any,
+    expected_model: str,
+    previous: Optional[Dict[str, Any]] = None,
+    min_chunks: int = 1,
+    max_shrink: float = 0.5,
+    smoke_queries: Sequence[str] = SMOKE_QUERIES,
+    k: int = 3,
+) -> Dict[str, Any]:
+    """Load a generation as a server would and check it; raises IndexArtifactError"""
+    index = load_artifact(path, embeddings, expected_model=expected_model, verify=True)
+    if len(index) < min_chunks:
+        raise IndexArtifactError(f"Generation has {len(index)} chunks, expected at least {min_chunks}")
+    if previous is not None and len(index) < previous["chunk_count"] * (1 - max_shrink):
+        raise IndexArtifactError(
+            f"Generation has {len(index)} chunks, down from {previous['chunk_count']}; "
+            "promote it with --force if that is intended"
+        )
+
+    expected = min(k, len(index))
+    for query in smoke_queries:
+        docs = index.similarity_search(query, k=k)
+        if len(docs) < expected or not any(doc.page_content.strip() for doc in docs):
+            raise IndexArtifactError(f"Smoke query {query!r} returned {len(docs)} results")
+
+    return {"chunk_count": len(index), "index_version": index.version, "smoke_queries": len(smoke_queries)}
+
+
+def promote(root: str, name: str):
+    """Point CURRENT at a generation; readers see either the old or the new name, never a partial one"""
+    if not is_artifact(os.path.join(root, name)):
+        raise IndexArtifactError(f"{name} is not a complete generation in {root}")
+    tmp_path = os.path.join(root, f".{CURRENT_FILE}.{uuid.uuid4().hex[:8]}")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(name + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(root, CURRENT_FILE))
+
+
+def previous_generation(root: str) -> Optional[str]:
+    """The newest generation older than the current one, for rollback"""
+    current = current_generation(root)
+    older = [name for name in list_generations(root) if current is None or name < current]
+    return older[-1] if older else None
+
+
+def collect_garbage(root: str, keep: int = 2) -> List[str]:
+    """Remove all but the ``keep`` newest generations (never the current one); returns removed names"""
+    current = current_generation(root)
+    generations = list_generations(root)
+    kept = set(generations[-keep:]) if keep > 0 else set()
+    if current is not None:
+        kept.add(current)
+
+    removed = []
+    for name in generations:
+        if name not in kept:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+            removed.append(name)
+
+    now = time.time()
+    for name in os.listdir(root) if os.path.isdir(root) else []:
+        path = os.path.join(root, name)
+        if ".tmp-" in name and os.path.isdir(path) and now - os.path.getmtime(path) > STALE_TMP_SECONDS:
+            shutil.rmtree(path, ignore_errors=True)
+            removed.append(name)
+    return removed
+
+
+def generation_manifest(root: str, name: Optional[str]) -> Optional[Dict[str, Any]]:
+    if name is None:
+        return None
+    try:
+        return read_manifest(os.path.join(root, name))
+    except IndexArtifactError:
+        return None
@@ -0,0 +1,352 @@
+"""
+Knowledge-base collections.
+
+The knowledge base is one index by default (INDEX_ARTIFACT_PATH, or the Chroma
+DB): the ``default`` collection. Guides for a region, language or species can
+be indexed as separate collections. Each one is a directory of index
+generations under KB_COLLECTIONS_PATH, built from a subset of the PDFs:
+
+    python build_index.py --output data/collections/vannamei --pdfs Vannamei-Culture-Guide.pdf
+
+Requests are routed to a collection by their attributes (``location``,
+``primarySpecies``, ...) using the rules in ``KB_COLLECTIONS_PATH/routes.json``.
+The first route whose patterns all match wins, and requests that match no
+route use the default collection:
+
+    {"routes": [
+        {"collection": "vannamei", "match": {"primarySpecies": "vannamei"}},
+        {"collection": "visayas", "match": {"location": "iloilo|negros|capiz|aklan"}}
+    ]}
+
+Patterns are case-insensitive regular expressions searched in the attribute.
+A ``/query`` request may also name its collection. Routing runs on every
+request, so it touches the filesystem at most once per INDEX_RELOAD_SECONDS:
+routes.json is reread when it changed, and which collections exist is cached
+until then.
+
+Collections are opened on first use, not at startup, and each worker keeps a
+memory-bounded LRU of them resident. When opening one would exceed
+KB_COLLECTIONS_MAX_MB (estimated as the vector matrix plus chunk texts), the
+least recently used ones are closed first. A newly promoted generation of a
+collection is picked up within INDEX_RELOAD_SECONDS. The default collection
+is the shared index of rag_pipeline. It is always resident and is not counted
+against the budget.
+
+Environment variables:
+    KB_COLLECTIONS_PATH     Root of the collection directories (default data/collections)
+    KB_COLLECTIONS_MAX_MB   Memory budget of resident collections per worker (default 512)
+"""
+
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Mapping, Optional, Pattern
+
+from .index_generations import resolve_index_dir
+from .logging_config import log_event
+from .metrics import COLLECTION_EVENTS, COLLECTION_RESIDENT_BYTES
+from .segment_cache import load_segment_table
+
+logger = logging.getLogger(__name__)
+
+KB_COLLECTIONS_PATH = os.getenv(
+    "KB_COLLECTIONS_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "collections")
+)
+KB_COLLECTIONS_MAX_MB = float(os.getenv("KB_COLLECTIONS_MAX_MB", "512"))
+INDEX_RELOAD_SECONDS = float(os.getenv("INDEX_RELOAD_SECONDS", "10"))
+
+DEFAULT_COLLECTION = "default"
+ROUTES_FILE = "routes.json"
+
+_NAME = re.compile(r"^[a-z0-9][a-z0-9_-]{0,63}$")
+
+
+class CollectionNotFound(ValueError):
+    """A request named a collection that has no index"""
+
+
+@dataclass
+class Route:
+    """Send requests whose attributes match every pattern to a collection"""
+    collection: str
+    match: Dict[str, Pattern]
+
+    def matches(self, attributes: Mapping[str, Any]) -> bool:
+        for name, pattern in self.match.items():
+            value = attributes.get(name)
+            if isinstance(value, (list, tuple)):
+                value = " ".join(str(v) for v in value)
+            if value is None or not pattern.search(str(value)):
+                return False
+        return True
+
+
+@dataclass
+class ResidentCollection:
+    """An open collection index and what the LRU needs to know about it"""
+    name: str
+    index_dir: str
+    index: Any
+    segment_table: Any
+    size_bytes: int
+    load_seconds: float
+    last_used: float
+    next_check: float
+
+
+def index_footprint(index: Any) -> int:
+    """Estimated resident bytes of a loaded index: the vector matrix and chunk texts"""
+    vectors = getattr(index, "vectors", None)
+    size = int(vectors.nbytes) if vectors is not None else 0
+    return size + sum(sys.getsizeof(text) for text in getattr(index, "texts", ()))
+
+
+def load_collection_index(index_dir: str):
+    """Open a collection generation the way the default index is opened"""
+    from .rag_pipeline import load_index_artifact
+
+    return load_index_artifact(index_dir)
+
+
+class CollectionManager:
+    """Opens collections on demand and keeps a memory-bounded LRU of them"""
+
+    def __init__(self, root: str = KB_COLLECTIONS_PATH, max_mb: float = KB_COLLECTIONS_MAX_MB,
+                 reload_seconds: float = INDEX_RELOAD_SECONDS,
+                 loader: Callable[[str], Any] = load_collection_index,
+                 clock: Callable[[], float] = time.monotonic):
+        self.root = root
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.reload_seconds = reload_seconds
+        self.loader = loader
+        self.clock = clock
+        self._resident: "OrderedDict[str, ResidentCollection]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._routes: List[Route] = []
+        self._routes_mtime: Optional[float] = None
+        self._exists: Dict[str, bool] = {}
+        self._next_refresh = float("-inf")
+
+    # Routing
+
+    def exists(self, name: str) -> bool:
+        """Whether the collection has a servable index (cached, see _refresh)"""
+        if not _NAME.match(name):
+            return False
+        with self._lock:
+            self._refresh()
+            known = self._exists.get(name)
+        if known is None:
+            known = resolve_index_dir(os.path.join(self.root, name)) is not None
+            with self._lock:
+                self._exists[name] = known
+        return known
+
+    def names(self) -> List[str]:
+        """Collections with a servable index under the root"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if self.exists(name))
+
+    def routes(self) -> List[Route]:
+        """Routing rules, reread when routes.json changes"""
+        with self._lock:
+            self._refresh()
+            return self._routes
+
+    def _refresh(self):
+        """
+        At most once per reload_seconds (caller holds the lock): reread
+        routes.json if it changed and forget which collections exist.
+        """
+        now = self.clock()
+        if now < self._next_refresh:
+            return
+        self._next_refresh = now + self.reload_seconds
+        self._exists.clear()
+        path = os.path.join(self.root, ROUTES_FILE)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            self._routes, self._routes_mtime = [], None
+            return
+        if mtime == self._routes_mtime:
+            return
+        try:
+            with open(path, encoding="utf-8") as f:
+                rules = json.load(f).get("routes", [])
+            routes = [
+                Route(rule["collection"], {name: re.compile(pattern, re.IGNORECASE)
+                                           for name, pattern in rule["match"].items()})
+                for rule in rules
+            ]
+        except (OSError, ValueError, KeyError, TypeError, AttributeError, re.error) as e:
+            # Keep routing by the last good rules rather than failing requests
+            log_event(logger, "collection_routes_invalid", level=logging.ERROR, path=path, error=str(e))
+        else:
+            self._routes = routes
+        self._routes_mtime = mtime
+
+    def route(self, attributes: Mapping[str, Any]) -> Optional[str]:
+        """Collection of the first route matching the attributes, or None for the default"""
+        for route in self.routes():
+            if route.matches(attributes) and self.exists(route.collection):
+                return route.collection
+        return None
+
+    def select(self, requested: Optional[str], attributes: Mapping[str, Any]) -> Optional[str]:
+        """
+        The collection a request uses (None for the default): the one it
+        names, else the routed one. Raises CollectionNotFound for an unknown name.
+        """
+        if requested:
+            if requested == DEFAULT_COLLECTION:
+                return None
+            if not self.exists(requested):
+                raise CollectionNotFound(f"Unknown collection {requested!r}")
+            return requested
+        return self.route(attributes)
+
+    # Residency
+
+    def loaded(self, name: str) -> Optional[ResidentCollection]:
+        """The collection if it is resident, without opening it"""
+        with self._lock:
+            return self._resident.get(name)
+
+    def get(self, name: str) -> ResidentCollection:
+        """The open collection, loading it (and evicting others) if needed; raises CollectionNotFound"""
+        entry = self._lookup(name)
+        if entry is not None:
+            return entry
+        with self._lock:
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+        # One load per collection at a time; concurrent requests for it wait for that load
+        with load_lock:
+            entry = self._lookup(name)
+            if entry is not None:
+                return entry
+            return self._load(name)
+
+    def _lookup(self, name: str) -> Optional[ResidentCollection]:
+        with self._lock:
+            entry = self._resident.get(name)
+            if entry is None:
+                return None
+            now = self.clock()
+            if self.reload_seconds > 0 and now >= entry.next_check:
+                entry.next_check = now + self.reload_seconds
+                index_dir = resolve_index_dir(os.path.join(self.root, name))
+                if index_dir != entry.index_dir:
+                    # A new generation was promoted (or the collection removed): reopen it
+                    self._drop(name, "reload")
+                    return None
+            entry.last_used = now
+            self._resident.move_to_end(name)
+            return entry
+
+    def _load(self, name: str) -> ResidentCollection:
+        index_dir = resolve_index_dir(os.path.join(self.root, name)) if _NAME.match(name) else None
+        if index_dir is None:
+            raise CollectionNotFound(f"Unknown collection {name!r}")
+
+        start = time.perf_counter()
+        index = self.loader(index_dir)
+        version = getattr(index, "version", None)
+        segment_table = load_segment_table(index_dir, version) if version else None
+        now = self.clock()
+        entry = ResidentCollection(
+            name=name, index_dir=index_dir, index=index, segment_table=segment_table,
+            size_bytes=index_footprint(index), load_seconds=time.perf_counter() - start,
+            last_used=now, next_check=now + self.reload_seconds,
+        )
+
+        with self._lock:
+            self._drop(name, None)
+            # Close the least recently used collections until the new one fits
+            while self._resident and self._resident_bytes() + entry.size_bytes > self.max_bytes:
+                self._drop(next(iter(self._resident)), "eviction")
+            self._resident[name] = entry
+            self._count(name, "load")
+            resident = list(self._resident)
+        COLLECTION_RESIDENT_BYTES.labels(collection=name).set(entry.size_bytes)
+
+        log_event(
+            logger, "collection_loaded",
+            collection=name, index_version=version, chunks=len(index),
+            size_mb=round(entry.size_bytes / (1024 * 1024), 2),
+            load_ms=round(entry.load_seconds * 1000, 1), resident=resident,
+        )
+        if entry.size_bytes > self.max_bytes:
+            log_event(logger, "collection_over_budget", level=logging.WARNING, collection=name,
+                      size_mb=round(entry.size_bytes / (1024 * 1024), 2), max_mb=round(self.max_bytes / (1024 * 1024), 2))
+        return entry
+
+    def _drop(self, name: str, reason: Optional[str]):
+        """Forget a resident collection (caller holds the lock). In-flight requests keep their reference."""
+        entry = self._resident.pop(name, None)
+        if entry is None:
+            return
+        COLLECTION_RESIDENT_BYTES.labels(collection=name).set(0)
+        if reason is not None:
+            self._count(name, reason)
+            log_event(logger, "collection_closed", collection=name, reason=reason,
+                      size_mb=round(entry.size_bytes / (1024 * 1024), 2))
+
+    def _resident_bytes(self) -> int:
+        return sum(entry.size_bytes for entry in self._resident.values())
+
+    def _count(self, name: str, event: str):
+        counts = self._counts.setdefault(name, {})
+        counts[event] = counts.get(event, 0) + 1
+        COLLECTION_EVENTS.labels(collection=name, event=event).inc()
+
+    def record_retrieval(self, name: Optional[str]):
+        """Count a context retrieval from a collection (None: the default)"""
+        with self._lock:
+            self._count(name or DEFAULT_COLLECTION, "retrieval")
+
+    def clear(self):
+        with self._lock:
+            for name in list(self._resident):
+                self._drop(name, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Residency, size and load/eviction/request counts of every collection"""
+        names = self.names()
+        routes = len(self.routes())
+        now = self.clock()
+        with self._lock:
+            collections = []
+            for name in sorted(set(names) | set(self._resident)):
+                entry = self._resident.get(name)
+                row = {"name": name, "resident": entry is not None}
+                if entry is not None:
+                    row.update(
+                        index_version=getattr(entry.index, "version", None),
+                        chunks=len(entry.index),
+                        size_mb=round(entry.size_bytes / (1024 * 1024), 2),
+                        load_ms=round(entry.load_seconds * 1000, 1),
+                        idle_seconds=round(now - entry.last_used, 1),
+                    )
+                row.update({f"{event}s": count for event, count in self._counts.get(name, {}).items()})
+                collections.append(row)
+            return {
+                "default": {"retrievals": self._counts.get(DEFAULT_COLLECTION, {}).get("retrieval", 0)},
+                "resident_mb": round(self._resident_bytes() / (1024 * 1024), 2),
+                "max_mb": round(self.max_bytes / (1024 * 1024), 2),
+                "routes": routes,
+                "collections": collections,
+            }
+
+
+COLLECTIONS = CollectionManager()
@@ -0,0 +1,156 @@
+"""
+Logging configuration for the AI service.
+
+Log records are handed to a ``QueueHandler`` on the request thread and written
+by a ``QueueListener`` background thread, so formatting and stream I/O never
+block the event loop. ``LOG_FORMAT=json`` switches to one compact JSON object
+per line for log shippers; the default ``text`` format is meant for local runs.
+
+Environment variables:
+    LOG_LEVEL                 Root log level (default INFO)
+    LOG_FORMAT                ``text`` or ``json`` (default text)
+    LOG_PAYLOAD_SAMPLE_RATE   Fraction of requests whose full request/response
+                              payload is logged (default 0.0, i.e. opt-in)
+"""
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+from typing import Any, Dict, Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0.0"))
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Format a log record as a single compact JSON line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, DATE_FORMAT),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human readable formatter that appends event fields as key=value pairs"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(
+                f"{key}={json.dumps(value, ensure_ascii=False, default=str)}"
+                for key, value in fields.items()
+            )
+        return line
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Queue records with the message merged but the traceback kept apart
+
+    The stock ``prepare`` folds the traceback into ``msg`` and drops
+    ``exc_info``, so the listener's formatter could never put it in its own
+    field. The traceback is rendered here instead and travels in
+    ``exc_text``. ``prepare`` runs on the caller's thread before the record
+    is queued, while the exception and its frames are still current; by the
+    time the listener thread sees the record they may be gone, so this
+    cannot move to the listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _EXC_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_EXC_FORMATTER = logging.Formatter()
+
+
+def configure_logging():
+    """Route all logging through a queue drained by a background listener thread"""
+    global _listener
+    if _listener is not None:
+        return
+
+    if LOG_FORMAT == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = TextFormatter(TEXT_FORMAT, datefmt=DATE_FORMAT)
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_QueueHandler(log_queue))
+    root.setLevel(LOG_LEVEL)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _restart_after_fork():
+    """A forked worker inherits the listener object but not its thread"""
+    global _listener
+    if _listener is not None:
+        _listener = None
+        configure_logging()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def log_event(logger: logging.Logger, event: str, level: int = logging.INFO, **fields: Any):
+    """Emit one structured event; fields become JSON keys or key=value pairs"""
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={"fields": fields})
+
+
+def should_log_payload() -> bool:
+    """Decide whether this request's full payload should be logged"""
+    return LOG_PAYLOAD_SAMPLE_RATE > 0 and random.random() < LOG_PAYLOAD_SAMPLE_RATE
+
+
+def stage_timings_ms(timings: Dict[str, float]) -> Dict[str, float]:
+    """Convert stage timings in seconds to rounded milliseconds for logging"""
+    return {stage: round(seconds * 1000, 1) for stage, seconds in timings.items()}
@@ -0,0 +1,213 @@
+"""
+Prometheus metrics for the AI service.
+
+Every pipeline stage is timed with ``track_stage`` so that the latency of a
+request can be broken down into model load, vector DB open, query embedding,
+similarity search, the Groq call and response parsing. Metrics are exposed in
+Prometheus text format by the ``/metrics`` endpoint in ``app.py``.
+
+Stage timings are also collected per request (see ``start_stage_timings``) so
+they can be attached to the request's structured log event, and each stage is
+a trace span when tracing is on (see tracing.py).
+
+Under the pre-fork server (``serve.py``) ``PROMETHEUS_MULTIPROC_DIR`` is set
+and ``/metrics`` aggregates the values written by every worker.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+from .tracing import set_span_attributes, span
+
+# Buckets cover everything from a sub-millisecond cache lookup to a slow LLM call
+STAGE_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+REQUEST_LATENCY = Histogram(
+    "likai_request_duration_seconds",
+    "Total HTTP request latency",
+    ["method", "path", "status"],
+    buckets=STAGE_BUCKETS,
+)
+
+STAGE_LATENCY = Histogram(
+    "likai_stage_duration_seconds",
+    "Latency of individual RAG pipeline stages",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+
+CACHE_HITS = Counter(
+    "likai_cache_hits_total",
+    "Cache lookups that returned a stored value",
+    ["cache"],
+)
+
+CACHE_MISSES = Counter(
+    "likai_cache_misses_total",
+    "Cache lookups that had to compute the value",
+    ["cache"],
+)
+
+PARSE_FALLBACKS = Counter(
+    "likai_parse_fallbacks_total",
+    "Times parse_ai_response fell back to default values",
+    ["section"],
+)
+
+LLM_TOKENS = Counter(
+    "likai_llm_tokens_total",
+    "Tokens sent to and received from the LLM",
+    ["direction"],
+)
+
+GUARDRAIL_DECISIONS = Counter(
+    "likai_guardrail_decisions_total",
+    "Chatbot topic guardrail outcomes",
+    ["decision", "reason"],
+)
+
+SESSIONS_ACTIVE = Gauge(
+    "likai_sessions_active",
+    "Chat sessions currently held in memory",
+    multiprocess_mode="livesum",
+)
+
+SESSION_TOKENS = Gauge(
+    "likai_session_tokens",
+    "Estimated tokens held across all chat sessions",
+    multiprocess_mode="livesum",
+)
+
+SESSION_EVICTIONS = Counter(
+    "likai_session_evictions_total",
+    "Chat sessions removed from memory",
+    ["reason"],
+)
+
+ADMISSION_IN_FLIGHT = Gauge(
+    "likai_admission_in_flight",
+    "Requests holding an admission slot",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "likai_admission_queue_depth",
+    "Requests waiting for an admission slot",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+
+ADMISSION_QUEUE_WAIT = Histogram(
+    "likai_admission_queue_wait_seconds",
+    "Time admitted requests waited for a slot",
+    ["pool"],
+    buckets=STAGE_BUCKETS,
+)
+
+ADMISSION_REJECTIONS = Counter(
+    "likai_admission_rejections_total",
+    "Requests shed by admission control",
+    ["pool", "reason"],
+)
+
+COLLECTION_EVENTS = Counter(
+    "likai_collection_events_total",
+    "Knowledge-base collection loads, evictions, reloads and retrievals",
+    ["collection", "event"],
+)
+
+COLLECTION_RESIDENT_BYTES = Gauge(
+    "likai_collection_resident_bytes",
+    "Estimated memory of resident knowledge-base collections",
+    ["collection"],
+    multiprocess_mode="livesum",
+)
+
+ERRORS = Counter(
+    "likai_errors_total",
+    "Errors raised while handling requests, by exception type",
+    ["endpoint", "error_type"],
+)
+
+
+# Stage timings (seconds) of the request currently being handled, if collected
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+
+def start_stage_timings() -> Dict[str, float]:
+    """Start collecting stage timings for the current request and return the collector"""
+    timings: Dict[str, float] = {}
+    _request_timings.set(timings)
+    return timings
+
+
+@contextmanager
+def track_stage(stage: str):
+    """Time a pipeline stage and record it in the stage latency histogram (and as a span)"""
+    start = time.perf_counter()
+    try:
+        with span(stage):
+            yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_LATENCY.labels(stage=stage).observe(elapsed)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    """Count a cache hit or miss for the named cache"""
+    if hit:
+        CACHE_HITS.labels(cache=cache).inc()
+    else:
+        CACHE_MISSES.labels(cache=cache).inc()
+
+
+def record_parse_fallback(section: str):
+    """Count a fallback to default values while parsing the LLM response"""
+    PARSE_FALLBACKS.labels(section=section).inc()
+
+
+def record_llm_usage(response: Any):
+    """Count input/output tokens reported on an LLM response message"""
+    usage = getattr(response, "usage_metadata", None) or {}
+    input_tokens = usage.get("input_tokens", 0)
+    output_tokens = usage.get("output_tokens", 0)
+    if input_tokens:
+        LLM_TOKENS.labels(direction="input").inc(input_tokens)
+    if output_tokens:
+        LLM_TOKENS.labels(direction="output").inc(output_tokens)
+    set_span_attributes({"llm.input_tokens": input_tokens, "llm.output_tokens": output_tokens})
+
+
+def record_error(endpoint: str, error: BaseException):
+    """Count an error raised while handling an endpoint"""
+    ERRORS.labels(endpoint=endpoint, error_type=type(error).__name__).inc()
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Render all metrics in Prometheus text exposition format"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import CollectorRegistry, multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,88 @@
+"""
+Per-process memory accounting.
+
+RSS counts every resident page a process maps, including pages shared with
+other workers, so it overstates the cost of adding a worker. This module
+reads ``/proc/<pid>/smaps_rollup`` (Linux) to also report:
+
+    uss   unique set size: private pages, freed if the process exits
+    pss   proportional set size: private pages plus a fair share of shared pages
+    shared  resident pages shared with at least one other process
+
+Summing PSS over all workers gives the real footprint of the server, and USS
+is the marginal cost of one more worker.
+"""
+
+import os
+from typing import Dict, List, Optional, Union
+
+_FIELDS = {
+    "Rss": "rss_mb",
+    "Pss": "pss_mb",
+    "Shared_Clean": "shared_mb",
+    "Shared_Dirty": "shared_mb",
+    "Private_Clean": "uss_mb",
+    "Private_Dirty": "uss_mb",
+    "Swap": "swap_mb",
+}
+
+
+def memory_usage(pid: Union[int, str] = "self") -> Dict[str, Optional[float]]:
+    """RSS, PSS, USS and shared memory of a process in MB (None where unavailable)"""
+    usage: Dict[str, Optional[float]] = {"rss_mb": None, "pss_mb": None, "uss_mb": None, "shared_mb": None, "swap_mb": None}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            lines = f.readlines()
+    except OSError:
+        return _fallback_usage(pid, usage)
+
+    totals: Dict[str, float] = {}
+    for line in lines:
+        parts = line.split()
+        if len(parts) >= 2 and parts[0].rstrip(":") in _FIELDS:
+            key = _FIELDS[parts[0].rstrip(":")]
+            totals[key] = totals.get(key, 0.0) + int(parts[1]) / 1024
+    usage.update({key: round(value, 1) for key, value in totals.items()})
+    return usage
+
+
+def _fallback_usage(pid: Union[int, str], usage: Dict[str, Optional[float]]) -> Dict[str, Optional[float]]:
+    """Peak RSS from getrusage when smaps_rollup is unavailable (own process only)"""
+    if pid not in ("self", os.getpid()):
+        return usage
+    try:
+        import resource
+        import sys
+    except ImportError:
+        return usage
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    usage["rss_mb"] = round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    return usage
+
+
+def child_pids(parent_pid: int) -> List[int]:
+    """PIDs of a process's direct children (Linux)"""
+    children: List[int] = []
+    task_dir = f"/proc/{parent_pid}/task"
+    try:
+        for tid in os.listdir(task_dir):
+            with open(os.path.join(task_dir, tid, "children")) as f:
+                children.extend(int(pid) for pid in f.read().split())
+    except OSError:
+        pass
+    return sorted(set(children))
+
+
+def workers_memory(pids: List[int]) -> Dict[str, object]:
+    """Per-worker memory and totals; total_pss_mb is the real footprint of the workers"""
+    workers = {pid: memory_usage(pid) for pid in pids}
+    pss = [w["pss_mb"] for w in workers.values() if w["pss_mb"] is not None]
+    uss = [w["uss_mb"] for w in workers.values() if w["uss_mb"] is not None]
+    rss = [w["rss_mb"] for w in workers.values() if w["rss_mb"] is not None]
+    return {
+        "workers": workers,
+        "total_rss_mb": round(sum(rss), 1),
+        "total_pss_mb": round(sum(pss), 1),
+        "mean_uss_mb": round(sum(uss) / len(uss), 1) if uss else None,
+    }
@@ -0,0 +1,175 @@
+"""
+On-demand profiling of individual requests.
+
+A profiled request runs its pipeline call (``process_farm_assessment`` for
+``/process-assessment``, ``query_farm_knowledge`` for ``/query``) under
+cProfile in the worker thread that executes it, so the profile shows where
+Python time goes in retrieval, prompt building, the LLM client and
+``parse_ai_response`` for that request only. The stats are written to
+``PROFILING_DIR`` as ``<profile_id>.prof`` (pstats format, readable with
+``python -m pstats`` or snakeviz). The response carries the id in an
+``X-Profile-Id`` header, and the file is downloaded from
+``GET /profiles/{profile_id}``. ``aggregate_profiles.py`` merges many
+profiles into one table and into collapsed stacks for flame graphs.
+
+A request is profiled when profiling is enabled and either it sends
+``X-Profile: <PROFILING_TOKEN>`` or it is sampled (``PROFILING_SAMPLE_RATE``).
+Overhead is bounded: one request is profiled at a time, and profiled requests
+may take at most ``PROFILING_MAX_OVERHEAD`` of the wall time of each budget
+window. Requests beyond that run unprofiled and are logged as
+``profile_skipped``. Only the newest ``PROFILING_MAX_FILES`` profiles are kept.
+
+Environment variables:
+    PROFILING_ENABLED                 Allow request profiling (default false)
+    PROFILING_TOKEN                   Value of the X-Profile header that requests a profile,
+                                      also required to download one (unset: header ignored)
+    PROFILING_SAMPLE_RATE             Fraction of requests profiled without the header (default 0.0)
+    PROFILING_MAX_OVERHEAD            Fraction of each window profiled requests may take (default 0.05)
+    PROFILING_BUDGET_WINDOW_SECONDS   Length of the budget window (default 60)
+    PROFILING_DIR                     Where profiles are stored (default logs/profiles)
+    PROFILING_MAX_FILES               Profiles kept before the oldest are deleted (default 200)
+"""
+
+import cProfile
+import hmac
+import logging
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional, Tuple
+
+from .logging_config import log_event
+
+logger = logging.getLogger(__name__)
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN") or None
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0.0"))
+PROFILING_MAX_OVERHEAD = float(os.getenv("PROFILING_MAX_OVERHEAD", "0.05"))
+PROFILING_BUDGET_WINDOW_SECONDS = float(os.getenv("PROFILING_BUDGET_WINDOW_SECONDS", "60"))
+PROFILING_DIR = os.getenv(
+    "PROFILING_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "logs", "profiles")
+)
+PROFILING_MAX_FILES = int(os.getenv("PROFILING_MAX_FILES", "200"))
+
+PROFILE_SUFFIX = ".prof"
+_PROFILE_ID = re.compile(r"^[0-9A-Za-z_-]{1,80}$")
+
+
+class RequestProfiler:
+    """Decides which requests are profiled, runs them under cProfile and stores the result"""
+
+    def __init__(self, enabled: bool = PROFILING_ENABLED, token: Optional[str] = PROFILING_TOKEN,
+                 sample_rate: float = PROFILING_SAMPLE_RATE, max_overhead: float = PROFILING_MAX_OVERHEAD,
+                 window_seconds: float = PROFILING_BUDGET_WINDOW_SECONDS, directory: str = PROFILING_DIR,
+                 max_files: int = PROFILING_MAX_FILES):
+        self.enabled = enabled
+        self.token = token
+        self.sample_rate = sample_rate
+        self.max_overhead = max_overhead
+        self.window_seconds = window_seconds
+        self.directory = directory
+        self.max_files = max_files
+        # cProfile hooks the running thread (and in Python 3.12+ allows one profiler per process)
+        self._running = threading.Lock()
+        self._budget_lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._spent = 0.0
+
+    def authorized(self, header: Optional[str]) -> bool:
+        """Whether an X-Profile header carries the admin token"""
+        return (self.enabled and self.token is not None and header is not None
+                and hmac.compare_digest(header.encode(), self.token.encode()))
+
+    def wants_profile(self, header: Optional[str] = None) -> Optional[str]:
+        """Why this request should be profiled ("requested" or "sampled"), or None"""
+        if not self.enabled:
+            return None
+        if self.authorized(header):
+            return "requested"
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    def _within_budget(self) -> bool:
+        with self._budget_lock:
+            now = time.monotonic()
+            if now - self._window_start >= self.window_seconds:
+                self._window_start, self._spent = now, 0.0
+            return self._spent < self.max_overhead * self.window_seconds
+
+    def _charge(self, seconds: float):
+        with self._budget_lock:
+            self._spent += seconds
+
+    def run(self, reason: Optional[str], label: str, fn: Callable[..., Any],
+            *args: Any, **kwargs: Any) -> Tuple[Any, Optional[str]]:
+        """
+        Call fn, under cProfile if reason is set and the budget allows, and
+        return its result with the id of the saved profile (or None).
+        """
+        if reason is None:
+            return fn(*args, **kwargs), None
+        if not self._within_budget():
+            log_event(logger, "profile_skipped", label=label, reason="budget")
+            return fn(*args, **kwargs), None
+        if not self._running.acquire(blocking=False):
+            log_event(logger, "profile_skipped", label=label, reason="busy")
+            return fn(*args, **kwargs), None
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            profiler.enable()
+            try:
+                result = fn(*args, **kwargs)
+            finally:
+                profiler.disable()
+        finally:
+            self._running.release()
+            elapsed = time.perf_counter() - start
+            self._charge(elapsed)
+            # Failed requests are saved too; a slow error is as interesting as a slow answer
+            profile_id = self._save(profiler, label, reason, elapsed)
+        return result, profile_id
+
+    def _save(self, profiler: cProfile.Profile, label: str, reason: str, seconds: float) -> Optional[str]:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        profile_id = f"{stamp}-{label}-{uuid.uuid4().hex[:8]}"
+        path = os.path.join(self.directory, profile_id + PROFILE_SUFFIX)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            profiler.dump_stats(tmp_path)
+            os.replace(tmp_path, path)
+            self._prune()
+        except OSError as e:
+            log_event(logger, "profile_save_failed", level=logging.WARNING, label=label, error=str(e))
+            return None
+        log_event(logger, "profile_saved", profile_id=profile_id, label=label, reason=reason,
+                  duration_ms=round(seconds * 1000, 1))
+        return profile_id
+
+    def _prune(self):
+        """Delete the oldest profiles beyond max_files (ids sort by time)"""
+        profiles = sorted(name for name in os.listdir(self.directory) if name.endswith(PROFILE_SUFFIX))
+        for name in profiles[:max(0, len(profiles) - self.max_files)]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    def path_for(self, profile_id: str) -> Optional[str]:
+        """Path of a stored profile, or None for an unknown or malformed id"""
+        if not _PROFILE_ID.match(profile_id):
+            return None
+        path = os.path.join(self.directory, profile_id + PROFILE_SUFFIX)
+        return path if os.path.isfile(path) else None
+
+
+PROFILER = RequestProfiler()
@@ -1,58 +1,321 @@
-from typing import List, Dict, Any
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Generator, Iterator, Optional, Tuple
+import logging
 import os
 import re
+import threading
+import time
 
-try:
-    from langchain_chroma import Chroma
-except ImportError:
-    from langchain_community.vectorstores import Chroma
-
-from .document_loader import process_pdfs
-from .embedding import get_embeddings_model
+# Heavy dependencies (Chroma, the PDF loader, the embedding model and the Groq
+# client) are imported inside the functions that use them, so importing this
+# module for serving stays fast. See benchmarks/import_time.py.
+from .embedding import embed_queries_with, embed_query_with, get_embeddings_model, embedding_model_id
+from .index_artifact import check_embedding_model, load_artifact, read_manifest
+from .index_generations import resolve_index_dir
+from .logging_config import log_event
 from .schemas import AssessmentData, AIRecommendation, CategoryAssessment, FarmStatusAssessment
-from .ai_models import get_llm, create_assessment_prompt
+from .ai_models import get_llm, create_assessment_prompt, llm_model_id
+from .metrics import track_stage, record_cache_lookup, record_llm_usage, record_parse_fallback
+from .guardrail import check_question, OFF_TOPIC_MESSAGE
+from .session_store import SESSIONS, Session, can_reuse_chunks, estimate_tokens
+from .segment_cache import SEGMENT_K, load_segment_table, search_depth, segment_key, segment_queries
+from .faq_store import FAQ_STORE
+from .cache import ANSWER_CACHE, ASSESSMENT_CACHE
+from .kb_collections import COLLECTIONS
+from .singleflight import normalize_question
+from .tracing import set_span_attributes, tracing_enabled
 
 # Vector DB path
-VECTOR_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "vectordb")
-os.makedirs(VECTOR_DB_PATH, exist_ok=True)
+VECTOR_DB_PATH = os.getenv(
+    "VECTOR_DB_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "vectordb")
+)
+
+logger = logging.getLogger(__name__)
+
+# Prebuilt index (see build_index.py): a root of blue-green generations or a
+# single artifact directory; preferred over the Chroma DB when present
+INDEX_ARTIFACT_PATH = os.getenv(
+    "INDEX_ARTIFACT_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "index")
+)
+INDEX_VERIFY_CHECKSUMS = os.getenv("INDEX_VERIFY_CHECKSUMS", "true").lower() == "true"
+
+# How often a server checks whether a new index generation was promoted (0 disables)
+INDEX_RELOAD_SECONDS = float(os.getenv("INDEX_RELOAD_SECONDS", "10"))
+
+# Set to false in deployments so a replica never embeds PDFs while serving traffic
+INDEX_BUILD_ON_DEMAND = os.getenv("INDEX_BUILD_ON_DEMAND", "true").lower() == "true"
+
+def load_chroma_class():
+    """Import the Chroma vector store class on first use"""
+    try:
+        from langchain_chroma import Chroma
+    except ImportError:
+        from langchain_community.vectorstores import Chroma
+    return Chroma
+
+def load_index_artifact(index_dir: str):
+    """Load a prebuilt index artifact read-only"""
+    # Refuse a mismatched artifact before spending time loading the model
+    check_embedding_model(read_manifest(index_dir), embedding_model_id())
+    with track_stage("model_load"):
+        embeddings = get_embeddings_model()
+    with track_stage("vectordb_open"):
+        return load_artifact(index_dir, embeddings, verify=INDEX_VERIFY_CHECKSUMS)
 
 def initialize_or_load_vectordb():
     """Initialize or load the vector database"""
-    embeddings = get_embeddings_model()
+    # Load the prebuilt artifact read-only if one has been deployed
+    index_dir = resolve_index_dir(INDEX_ARTIFACT_PATH)
+    if index_dir is not None:
+        return load_index_artifact(index_dir)
+    
+    Chroma = load_chroma_class()
+    
+    with track_stage("model_load"):
+        embeddings = get_embeddings_model()
     
     # Check if vector DB exists
     if os.path.exists(VECTOR_DB_PATH) and os.listdir(VECTOR_DB_PATH):
         # Load existing DB
-        vector_db = Chroma(persist_directory=VECTOR_DB_PATH, embedding_function=embeddings)
+        with track_stage("vectordb_open"):
+            vector_db = Chroma(persist_directory=VECTOR_DB_PATH, embedding_function=embeddings)
     else:
-        # Create new DB
+        if not INDEX_BUILD_ON_DEMAND:
+            raise ValueError(
+                f"No index artifact at {INDEX_ARTIFACT_PATH} and INDEX_BUILD_ON_DEMAND is disabled; "
+                "run build_index.py"
+            )
+        
+        # Create new DB (ingestion-only dependencies are imported here)
+        from .document_loader import process_pdfs
+        
         chunks = process_pdfs()
         if not chunks:
             raise ValueError("No documents found to process")
             
-        vector_db = Chroma.from_documents(
-            documents=chunks,
-            embedding=embeddings,
-            persist_directory=VECTOR_DB_PATH
-        )
+        with track_stage("index_build"):
+            vector_db = Chroma.from_documents(
+                documents=chunks,
+                embedding=embeddings,
+                persist_directory=VECTOR_DB_PATH
+            )
         
     return vector_db
 
-def get_relevant_context(assessment_data: AssessmentData) -> str:
-    """Retrieve relevant context for the assessment"""
-    vector_db = initialize_or_load_vectordb()
+# Vector DB opened once per process and shared by all requests
+_vector_db = None
+_vector_db_lock = threading.Lock()
+
+# Precomputed assessment retrieval for the artifact index (see segment_cache.py)
+_segment_table = None
+
+# Artifact directory _vector_db was loaded from, and the state of hot reloads
+_index_dir = None
+_reload_state = {"next_check": 0.0, "loading": False, "failed": None}
+
+def get_vector_db():
+    """Get the shared vector database, opening it on first use"""
+    global _vector_db, _segment_table, _index_dir
+    if _vector_db is None:
+        with _vector_db_lock:
+            if _vector_db is None:
+                index_dir = resolve_index_dir(INDEX_ARTIFACT_PATH)
+                vector_db = load_index_artifact(index_dir) if index_dir else initialize_or_load_vectordb()
+                version = getattr(vector_db, "version", None)
+                _segment_table = load_segment_table(index_dir, version) if index_dir and version else None
+                _index_dir = index_dir
+                _vector_db = vector_db
+    elif _index_dir is not None and INDEX_RELOAD_SECONDS > 0:
+        check_for_new_index()
+    return _vector_db
+
+def loaded_vector_db():
+    """The shared vector database if it is already open, else None. Lookups made
+    before admission use this so a request never opens the index outside a slot."""
+    if _vector_db is not None and _index_dir is not None and INDEX_RELOAD_SECONDS > 0:
+        check_for_new_index()
+    return _vector_db
+
+def open_collection(collection: Optional[str] = None):
+    """Vector DB and segment table of a knowledge-base collection (None: the shared index).
+    Named collections are opened on first use (see kb_collections.py)."""
+    if collection is None:
+        vector_db = get_vector_db()
+        return vector_db, _segment_table
+    resident = COLLECTIONS.get(collection)
+    return resident.index, resident.segment_table
+
+def loaded_collection_db(collection: Optional[str] = None):
+    """Like loaded_vector_db, for any collection: its vector DB if resident, else None"""
+    if collection is None:
+        return loaded_vector_db()
+    resident = COLLECTIONS.loaded(collection)
+    return resident.index if resident is not None else None
+
+def check_for_new_index():
+    """Start loading a newly promoted index generation in the background.
+    Requests keep using the index they started with; new requests get the
+    new one once it has loaded."""
+    now = time.monotonic()
+    if now < _reload_state["next_check"] or _reload_state["loading"]:
+        return
+    with _vector_db_lock:
+        if now < _reload_state["next_check"] or _reload_state["loading"]:
+            return
+        _reload_state["next_check"] = now + INDEX_RELOAD_SECONDS
+        index_dir = resolve_index_dir(INDEX_ARTIFACT_PATH)
+        if index_dir is None or index_dir in (_index_dir, _reload_state["failed"]):
+            return
+        _reload_state["loading"] = True
+    threading.Thread(target=swap_index, args=(index_dir,), name="index-reload", daemon=True).start()
+
+def swap_index(index_dir: str):
+    """Load an index generation and make it the shared index"""
+    global _vector_db, _segment_table, _index_dir
+    previous_version = getattr(_vector_db, "version", None)
+    try:
+        vector_db = load_index_artifact(index_dir)
+        segment_table = load_segment_table(index_dir, vector_db.version)
+        with _vector_db_lock:
+            _segment_table = segment_table
+            _vector_db = vector_db
+            _index_dir = index_dir
+    except Exception as e:
+        _reload_state["failed"] = index_dir
+        log_event(logger, "index_reload_failed", level=logging.ERROR, index_dir=index_dir,
+                  error_type=type(e).__name__, error=str(e))
+        return
+    finally:
+        _reload_state["loading"] = False
+    
+    log_event(logger, "index_swapped", index_dir=index_dir,
+              previous_version=previous_version, index_version=vector_db.version)
+
+def search_documents(vector_db, query: str, k: int, query_vector: Optional[List[float]] = None):
+    """Embed the query (unless already embedded) and run a similarity search"""
+    if query_vector is None:
+        with track_stage("query_embedding"):
+            query_vector = embed_query_with(vector_db.embeddings, query)
+    
+    with track_stage("similarity_search"):
+        docs = vector_db.similarity_search_by_vector(query_vector, k=k)
+        if tracing_enabled():
+            set_span_attributes({
+                "search.k": k,
+                "search.results": len(docs),
+                "search.sources": [f"{doc.metadata.get('source')}#{doc.metadata.get('page')}" for doc in docs],
+            })
+    return docs
+
+def multi_query_search(vector_db, queries: List[Tuple[str, int]], k: int):
+    """
+    Search several (query, quota) pairs at once and merge their rankings into
+    at most k distinct chunks (see vector_index.merge_ranked). The queries are
+    embedded in one batched model call and, on the index artifact, scored in
+    one matrix product.
+    """
+    from .vector_index import merge_ranked
+    
+    texts = [query for query, _ in queries]
+    quotas = [quota for _, quota in queries]
+    depth = search_depth(queries, k)
+    with track_stage("query_embedding"):
+        vectors = embed_queries_with(vector_db.embeddings, texts)
+    
+    with track_stage("similarity_search"):
+        if hasattr(vector_db, "search_positions_batch"):
+            positions, _ = vector_db.search_positions_batch(vectors, depth)
+            docs = [vector_db.document(i) for i in merge_ranked(positions.tolist(), quotas, k)]
+        else:
+            # Chroma: one search per query, merged by chunk content
+            found = {}
+            rankings = []
+            for vector in vectors:
+                ranking = []
+                for doc in vector_db.similarity_search_by_vector(vector, k=depth):
+                    key = (doc.metadata.get("source"), doc.metadata.get("page"), doc.page_content)
+                    found.setdefault(key, doc)
+                    ranking.append(key)
+                rankings.append(ranking)
+            docs = [found[key] for key in merge_ranked(rankings, quotas, k)]
+        if tracing_enabled():
+            set_span_attributes({
+                "search.queries": len(queries),
+                "search.k": k,
+                "search.results": len(docs),
+                "search.sources": [f"{doc.metadata.get('source')}#{doc.metadata.get('page')}" for doc in docs],
+            })
+    return docs
+
+def annotate_prompt(prompt: str):
+    """Prompt size on the current (prompt_build) span"""
+    set_span_attributes({"prompt.chars": len(prompt), "prompt.tokens_estimated": estimate_tokens(prompt)})
+
+def invoke_llm(prompt: str) -> str:
+    """Call the LLM with a prompt and return the response text"""
+    llm = get_llm()
+    
+    with track_stage("llm_call"):
+        set_span_attributes({"llm.model": llm_model_id(), "llm.streamed": False})
+        response = llm.invoke(prompt)
+        record_llm_usage(response)
+    
+    # Extract content from AIMessage object (ChatGroq returns AIMessage)
+    return response.content if hasattr(response, 'content') else str(response)
+
+def stream_llm(prompt: str) -> Iterator[str]:
+    """Stream the LLM response text, recording time to first token and token usage"""
+    llm = get_llm()
     
-    # Create search query from assessment data
-    query_parts = [
+    with track_stage("llm_call"):
+        set_span_attributes({"llm.model": llm_model_id(), "llm.streamed": True})
+        start = time.perf_counter()
+        first_token = track_stage("llm_first_token")
+        first_token.__enter__()
+        waiting = True
+        for chunk in llm.stream(prompt):
+            if getattr(chunk, "usage_metadata", None):
+                record_llm_usage(chunk)
+            if not chunk.content:
+                continue
+            if waiting:
+                first_token.__exit__(None, None, None)
+                set_span_attributes({"llm.time_to_first_token_ms": round((time.perf_counter() - start) * 1000, 1)})
+                waiting = False
+            yield chunk.content
+        if waiting:
+            first_token.__exit__(None, None, None)
+
+def assessment_collection(assessment_data: AssessmentData) -> Optional[str]:
+    """Collection an assessment is routed to by its answers (location, species, ...), None for the default"""
+    return COLLECTIONS.route(assessment_data.model_dump())
+
+def get_relevant_context(assessment_data: AssessmentData, collection: Optional[str] = None) -> str:
+    """Retrieve relevant context for the assessment"""
+    vector_db, segment_table = open_collection(collection)
+    COLLECTIONS.record_retrieval(collection)
+    profile = (
         assessment_data.primarySpecies,
         assessment_data.farmType,
         assessment_data.isNewFarmer,
-        *assessment_data.topConcerns
-    ]
-    query = " ".join(filter(None, query_parts))
+        assessment_data.topConcerns,
+    )
+    
+    # Profiles made of the form's options were searched at index time
+    ids = None
+    if segment_table is not None:
+        ids = segment_table.lookup(segment_key(*profile), getattr(vector_db, "version", None), SEGMENT_K)
+        record_cache_lookup("segment_context", ids is not None)
     
-    # Retrieve relevant documents
-    docs = vector_db.similarity_search(query, k=5)
+    if ids is not None:
+        with track_stage("segment_lookup"):
+            docs = vector_db.get_by_ids(ids)
+            set_span_attributes({"segment.chunks": len(docs)})
+    else:
+        # Search the profile, each concern and each assessed category together
+        docs = multi_query_search(vector_db, segment_queries(*profile), k=SEGMENT_K)
     
     # Format context from documents
     context_parts = []
@@ -63,57 +326,111 @@ def get_relevant_context(assessment_data: AssessmentData) -> str:
     
     return "\n\n".join(context_parts)
 
+def assessment_cache_key(assessment_data: AssessmentData, vector_db) -> Optional[str]:
+    """Cache key of an assessment under the index version, or None without a versioned index"""
+    version = getattr(vector_db, "version", None)
+    if version is None:
+        return None
+    return ASSESSMENT_CACHE.key(version, llm_model_id(), assessment_data.model_dump())
+
+def lookup_cached_assessment(assessment_data: AssessmentData) -> Optional[FarmStatusAssessment]:
+    """Assessment computed earlier for the same answers (see cache.py), or None"""
+    key = assessment_cache_key(assessment_data, loaded_collection_db(assessment_collection(assessment_data)))
+    if key is None:
+        return None
+    with track_stage("cache_lookup"):
+        return ASSESSMENT_CACHE.get(key)
+
 def process_farm_assessment(assessment_data: AssessmentData) -> FarmStatusAssessment:
-    """Process farm assessment using RAG pipeline"""
+    """
+    Process farm assessment using RAG pipeline, reusing an assessment of the same answers.
+    Context comes from the collection the assessment is routed to.
+    """
+    collection = assessment_collection(assessment_data)
+    vector_db, _ = open_collection(collection)
+    key = assessment_cache_key(assessment_data, vector_db)
+    if key is None:
+        return generate_assessment(assessment_data, collection)
+    return ASSESSMENT_CACHE.get_or_compute(key, lambda: generate_assessment(assessment_data, collection))
+
+def generate_assessment(assessment_data: AssessmentData, collection: Optional[str] = None) -> FarmStatusAssessment:
+    """Run retrieval and the LLM for an assessment"""
     # Get relevant context from vector DB
-    context = get_relevant_context(assessment_data)
+    context = get_relevant_context(assessment_data, collection)
     
     # Create prompt with assessment data and context
-    prompt = create_assessment_prompt(assessment_data, context)
+    with track_stage("prompt_build"):
+        prompt = create_assessment_prompt(assessment_data, context)
+        annotate_prompt(prompt)
     
-    # Get LLM from Groq
-    llm = get_llm()
-    
-    # Generate completion with prompt
-    response = llm.invoke(prompt)
-    
-    # Extract content from AIMessage object (ChatGroq returns AIMessage)
-    response_text = response.content if hasattr(response, 'content') else str(response)
+    # Generate completion with prompt using the Groq LLM
+    response_text = invoke_llm(prompt)
     
     # Parse response into structured assessment with scores
-    assessment = parse_ai_response(response_text)
+    with track_stage("parse_response"):
+        assessment = parse_ai_response(response_text)
+        set_span_attributes({
+            "parse.categories": len(assessment.categories),
+            "parse.recommendations": len(assessment.recommendations),
+        })
     
     return assessment
 
-def query_farm_knowledge(question: str) -> str:
+@dataclass
+class PreparedQuery:
+    """Retrieval results and prompt for a chat question, computed before the LLM call"""
+    prompt: Optional[str]  # None when the guardrail rejected the question
+    docs: List[Any] = field(default_factory=list)
+    query_vector: Optional[List[float]] = None
+    reused_chunks: bool = False
+    collection: Optional[str] = None
+    
+    @property
+    def on_topic(self) -> bool:
+        return self.prompt is not None
+
+def prepare_query(question: str, session: Optional[Session] = None,
+                  collection: Optional[str] = None) -> PreparedQuery:
     """
-    Query the RAG system for farm-related knowledge.
-    Returns an AI-generated answer based on the vector database context.
+    Run the guardrail, retrieve context from the collection (or reuse the
+    session's chunks) and build the QA prompt. Earlier turns of the session
+    are included in the prompt.
     """
-    # Check if question is farm-related
-    farm_keywords = [
-        'shrimp', 'prawn', 'aquaculture', 'pond', 'water', 'feed', 'disease', 
-        'biosecurity', 'gaqp', 'farm', 'harvest', 'culture', 'post-larvae', 'pl',
-        'stocking', 'mortality', 'growth', 'vannamei', 'monodon', 'oxygen',
-        'ph', 'salinity', 'temperature', 'ammonia', 'nitrite', 'treatment',
-        'hatchery', 'nursery', 'grow-out', 'fry', 'nauplii'
-    ]
-    
-    question_lower = question.lower()
-    is_farm_related = any(keyword in question_lower for keyword in farm_keywords)
-    
-    if not is_farm_related:
-        return ("I'm LikAI Coach, specialized in aquaculture and shrimp farming practices. "
-                "I can only answer questions related to shrimp farming, pond management, "
-                "biosecurity, water quality, feeding, disease prevention, and GAqP best practices. "
-                "Please ask me something about your shrimp farm! 🦐")
-    
-    # Initialize vector DB
-    vector_db = initialize_or_load_vectordb()
-    
-    # Retrieve relevant context
-    docs = vector_db.similarity_search(question, k=4)
+    # Check if question is farm-related (off-topic questions never reach search or Groq)
+    verdict = check_question(question)
+    if not verdict.on_topic and verdict.reason != "off_topic_phrase" and session and session.last_question:
+        # Short follow-ups ("what about at night?") are judged together with the previous question
+        verdict = check_question(f"{session.last_question} {question}")
+        verdict.query_vector = None
+    if not verdict.on_topic:
+        return PreparedQuery(prompt=None)
+    
+    # Embed once; the vector is used for search and kept so follow-ups can be compared with it
+    query_vector = verdict.query_vector
+    if query_vector is None:
+        with track_stage("query_embedding"):
+            query_vector = embed_query_with(get_embeddings_model(), question)
     
+    reuse = can_reuse_chunks(session, query_vector) and session.retrieval_collection == collection
+    if session is not None:
+        record_cache_lookup("session_chunks", reuse)
+    
+    if reuse:
+        docs = session.retrieved_docs
+    else:
+        # Get the collection's vector DB and retrieve relevant context
+        docs = search_documents(open_collection(collection)[0], question, k=4, query_vector=query_vector)
+        COLLECTIONS.record_retrieval(collection)
+    
+    with track_stage("prompt_build"):
+        prompt = create_qa_prompt(question, docs, session)
+        annotate_prompt(prompt)
+    
+    return PreparedQuery(prompt=prompt, docs=docs, query_vector=query_vector, reused_chunks=reuse,
+                         collection=collection)
+
+def create_qa_prompt(question: str, docs: List[Any], session: Optional[Session] = None) -> str:
+    """The QA prompt: retrieved context, earlier turns of the session and the question"""
     # Format context
     context_parts = []
     for doc in docs:
@@ -122,13 +439,17 @@ def query_farm_knowledge(question: str) -> str:
     
     context = "\n\n".join(context_parts)
     
+    history = ""
+    if session is not None and (session.turns or session.summary):
+        history = f"\nCONVERSATION SO FAR:\n{session.history_text()}\n"
+    
     # Create prompt for question answering
-    prompt = f"""You are LikAI Coach, an expert in shrimp aquaculture and GAqP (Good Aquaculture Practices) certification. 
+    return f"""You are LikAI Coach, an expert in shrimp aquaculture and GAqP (Good Aquaculture Practices) certification. 
 Answer the farmer's question using the provided context from official GAqP manuals.
 
 CONTEXT FROM GAqP MANUALS:
 {context}
-
+{history}
 FARMER'S QUESTION:
 {question}
 
@@ -142,15 +463,93 @@ INSTRUCTIONS:
 - If the context doesn't fully answer the question, provide general best practices
 
 ANSWER:"""
+
+def answer_question(question: str, session: Optional[Session] = None,
+                    collection: Optional[str] = None) -> Tuple[str, PreparedQuery]:
+    """Answer a chat question without touching session state"""
+    prepared = prepare_query(question, session, collection)
+    if not prepared.on_topic:
+        return OFF_TOPIC_MESSAGE, prepared
     
     # Get LLM response
-    llm = get_llm()
-    response = llm.invoke(prompt)
-    
-    # Extract content
-    answer = response.content if hasattr(response, 'content') else str(response)
+    return invoke_llm(prepared.prompt).strip(), prepared
+
+def stream_answer(question: str, session: Optional[Session] = None,
+                  collection: Optional[str] = None) -> Generator[str, None, PreparedQuery]:
+    """Like answer_question, but yields the answer as the LLM generates it"""
+    prepared = prepare_query(question, session, collection)
+    if not prepared.on_topic:
+        yield OFF_TOPIC_MESSAGE
+        return prepared
     
-    return answer.strip()
+    pieces = []
+    for piece in stream_llm(prepared.prompt):
+        pieces.append(piece)
+        yield piece
+    if session is None:
+        cache_answer(question, "".join(pieces).strip(), collection)
+    return prepared
+
+def record_query_turn(session_id: Optional[str], question: str, answer: str, prepared: PreparedQuery):
+    """Store an answered turn, and the chunks it was answered from, in the session"""
+    if not session_id or not prepared.on_topic:
+        return
+    if prepared.reused_chunks:
+        SESSIONS.record_turn(session_id, question, answer)
+    else:
+        SESSIONS.record_turn(
+            session_id, question, answer,
+            retrieved_docs=prepared.docs, retrieval_vector=prepared.query_vector,
+            retrieval_collection=prepared.collection,
+        )
+
+def answer_cache_key(question: str, vector_db) -> Optional[str]:
+    """Cache key of a question asked outside a session, or None without a versioned index"""
+    version = getattr(vector_db, "version", None)
+    if version is None:
+        return None
+    return ANSWER_CACHE.key(version, llm_model_id(), normalize_question(question))
+
+def lookup_cached_answer(question: str, collection: Optional[str] = None) -> Optional[str]:
+    """Answer given earlier, on this or another replica, to a question asked outside a session, or None"""
+    key = answer_cache_key(question, loaded_collection_db(collection))
+    if key is None:
+        return None
+    with track_stage("cache_lookup"):
+        return ANSWER_CACHE.get(key)
+
+def cache_answer(question: str, answer: str, collection: Optional[str] = None):
+    """Store the answer to a question asked outside a session"""
+    key = answer_cache_key(question, loaded_collection_db(collection))
+    if key is not None:
+        ANSWER_CACHE.set(key, answer)
+
+def lookup_faq_answer(question: str) -> Optional[str]:
+    """Precomputed answer to a frequently asked question (see faq_store.py), or None"""
+    with track_stage("faq_lookup"):
+        entry = FAQ_STORE.lookup(question, loaded_vector_db())
+    return entry.answer if entry is not None else None
+
+def query_farm_knowledge(question: str, session_id: Optional[str] = None, collection: Optional[str] = None) -> str:
+    """
+    Query the RAG system for farm-related knowledge.
+    Returns an AI-generated answer based on the context retrieved from the
+    collection (None: the shared index).
+    With a session_id, earlier turns are included in the prompt and the
+    previous turn's chunks are reused when the follow-up is still about them.
+    Without a session the answer is cached and reused (see cache.py).
+    """
+    if not session_id:
+        # Off-topic questions must not open the index, so only an open one is used for the key
+        key = answer_cache_key(question, loaded_collection_db(collection))
+        if key is not None:
+            # Guardrail rejections are cheap to repeat and not worth a cache entry
+            return ANSWER_CACHE.get_or_compute(key, lambda: answer_question(question, collection=collection)[0],
+                                               cacheable=lambda answer: answer != OFF_TOPIC_MESSAGE)
+    session = SESSIONS.get(session_id) if session_id else None
+    answer, prepared = answer_question(question, session, collection)
+    record_query_turn(session_id, question, answer, prepared)
+    return answer
 
 def parse_ai_response(response: str) -> FarmStatusAssessment:
     """Parse the AI response into structured assessment with scores"""
@@ -248,13 +647,16 @@ def parse_ai_response(response: str) -> FarmStatusAssessment:
                     ))
                 except Exception as e:
                     print(f"Error parsing recommendation: {e}")
+                    record_parse_fallback("recommendation")
                     continue
     
     except Exception as e:
         print(f"Error parsing AI response: {e}")
+        record_parse_fallback("response")
     
     # If no categories were parsed, create defaults
     if not categories:
+        record_parse_fallback("categories")
         default_categories = ['biosecurity', 'water_management', 'pond_preparation', 'stock_quality', 'health_monitoring']
         for cat in default_categories:
             categories[cat] = CategoryAssessment(
@@ -266,6 +668,7 @@ def parse_ai_response(response: str) -> FarmStatusAssessment:
     
     # If no recommendations were parsed, create a fallback
     if not recommendations:
+        record_parse_fallback("recommendations")
         recommendations = [AIRecommendation(
             title="Implement Basic Biosecurity Measures",
             description="Set up fundamental biosecurity practices appropriate for your farm type.",
@@ -0,0 +1,193 @@
+"""
+Precomputed assessment retrieval per farm-profile segment.
+
+Assessment context is retrieved with several queries built only from
+``primarySpecies``, ``farmType``, ``isNewFarmer`` and ``topConcerns``
+(``segment_queries``): the whole profile, each concern and each category the
+assessment scores. Their rankings are merged with a quota per query, so
+every concern and category gets context of its own. The frontend form offers
+a short fixed list for each field. ``build_index.py`` enumerates every
+combination (up to ``MAX_CONCERNS`` concerns), runs the search once per
+combination and stores the merged chunk IDs next to the index artifact:
+
+    segments.json   {"format_version", "index_version", "k", "segments": {key: [chunk_id, ...]}}
+
+At request time a profile from the form is a dictionary lookup. Profiles
+outside the table (free-text values, more concerns, an older table) fall
+back to a live search. The table records the ``index_version`` it was built
+against and is ignored for any other index, so re-indexing can never serve
+chunk IDs from a previous build.
+"""
+
+import json
+import logging
+import os
+from itertools import combinations
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .logging_config import log_event
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 2
+SEGMENTS_FILE = "segments.json"
+SEGMENT_K = 5
+MAX_CONCERNS = 3
+
+# Chunks each query of a profile may contribute to the merged context
+PROFILE_QUOTA = 3
+CONCERN_QUOTA = 1
+CATEGORY_QUOTA = 1
+
+# Option lists of the frontend assessment form
+# (frontend/src/features/assessment/farm-assessment-form.tsx)
+SPECIES = ["vannamei", "monodon", "indicus", "other"]
+FARM_TYPES = ["extensive", "semi-intensive", "intensive", "super-intensive"]
+FARMER_STATUS = ["New Setup", "Existing Pond"]
+CONCERNS = [
+    "Disease outbreaks",
+    "High feed costs",
+    "Limited capital",
+    "Lack of technical knowledge",
+    "Market access",
+    "Water quality issues",
+    "Seed stock quality",
+    "Environmental compliance",
+    "Weather/climate risks",
+    "Equipment failures",
+]
+
+# Categories the assessment prompt scores (ai_models.create_assessment_prompt)
+CATEGORIES = [
+    "biosecurity",
+    "water management",
+    "pond preparation",
+    "stock quality",
+    "health monitoring",
+]
+
+_CONCERN_ORDER = {concern: i for i, concern in enumerate(CONCERNS)}
+
+
+def segment_query(species: str, farm_type: str, farmer_status: str, concerns: Sequence[str]) -> str:
+    """The assessment search query. Known concerns are put in form order so the
+    same profile gives the same query however the concerns were ticked."""
+    ordered = sorted(concerns, key=lambda c: (_CONCERN_ORDER.get(c, len(CONCERNS)), c))
+    return " ".join(filter(None, [species, farm_type, farmer_status, *ordered]))
+
+
+def segment_queries(species: str, farm_type: str, farmer_status: str,
+                    concerns: Sequence[str], k: int = SEGMENT_K) -> List[Tuple[str, int]]:
+    """
+    (query, quota) pairs searched for a profile: the whole profile, then each
+    concern and category. Queries take turns in the merge, so only the first
+    k can contribute a chunk and the rest are not searched at all.
+    """
+    ordered = sorted(set(concerns), key=lambda c: (_CONCERN_ORDER.get(c, len(CONCERNS)), c))
+    queries = [(segment_query(species, farm_type, farmer_status, concerns), PROFILE_QUOTA)]
+    queries += [(f"{species} {concern}".strip(), CONCERN_QUOTA) for concern in ordered]
+    queries += [(f"{species} {category}".strip(), CATEGORY_QUOTA) for category in CATEGORIES]
+    return queries[:k]
+
+
+def search_depth(queries: Sequence[Tuple[str, int]], k: int) -> int:
+    """How many ranked results per query guarantee each one fills its quota after deduplication"""
+    return k + max((quota for _, quota in queries), default=0)
+
+
+def segment_key(species: str, farm_type: str, farmer_status: str, concerns: Sequence[str]) -> Optional[str]:
+    """Table key for a profile, or None if it is not one of the enumerated combinations"""
+    unique = set(concerns)
+    if (species not in SPECIES or farm_type not in FARM_TYPES or farmer_status not in FARMER_STATUS
+            or not 1 <= len(unique) <= MAX_CONCERNS or len(unique) != len(concerns)
+            or not unique.issubset(_CONCERN_ORDER)):
+        return None
+    ordered = sorted(unique, key=_CONCERN_ORDER.get)
+    return "|".join([species, farm_type, farmer_status, ";".join(ordered)])
+
+
+def enumerate_segments(max_concerns: int = MAX_CONCERNS,
+                       k: int = SEGMENT_K) -> Iterator[Tuple[str, List[Tuple[str, int]]]]:
+    """Every (key, queries) pair of the form's option lists"""
+    for species in SPECIES:
+        for farm_type in FARM_TYPES:
+            for status in FARMER_STATUS:
+                for count in range(1, max_concerns + 1):
+                    for concerns in combinations(CONCERNS, count):
+                        yield (segment_key(species, farm_type, status, concerns),
+                               segment_queries(species, farm_type, status, concerns, k))
+
+
+class SegmentTable:
+    """Ranked chunk IDs per profile segment for one index version"""
+
+    def __init__(self, index_version: str, k: int, segments: Dict[str, List[str]]):
+        self.index_version = index_version
+        self.k = k
+        self.segments = segments
+
+    def __len__(self) -> int:
+        return len(self.segments)
+
+    def lookup(self, key: Optional[str], index_version: Optional[str], k: int) -> Optional[List[str]]:
+        """Chunk IDs for the segment, or None when the caller must search live"""
+        if key is None or index_version != self.index_version or k > self.k:
+            return None
+        ids = self.segments.get(key)
+        return ids[:k] if ids is not None else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "format_version": FORMAT_VERSION,
+            "index_version": self.index_version,
+            "k": self.k,
+            "segments": self.segments,
+        }
+
+
+def build_segment_table(index: Any, embeddings: Any, k: int = SEGMENT_K, batch_size: int = 256,
+                        max_concerns: int = MAX_CONCERNS) -> SegmentTable:
+    """Search every segment's queries against a ``NumpyVectorIndex`` and keep the merged IDs"""
+    from .vector_index import merge_ranked
+
+    pairs = list(enumerate_segments(max_concerns, k))
+    segments: Dict[str, List[str]] = {}
+    for start in range(0, len(pairs), batch_size):
+        batch = pairs[start:start + batch_size]
+        # Concern and category queries repeat across segments; each distinct one is embedded and searched once
+        texts = list(dict.fromkeys(query for _, queries in batch for query, _ in queries))
+        depth = max(search_depth(queries, k) for _, queries in batch)
+        positions, _ = index.search_positions_batch(embeddings.embed_documents(texts), depth)
+        rankings = dict(zip(texts, positions.tolist()))
+        for key, queries in batch:
+            merged = merge_ranked([rankings[query] for query, _ in queries], [quota for _, quota in queries], k)
+            segments[key] = [index.ids[i] for i in merged]
+    return SegmentTable(index.version, k, segments)
+
+
+def write_segment_table(index_dir: str, table: SegmentTable) -> str:
+    """Write the table next to the index artifact, replacing any previous one atomically"""
+    path = os.path.join(index_dir, SEGMENTS_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(table.to_dict(), f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_segment_table(index_dir: str, index_version: Optional[str]) -> Optional[SegmentTable]:
+    """The table for this index version, or None if there is none (assessments then search live)"""
+    path = os.path.join(index_dir, SEGMENTS_FILE)
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        log_event(logger, "segment_table_unreadable", level=logging.WARNING, path=path, error=str(e))
+        return None
+    if data.get("format_version") != FORMAT_VERSION or data.get("index_version") != index_version:
+        log_event(logger, "segment_table_stale", level=logging.WARNING, path=path,
+                  table_version=data.get("index_version"), index_version=index_version)
+        return None
+    return SegmentTable(data["index_version"], data["k"], data["segments"])
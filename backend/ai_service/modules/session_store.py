@@ -0,0 +1,290 @@
+"""
+Bounded chat session memory for the LikAI Coach chatbot.
+
+Each ``session_id`` sent to ``/query`` keeps its recent question/answer
+turns, a rolling summary of older turns and the chunks retrieved for the
+last search. Memory is bounded at three levels:
+
+- per session: once the turns exceed ``SESSION_TOKEN_BUDGET`` the oldest turns
+  (beyond the most recent ``SESSION_KEEP_RECENT_TURNS``) are folded into the
+  summary, which is itself capped at ``SESSION_SUMMARY_TOKENS``
+- per process: sessions idle for longer than ``SESSION_TTL_SECONDS`` expire,
+  and the least recently used sessions are evicted once there are more than
+  ``SESSION_MAX_SESSIONS`` or their combined size exceeds ``SESSION_MAX_TOTAL_TOKENS``
+
+Follow-up questions reuse the stored chunks instead of searching again when
+their embedding is close enough to the query that retrieved them.
+
+Environment variables:
+    SESSION_TTL_SECONDS           Idle time before a session expires (default 1800)
+    SESSION_MAX_SESSIONS          Maximum number of live sessions (default 1000)
+    SESSION_MAX_TOTAL_TOKENS      Token cap across all sessions (default 2000000)
+    SESSION_TOKEN_BUDGET          Tokens of turns kept verbatim per session (default 1200)
+    SESSION_KEEP_RECENT_TURNS     Turns never folded into the summary (default 2)
+    SESSION_SUMMARY_TOKENS        Maximum size of the rolling summary (default 300)
+    SESSION_SUMMARIZER            ``extractive`` (default) or ``llm``
+    SESSION_REUSE_MIN_SIMILARITY  Cosine similarity needed to reuse stored chunks (default 0.75)
+"""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Optional
+
+from .metrics import SESSION_EVICTIONS, SESSION_TOKENS, SESSIONS_ACTIVE
+
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "1800"))
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "1000"))
+SESSION_MAX_TOTAL_TOKENS = int(os.getenv("SESSION_MAX_TOTAL_TOKENS", "2000000"))
+SESSION_TOKEN_BUDGET = int(os.getenv("SESSION_TOKEN_BUDGET", "1200"))
+SESSION_KEEP_RECENT_TURNS = int(os.getenv("SESSION_KEEP_RECENT_TURNS", "2"))
+SESSION_SUMMARY_TOKENS = int(os.getenv("SESSION_SUMMARY_TOKENS", "300"))
+SESSION_SUMMARIZER = os.getenv("SESSION_SUMMARIZER", "extractive").lower()
+SESSION_REUSE_MIN_SIMILARITY = float(os.getenv("SESSION_REUSE_MIN_SIMILARITY", "0.75"))
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)"""
+    return max(1, len(text) // 4) if text else 0
+
+
+def first_sentence(text: str, max_chars: int = 160) -> str:
+    """First sentence of a text, shortened to max_chars"""
+    sentence = _SENTENCE_END.split(text.strip(), maxsplit=1)[0]
+    return sentence if len(sentence) <= max_chars else sentence[:max_chars - 3].rstrip() + "..."
+
+
+def extractive_summary(turns: List["Turn"]) -> str:
+    """Summarize turns as one line per turn: the question and the start of its answer"""
+    return "\n".join(f"- Asked: {first_sentence(t.question)} Answered: {first_sentence(t.answer)}" for t in turns)
+
+
+def llm_summary(turns: List["Turn"]) -> str:
+    """Summarize turns with the chat LLM"""
+    from .rag_pipeline import invoke_llm
+
+    transcript = "\n".join(f"Farmer: {t.question}\nCoach: {t.answer}" for t in turns)
+    return invoke_llm(
+        "Summarize this conversation between a shrimp farmer and an aquaculture coach in at most "
+        f"three short bullet points, keeping any farm details the farmer mentioned:\n\n{transcript}"
+    ).strip()
+
+
+@dataclass
+class Turn:
+    question: str
+    answer: str
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.question) + estimate_tokens(self.answer)
+
+
+@dataclass
+class Session:
+    """Conversation state for one session_id"""
+    session_id: str
+    turns: List[Turn] = field(default_factory=list)
+    summary: str = ""
+    retrieved_docs: List[Any] = field(default_factory=list)
+    retrieval_vector: Optional[List[float]] = None
+    retrieval_collection: Optional[str] = None
+    last_access: float = field(default_factory=time.monotonic)
+    # Guards turns and summary: requests on the same session_id may read while another records a turn
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    @property
+    def tokens(self) -> int:
+        with self.lock:
+            docs = sum(estimate_tokens(doc.page_content) for doc in self.retrieved_docs)
+            return sum(t.tokens for t in self.turns) + estimate_tokens(self.summary) + docs
+
+    @property
+    def last_question(self) -> Optional[str]:
+        with self.lock:
+            return self.turns[-1].question if self.turns else None
+
+    def history_text(self) -> str:
+        """Summary and recent turns formatted for the QA prompt"""
+        with self.lock:
+            summary, turns = self.summary, list(self.turns)
+        parts = []
+        if summary:
+            parts.append(f"Earlier in this conversation:\n{summary}")
+        for turn in turns:
+            parts.append(f"Farmer: {turn.question}\nLikAI Coach: {turn.answer}")
+        return "\n\n".join(parts)
+
+
+class SessionStore:
+    """Thread-safe LRU of chat sessions with TTL, per-session and global token caps"""
+
+    def __init__(
+        self,
+        ttl_seconds: float = SESSION_TTL_SECONDS,
+        max_sessions: int = SESSION_MAX_SESSIONS,
+        max_total_tokens: int = SESSION_MAX_TOTAL_TOKENS,
+        token_budget: int = SESSION_TOKEN_BUDGET,
+        keep_recent_turns: int = SESSION_KEEP_RECENT_TURNS,
+        summary_tokens: int = SESSION_SUMMARY_TOKENS,
+        summarizer: Optional[Callable[[List[Turn]], str]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.max_total_tokens = max_total_tokens
+        self.token_budget = token_budget
+        self.keep_recent_turns = keep_recent_turns
+        self.summary_tokens = summary_tokens
+        if summarizer is None:
+            summarizer = llm_summary if SESSION_SUMMARIZER == "llm" else extractive_summary
+        self.summarizer = summarizer
+        self.clock = clock
+        self._lock = threading.Lock()
+        # Least recently used first; last_access only grows along the order, so expiry stops early
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._tokens: dict = {}
+        self._total_tokens = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    @property
+    def total_tokens(self) -> int:
+        return self._total_tokens
+
+    def get(self, session_id: str) -> Optional[Session]:
+        """Return a live session (marking it recently used), or None"""
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.last_access = self.clock()
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def record_turn(
+        self,
+        session_id: str,
+        question: str,
+        answer: str,
+        retrieved_docs: Optional[List[Any]] = None,
+        retrieval_vector: Optional[List[float]] = None,
+        retrieval_collection: Optional[str] = None,
+    ) -> Session:
+        """Append a turn, store the chunks it was answered from and enforce all limits"""
+        with self._lock:
+            session = self._sessions.get(session_id) or Session(session_id)
+            with session.lock:
+                session.turns.append(Turn(question, answer))
+                if retrieved_docs is not None:
+                    session.retrieved_docs = list(retrieved_docs)
+                    session.retrieval_vector = retrieval_vector
+                    session.retrieval_collection = retrieval_collection
+                folded = self._turns_to_fold(session)
+            session.last_access = self.clock()
+            self._sessions[session_id] = session
+            self._sessions.move_to_end(session_id)
+
+        if folded:
+            self._compact(session, folded)
+
+        with self._lock:
+            if self._sessions.get(session_id) is session:
+                self._set_tokens(session_id, session.tokens)
+            self._expire()
+            self._enforce_limits()
+            self._update_gauges()
+        return session
+
+    def clear(self, session_id: Optional[str] = None):
+        """Drop one session, or all sessions"""
+        with self._lock:
+            if session_id is None:
+                self._sessions.clear()
+                self._tokens.clear()
+                self._total_tokens = 0
+            else:
+                self._sessions.pop(session_id, None)
+                self._total_tokens -= self._tokens.pop(session_id, 0)
+            self._update_gauges()
+
+    def _turns_to_fold(self, session: Session) -> List[Turn]:
+        """The oldest turns to fold into the summary for the session to fit its budget (caller holds session.lock)"""
+        turn_tokens = sum(t.tokens for t in session.turns)
+        folded = []
+        for turn in session.turns[:max(0, len(session.turns) - self.keep_recent_turns)]:
+            if turn_tokens <= self.token_budget:
+                break
+            turn_tokens -= turn.tokens
+            folded.append(turn)
+        return folded
+
+    def _compact(self, session: Session, folded: List[Turn]):
+        """Fold the turns into the rolling summary"""
+        # Summarizing may call the LLM, so it runs outside the locks; readers keep seeing
+        # the turns until the summary replaces them in one step
+        addition = self.summarizer(folded)
+        with session.lock:
+            if len(session.turns) < len(folded) or any(a is not b for a, b in zip(session.turns, folded)):
+                # A concurrent turn on the same session already folded these
+                return
+            summary = f"{session.summary}\n{addition}" if session.summary else addition
+            # Keep the newest part of the summary when it outgrows its cap
+            max_chars = self.summary_tokens * 4
+            if len(summary) > max_chars:
+                summary = summary[-max_chars:].split("\n", 1)[-1]
+            del session.turns[:len(folded)]
+            session.summary = summary
+
+    def _set_tokens(self, session_id: str, tokens: int):
+        self._total_tokens += tokens - self._tokens.get(session_id, 0)
+        self._tokens[session_id] = tokens
+
+    def _expire(self):
+        now = self.clock()
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_access <= self.ttl_seconds:
+                break
+            self._evict(session_id, "ttl")
+
+    def _enforce_limits(self):
+        while len(self._sessions) > self.max_sessions:
+            self._evict(next(iter(self._sessions)), "max_sessions")
+        while len(self._sessions) > 1 and self.total_tokens > self.max_total_tokens:
+            self._evict(next(iter(self._sessions)), "memory_cap")
+
+    def _evict(self, session_id: str, reason: str):
+        self._sessions.pop(session_id, None)
+        self._total_tokens -= self._tokens.pop(session_id, 0)
+        SESSION_EVICTIONS.labels(reason=reason).inc()
+
+    def _update_gauges(self):
+        SESSIONS_ACTIVE.set(len(self._sessions))
+        SESSION_TOKENS.set(self.total_tokens)
+
+
+def cosine_similarity(a: List[float], b: List[float]) -> float:
+    import numpy as np
+
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+    denominator = float(np.linalg.norm(a) * np.linalg.norm(b)) or 1.0
+    return float(a @ b) / denominator
+
+
+def can_reuse_chunks(session: Optional[Session], query_vector: List[float],
+                     min_similarity: float = SESSION_REUSE_MIN_SIMILARITY) -> bool:
+    """Whether the session's stored chunks are still relevant to a follow-up question"""
+    if session is None or not session.retrieved_docs or session.retrieval_vector is None:
+        return False
+    return cosine_similarity(session.retrieval_vector, query_vector) >= min_similarity
+
+
+SESSIONS = SessionStore()
@@ -0,0 +1,267 @@
+"""
+Single-flight coalescing of identical in-flight chat questions.
+
+When several farmers ask the same question at the same moment (a broadcast
+tip, a class working through the same exercise), only the first request runs
+retrieval and the LLM call. Requests for the same normalized question that
+arrive while it is still in flight wait for that computation and share its
+answer instead of spending another admission slot and another LLM call.
+Nothing is kept once the computation finishes, so this is not a cache: a
+question asked after the answer was returned is computed again.
+
+Two flavours share the idea:
+
+- ``SingleFlight`` for async callers that want the finished answer (``/query``)
+- ``StreamFlight`` for streamed answers (``/query/stream``): a producer thread
+  generates the pieces once and every subscriber replays them from the start,
+  so a subscriber joining late still receives the whole answer, and the
+  leader disconnecting does not cut the stream for the others. Subscribers
+  are fed on the event loop through a queue each, so a burst of identical
+  streams occupies one thread (the producer's) rather than one per caller.
+  When every subscriber has gone, the producer is closed after its current
+  piece and the LLM stops generating.
+
+Only stateless questions are coalesced. A question asked within a chat session
+depends on that session's history and is always computed on its own.
+
+Environment variables:
+    QUERY_SINGLEFLIGHT_ENABLED    Coalesce identical in-flight questions (default true)
+"""
+
+import asyncio
+import contextvars
+import os
+import re
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Generator, List, Optional, Tuple
+
+from .metrics import record_cache_lookup
+
+QUERY_SINGLEFLIGHT_ENABLED = os.getenv("QUERY_SINGLEFLIGHT_ENABLED", "true").lower() == "true"
+
+
+def normalize_question(question: str) -> str:
+    """Key for coalescing: case, punctuation and spacing differences don't matter"""
+    text = re.sub(r"[^\w\s]", " ", question.lower())
+    return " ".join(text.split())
+
+
+class SingleFlight:
+    """Run one computation per key at a time and share its result with concurrent callers"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[str, asyncio.Task] = {}
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._calls
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Return ``(result, shared)``. The first caller for a key starts ``fn``;
+        callers arriving before it finishes await the same computation.
+        Exceptions are shared too.
+        """
+        task = self._calls.get(key)
+        shared = task is not None
+        if task is None:
+            # A task of its own, so one caller disconnecting doesn't cancel it for the others
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        record_cache_lookup(self.name, shared)
+        return await asyncio.shield(task), shared
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Mark the exception retrieved when every caller has gone away
+            task.exception()
+
+
+_END = object()
+
+
+class _Broadcast:
+    """Pieces of one streamed answer, kept until the producer finishes"""
+
+    def __init__(self):
+        self.pieces: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.result: Any = None
+        self.subscribers = 0
+        self.cancelled = False
+        self.lock = threading.Lock()
+        self.listeners: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = []
+
+    def run(self, producer: Callable[[], Generator[str, None, Any]]):
+        try:
+            stream = producer()
+            while True:
+                try:
+                    piece = next(stream)
+                except StopIteration as stop:
+                    self.result = stop.value
+                    break
+                with self.lock:
+                    self.pieces.append(piece)
+                    self._notify(piece)
+                if self.cancelled:
+                    # Nobody is listening any more; closing the generator stops the LLM stream
+                    stream.close()
+                    break
+        except BaseException as e:
+            self.error = e
+        finally:
+            with self.lock:
+                self.done = True
+                self._notify(_END)
+                self.listeners.clear()
+
+    def _notify(self, item: Any):
+        """Hand an item to every listening queue on its own loop (caller holds the lock)"""
+        for loop, queue in self.listeners:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                pass  # The listener's loop is closed; it is not reading any more
+
+    def listen(self) -> Tuple[List[str], Optional[asyncio.Queue]]:
+        """The pieces so far and a queue receiving the rest (None once the stream is done)"""
+        with self.lock:
+            pieces = list(self.pieces)
+            if self.done:
+                return pieces, None
+            queue: asyncio.Queue = asyncio.Queue()
+            self.listeners.append((asyncio.get_running_loop(), queue))
+            return pieces, queue
+
+    def unlisten(self, queue: asyncio.Queue):
+        with self.lock:
+            self.listeners = [listener for listener in self.listeners if listener[1] is not queue]
+
+
+class Subscription:
+    """
+    One caller's view of a streamed answer, iterated with ``async for`` on the
+    event loop. Call ``close`` when the caller stops listening.
+    """
+
+    def __init__(self, broadcast: _Broadcast, shared: bool, on_close: Callable[[], None]):
+        self._broadcast = broadcast
+        self.shared = shared
+        self._on_close = on_close
+        self._closed = False
+
+    def close(self):
+        """Stop listening; the last subscriber to leave cancels the producer"""
+        if not self._closed:
+            self._closed = True
+            self._on_close()
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        broadcast = self._broadcast
+        pieces, queue = broadcast.listen()
+        try:
+            for piece in pieces:
+                yield piece
+            while queue is not None:
+                item = await queue.get()
+                if item is _END:
+                    break
+                yield item
+        finally:
+            if queue is not None:
+                broadcast.unlisten(queue)
+        if broadcast.error is not None:
+            raise broadcast.error
+
+    @property
+    def result(self) -> Any:
+        """The producer's return value, available once iteration has finished"""
+        return self._broadcast.result
+
+
+class StreamFlight:
+    """Generate each streamed answer once per key and fan the pieces out to every subscriber"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._streams: Dict[str, _Broadcast] = {}
+
+    def in_flight(self, key: str) -> bool:
+        with self._lock:
+            return key in self._streams
+
+    def join(self, key: Optional[str]) -> Optional[Subscription]:
+        """Subscribe to the stream for ``key`` if one is being generated, else None"""
+        if key is None:
+            return None
+        with self._lock:
+            broadcast = self._streams.get(key)
+            if broadcast is None:
+                return None
+            subscription = self._subscription(key, broadcast, shared=True)
+        record_cache_lookup(self.name, True)
+        return subscription
+
+    def subscribe(self, key: Optional[str], producer: Callable[[], Generator[str, None, Any]],
+                  on_done: Optional[Callable[[], None]] = None) -> Subscription:
+        """
+        Subscribe to the stream for ``key``, starting ``producer`` in a background
+        thread if nobody is generating it yet. ``key=None`` never coalesces.
+        ``on_done`` runs in the producer thread when a producer started here
+        finishes, fails or is cancelled (it releases the admission slot);
+        it is not called when the subscription joins an existing stream.
+        """
+        with self._lock:
+            broadcast = self._streams.get(key) if key is not None else None
+            shared = broadcast is not None
+            if broadcast is None:
+                broadcast = _Broadcast()
+                if key is not None:
+                    self._streams[key] = broadcast
+                self._start(key, broadcast, producer, on_done)
+            subscription = self._subscription(key, broadcast, shared)
+        if key is not None:
+            record_cache_lookup(self.name, shared)
+        return subscription
+
+    def _subscription(self, key: Optional[str], broadcast: _Broadcast, shared: bool) -> Subscription:
+        """A new subscriber of the broadcast (caller holds the lock)"""
+        broadcast.subscribers += 1
+
+        def leave():
+            with self._lock:
+                broadcast.subscribers -= 1
+                if broadcast.subscribers == 0 and not broadcast.done:
+                    broadcast.cancelled = True
+                    # Later requests for the key start a fresh stream instead of joining a cancelled one
+                    self._forget(key, broadcast)
+
+        return Subscription(broadcast, shared, leave)
+
+    def _forget(self, key: Optional[str], broadcast: _Broadcast):
+        if key is not None and self._streams.get(key) is broadcast:
+            del self._streams[key]
+
+    def _start(self, key: Optional[str], broadcast: _Broadcast, producer, on_done):
+        def run():
+            try:
+                broadcast.run(producer)
+            finally:
+                with self._lock:
+                    self._forget(key, broadcast)
+                if on_done is not None:
+                    on_done()
+
+        # Stage timings of the request that started the stream are recorded in its context
+        context = contextvars.copy_context()
+        threading.Thread(target=context.run, args=(run,), name=f"{self.name}-producer", daemon=True).start()
+
+
+QUERY_FLIGHT = SingleFlight("query_singleflight")
+QUERY_STREAM_FLIGHT = StreamFlight("query_stream_singleflight")
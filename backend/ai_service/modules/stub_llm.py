@@ -0,0 +1,162 @@
+"""
+Local stand-in for the Groq chat model.
+
+Returns canned answers in the exact formats the pipeline parses, after a
+configurable time-to-first-token and token generation rate. Used by the
+benchmark and load-test harnesses (``LLM_PROVIDER=stub``) so the pipeline
+can be exercised offline without a Groq API key.
+
+Environment variables:
+    STUB_LLM_LATENCY_MS       Time to first token in milliseconds (default 300)
+    STUB_LLM_TOKENS_PER_SEC   Output token rate (default 800)
+"""
+
+import os
+import time
+from typing import Any, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import Field
+
+ASSESSMENT_MARKER = "===PRIORITY RECOMMENDATIONS==="
+
+STUB_ASSESSMENT_HEADER = """===OVERALL ASSESSMENT===
+Overall Score: 62
+Overall Status: Moderate Risk
+Summary: The farm has basic pond preparation in place but lacks consistent water filtration and PL quarantine. Biosecurity controls at entry points are partial and records are incomplete.
+
+===CATEGORY ASSESSMENTS===
+
+BIOSECURITY:
+Score: 55
+Status: Needs Improvement
+Issues: Partial fencing allows animal entry; No footbaths at pond entrances; Equipment shared between ponds
+Strengths: Restricted visitor access
+
+WATER MANAGEMENT:
+Score: 60
+Status: Needs Improvement
+Issues: Incoming water is not filtered; No separate reservoir for treatment
+Strengths: Weekly water quality monitoring
+
+POND PREPARATION:
+Score: 72
+Status: Good
+Issues: Muck layer only sometimes removed; Pond disinfection is irregular
+Strengths: Ponds are drained and sun-dried between cycles
+
+STOCK QUALITY:
+Score: 58
+Status: Needs Improvement
+Issues: PLs sourced from an uncertified local hatchery; No quarantine before stocking
+Strengths: PLs are acclimated before stocking
+
+HEALTH MONITORING:
+Score: 65
+Status: Good
+Issues: Health checks only when problems occur; Records are basic
+Strengths: Feeding follows a regular schedule
+
+===PRIORITY RECOMMENDATIONS===
+"""
+
+STUB_TASKS = [
+    ("Install Inlet Water Filtration", "critical", "Water Management", "₱5,000-10,000", "Within 7 days"),
+    ("Set Up Footbaths at Pond Entrances", "high", "Biosecurity", "₱1,000-3,000", "Today"),
+    ("Quarantine Post-Larvae Before Stocking", "high", "Stock Quality", "₱2,000-5,000", "Next 7 days"),
+    ("Complete Perimeter Fencing", "high", "Infrastructure", "₱10,000-20,000", "Within 30 days"),
+    ("Remove Muck Layer Every Cycle", "medium", "Pond Preparation", "₱0 (existing equipment)", "Next 7 days"),
+    ("Dedicate Equipment to Each Pond", "medium", "Biosecurity", "₱3,000-6,000", "Within 30 days"),
+    ("Start Daily Health Checks", "medium", "Health Monitoring", "₱0 (existing equipment)", "Today"),
+    ("Keep Detailed Pond Records", "low", "Health Monitoring", "₱500-1,000", "Within 30 days"),
+]
+
+STUB_ANSWER = (
+    "🦐 Good question! Based on the GAqP manuals, start by checking your water quality "
+    "daily: keep dissolved oxygen above 4 mg/L, pH between 7.5 and 8.5, and salinity stable.\n\n"
+    "💧 Filter incoming water through a fine mesh and treat it in a reservoir before it enters "
+    "the grow-out pond. Record every reading so changes are easy to spot.\n\n"
+    "If you notice unusual mortality, isolate the affected pond, stop sharing equipment, and "
+    "contact your local BFAR office for diagnosis."
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token for English text)"""
+    return max(1, len(text) // 4)
+
+
+def build_stub_assessment() -> str:
+    """Build a canned assessment response in the format parse_ai_response expects"""
+    tasks = []
+    for number, (title, priority, category, cost, timeframe) in enumerate(STUB_TASKS, start=1):
+        tasks.append(
+            f"{number}. {title}:\n"
+            f"Description: {title} to reduce the risk of disease entering and spreading on the farm.\n"
+            f"Priority: {priority}\n"
+            f"Category: {category}\n"
+            f"Estimated Cost: {cost}\n"
+            f"Timeframe: {timeframe}\n"
+            f"Adaptation Reason: The {category.lower()} score shows this is a gap for this farm."
+        )
+    return STUB_ASSESSMENT_HEADER + "\n" + "\n\n".join(tasks) + "\n"
+
+
+class StubChatModel(BaseChatModel):
+    """Chat model that simulates Groq latency and returns canned responses"""
+
+    latency_ms: float = Field(default_factory=lambda: float(os.getenv("STUB_LLM_LATENCY_MS", "300")))
+    tokens_per_sec: float = Field(default_factory=lambda: float(os.getenv("STUB_LLM_TOKENS_PER_SEC", "800")))
+
+    @property
+    def _llm_type(self) -> str:
+        return "likai-stub"
+
+    def _respond(self, messages: List[BaseMessage]) -> str:
+        prompt = "\n".join(str(message.content) for message in messages)
+        return build_stub_assessment() if ASSESSMENT_MARKER in prompt else STUB_ANSWER
+
+    def _usage(self, messages: List[BaseMessage], text: str) -> dict:
+        input_tokens = sum(estimate_tokens(str(message.content)) for message in messages)
+        output_tokens = estimate_tokens(text)
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        text = self._respond(messages)
+        usage = self._usage(messages, text)
+        time.sleep(self.latency_ms / 1000 + usage["output_tokens"] / self.tokens_per_sec)
+        message = AIMessage(content=text, usage_metadata=usage)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        text = self._respond(messages)
+        usage = self._usage(messages, text)
+        time.sleep(self.latency_ms / 1000)
+        words = text.split(" ")
+        delay = usage["output_tokens"] / self.tokens_per_sec / len(words)
+        for index, word in enumerate(words):
+            time.sleep(delay)
+            piece = word if index == 0 else " " + word
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=piece))
+            if run_manager:
+                run_manager.on_llm_new_token(piece, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=usage))
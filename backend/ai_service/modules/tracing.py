@@ -0,0 +1,167 @@
+"""
+OpenTelemetry tracing for requests through the RAG pipeline.
+
+Each HTTP request gets a server span (continuing a caller's ``traceparent``
+when one is sent), and every ``track_stage`` block inside it becomes a child
+span named after the stage: guardrail, query embedding, similarity search,
+prompt build, the LLM call, time to first token and response parsing. Stages
+add what is needed to explain their latency as span attributes:
+
+    similarity_search    search.k, search.results, search.sources ("file#page")
+    prompt_build         prompt.chars, prompt.tokens_estimated
+    llm_call             llm.model, llm.input_tokens, llm.output_tokens,
+                         llm.time_to_first_token_ms (streamed answers)
+    parse_response       parse.categories, parse.recommendations
+    guardrail,           guardrail.on_topic, guardrail.reason, guardrail.similarity
+    guardrail_classifier (on whichever of the two reached the verdict)
+
+Tracing is off unless ``TRACING_EXPORTER`` is set. The OpenTelemetry SDK is
+imported only then, so the default configuration pays one ``None`` check per
+stage. Sampling is decided once per trace (``TRACING_SAMPLE_RATE``) and
+followed by every span in it. Spans use this module's own tracer provider, not
+the global one, so reconfiguring (tests, workers after a fork) is safe.
+
+Environment variables:
+    TRACING_EXPORTER               ``none`` (default), ``otlp``, ``file`` or ``console``
+    TRACING_SAMPLE_RATE            Fraction of traces kept (default 1.0)
+    TRACING_FILE_PATH              Output of the file exporter, one JSON span per line
+                                   (default logs/traces.jsonl)
+    OTEL_SERVICE_NAME              Service name on exported spans (default likai-ai-service)
+    OTEL_EXPORTER_OTLP_ENDPOINT    Collector for the otlp exporter (default http://localhost:4317)
+"""
+
+import contextlib
+import logging
+import os
+from typing import Any, Dict, Iterator, Mapping, Optional
+
+from .logging_config import log_event
+
+logger = logging.getLogger(__name__)
+
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none").lower()
+TRACING_SAMPLE_RATE = float(os.getenv("TRACING_SAMPLE_RATE", "1.0"))
+TRACING_FILE_PATH = os.getenv(
+    "TRACING_FILE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "logs", "traces.jsonl")
+)
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "likai-ai-service")
+
+EXPORTERS = ("none", "otlp", "file", "console")
+
+_provider = None
+_tracer = None
+_NO_SPAN = contextlib.nullcontext()
+
+
+def create_exporter(name: str, file_path: str = TRACING_FILE_PATH):
+    """The span exporter for a TRACING_EXPORTER value; raises ValueError"""
+    from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+    if name == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        return OTLPSpanExporter()
+    if name == "file":
+        os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+        out = open(file_path, "a", encoding="utf-8")
+        return ConsoleSpanExporter(out=out, formatter=lambda span: span.to_json(indent=None) + "\n")
+    if name == "console":
+        return ConsoleSpanExporter()
+    raise ValueError(f"Unknown TRACING_EXPORTER {name!r}; expected one of {', '.join(EXPORTERS)}")
+
+
+def configure_tracing(exporter: str = TRACING_EXPORTER, sample_rate: float = TRACING_SAMPLE_RATE,
+                      span_exporter: Any = None) -> bool:
+    """
+    Start exporting spans and return whether tracing is on. ``span_exporter``
+    replaces the configured exporter and is called synchronously (tests).
+    """
+    global _provider, _tracer
+    shutdown_tracing()
+    if span_exporter is None and exporter == "none":
+        return False
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, SimpleSpanProcessor
+        from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+    except ImportError:
+        log_event(logger, "tracing_unavailable", level=logging.WARNING, error="opentelemetry-sdk not installed")
+        return False
+
+    if span_exporter is None:
+        processor = BatchSpanProcessor(create_exporter(exporter))
+    else:
+        processor = SimpleSpanProcessor(span_exporter)
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": SERVICE_NAME}),
+        sampler=ParentBased(TraceIdRatioBased(sample_rate)),
+    )
+    provider.add_span_processor(processor)
+    _provider, _tracer = provider, provider.get_tracer("likai.rag_pipeline")
+    log_event(logger, "tracing_configured", exporter=exporter if span_exporter is None else "custom",
+              sample_rate=sample_rate)
+    return True
+
+
+def shutdown_tracing():
+    """Flush buffered spans and stop tracing"""
+    global _provider, _tracer
+    provider, _provider, _tracer = _provider, None, None
+    if provider is not None:
+        provider.shutdown()
+
+
+def tracing_enabled() -> bool:
+    return _tracer is not None
+
+
+def _clean(attributes: Mapping[str, Any]) -> Dict[str, Any]:
+    """Attribute values OpenTelemetry accepts: drop None, stringify the rest of the unsupported types"""
+    cleaned = {}
+    for key, value in attributes.items():
+        if value is None:
+            continue
+        if isinstance(value, (list, tuple)):
+            value = [v if isinstance(v, (str, bool, int, float)) else str(v) for v in value]
+        elif not isinstance(value, (str, bool, int, float)):
+            value = str(value)
+        cleaned[key] = value
+    return cleaned
+
+
+def span(name: str, attributes: Optional[Mapping[str, Any]] = None):
+    """Context manager for a child span of the current one (a no-op while tracing is off)"""
+    if _tracer is None:
+        return _NO_SPAN
+    return _tracer.start_as_current_span(name, attributes=_clean(attributes or {}))
+
+
+def set_span_attributes(attributes: Mapping[str, Any]):
+    """Add attributes to the current span, if it is being recorded"""
+    if _tracer is None:
+        return
+    from opentelemetry import trace
+
+    current = trace.get_current_span()
+    if current.is_recording():
+        current.set_attributes(_clean(attributes))
+
+
+@contextlib.contextmanager
+def request_span(method: str, path: str, headers: Mapping[str, str]) -> Iterator[Any]:
+    """Server span for an HTTP request, continuing the caller's trace context if any"""
+    if _tracer is None:
+        yield None
+        return
+    from opentelemetry.propagate import extract
+    from opentelemetry.trace import SpanKind
+
+    with _tracer.start_as_current_span(
+        f"{method} {path}", context=extract(headers), kind=SpanKind.SERVER,
+        attributes={"http.request.method": method, "url.path": path},
+    ) as current:
+        yield current
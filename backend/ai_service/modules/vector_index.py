@@ -0,0 +1,120 @@
+"""
+In-memory vector index over a loaded index artifact.
+
+Implements the parts of the Chroma vector store interface the pipeline uses
+(``embeddings``, ``similarity_search``, ``similarity_search_by_vector`` and
+``get``) with one matrix product over unit-normalized vectors. Several query
+vectors are scored in the same product (``search_positions_batch``), and
+``merge_ranked`` combines their rankings. The vector matrix is a read-only
+memory map, so it is never copied per request and pre-forked workers share
+its pages.
+"""
+
+from typing import Any, Dict, Hashable, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.documents import Document
+
+
+class NumpyVectorIndex:
+    """Cosine-similarity search over a read-only (n, dim) float32 matrix"""
+
+    def __init__(self, vectors: np.ndarray, ids: List[str], texts: List[str],
+                 metadatas: List[Dict[str, Any]], embeddings: Any, manifest: Optional[Dict[str, Any]] = None):
+        if len(vectors) != len(ids) or len(ids) != len(texts) or len(texts) != len(metadatas):
+            raise ValueError("Vectors, ids, texts and metadatas must have the same length")
+        self.vectors = vectors
+        self.ids = ids
+        self.texts = texts
+        self.metadatas = metadatas
+        self.embeddings = embeddings
+        self.manifest = manifest or {}
+        self._positions = {chunk_id: i for i, chunk_id in enumerate(ids)}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def version(self) -> Optional[str]:
+        return self.manifest.get("index_version")
+
+    def document(self, position: int) -> Document:
+        metadata = dict(self.metadatas[position])
+        metadata["chunk_id"] = self.ids[position]
+        return Document(page_content=self.texts[position], metadata=metadata)
+
+    def get_by_ids(self, ids: List[str]) -> List[Document]:
+        """Documents for chunk IDs, skipping IDs not in this index"""
+        return [self.document(self._positions[i]) for i in ids if i in self._positions]
+
+    def has_ids(self, ids: List[str]) -> bool:
+        """Whether every chunk ID is in this index"""
+        return all(i in self._positions for i in ids)
+
+    def search_positions(self, query_vector: List[float], k: int):
+        """Row positions and scores of the k most similar chunks, best first"""
+        positions, scores = self.search_positions_batch([query_vector], k)
+        return positions[0], scores[0]
+
+    def search_positions_batch(self, query_vectors: Sequence[List[float]], k: int):
+        """
+        (queries, k) arrays of row positions and scores of the k most similar
+        chunks for each query, best first, from one matrix-matrix product
+        """
+        queries = np.asarray(query_vectors, dtype=np.float32).reshape(len(query_vectors), -1)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms > 0, norms, 1.0)
+        k = min(k, len(self.ids))
+        if k <= 0:
+            return (np.empty((len(queries), 0), dtype=np.int64),
+                    np.empty((len(queries), 0), dtype=np.float32))
+        scores = queries @ self.vectors.T
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs) -> List[Document]:
+        positions, _ = self.search_positions(embedding, k)
+        return [self.document(int(i)) for i in positions]
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4):
+        positions, scores = self.search_positions(embedding, k)
+        return [(self.document(int(i)), float(s)) for i, s in zip(positions, scores)]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs) -> List[Document]:
+        return self.similarity_search_by_vector(self.embeddings.embed_query(query), k=k)
+
+    def get(self) -> Dict[str, List[Any]]:
+        """All chunks, in the same shape as ``Chroma.get()``"""
+        return {"ids": list(self.ids), "documents": list(self.texts), "metadatas": [dict(m) for m in self.metadatas]}
+
+
+def merge_ranked(rankings: Sequence[Sequence[Hashable]], quotas: Sequence[int], k: int) -> List[Hashable]:
+    """
+    Merge the rankings of several queries into at most k distinct items.
+    Queries take turns, best remaining item first, so every query gets its
+    top item before any gets a second; a query stops after its quota and
+    an item already taken by an earlier query is skipped.
+    """
+    selected: List[Hashable] = []
+    seen = set()
+    cursors = [0] * len(rankings)
+    taken = [0] * len(rankings)
+    while len(selected) < k:
+        progressed = False
+        for i, ranking in enumerate(rankings):
+            if taken[i] >= quotas[i] or len(selected) >= k:
+                continue
+            while cursors[i] < len(ranking) and ranking[cursors[i]] in seen:
+                cursors[i] += 1
+            if cursors[i] < len(ranking):
+                item = ranking[cursors[i]]
+                cursors[i] += 1
+                taken[i] += 1
+                seen.add(item)
+                selected.append(item)
+                progressed = True
+        if not progressed:
+            break
+    return selected
@@ -0,0 +1,165 @@
+"""
+Startup warm-up and readiness tracking.
+
+``run_warmup`` loads the embedding model, embeds the guardrail topic
+centroids, opens the vector store, runs a probe query embedding + similarity
+search and (optionally) primes the LLM connection, recording the status and
+duration of each step. ``/ready`` in ``app.py`` reports this state so load
+balancers only route to warm instances.
+
+Environment variables:
+    WARMUP_ENABLED   Run the warm-up at startup (default true)
+    WARMUP_LLM       Also send a tiny prompt to prime the LLM connection (default false)
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+WARMUP_LLM = os.getenv("WARMUP_LLM", "false").lower() == "true"
+
+WARMUP_QUERY = "biosecurity measures for shrimp pond preparation"
+
+PENDING = "pending"
+READY = "ready"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+class ReadinessState:
+    """Thread-safe record of per-component warm-up status and timings"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.components: Dict[str, Dict[str, Any]] = {}
+        self.started_at: Optional[str] = None
+        self.completed_at: Optional[str] = None
+        self.duration_ms: Optional[float] = None
+
+    def reset(self, component_names):
+        with self._lock:
+            self.components = {name: {"status": PENDING} for name in component_names}
+            self.started_at = datetime.now().isoformat()
+            self.completed_at = None
+            self.duration_ms = None
+
+    def update(self, name: str, **fields: Any):
+        with self._lock:
+            self.components.setdefault(name, {}).update(fields)
+
+    def finish(self, duration: float):
+        with self._lock:
+            self.completed_at = datetime.now().isoformat()
+            self.duration_ms = round(duration * 1000, 1)
+
+    @property
+    def status(self) -> str:
+        with self._lock:
+            statuses = [component["status"] for component in self.components.values()]
+        if not statuses:
+            return PENDING
+        if FAILED in statuses:
+            return FAILED
+        if PENDING in statuses:
+            return "warming"
+        return READY
+
+    @property
+    def is_ready(self) -> bool:
+        return self.status == READY
+
+    def snapshot(self) -> Dict[str, Any]:
+        status = self.status
+        with self._lock:
+            return {
+                "status": status,
+                "started_at": self.started_at,
+                "completed_at": self.completed_at,
+                "warmup_ms": self.duration_ms,
+                "components": {name: dict(component) for name, component in self.components.items()},
+            }
+
+
+READINESS = ReadinessState()
+
+
+def warm_embedding_model():
+    from .embedding import get_embeddings_model
+    get_embeddings_model()
+
+
+def warm_guardrail():
+    from .guardrail import CENTROIDS
+    CENTROIDS.ensure_loaded()
+
+
+def warm_vector_db():
+    from .rag_pipeline import get_vector_db
+    get_vector_db()
+
+
+def warm_query_probe():
+    from .rag_pipeline import get_vector_db, search_documents
+    search_documents(get_vector_db(), WARMUP_QUERY, k=1)
+
+
+def warm_llm():
+    from .ai_models import get_llm
+    get_llm().invoke("Reply with OK.")
+
+
+def run_warmup(prime_llm: bool = WARMUP_LLM, state: ReadinessState = READINESS,
+               resume: bool = False) -> ReadinessState:
+    """
+    Run each warm-up step in order, stopping at the first failure. With
+    resume, steps the state already records as ready (serve.py warms up before
+    forking the workers) are kept instead of rerun, so a worker's readiness
+    never drops back to pending.
+    """
+    steps: Dict[str, Callable[[], None]] = {
+        "embedding_model": warm_embedding_model,
+        "guardrail": warm_guardrail,
+        "vector_db": warm_vector_db,
+        "query_probe": warm_query_probe,
+        "llm": warm_llm,
+    }
+    components = state.snapshot()["components"] if resume else {}
+    done = {name for name, component in components.items() if component["status"] == READY}
+    if not done:
+        state.reset(steps)
+    start = time.perf_counter()
+
+    failed = False
+    for name, step in steps.items():
+        if name in done:
+            continue
+        if failed:
+            state.update(name, status=SKIPPED, reason="earlier step failed")
+            continue
+        if name == "llm" and not prime_llm:
+            state.update(name, status=SKIPPED, reason="WARMUP_LLM disabled")
+            continue
+        step_start = time.perf_counter()
+        try:
+            step()
+            state.update(name, status=READY, duration_ms=round((time.perf_counter() - step_start) * 1000, 1))
+        except Exception as e:
+            failed = True
+            state.update(
+                name, status=FAILED,
+                duration_ms=round((time.perf_counter() - step_start) * 1000, 1),
+                error=f"{type(e).__name__}: {e}",
+            )
+
+    state.finish(time.perf_counter() - start)
+    return state
+
+
+def mark_warmup_disabled(state: ReadinessState = READINESS):
+    """Record that warm-up was skipped; components load lazily on first request"""
+    state.reset([])
+    state.update("warmup", status=SKIPPED, reason="WARMUP_ENABLED disabled")
+    state.finish(0.0)
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+"""
+Offline batch precomputation of FAQ answers.
+
+Answers a list of frequently asked questions against the current index and
+stores them in the FAQ store (modules/faq_store.py). Each answer is stored with
+the chunk IDs it was generated from and the index version. ``/query`` and
+``/query/stream`` then serve matching questions without calling the LLM.
+
+Questions come from a curated file (one per line, ``#`` comments allowed) and/or
+are mined from the service's JSON logs: sampled ``query_payload`` events
+(LOG_PAYLOAD_SAMPLE_RATE) asked outside a session at least ``--min-count``
+times.
+
+Re-running the job after an index rebuild only calls the LLM for questions
+whose retrieved chunks changed. The others keep their answer and get the new
+index version. LLM calls run with bounded concurrency. Never prompts for input.
+
+Usage (from backend/ai_service):
+    python precompute_faq.py
+    python precompute_faq.py --questions data/faq_questions.txt --concurrency 4
+    python precompute_faq.py --from-logs logs/app.jsonl --min-count 5
+    python precompute_faq.py --force     # regenerate every answer
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_QUESTIONS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "faq_questions.txt")
+
+
+def load_questions(path: str) -> List[str]:
+    """Questions from a text file, one per line; blank lines and # comments are skipped"""
+    with open(path, encoding="utf-8") as f:
+        lines = (line.strip() for line in f)
+        return [line for line in lines if line and not line.startswith("#")]
+
+
+def mine_questions(log_paths: Iterable[str], min_count: int = 3) -> List[str]:
+    """Questions asked outside a session at least min_count times, most frequent first"""
+    from modules.singleflight import normalize_question
+
+    counts: Counter = Counter()
+    phrasing: Dict[str, str] = {}
+    for path in log_paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if entry.get("msg") != "query_payload" or entry.get("session_id") or not entry.get("question"):
+                    continue
+                key = normalize_question(entry["question"])
+                counts[key] += 1
+                phrasing.setdefault(key, entry["question"].strip())
+    return [phrasing[key] for key, count in counts.most_common() if count >= min_count]
+
+
+def precompute(questions: List[str], store=None, concurrency: int = 4, force: bool = False,
+               prune: bool = False) -> Dict[str, Any]:
+    """Answer questions whose retrieval changed and save the store; raises ValueError"""
+    from modules.faq_store import FAQ_STORE, FaqEntry
+    from modules.rag_pipeline import get_vector_db, invoke_llm, prepare_query
+    from modules.singleflight import normalize_question
+
+    store = store or FAQ_STORE
+    index = get_vector_db()
+    version = getattr(index, "version", None)
+    if version is None:
+        raise ValueError("FAQ answers need an index artifact; run build_index.py first")
+
+    start = time.perf_counter()
+    existing = store.load()
+    entries = {} if prune else dict(existing)
+    report = {"questions": 0, "generated": 0, "unchanged": 0, "off_topic": [], "failed": []}
+
+    # Retrieval is cheap: run it for every question to find the answers that changed
+    pending, seen = {}, set()
+    for question in questions:
+        key = normalize_question(question)
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        report["questions"] += 1
+        prepared = prepare_query(question)
+        if not prepared.on_topic:
+            report["off_topic"].append(question)
+            entries.pop(key, None)
+            continue
+        chunk_ids = [doc.metadata.get("chunk_id") for doc in prepared.docs]
+        previous = existing.get(key)
+        if not force and previous is not None and previous.chunk_ids == chunk_ids:
+            entries[key] = replace(previous, index_version=version)
+            report["unchanged"] += 1
+        else:
+            pending[key] = (question, prepared.prompt, chunk_ids)
+
+    def generate(item):
+        key, (question, prompt, chunk_ids) = item
+        try:
+            answer = invoke_llm(prompt).strip()
+        except Exception as e:
+            return key, question, None, f"{type(e).__name__}: {e}"
+        return key, question, FaqEntry(
+            question=question, answer=answer, chunk_ids=chunk_ids, index_version=version,
+            generated_at=datetime.now(timezone.utc).isoformat(),
+        ), None
+
+    # Bounded concurrency against the LLM provider
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        for key, question, entry, error in pool.map(generate, pending.items()):
+            if entry is None:
+                # A stale answer must not outlive a failed regeneration
+                entries.pop(key, None)
+                report["failed"].append({"question": question, "error": error})
+            else:
+                entries[key] = entry
+                report["generated"] += 1
+
+    store.save(entries)
+    report.update(
+        store=os.path.abspath(store.path),
+        index_version=version,
+        entries=len(entries),
+        stale=sum(1 for entry in entries.values() if not entry.is_valid_for(index)),
+        seconds=round(time.perf_counter() - start, 1),
+    )
+    return report
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Precompute answers to frequently asked questions")
+    parser.add_argument("--questions", default=None, help=f"Question list (default {DEFAULT_QUESTIONS})")
+    parser.add_argument("--from-logs", nargs="*", default=[], help="JSON log files to mine for questions")
+    parser.add_argument("--min-count", type=int, default=3, help="Times a logged question must appear")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent LLM calls")
+    parser.add_argument("--force", action="store_true", help="Regenerate answers even if their chunks are unchanged")
+    parser.add_argument("--prune", action="store_true", help="Drop stored answers for questions not in this run")
+    args = parser.parse_args(argv)
+
+    questions = []
+    if args.questions or not args.from_logs:
+        questions.extend(load_questions(args.questions or DEFAULT_QUESTIONS))
+    if args.from_logs:
+        questions.extend(mine_questions(args.from_logs, args.min_count))
+
+    try:
+        report = precompute(questions, concurrency=args.concurrency, force=args.force, prune=args.prune)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+
+    print(json.dumps(report, indent=2))
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+"""
+Pre-fork multi-worker server.
+
+``uvicorn --workers N`` starts N fresh interpreters, and each one loads its own
+SentenceTransformer and index. This server loads the embedding model, the
+guardrail centroids and the index once in the parent, freezes the heap with
+``gc.freeze()`` and then forks the workers. Model weights and index pages are
+shared copy-on-write, so each additional worker costs only its unique memory
+(USS), which is logged per worker as ``worker_memory`` events. The parent owns
+the listening socket and restarts workers that exit.
+
+Use an index artifact (``build_index.py``) for the read-only index: its vectors
+are memory-mapped and shared by all workers. The LLM client is created in each
+worker after the fork, never in the parent.
+
+Usage (from backend/ai_service):
+    python serve.py --workers 4
+    python serve.py --workers 4 --no-preload    # each worker loads its own copy, for comparison
+
+Environment variables:
+    WEB_CONCURRENCY              Default number of workers (default 2)
+    WORKER_MEMORY_LOG_SECONDS    Interval between worker_memory events (default 300, 0 disables)
+"""
+
+import argparse
+import gc
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+from typing import Optional
+
+RESTART_DELAY_SECONDS = 1.0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the API from pre-forked workers sharing one model and index")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "2")))
+    parser.add_argument("--no-preload", action="store_true", help="Load the model in each worker instead of the parent")
+    parser.add_argument("--memory-log-seconds", type=float,
+                        default=float(os.getenv("WORKER_MEMORY_LOG_SECONDS", "300")))
+    parser.add_argument("--log-level", default="warning", help="uvicorn log level")
+    return parser.parse_args(argv)
+
+
+def prepare_environment(workers: int):
+    """Settings that must be in place before the app and its libraries are imported.
+    Returns a metrics directory created here, which the caller removes on exit."""
+    # Split CPU threads between workers instead of letting each one use every core
+    os.environ.setdefault("OMP_NUM_THREADS", str(max(1, (os.cpu_count() or 1) // workers)))
+    # Tokenizer thread pools do not survive fork
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    # Each worker writes its metrics to this directory and /metrics aggregates them
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="likai-metrics-")
+        return os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    # Values left over from a previous run would be added to this run's
+    shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+    return None
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def exit_code(error: Optional[BaseException]) -> int:
+    """Exit status of a worker that stopped with this exception (None: a clean stop)"""
+    if error is None:
+        return 0
+    if isinstance(error, SystemExit):
+        return error.code if isinstance(error.code, int) else int(error.code is not None)
+    if isinstance(error, KeyboardInterrupt):
+        return 128 + signal.SIGINT
+    return 1
+
+
+def run_worker(app, sock: socket.socket, log_level: str):
+    """Worker body: serve the app on the shared socket until told to stop"""
+    import logging
+    import uvicorn
+    from modules.logging_config import shutdown_logging
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    try:
+        server = uvicorn.Server(uvicorn.Config(app, log_level=log_level))
+        server.run(sockets=[sock])
+    except Exception:
+        # The parent only sees the exit status; without this a crash-looping worker leaves no trace
+        logging.getLogger("serve").exception("worker_failed", extra={"fields": {"pid": os.getpid()}})
+        raise
+    finally:
+        # A forked worker must never return into the parent's code; KeyboardInterrupt and
+        # SystemExit propagate to here and become the exit status
+        shutdown_logging()
+        os._exit(exit_code(sys.exc_info()[1]))
+
+
+def spawn_worker(app, sock: socket.socket, log_level: str) -> int:
+    pid = os.fork()
+    if pid == 0:
+        run_worker(app, sock, log_level)
+    return pid
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    metrics_dir = prepare_environment(args.workers)
+    try:
+        return serve(args)
+    finally:
+        if metrics_dir:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+def serve(args) -> int:
+    """Preload, fork the workers and supervise them until SIGTERM/SIGINT"""
+    import logging
+    from prometheus_client import multiprocess
+    from app import app
+    from modules.logging_config import log_event
+    from modules.process_memory import memory_usage, workers_memory
+    from modules.warmup import READINESS, run_warmup
+
+    logger = logging.getLogger("serve")
+    sock = bind_socket(args.host, args.port)
+
+    if not args.no_preload:
+        # Load everything workers share; the LLM client is left to each worker
+        state = run_warmup(prime_llm=False, state=READINESS)
+        snapshot = state.snapshot()
+        log_event(logger, "preload_completed", status=snapshot["status"],
+                  warmup_ms=snapshot["warmup_ms"], memory=memory_usage())
+        if not state.is_ready:
+            log_event(logger, "preload_failed", level=logging.ERROR, components=snapshot["components"])
+            return 1
+        # Move everything allocated so far out of the collector's reach, so
+        # collections in the workers don't write to (and copy) shared pages
+        gc.collect()
+        gc.freeze()
+
+    workers = {}
+    for _ in range(args.workers):
+        workers[spawn_worker(app, sock, args.log_level)] = time.monotonic()
+    log_event(logger, "workers_started", workers=sorted(workers), preload=not args.no_preload,
+              address=f"http://{args.host}:{args.port}")
+
+    stopping = False
+
+    def request_stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    next_memory_log = time.monotonic() + args.memory_log_seconds
+    signalled = False
+    while workers:
+        if stopping and not signalled:
+            for pid in workers:
+                os.kill(pid, signal.SIGTERM)
+            signalled = True
+
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid:
+            started = workers.pop(pid, None)
+            multiprocess.mark_process_dead(pid)
+            if not stopping:
+                log_event(logger, "worker_exited", level=logging.WARNING, pid=pid,
+                          exit_code=os.waitstatus_to_exitcode(status))
+                # Don't spin if workers die straight after starting
+                if started is not None and time.monotonic() - started < RESTART_DELAY_SECONDS:
+                    time.sleep(RESTART_DELAY_SECONDS)
+                workers[spawn_worker(app, sock, args.log_level)] = time.monotonic()
+            continue
+
+        if args.memory_log_seconds > 0 and time.monotonic() >= next_memory_log:
+            log_event(logger, "worker_memory", parent=memory_usage(), **workers_memory(sorted(workers)))
+            next_memory_log = time.monotonic() + args.memory_log_seconds
+        time.sleep(0.2)
+
+    sock.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
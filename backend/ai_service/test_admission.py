@@ -0,0 +1,201 @@
+"""
+Admission Control Test Suite
+Tests concurrency limits, priority ordering and load shedding of the
+admission pools, and the 429/503 responses returned by the API.
+"""
+
+import asyncio
+import contextlib
+import sys
+import unittest
+from unittest import mock
+
+
+class TestAdmissionPool(unittest.IsolatedAsyncioTestCase):
+    """Test the per-endpoint admission pool"""
+
+    async def hold(self, pool, release, order, name, priority=1):
+        async with pool.slot(priority):
+            order.append(name)
+            await release.wait()
+
+    async def test_concurrency_limit(self):
+        """Test that no more than max_concurrency requests run at once"""
+        from modules.admission import AdmissionPool
+
+        pool = AdmissionPool("test", max_concurrency=2, max_queue=10, max_queue_wait=5)
+        release, order = asyncio.Event(), []
+        tasks = [asyncio.create_task(self.hold(pool, release, order, i)) for i in range(5)]
+        await asyncio.sleep(0.01)
+
+        self.assertEqual(len(order), 2)
+        self.assertEqual((pool.in_flight, pool.queued), (2, 3))
+        release.set()
+        await asyncio.gather(*tasks)
+        self.assertEqual((pool.in_flight, pool.queued), (0, 0))
+
+    async def test_priority_order(self):
+        """Test that queued high-priority requests are admitted first"""
+        from modules.admission import AdmissionPool, PRIORITIES
+
+        pool = AdmissionPool("test", max_concurrency=1, max_queue=10, max_queue_wait=5)
+        release, order = asyncio.Event(), []
+        tasks = [asyncio.create_task(self.hold(pool, release, order, "first"))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(self.hold(pool, release, order, "low", PRIORITIES["low"])))
+        tasks.append(asyncio.create_task(self.hold(pool, release, order, "high", PRIORITIES["high"])))
+        await asyncio.sleep(0.01)
+        release.set()
+        await asyncio.gather(*tasks)
+
+        self.assertEqual(order, ["first", "high", "low"])
+
+    async def test_queue_full_rejected_fast(self):
+        """Test that a full queue sheds the request immediately with 429"""
+        from modules.admission import AdmissionPool, AdmissionRejected
+
+        pool = AdmissionPool("test", max_concurrency=1, max_queue=1, max_queue_wait=5)
+        release, order = asyncio.Event(), []
+        tasks = [asyncio.create_task(self.hold(pool, release, order, i)) for i in range(2)]
+        await asyncio.sleep(0.01)
+
+        with self.assertRaises(AdmissionRejected) as rejected:
+            async with pool.slot():
+                pass
+        self.assertEqual(rejected.exception.status_code, 429)
+        self.assertGreaterEqual(rejected.exception.retry_after, 1)
+        release.set()
+        await asyncio.gather(*tasks)
+
+    async def test_high_priority_displaces_low(self):
+        """Test that a high-priority request takes a full queue's lowest-priority place"""
+        from modules.admission import AdmissionPool, AdmissionRejected, PRIORITIES
+
+        pool = AdmissionPool("test", max_concurrency=1, max_queue=1, max_queue_wait=5)
+        release, order = asyncio.Event(), []
+        running = asyncio.create_task(self.hold(pool, release, order, "running"))
+        await asyncio.sleep(0)
+        low = asyncio.create_task(self.hold(pool, release, order, "low", PRIORITIES["low"]))
+        await asyncio.sleep(0)
+        high = asyncio.create_task(self.hold(pool, release, order, "high", PRIORITIES["high"]))
+        await asyncio.sleep(0.01)
+
+        release.set()
+        await asyncio.gather(running, high)
+        with self.assertRaises(AdmissionRejected) as rejected:
+            await low
+        self.assertEqual(rejected.exception.reason, "displaced")
+        self.assertEqual(order, ["running", "high"])
+
+    async def test_queue_wait_timeout(self):
+        """Test that a request waiting past max_queue_wait gets a 503"""
+        from modules.admission import AdmissionPool, AdmissionRejected
+
+        pool = AdmissionPool("test", max_concurrency=1, max_queue=5, max_queue_wait=0.05)
+        release, order = asyncio.Event(), []
+        running = asyncio.create_task(self.hold(pool, release, order, "running"))
+        await asyncio.sleep(0)
+
+        with self.assertRaises(AdmissionRejected) as rejected:
+            async with pool.slot():
+                pass
+        self.assertEqual(rejected.exception.status_code, 503)
+        self.assertEqual(pool.queued, 0)
+        release.set()
+        await running
+
+    async def test_cancelled_waiter_frees_place(self):
+        """Test that a client disconnecting while queued leaks no slot"""
+        from modules.admission import AdmissionPool
+
+        pool = AdmissionPool("test", max_concurrency=1, max_queue=5, max_queue_wait=5)
+        release, order = asyncio.Event(), []
+        running = asyncio.create_task(self.hold(pool, release, order, "running"))
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(self.hold(pool, release, order, "cancelled"))
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        await running
+
+        self.assertEqual((pool.in_flight, pool.queued), (0, 0))
+        async with pool.slot():
+            self.assertEqual(pool.in_flight, 1)
+
+
+class TestPriorityHeader(unittest.TestCase):
+    """Test that high priority must be granted by the configured token"""
+
+    def test_high_priority_needs_token(self):
+        from modules import admission
+        from modules.admission import DEFAULT_PRIORITY, PRIORITIES, parse_priority
+
+        with mock.patch.object(admission, "ADMISSION_PRIORITY_TOKEN", None):
+            self.assertEqual(parse_priority("high"), DEFAULT_PRIORITY)
+            self.assertEqual(parse_priority("high", "anything"), DEFAULT_PRIORITY)
+        with mock.patch.object(admission, "ADMISSION_PRIORITY_TOKEN", "s3cret"):
+            self.assertEqual(parse_priority("high", "guess"), DEFAULT_PRIORITY)
+            self.assertEqual(parse_priority("High", "s3cret"), PRIORITIES["high"])
+        # Lowering your own priority needs no token
+        self.assertEqual(parse_priority("low"), PRIORITIES["low"])
+
+    def test_endpoint_passes_token(self):
+        from fastapi.testclient import TestClient
+        from app import app
+        from modules import admission
+
+        priorities = []
+
+        @contextlib.asynccontextmanager
+        async def record(pool, priority):
+            priorities.append(priority)
+            yield
+
+        headers = {"X-Priority": "high", "X-Priority-Token": "s3cret"}
+        with mock.patch.object(admission, "ADMISSION_PRIORITY_TOKEN", "s3cret"), \
+                mock.patch("app.admit", record), \
+                mock.patch("app.query_farm_knowledge", return_value="answer"):
+            TestClient(app).post("/query", json={"question": "How deep should my pond be?"}, headers=headers)
+            TestClient(app).post("/query", json={"question": "How wide should my pond be?"},
+                                 headers={"X-Priority": "high"})
+
+        self.assertEqual(priorities, [admission.PRIORITIES["high"], admission.DEFAULT_PRIORITY])
+
+
+class TestSheddingResponses(unittest.TestCase):
+    """Test the HTTP responses for shed requests"""
+
+    @classmethod
+    def setUpClass(cls):
+        from fastapi.testclient import TestClient
+        from app import app
+        cls.client = TestClient(app)
+
+    def test_full_pool_returns_429_with_retry_after(self):
+        """Test that a saturated chat pool answers 429 without running the pipeline"""
+        from modules.admission import AdmissionPool
+
+        full = AdmissionPool("chat", max_concurrency=0, max_queue=0, max_queue_wait=1)
+        with mock.patch("app.CHAT_POOL", full), \
+                mock.patch("app.query_farm_knowledge", side_effect=AssertionError("ran pipeline")):
+            response = self.client.post("/query", json={"question": "How deep should my pond be?"})
+
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response.headers["Retry-After"]), 1)
+
+    def test_upstream_rate_limit_returns_503(self):
+        """Test that an LLM rate limit is reported as 503 instead of 500"""
+        class RateLimitError(Exception):
+            status_code = 429
+
+        with mock.patch("app.query_farm_knowledge", side_effect=RateLimitError("rate limited")):
+            response = self.client.post("/query", json={"question": "How deep should my pond be?"})
+
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("Retry-After", response.headers)
+
+
+if __name__ == "__main__":
+    result = unittest.main(exit=False, verbosity=2).result
+    sys.exit(0 if result.wasSuccessful() else 1)
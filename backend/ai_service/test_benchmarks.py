@@ -0,0 +1,186 @@
+"""
+Benchmark Harness Test Suite
+Tests the stub LLM, synthetic data generators and latency summaries used by
+the offline benchmarks. Runs without a Groq key or network access.
+"""
+
+import sys
+import unittest
+
+
+class TestStubLLM(unittest.TestCase):
+    """Test the offline stand-in for the Groq model"""
+
+    def test_stub_assessment_parses_without_fallback(self):
+        """Test that the canned assessment matches the format parse_ai_response expects"""
+        from modules.stub_llm import StubChatModel, ASSESSMENT_MARKER
+        from modules.rag_pipeline import parse_ai_response
+
+        llm = StubChatModel(latency_ms=0, tokens_per_sec=1e9)
+        response = llm.invoke(f"Analyze this farm {ASSESSMENT_MARKER}")
+        assessment = parse_ai_response(response.content)
+
+        self.assertEqual(assessment.overallScore, 62)
+        self.assertEqual(len(assessment.categories), 5)
+        self.assertEqual(len(assessment.recommendations), 8)
+        self.assertEqual(assessment.recommendations[0].priority, "critical")
+        self.assertGreater(response.usage_metadata["output_tokens"], 0)
+
+    def test_stub_stream_matches_invoke(self):
+        """Test that streamed chunks reassemble into the full answer"""
+        from modules.stub_llm import StubChatModel, STUB_ANSWER
+
+        llm = StubChatModel(latency_ms=0, tokens_per_sec=1e9)
+        streamed = "".join(chunk.content for chunk in llm.stream("How do I prepare my pond?"))
+
+        self.assertEqual(streamed, STUB_ANSWER)
+
+
+class TestSyntheticData(unittest.TestCase):
+    """Test synthetic profile and question generation"""
+
+    def test_profiles_are_valid_assessments(self):
+        """Test that generated profiles validate against AssessmentData"""
+        from benchmarks.synthetic import generate_profiles
+        from modules.schemas import AssessmentData
+
+        profiles = generate_profiles(25, seed=7)
+
+        for profile in profiles:
+            AssessmentData(**profile)
+        self.assertEqual(profiles, generate_profiles(25, seed=7))
+
+    def test_percentile_summary(self):
+        """Test nearest-rank percentiles reported in milliseconds"""
+        from benchmarks.bench_pipeline import summarize
+
+        stats = summarize([i / 1000 for i in range(1, 101)])
+
+        self.assertEqual(stats["p50"], 50.0)
+        self.assertEqual(stats["p95"], 95.0)
+        self.assertEqual(stats["p99"], 99.0)
+
+
+class TestLoadTestReport(unittest.TestCase):
+    """Test load test step aggregation and saturation detection"""
+
+    def test_step_saturation(self):
+        """Test that errors and throughput shortfall mark a step as saturated"""
+        from benchmarks.load_test import summarize_step, is_saturated
+
+        healthy = [{"endpoint": "/query", "status": 200, "error": None, "latency": 0.2}] * 40
+        step = summarize_step(4.0, 10.0, healthy)
+        self.assertFalse(is_saturated(step, slo_ms=1000, max_error_rate=0.01))
+
+        overloaded = healthy[:20] + [{"endpoint": "/query", "status": 500, "error": None, "latency": 0.1}] * 20
+        step = summarize_step(4.0, 10.0, overloaded)
+        self.assertEqual(step["error_rate"], 0.5)
+        self.assertEqual(step["endpoints"]["/query"]["statuses"], {"200": 20, "500": 20})
+        self.assertTrue(is_saturated(step, slo_ms=1000, max_error_rate=0.01))
+
+
+    def test_most_queries_session_less(self):
+        """Test that only the configured fraction of queries belong to a session"""
+        import random
+        from benchmarks.load_test import query_payload
+
+        rng = random.Random(7)
+        payloads = [query_payload(rng, ["How do I lime my pond?"], 0.1, 5) for _ in range(1000)]
+        sessioned = [p["session_id"] for p in payloads if "session_id" in p]
+
+        self.assertTrue(50 < len(sessioned) < 150)
+        self.assertLessEqual(len(set(sessioned)), 5)
+        self.assertFalse(any("session_id" in p for p in (query_payload(rng, ["q"], 0.0, 5) for _ in range(100))))
+
+
+class TestAssessmentSerialization(unittest.TestCase):
+    """Test the single-pass assessment response"""
+
+    def test_response_matches_old_format(self):
+        """Test that /process-assessment serves the same document as the hand-built dict"""
+        from unittest import mock
+        from fastapi.encoders import jsonable_encoder
+        from fastapi.testclient import TestClient
+        from app import app
+        from benchmarks.bench_serialization import legacy_response_dict, typical_assessment
+        from benchmarks.synthetic import generate_profiles
+
+        assessment = typical_assessment()
+        with mock.patch("app.process_farm_assessment", return_value=assessment):
+            response = TestClient(app).post("/process-assessment", json=generate_profiles(1)[0])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "application/json")
+        self.assertEqual(response.json(), jsonable_encoder(legacy_response_dict(assessment)))
+        self.assertEqual(len(response.json()["tasks"]), 8)
+
+    def test_pydantic_fallback_without_orjson(self):
+        import json
+        from unittest import mock
+        from app import assessment_response
+        from benchmarks.bench_serialization import typical_assessment
+
+        assessment = typical_assessment()
+        with mock.patch("app.orjson", None):
+            fallback = assessment_response(assessment).body
+        self.assertEqual(json.loads(fallback), json.loads(assessment_response(assessment).body))
+
+    def test_benchmark_paths_agree(self):
+        from benchmarks.bench_serialization import run_benchmark
+
+        report = run_benchmark(iterations=5)
+
+        self.assertEqual(report["recommendations"], 8)
+        self.assertEqual(len({result["bytes"] for result in report["results"].values()}), 1)
+
+
+class TestRetrievalEvaluation(unittest.TestCase):
+    """Test recall@k and MRR scoring against a synthetic index"""
+
+    def test_scores_gold_set(self):
+        import json
+        import os
+        import tempfile
+        from unittest import mock
+        from benchmarks.eval_retrieval import load_gold_set, run_evaluation
+        from benchmarks.synthetic import generate_chunks
+        from test_index_artifact import build_test_artifact
+
+        # Fake embeddings map a chunk's own text to its vector: those questions rank first
+        chunks = generate_chunks(30, seed=3)
+        gold = [{"question": chunks[i]["text"], "relevant": [{"source": "synthetic-gaqp-manual.pdf", "page": i // 3}]}
+                for i in (0, 10)]
+        gold.append({"question": "Which page is missing?", "relevant": [{"source": "other.pdf", "page": 99}]})
+
+        with tempfile.TemporaryDirectory() as tmp, mock.patch("modules.embedding.EMBEDDING_BACKEND", "fake"):
+            build_test_artifact(os.path.join(tmp, "index"))
+            gold_path = os.path.join(tmp, "gold.jsonl")
+            with open(gold_path, "w") as f:
+                f.write("\n".join(json.dumps(entry) for entry in gold) + "\n")
+
+            self.assertEqual(len(load_gold_set(gold_path)), 3)
+            report = run_evaluation("artifact", os.path.join(tmp, "index"), gold_path, ks=[4, 1], repeats=1)
+
+        self.assertEqual((report["index"]["chunks"], report["index"]["embedding_model"]), (30, "fake-384"))
+        first, second = report["results"]
+        self.assertEqual((first["k"], second["k"]), (1, 4))
+        self.assertEqual((first["recall"], first["hit_rate"], first["mrr"]), (0.667, 0.667, 0.667))
+        self.assertEqual(second["mrr"], 0.667)
+        self.assertGreaterEqual(first["query_ms"]["p50"], first["search_ms"]["p50"])
+
+
+class TestColdStart(unittest.TestCase):
+    """Test that serving imports stay lightweight"""
+
+    def test_app_import_defers_heavy_modules(self):
+        """Test that importing app loads no model, vector store or PDF dependencies"""
+        from benchmarks.import_time import measure_import
+
+        report = measure_import("app")
+
+        self.assertEqual(report["eager_deferred_modules"], [])
+
+
+if __name__ == "__main__":
+    result = unittest.main(exit=False, verbosity=2).result
+    sys.exit(0 if result.wasSuccessful() else 1)
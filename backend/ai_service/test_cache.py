@@ -0,0 +1,324 @@
+"""
+Cache Test Suite
+Tests the two-tier cache against the in-memory Redis stand-in: TTL and LRU
+bounds, sharing between replicas, stampede protection, a failing shared
+tier, and answers and assessments keyed by the index version.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from test_index_artifact import build_test_artifact
+
+
+class BrokenRedis:
+    """A shared tier that is down"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __getattr__(self, name):
+        def fail(*args, **kwargs):
+            self.calls += 1
+            raise ConnectionError("connection refused")
+        return fail
+
+
+class TestTiers(unittest.TestCase):
+    """Test the local LRU and the Redis stand-in"""
+
+    def test_lru_bound_and_ttl(self):
+        from modules.cache import LocalLRU, _MISSING
+
+        lru = LocalLRU(max_entries=2)
+        lru.set("a", 1, ttl=60)
+        lru.set("b", 2, ttl=60)
+        lru.get("a")
+        lru.set("c", 3, ttl=60)
+        lru.set("d", 4, ttl=0.01)
+        time.sleep(0.02)
+
+        self.assertEqual(lru.get("a"), _MISSING)
+        self.assertEqual(lru.get("c"), 3)
+        self.assertEqual(lru.get("d"), _MISSING)
+
+    def test_stand_in_set_options(self):
+        from modules.cache import InMemoryRedis
+
+        redis = InMemoryRedis()
+        self.assertTrue(redis.set("lock", "a", px=20, nx=True))
+        self.assertIsNone(redis.set("lock", "b", px=20, nx=True))
+        self.assertEqual(redis.get("lock"), b"a")
+        time.sleep(0.03)
+        self.assertIsNone(redis.get("lock"))
+        self.assertTrue(redis.set("lock", "b", ex=60, nx=True))
+        self.assertEqual(redis.delete("lock", "missing"), 1)
+
+    def test_lock_release_checks_token(self):
+        """Test that a replica whose lock expired cannot delete the lock another replica took since"""
+        from modules.cache import InMemoryRedis, RELEASE_LOCK_SCRIPT
+
+        redis = InMemoryRedis()
+        redis.set("k:lock", "token-b", px=1000, nx=True)
+
+        self.assertEqual(redis.eval(RELEASE_LOCK_SCRIPT, 1, "k:lock", "token-a"), 0)
+        self.assertEqual(redis.get("k:lock"), b"token-b")
+        self.assertEqual(redis.eval(RELEASE_LOCK_SCRIPT, 1, "k:lock", "token-b"), 1)
+        self.assertIsNone(redis.get("k:lock"))
+
+
+class TestTieredCache(unittest.TestCase):
+    """Test two replicas sharing one Redis-protocol tier"""
+
+    def setUp(self):
+        from modules.cache import InMemoryRedis, TieredCache
+
+        self.redis = InMemoryRedis()
+        self.replica_a = TieredCache("test", ttl_seconds=60, shared=self.redis, lock_seconds=2)
+        self.replica_b = TieredCache("test", ttl_seconds=60, shared=self.redis, lock_seconds=2)
+
+    def test_value_shared_between_replicas(self):
+        key = self.replica_a.key("v1", "How do I lime my pond?")
+        self.replica_a.get_or_compute(key, lambda: {"answer": "Spread lime ✓"})
+
+        value = self.replica_b.get_or_compute(key, mock.Mock(side_effect=AssertionError("recomputed")))
+
+        self.assertEqual(value, {"answer": "Spread lime ✓"})
+        self.assertIsNone(self.replica_b.get(self.replica_b.key("v2", "How do I lime my pond?")))
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+
+        def slow():
+            calls.append(1)
+            time.sleep(0.1)
+            return "value"
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.replica_a.get_or_compute("k", slow)))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["value"] * 8)
+
+    def test_replica_waits_for_value_being_computed(self):
+        started = threading.Event()
+
+        def slow():
+            started.set()
+            time.sleep(0.2)
+            return "from a"
+
+        thread = threading.Thread(target=self.replica_a.get_or_compute, args=("k", slow))
+        thread.start()
+        started.wait()
+        value = self.replica_b.get_or_compute("k", mock.Mock(side_effect=AssertionError("stampede")))
+        thread.join()
+
+        self.assertEqual(value, "from a")
+
+    def test_errors_are_shared_and_not_cached(self):
+        with self.assertRaises(RuntimeError):
+            self.replica_a.get_or_compute("k", mock.Mock(side_effect=RuntimeError("rate limited")))
+        self.assertEqual(self.replica_a.get_or_compute("k", lambda: "retried"), "retried")
+        self.assertIsNone(self.redis.get("k:lock"))
+
+    def test_unlocked_cache_skips_shared_lock(self):
+        """Test that a cache without the lock costs one GET and one SET on a miss"""
+        from modules.cache import TieredCache
+
+        cache = TieredCache("test", ttl_seconds=60, shared=self.redis, lock=False)
+        with mock.patch.object(self.redis, "set", wraps=self.redis.set) as set_, \
+                mock.patch.object(self.redis, "get", wraps=self.redis.get) as get, \
+                mock.patch.object(self.redis, "eval", wraps=self.redis.eval) as eval_:
+            self.assertEqual(cache.get_or_compute("k", lambda: "value"), "value")
+
+        self.assertEqual((get.call_count, set_.call_count, eval_.call_count), (1, 1, 0))
+        self.assertNotIn("nx", set_.call_args.kwargs)
+        self.assertEqual(self.replica_a.get("k"), "value")
+
+    def test_uncacheable_value_not_stored(self):
+        value = self.replica_a.get_or_compute("k", lambda: "rejected", cacheable=lambda v: v != "rejected")
+
+        self.assertEqual(value, "rejected")
+        self.assertIsNone(self.replica_a.get("k"))
+        self.assertIsNone(self.redis.get("k"))
+        self.assertIsNone(self.redis.get("k:lock"))
+
+    def test_shared_tier_down(self):
+        """Test that an unreachable shared tier falls back to the local tier and backs off"""
+        from modules.cache import TieredCache
+
+        broken = BrokenRedis()
+        cache = TieredCache("test", ttl_seconds=60, shared=broken)
+
+        self.assertEqual(cache.get_or_compute("k", lambda: "value"), "value")
+        calls = broken.calls
+        self.assertEqual(cache.get_or_compute("k", mock.Mock(side_effect=AssertionError("recomputed"))), "value")
+        self.assertEqual(cache.get_or_compute("other", lambda: "computed"), "computed")
+        self.assertEqual(broken.calls, calls)
+
+    def test_disabled(self):
+        from modules.cache import TieredCache
+
+        cache = TieredCache("test", ttl_seconds=60, enabled=False)
+        compute = mock.Mock(return_value="value")
+        cache.get_or_compute("k", compute)
+        cache.get_or_compute("k", compute)
+
+        self.assertEqual(compute.call_count, 2)
+        self.assertIsNone(cache.get("k"))
+
+
+class TestPipelineCaches(unittest.TestCase):
+    """Test answers and assessments cached under the index version"""
+
+    def setUp(self):
+        import modules.rag_pipeline as rag_pipeline
+        from modules.cache import InMemoryRedis, TieredCache, ASSESSMENT_CACHE
+        from modules.index_generations import new_generation_dir, promote
+
+        self.root = tempfile.mkdtemp(prefix="likai-test-")
+        self.redis = InMemoryRedis()
+        self.llm_calls = []
+        self.patches = [
+            mock.patch("modules.embedding.EMBEDDING_BACKEND", "fake"),
+            mock.patch.object(rag_pipeline, "INDEX_ARTIFACT_PATH", self.root),
+            mock.patch.object(rag_pipeline, "INDEX_RELOAD_SECONDS", 0),
+            mock.patch.object(rag_pipeline, "_vector_db", None),
+            mock.patch.object(rag_pipeline, "_index_dir", None),
+            mock.patch.object(rag_pipeline, "_segment_table", None),
+            mock.patch.object(rag_pipeline, "invoke_llm", side_effect=self.fake_llm),
+            mock.patch.object(rag_pipeline, "ANSWER_CACHE", TieredCache("answer", 60, shared=self.redis)),
+            mock.patch.object(rag_pipeline, "ASSESSMENT_CACHE", TieredCache(
+                "assessment", 60, shared=self.redis, encode=ASSESSMENT_CACHE._encode, decode=ASSESSMENT_CACHE._decode,
+            )),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+        generation = new_generation_dir(self.root)
+        build_test_artifact(generation)
+        promote(self.root, os.path.basename(generation))
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def fake_llm(self, prompt):
+        from modules.stub_llm import build_stub_assessment
+
+        self.llm_calls.append(prompt)
+        return build_stub_assessment() if "Overall Score" in prompt else f"Answer {len(self.llm_calls)}"
+
+    def new_replica(self):
+        """Another process: empty local tiers, same shared tier"""
+        import modules.rag_pipeline as rag_pipeline
+
+        rag_pipeline.ANSWER_CACHE.clear()
+        rag_pipeline.ASSESSMENT_CACHE.clear()
+
+    def test_answer_reused_until_index_changes(self):
+        import modules.rag_pipeline as rag_pipeline
+        from modules.rag_pipeline import get_vector_db, load_index_artifact, lookup_cached_answer, query_farm_knowledge
+
+        question = "How do I prepare my pond before stocking?"
+        get_vector_db()
+        first = query_farm_knowledge(question)
+        self.new_replica()
+
+        self.assertEqual(lookup_cached_answer("how do I prepare my pond before stocking"), first)
+        self.assertEqual(query_farm_knowledge(question), first)
+        self.assertEqual(len(self.llm_calls), 1)
+        self.assertIsNone(lookup_cached_answer("What is white spot disease?"))
+
+        path = os.path.join(self.root, "changed")
+        build_test_artifact(path, chunk_count=20)
+        rag_pipeline._vector_db = load_index_artifact(path)
+
+        self.assertIsNone(lookup_cached_answer(question))
+        self.assertNotEqual(query_farm_knowledge(question), first)
+
+    def test_off_topic_answers_not_cached(self):
+        from modules.guardrail import OFF_TOPIC_MESSAGE, GuardrailVerdict
+        from modules.rag_pipeline import get_vector_db, lookup_cached_answer, query_farm_knowledge
+
+        get_vector_db()
+        with mock.patch("modules.rag_pipeline.check_question",
+                        return_value=GuardrailVerdict(on_topic=False, reason="off_topic_phrase")):
+            self.assertEqual(query_farm_knowledge("Write me a poem"), OFF_TOPIC_MESSAGE)
+
+        self.assertIsNone(lookup_cached_answer("Write me a poem"))
+
+    def test_session_answers_not_cached(self):
+        from modules.rag_pipeline import get_vector_db, lookup_cached_answer, query_farm_knowledge
+
+        get_vector_db()
+        query_farm_knowledge("How do I prepare my pond before stocking?", session_id="s1")
+
+        self.assertIsNone(lookup_cached_answer("How do I prepare my pond before stocking?"))
+
+    def test_assessment_reused(self):
+        from modules.rag_pipeline import lookup_cached_assessment, process_farm_assessment
+        from modules.schemas import AssessmentData
+        from benchmarks.synthetic import generate_profiles
+
+        profile = AssessmentData(**generate_profiles(1, seed=5)[0])
+        self.assertIsNone(lookup_cached_assessment(profile))
+        first = process_farm_assessment(profile)
+        self.new_replica()
+
+        self.assertEqual(lookup_cached_assessment(profile), first)
+        self.assertEqual(process_farm_assessment(profile), first)
+        self.assertEqual(len(self.llm_calls), 1)
+
+
+class TestCachedEndpoints(unittest.TestCase):
+    """Test that cached answers and assessments skip admission and the pipeline"""
+
+    @classmethod
+    def setUpClass(cls):
+        from fastapi.testclient import TestClient
+        from app import app
+        cls.client = TestClient(app)
+
+    def test_cached_answer_served(self):
+        with mock.patch("app.lookup_faq_answer", return_value=None), \
+                mock.patch("app.lookup_cached_answer", return_value="Lime the pond bottom."), \
+                mock.patch("app.query_farm_knowledge", side_effect=AssertionError("ran pipeline")):
+            response = self.client.post("/query", json={"question": "How do I prepare my pond?"})
+            streamed = self.client.post("/query/stream", json={"question": "How do I prepare my pond?"})
+
+        self.assertEqual(response.json()["answer"], "Lime the pond bottom.")
+        self.assertIn('"token": "Lime the pond bottom."', streamed.text)
+
+    def test_cached_assessment_served(self):
+        from modules.admission import AdmissionPool
+        from modules.rag_pipeline import parse_ai_response
+        from modules.stub_llm import build_stub_assessment
+        from benchmarks.synthetic import generate_profiles
+
+        full = AdmissionPool("assessment", max_concurrency=0, max_queue=0, max_queue_wait=1)
+        with mock.patch("app.ASSESSMENT_POOL", full), \
+                mock.patch("app.lookup_cached_assessment", return_value=parse_ai_response(build_stub_assessment())), \
+                mock.patch("app.process_farm_assessment", side_effect=AssertionError("ran pipeline")):
+            response = self.client.post("/process-assessment", json=generate_profiles(1)[0])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["tasks"]), 8)
+
+
+if __name__ == "__main__":
+    result = unittest.main(exit=False, verbosity=2).result
+    sys.exit(0 if result.wasSuccessful() else 1)
@@ -0,0 +1,270 @@
+"""
+Chunk Store Test Suite
+Tests storing parsed PDF chunks by source hash and reusing them instead of
+parsing the PDF again.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from langchain_core.documents import Document
+
+CHUNKER = {"splitter": "recursive_character", "chunk_size": 1000, "chunk_overlap": 200}
+
+
+def make_pages(count=4, source="gaqp_manual.pdf"):
+    return [
+        Document(page_content=f"Page {i}: lime the pond bottom ✓ before stocking.\n\nCheck aeration daily.",
+                 metadata={"source": source, "category": "gaqp", "page": i, "total_pages": count})
+        for i in range(count)
+    ]
+
+
+def fake_pages(pages, fail_at=None, calls=None):
+    """Stand-in for iter_pdf_pages that can crash after a given page"""
+    def iter_pages(filepath, filename, start_page=0):
+        if calls is not None:
+            calls.append(start_page)
+        for page in pages[start_page:]:
+            if page.metadata["page"] == fail_at:
+                raise RuntimeError("parser crashed")
+            yield page
+    return iter_pages
+
+
+def make_chunks(count=5, source="gaqp_manual.pdf"):
+    return [
+        Document(page_content=f"Chunk {i} about pond liming ✓ and aeration.",
+                 metadata={"source": source, "category": "gaqp", "page": i // 2})
+        for i in range(count)
+    ]
+
+
+class TestChunkStore(unittest.TestCase):
+    """Test the on-disk chunk store"""
+
+    def setUp(self):
+        from modules.chunk_store import ChunkStore
+
+        self.tmp = tempfile.mkdtemp(prefix="likai-test-")
+        self.store = ChunkStore(os.path.join(self.tmp, "chunks"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_round_trip(self):
+        """Test that text, page and metadata come back unchanged and in order"""
+        chunks = make_chunks()
+        self.assertEqual(self.store.write("a" * 64, "gaqp_manual.pdf", iter(chunks), CHUNKER, size=123), 5)
+
+        loaded = list(self.store.read("a" * 64))
+        self.assertEqual([c.page_content for c in loaded], [c.page_content for c in chunks])
+        self.assertEqual([c.metadata for c in loaded], [c.metadata for c in chunks])
+        self.assertEqual(self.store.header("a" * 64)["size"], 123)
+        self.assertEqual(os.listdir(self.store.root), [os.path.basename(self.store.path("a" * 64))])
+
+    def test_gzip_without_zstandard(self):
+        """Test that the store falls back to gzip and replaces the zstd copy"""
+        self.store.write("b" * 64, "gaqp_manual.pdf", make_chunks(2), CHUNKER)
+        with mock.patch("modules.chunk_store.zstandard", None):
+            self.store.write("b" * 64, "gaqp_manual.pdf", make_chunks(3), CHUNKER)
+            self.assertTrue(self.store.path("b" * 64).endswith(".jsonl.gz"))
+            self.assertEqual(len(list(self.store.read("b" * 64))), 3)
+        self.assertEqual(len(os.listdir(self.store.root)), 1)
+
+    def test_chunker_settings_must_match(self):
+        """Test that chunks cut with other settings are not reused"""
+        self.store.write("c" * 64, "gaqp_manual.pdf", make_chunks(), CHUNKER)
+
+        self.assertTrue(self.store.has("c" * 64, CHUNKER))
+        self.assertFalse(self.store.has("c" * 64, dict(CHUNKER, chunk_size=500)))
+        self.assertFalse(self.store.has("d" * 64, CHUNKER))
+
+    def test_failed_write_leaves_previous_version(self):
+        """Test that an interrupted write keeps the earlier chunks readable"""
+        self.store.write("e" * 64, "gaqp_manual.pdf", make_chunks(2), CHUNKER)
+
+        def broken():
+            yield from make_chunks(1)
+            raise RuntimeError("parser crashed")
+
+        with self.assertRaises(RuntimeError):
+            self.store.write("e" * 64, "gaqp_manual.pdf", broken(), CHUNKER)
+        self.assertEqual(len(list(self.store.read("e" * 64))), 2)
+        self.assertEqual(len(os.listdir(self.store.root)), 1)
+
+    def test_iter_chunks_across_sources(self):
+        self.store.write("f" * 64, "b_manual.pdf", make_chunks(2, "b_manual.pdf"), CHUNKER)
+        self.store.write("0" * 64, "a_manual.pdf", make_chunks(3, "a_manual.pdf"), CHUNKER)
+
+        self.assertEqual([h["source"] for h in self.store.sources()], ["a_manual.pdf", "b_manual.pdf"])
+        self.assertEqual(len(list(self.store.iter_chunks(CHUNKER))), 5)
+        self.assertEqual(list(self.store.iter_chunks(dict(CHUNKER, chunk_size=1))), [])
+
+    def test_writer_drops_uncommitted_page(self):
+        """Test that a resumed writer discards chunks written after the last checkpoint"""
+        writer = self.store.open_writer("1" * 64, "gaqp_manual.pdf", CHUNKER)
+        writer.add_page(0, make_chunks(2))
+        writer._file.write(b'{"text": "half a pa')
+        writer.close()
+
+        writer = self.store.open_writer("1" * 64, "gaqp_manual.pdf", CHUNKER)
+        self.assertEqual((writer.next_page, writer.chunk_count), (1, 2))
+        writer.add_page(1, make_chunks(1))
+        self.assertEqual(writer.finish(), 3)
+        self.assertEqual(len(list(self.store.read("1" * 64))), 3)
+        self.assertEqual(os.listdir(self.store.root), [os.path.basename(self.store.path("1" * 64))])
+
+    def test_writer_restarts_with_other_chunker(self):
+        writer = self.store.open_writer("2" * 64, "gaqp_manual.pdf", CHUNKER)
+        writer.add_page(0, make_chunks(2))
+        writer.close()
+
+        writer = self.store.open_writer("2" * 64, "gaqp_manual.pdf", dict(CHUNKER, chunk_size=500))
+        self.assertFalse(writer.resumed)
+        self.assertEqual(list(writer.committed_chunks()), [])
+        writer.close()
+
+
+class TestDocumentLoaderUsesStore(unittest.TestCase):
+    """Test that a PDF is parsed once and then served from the store"""
+
+    def setUp(self):
+        from modules.chunk_store import ChunkStore
+
+        self.tmp = tempfile.mkdtemp(prefix="likai-test-")
+        pdf_dir = os.path.join(self.tmp, "pdfs")
+        os.makedirs(pdf_dir)
+        with open(os.path.join(pdf_dir, "gaqp_manual.pdf"), "wb") as f:
+            f.write(b"%PDF-1.4 not really a pdf")
+        self.patches = [
+            mock.patch("modules.document_loader.PDF_DIR", pdf_dir),
+            mock.patch("modules.document_loader.PROCESSED_DIR", os.path.join(self.tmp, "processed")),
+            mock.patch("modules.document_loader.CHUNK_STORE", ChunkStore(os.path.join(self.tmp, "chunks"))),
+            mock.patch("modules.embedding.EMBEDDING_BACKEND", "fake"),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_second_load_skips_parsing(self):
+        from modules.document_loader import process_single_pdf
+
+        calls = []
+        with mock.patch("modules.document_loader.iter_pdf_pages", fake_pages(make_pages(), calls=calls)):
+            first = process_single_pdf("gaqp_manual.pdf")
+            second = process_single_pdf("gaqp_manual.pdf")
+            self.assertEqual(len(calls), 1)
+
+            process_single_pdf("gaqp_manual.pdf", reparse=True)
+            self.assertEqual(len(calls), 2)
+
+        self.assertEqual(len(first), 4)
+        self.assertEqual([c.page_content for c in second], [c.page_content for c in first])
+
+    def test_changed_pdf_is_parsed_again(self):
+        from modules.document_loader import PDF_DIR, process_single_pdf
+
+        calls = []
+        with mock.patch("modules.document_loader.iter_pdf_pages", fake_pages(make_pages(), calls=calls)):
+            process_single_pdf("gaqp_manual.pdf")
+            with open(os.path.join(PDF_DIR, "gaqp_manual.pdf"), "ab") as f:
+                f.write(b" revised")
+            process_single_pdf("gaqp_manual.pdf")
+
+        self.assertEqual(len(calls), 2)
+
+    def test_crashed_ingest_resumes_after_last_page(self):
+        """Test that a crash mid-PDF resumes at the next page and yields the same chunks"""
+        from modules.document_loader import CHUNK_STORE, ingest_pdf
+
+        pages, calls = make_pages(6), []
+        with mock.patch("modules.document_loader.iter_pdf_pages", fake_pages(pages, fail_at=3, calls=calls)):
+            with self.assertRaises(RuntimeError):
+                list(ingest_pdf("gaqp_manual.pdf"))
+        self.assertEqual(CHUNK_STORE.sources(), [])
+
+        with mock.patch("modules.document_loader.iter_pdf_pages", fake_pages(pages, calls=calls)):
+            resumed = list(ingest_pdf("gaqp_manual.pdf"))
+            clean = list(ingest_pdf("gaqp_manual.pdf", reparse=True))
+
+        self.assertEqual(calls, [0, 3, 0])
+        self.assertEqual([c.metadata["page"] for c in resumed], list(range(6)))
+        self.assertEqual([c.page_content for c in resumed], [c.page_content for c in clean])
+        self.assertEqual(len(CHUNK_STORE.sources()), 1)
+
+    def test_pages_read_from_open_file(self):
+        """Test that pages come from a reader on the open file, not a copy of the whole PDF"""
+        import hashlib
+        from pypdf import PdfReader, PdfWriter
+        from modules.document_loader import PDF_DIR, get_pdf_hash, iter_pdf_pages
+
+        path = os.path.join(PDF_DIR, "gaqp_blank.pdf")
+        writer = PdfWriter()
+        for _ in range(3):
+            writer.add_blank_page(width=200, height=200)
+        with open(path, "wb") as f:
+            writer.write(f)
+
+        readers, label_reads = [], []
+        page_labels = PdfReader.page_labels
+        with mock.patch("modules.document_loader.PdfReader", side_effect=lambda s: readers.append(s) or PdfReader(s)), \
+                mock.patch.object(PdfReader, "page_labels",
+                                  property(lambda reader: label_reads.append(1) or page_labels.fget(reader))):
+            pages = list(iter_pdf_pages(path, "gaqp_blank.pdf", start_page=1))
+
+        self.assertEqual([p.metadata["page"] for p in pages], [1, 2])
+        self.assertEqual([p.metadata["page_label"] for p in pages], ["2", "3"])
+        self.assertEqual(pages[0].metadata["total_pages"], 3)
+        # The label list is built once per document, not once per page
+        self.assertEqual(len(label_reads), 1)
+        self.assertFalse(isinstance(readers[0], str))
+        self.assertTrue(readers[0].closed)
+        with open(path, "rb") as f:
+            self.assertEqual(get_pdf_hash(path), hashlib.md5(f.read()).hexdigest())
+
+
+class TestStreamingBuild(unittest.TestCase):
+    """Test that chunks are embedded as they are produced"""
+
+    def test_artifact_built_one_batch_at_a_time(self):
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        from modules.index_artifact import build_artifact_from_documents
+
+        produced, batches = [0], []
+        fake = DeterministicFakeEmbedding(size=16)
+
+        def documents():
+            for chunk in make_chunks(25):
+                produced[0] += 1
+                yield chunk
+
+        class RecordingEmbeddings:
+            def embed_documents(self, texts):
+                batches.append((produced[0], len(texts)))
+                return fake.embed_documents(texts)
+
+        tmp = tempfile.mkdtemp(prefix="likai-test-")
+        try:
+            manifest = build_artifact_from_documents(
+                os.path.join(tmp, "index"), documents(), RecordingEmbeddings(), "fake-16", batch_size=10
+            )
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+        self.assertEqual(manifest["chunk_count"], 25)
+        # Each batch is embedded before the next chunk is produced
+        self.assertEqual(batches, [(10, 10), (20, 10), (25, 5)])
+
+
+if __name__ == "__main__":
+    result = unittest.main(exit=False, verbosity=2).result
+    sys.exit(0 if result.wasSuccessful() else 1)
@@ -0,0 +1,80 @@
+"""
+Chunking Test Suite
+Tests token-aware chunking against the embedding model's sequence limit,
+offline with the approximate tokenizer.
+"""
+
+import sys
+import unittest
+from unittest import mock
+
+from langchain_core.documents import Document
+
+PAGE = (
+    "Pond preparation starts with drying the bottom and applying agricultural lime "
+    "at a rate matched to the soil pH. " * 12
+    + "\n\n"
+    + "Water quality monitoring covers dissolved oxygen, pH, salinity and ammonia, "
+    "measured at dawn and in the afternoon. " * 12
+)
+
+
+class TestChunking(unittest.TestCase):
+    """Test the token-aware splitter and its statistics"""
+
+    def setUp(self):
+        self.patch = mock.patch("modules.embedding.EMBEDDING_BACKEND", "fake")
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+
+    def test_chunks_fit_sequence_limit(self):
+        from modules.chunking import EMBEDDING_MAX_TOKENS, get_text_splitter, get_token_counter
+
+        counter = get_token_counter()
+        chunks = get_text_splitter().split_documents([Document(page_content=PAGE, metadata={"page": 0})])
+
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertLessEqual(counter.count(chunk.page_content) + counter.special_tokens, EMBEDDING_MAX_TOKENS)
+            self.assertEqual(chunk.metadata, {"page": 0})
+
+    def test_tokenizer_loaded_once(self):
+        from modules.chunking import get_token_counter
+
+        self.assertIs(get_token_counter(), get_token_counter())
+
+    def test_chunker_records_tokenizer(self):
+        """Test that another embedding model means other chunker settings"""
+        from modules.chunking import get_chunker
+
+        fake = get_chunker()
+        with mock.patch("modules.embedding.EMBEDDING_BACKEND", "huggingface"):
+            self.assertNotEqual(get_chunker(), fake)
+        self.assertEqual(fake["tokenizer"], "approx-wordpiece")
+
+    def test_stats_report_truncation(self):
+        from modules.chunking import ChunkStats, get_text_splitter
+
+        stats = ChunkStats(max_tokens=256)
+        long_chunk = Document(page_content=PAGE, metadata={})
+        chunks = get_text_splitter().split_documents([long_chunk])
+        passed = list(stats.track(chunks + [long_chunk]))
+
+        summary = stats.summary()
+        self.assertEqual(len(passed), len(chunks) + 1)
+        self.assertEqual(summary["chunks"], len(chunks) + 1)
+        self.assertEqual(summary["truncated_chunks"], 1)
+        self.assertEqual(summary["tokens_max"], summary["truncated_tokens"] + 256)
+        self.assertLessEqual(summary["tokens_p50"], 256)
+
+    def test_empty_stats(self):
+        from modules.chunking import ChunkStats
+
+        self.assertEqual(ChunkStats().summary()["chunks"], 0)
+
+
+if __name__ == "__main__":
+    result = unittest.main(exit=False, verbosity=2).result
+    sys.exit(0 if result.wasSuccessful() else 1)
@@ -0,0 +1,256 @@
+"""
+FAQ Store Test Suite
+Tests precomputed FAQ answers: the store, the batch job's incremental
+regeneration and bounded concurrency, and serving stored answers from /query,
+offline with fake embeddings and a synthetic index artifact.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from test_index_artifact import build_test_artifact
+
+QUESTIONS = [
+    "How do I prepare my pond before stocking?",
+    "What causes high ammonia in shrimp ponds?",
+    "How do I prevent white spot disease?",
+    "What's the weather forecast for tomorrow?",
+]
+
+
+def build_changed_artifact(output_dir, chunk_count=30):
+    """An index whose chunks all differ from build_test_artifact's"""
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+    from benchmarks.synthetic import generate_chunks
+    from modules.index_artifact import build_artifact
+
+    chunks = generate_chunks(chunk_count, seed=11)
+    return build_artifact(
+        output_dir, [c["text"] + " (revised)" for c in chunks], [c["metadata"] for c in chunks],
+        embeddings=DeterministicFakeEmbedding(size=384), embedding_model="fake-384",
+    )
+
+
+class TestFaqStore(unittest.TestCase):
+    """Test the on-disk store and entry validity"""
+
+    def setUp(self):
+        from modules.faq_store import FaqStore
+
+        self.tmp = tempfile.mkdtemp(prefix="likai-test-")
+        self.store = FaqStore(os.path.join(self.tmp, "faq_answers.json"), reload_seconds=0)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def entry(self, question="How do I lime my pond?", chunk_ids=("a", "b")):
+        from modules.faq_store import FaqEntry
+
+        return FaqEntry(question=question, answer="Spread agricultural lime ✓", chunk_ids=list(chunk_ids),
+                        index_version="v1")
+
+    def test_round_trip_and_normalized_match(self):
+        from modules.faq_store import FaqStore
+
+        self.store.save({"how do i lime my pond": self.entry()})
+        other = FaqStore(self.store.path, reload_seconds=0)
+
+        self.assertEqual(other.get("How do I lime my pond??").answer, "Spread agricultural lime ✓")
+        self.assertIsNone(other.get("How do I lime my dog?"))
+
+    def test_reloads_when_file_changes(self):
+        from modules.faq_store import FaqStore
+
+        reader = FaqStore(self.store.path, reload_seconds=0)
+        self.assertIsNone(reader.get("How do I lime my pond?"))
+        self.store.save({"how do i lime my pond": self.entry()})
+        self.assertIsNotNone(reader.get("How do I lime my pond?"))
+
+    def test_entry_valid_only_while_chunks_exist(self):
+        entry = self.entry()
+        index = mock.Mock(version="v2")
+
+        index.has_ids.return_value = True
+        self.assertTrue(entry.is_valid_for(index))
+        index.has_ids.return_value = False
+        self.assertFalse(entry.is_valid_for(index))
+        self.assertTrue(entry.is_valid_for(mock.Mock(version="v1")))
+        self.assertFalse(entry.is_valid_for(object()))
+
+    def test_unreadable_file_is_empty(self):
+        with open(self.store.path, "w") as f:
+            f.write("{not json")
+        self.assertEqual(self.store.load(), {})
+
+
+class TestPrecompute(unittest.TestCase):
+    """Test the batch job against a synthetic index"""
+
+    def setUp(self):
+        import modules.rag_pipeline as rag_pipeline
+        from modules.faq_store import FaqStore
+        from modules.index_generations import new_generation_dir, promote
+
+        self.root = tempfile.mkdtemp(prefix="likai-test-")
+        self.store = FaqStore(os.path.join(self.root, "faq_answers.json"), reload_seconds=0)
+        self.llm_calls = []
+        self.patches = [
+            mock.patch("modules.embedding.EMBEDDING_BACKEND", "fake"),
+            mock.patch.object(rag_pipeline, "INDEX_ARTIFACT_PATH", self.root),
+            mock.patch.object(rag_pipeline, "INDEX_RELOAD_SECONDS", 0),
+            mock.patch.object(rag_pipeline, "_vector_db", None),
+            mock.patch.object(rag_pipeline, "_index_dir", None),
+            mock.patch.object(rag_pipeline, "_segment_table", None),
+            mock.patch.object(rag_pipeline, "invoke_llm", side_effect=self.fake_llm),
+            mock.patch.object(rag_pipeline, "FAQ_STORE", self.store),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+        generation = new_generation_dir(self.root)
+        build_test_artifact(generation)
+        promote(self.root, os.path.basename(generation))
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def fake_llm(self, prompt):
+        self.llm_calls.append(prompt)
+        return f"Answer {len(self.llm_calls)}"
+
+    def swap_to_changed_index(self):
+        import modules.rag_pipeline as rag_pipeline
+        from modules.rag_pipeline import load_index_artifact
+
+        path = os.path.join(self.root, "changed")
+        build_changed_artifact(path)
+        rag_pipeline._vector_db = load_index_artifact(path)
+
+    def test_answers_stored_and_served(self):
+        from precompute_faq import precompute
+        from modules.rag_pipeline import get_vector_db, lookup_faq_answer
+
+        report = precompute(QUESTIONS, store=self.store)
+
+        self.assertEqual((report["generated"], report["entries"]), (3, 3))
+        self.assertEqual(report["off_topic"], [QUESTIONS[3]])
+        entry = self.store.get(QUESTIONS[0])
+        self.assertEqual(entry.index_version, get_vector_db().version)
+        self.assertEqual(len(entry.chunk_ids), 4)
+        self.assertEqual(lookup_faq_answer("how do I prepare my pond before stocking"), entry.answer)
+        self.assertIsNone(lookup_faq_answer("How do I prepare my pond after harvest?"))
+
+    def test_rerun_regenerates_only_changed_entries(self):
+        """Test that unchanged retrieval reuses answers and changed chunks stop them being served"""
+        from precompute_faq import precompute
+        from modules.rag_pipeline import lookup_faq_answer
+
+        precompute(QUESTIONS, store=self.store)
+        self.assertEqual(precompute(QUESTIONS, store=self.store)["generated"], 0)
+        self.assertEqual(len(self.llm_calls), 3)
+
+        self.swap_to_changed_index()
+        self.assertIsNone(lookup_faq_answer(QUESTIONS[0]))
+
+        report = precompute(QUESTIONS, store=self.store)
+        self.assertEqual((report["generated"], report["unchanged"], report["stale"]), (3, 0, 0))
+        self.assertEqual(lookup_faq_answer(QUESTIONS[0]), self.store.get(QUESTIONS[0]).answer)
+
+    def test_lookup_never_opens_index(self):
+        import modules.rag_pipeline as rag_pipeline
+        from precompute_faq import precompute
+        from modules.rag_pipeline import lookup_faq_answer
+
+        precompute(QUESTIONS[:1], store=self.store)
+        rag_pipeline._vector_db = None
+        with mock.patch.object(rag_pipeline, "load_index_artifact", side_effect=AssertionError("opened index")):
+            self.assertIsNone(lookup_faq_answer(QUESTIONS[0]))
+
+    def test_bounded_concurrency(self):
+        from precompute_faq import precompute
+
+        active, peak, lock = [0], [0], threading.Lock()
+
+        def slow_llm(prompt):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            return "answer"
+
+        questions = [f"How do I manage pond water quality in week {i}?" for i in range(8)]
+        with mock.patch("modules.rag_pipeline.invoke_llm", side_effect=slow_llm):
+            report = precompute(questions, store=self.store, concurrency=2)
+
+        self.assertEqual(report["generated"], 8)
+        self.assertEqual(peak[0], 2)
+
+    def test_failed_regeneration_drops_entry(self):
+        from precompute_faq import precompute
+
+        precompute(QUESTIONS[:1], store=self.store)
+        with mock.patch("modules.rag_pipeline.invoke_llm", side_effect=RuntimeError("rate limited")):
+            report = precompute(QUESTIONS[:1], store=self.store, force=True)
+
+        self.assertEqual(len(report["failed"]), 1)
+        self.assertIsNone(self.store.get(QUESTIONS[0]))
+
+    def test_questions_mined_from_logs(self):
+        import json
+        from precompute_faq import mine_questions
+
+        path = os.path.join(self.root, "app.jsonl")
+        events = [
+            {"msg": "query_payload", "session_id": None, "question": "What is white spot?"},
+            {"msg": "query_payload", "session_id": None, "question": "what is WHITE spot"},
+            {"msg": "query_payload", "session_id": "s1", "question": "What is white spot?"},
+            {"msg": "query_payload", "session_id": None, "question": "How deep is a pond?"},
+            {"msg": "query_completed", "session_id": None},
+        ]
+        with open(path, "w") as f:
+            f.write("\n".join(json.dumps(e) for e in events) + "\nnot json\n")
+
+        self.assertEqual(mine_questions([path], min_count=2), ["What is white spot?"])
+
+
+class TestFaqEndpoints(unittest.TestCase):
+    """Test that /query and /query/stream serve stored answers without the pipeline"""
+
+    @classmethod
+    def setUpClass(cls):
+        from fastapi.testclient import TestClient
+        from app import app
+        cls.client = TestClient(app)
+
+    def test_stored_answer_skips_pipeline(self):
+        with mock.patch("app.lookup_faq_answer", return_value="Dry the pond for two weeks."), \
+                mock.patch("app.query_farm_knowledge", side_effect=AssertionError("ran pipeline")):
+            response = self.client.post("/query", json={"question": "How do I prepare my pond?"})
+            streamed = self.client.post("/query/stream", json={"question": "How do I prepare my pond?"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["answer"], "Dry the pond for two weeks.")
+        self.assertIn('"token": "Dry the pond for two weeks."', streamed.text)
+        self.assertTrue(streamed.text.endswith("data: [DONE]\n\n"))
+
+    def test_session_questions_use_pipeline(self):
+        with mock.patch("app.lookup_faq_answer", side_effect=AssertionError("used FAQ")), \
+                mock.patch("app.query_farm_knowledge", return_value="From the pipeline"):
+            response = self.client.post("/query", json={"question": "How do I prepare my pond?", "session_id": "s1"})
+
+        self.assertEqual(response.json()["answer"], "From the pipeline")
+
+
+if __name__ == "__main__":
+    result = unittest.main(exit=False, verbosity=2).result
+    sys.exit(0 if result.wasSuccessful() else 1)
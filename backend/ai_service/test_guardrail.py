@@ -0,0 +1,122 @@
+"""
+Topic Guardrail Test Suite
+Tests the keyword matcher, the off-topic fast path and the embedding
+centroid classifier. Runs offline with a small hand-built embedding model.
+"""
+
+import sys
+import unittest
+from unittest import mock
+
+FARM_WORDS = {"shrimp", "pond", "stocking", "ammonia", "disease", "feed", "farm", "typhoons", "flooding", "harvest", "larvae"}
+OTHER_WORDS = {"movie", "basketball", "poem", "bitcoin", "joke", "cook", "adobo", "weather", "election", "homework"}
+
+
+class TopicEmbeddings:
+    """Two-dimensional embeddings: farm vocabulary vs. everything-else vocabulary"""
+
+    def embed_query(self, text):
+        words = {w.strip("?.,!'").lower() for w in text.split()}
+        return [len(words & FARM_WORDS) + 0.01, len(words & OTHER_WORDS) + 0.01]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+
+class TestKeywordMatcher(unittest.TestCase):
+    """Test the precompiled keyword tiers"""
+
+    def test_short_keywords_need_word_boundaries(self):
+        """Test that 'pl' and 'ph' no longer match inside unrelated words"""
+        from modules.guardrail import match_keywords
+
+        self.assertIsNone(match_keywords("Please explain how the Philippine economy works"))
+        self.assertTrue(match_keywords("Where can I buy healthy PLs?").on_topic)
+        self.assertTrue(match_keywords("What pH is best?").on_topic)
+
+    def test_inflected_keywords_match(self):
+        """Test that plurals and verb forms of farm keywords are accepted"""
+        from modules.guardrail import match_keywords
+
+        for question in ("How should I be feeding at night?", "Are my ponds too deep?", "Tips for farmers?"):
+            self.assertEqual(match_keywords(question).reason, "keyword", question)
+
+    def test_off_topic_phrase_rejected(self):
+        """Test that obvious off-topic questions are rejected by the fast path"""
+        from modules.guardrail import check_question
+
+        with mock.patch("modules.guardrail.get_embeddings_model", side_effect=AssertionError("embedded")):
+            verdict = check_question("What's the weather like today?")
+
+        self.assertFalse(verdict.on_topic)
+        self.assertEqual(verdict.reason, "off_topic_phrase")
+
+
+class TestCentroidClassifier(unittest.TestCase):
+    """Test the embedding-similarity tier"""
+
+    def setUp(self):
+        from modules.cache import EMBEDDING_CACHE
+        from modules.guardrail import TopicCentroids
+        self.patches = [
+            mock.patch("modules.guardrail.get_embeddings_model", return_value=TopicEmbeddings()),
+            # Keep the hand-built vectors out of the shared query embedding cache
+            mock.patch.object(EMBEDDING_CACHE, "enabled", False),
+            mock.patch("modules.guardrail.CENTROIDS", TopicCentroids()),
+            mock.patch("modules.guardrail.GUARDRAIL_MODE", "hybrid"),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+
+    def test_classifier_accepts_and_returns_vector(self):
+        """Test that a keyword-less farm question is accepted with its embedding"""
+        from modules.guardrail import check_question
+
+        verdict = check_question("How do I protect against typhoons and flooding?")
+
+        self.assertTrue(verdict.on_topic)
+        self.assertEqual(verdict.reason, "embedding")
+        self.assertIsNotNone(verdict.query_vector)
+
+    def test_classifier_rejects(self):
+        """Test that a keyword-less off-topic question is rejected"""
+        from modules.guardrail import check_question
+
+        verdict = check_question("How do I cook adobo?")
+
+        self.assertFalse(verdict.on_topic)
+        self.assertEqual(verdict.reason, "embedding")
+
+    def test_classifier_time_not_counted_as_guardrail(self):
+        """Test that nested stages don't add their time to the guardrail stage"""
+        import time
+        from modules.guardrail import CENTROIDS, check_question
+        from modules.metrics import start_stage_timings
+
+        score = CENTROIDS.score
+        timings = start_stage_timings()
+        with mock.patch.object(CENTROIDS, "score", lambda vector: (time.sleep(0.05), score(vector))[1]):
+            check_question("How do I protect against typhoons and flooding?")
+
+        self.assertGreaterEqual(timings["guardrail_classifier"], 0.05)
+        self.assertLess(timings["guardrail"], 0.05)
+
+    def test_rejected_question_skips_search_and_llm(self):
+        """Test that off-topic questions never reach the vector DB or Groq"""
+        from modules.rag_pipeline import query_farm_knowledge
+        from modules.guardrail import OFF_TOPIC_MESSAGE
+
+        with mock.patch("modules.rag_pipeline.get_vector_db", side_effect=AssertionError("searched")), \
+                mock.patch("modules.rag_pipeline.get_llm", side_effect=AssertionError("called LLM")):
+            answer = query_farm_knowledge("Tell me a joke about basketball")
+
+        self.assertEqual(answer, OFF_TOPIC_MESSAGE)
+
+
+if __name__ == "__main__":
+    result = unittest.main(exit=False, verbosity=2).result
+    sys.exit(0 if result.wasSuccessful() else 1)
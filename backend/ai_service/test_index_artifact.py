@@ -0,0 +1,143 @@
+"""
+Index Artifact Test Suite
+Tests building, verifying and loading portable index artifacts offline,
+using deterministic fake embeddings and synthetic knowledge-base chunks.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+
+def build_test_artifact(output_dir, chunk_count=30, **kwargs):
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+    from benchmarks.synthetic import generate_chunks
+    from modules.index_artifact import build_artifact
+
+    chunks = generate_chunks(chunk_count, seed=3)
+    return build_artifact(
+        output_dir,
+        [c["text"] for c in chunks],
+        [c["metadata"] for c in chunks],
+        embeddings=DeterministicFakeEmbedding(size=384),
+        embedding_model="fake-384",
+        sources=[{"filename": "synthetic-gaqp-manual.pdf", "sha256": "0" * 64, "size": 1}],
+        batch_size=7,
+        **kwargs,
+    )
+
+
+class TestIndexArtifact(unittest.TestCase):
+    """Test the artifact format and the read-only vector index"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix="likai-test-")
+        self.path = os.path.join(self.tmp, "index")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_manifest_describes_artifact(self):
+        """Test that the manifest records the model, counts, sources and checksums"""
+        manifest = build_test_artifact(self.path)
+
+        self.assertEqual(manifest["embedding_model"], "fake-384")
+        self.assertEqual(manifest["dimension"], 384)
+        self.assertEqual(manifest["chunk_count"], manifest["sources"][0]["chunks"])
+        self.assertIn("sha256", manifest["files"]["vectors.f32"])
+        self.assertEqual(os.listdir(self.tmp), ["index"])
+
+    def test_version_is_reproducible(self):
+        """Test that rebuilding the same chunks gives the same index version"""
+        first = build_test_artifact(self.path)
+        second = build_test_artifact(self.path, overwrite=True)
+        self.assertEqual(first["index_version"], second["index_version"])
+
+    def test_load_and_search(self):
+        """Test that a loaded artifact is read-only and returns the exact nearest chunk"""
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        from modules.index_artifact import load_artifact
+
+        build_test_artifact(self.path)
+        embeddings = DeterministicFakeEmbedding(size=384)
+        index = load_artifact(self.path, embeddings, expected_model="fake-384")
+
+        self.assertFalse(index.vectors.flags.writeable)
+        text = index.texts[5]
+        docs = index.similarity_search_by_vector(embeddings.embed_query(text), k=3)
+        self.assertEqual(docs[0].page_content, text)
+        self.assertEqual(docs[0].metadata["chunk_id"], index.ids[5])
+        self.assertEqual(len(index.get()["ids"]), len(index))
+
+    def test_mismatched_model_refused(self):
+        """Test that a server refuses an artifact built with another embedding model"""
+        from modules.index_artifact import IndexArtifactError, load_artifact
+
+        build_test_artifact(self.path)
+        with self.assertRaisesRegex(IndexArtifactError, "all-MiniLM-L6-v2"):
+            load_artifact(self.path, embeddings=None, expected_model="all-MiniLM-L6-v2")
+
+    def test_corruption_detected(self):
+        """Test that a modified chunk file fails checksum verification"""
+        from modules.index_artifact import IndexArtifactError, load_artifact
+
+        build_test_artifact(self.path)
+        with open(os.path.join(self.path, "chunks.jsonl"), "a") as f:
+            f.write("\n")
+        with self.assertRaisesRegex(IndexArtifactError, "Checksum"):
+            load_artifact(self.path, embeddings=None)
+
+
+class TestServerLoadsArtifact(unittest.TestCase):
+    """Test that the pipeline serves from an artifact instead of building an index"""
+
+    def setUp(self):
+        import modules.embedding
+        import modules.rag_pipeline
+
+        self.tmp = tempfile.mkdtemp(prefix="likai-test-")
+        self.path = os.path.join(self.tmp, "index")
+        modules.embedding._embeddings_model = None
+        modules.rag_pipeline._vector_db = None
+        self.patches = [
+            mock.patch("modules.embedding.EMBEDDING_BACKEND", "fake"),
+            mock.patch("modules.rag_pipeline.INDEX_ARTIFACT_PATH", self.path),
+            mock.patch("modules.rag_pipeline.VECTOR_DB_PATH", os.path.join(self.tmp, "vectordb")),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        import modules.rag_pipeline
+
+        for patch in self.patches:
+            patch.stop()
+        modules.rag_pipeline._vector_db = None
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_artifact_preferred(self):
+        """Test that get_vector_db loads the artifact without touching Chroma"""
+        from modules.rag_pipeline import get_vector_db, search_documents
+
+        build_test_artifact(self.path)
+        with mock.patch("modules.rag_pipeline.load_chroma_class", side_effect=AssertionError("opened Chroma")):
+            vector_db = get_vector_db()
+
+        self.assertEqual(len(search_documents(vector_db, "pond preparation", k=4)), 4)
+
+    def test_no_build_on_demand(self):
+        """Test that a replica without an artifact refuses to embed PDFs itself"""
+        from modules.rag_pipeline import get_vector_db
+
+        with mock.patch("modules.rag_pipeline.INDEX_BUILD_ON_DEMAND", False), \
+                mock.patch("modules.document_loader.process_pdfs", side_effect=AssertionError("built index")):
+            with self.assertRaisesRegex(ValueError, "build_index.py"):
+                get_vector_db()
+
+
+if __name__ == "__main__":
+    result = unittest.main(exit=False, verbosity=2).result
+    sys.exit(0 if result.wasSuccessful() else 1)
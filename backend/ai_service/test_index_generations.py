@@ -0,0 +1,201 @@
+"""
+Index Generations Test Suite
+Tests blue-green index builds: validation, atomic promotion, garbage
+collection and hot swapping in a running process, offline with fake embeddings.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from test_index_artifact import build_test_artifact
+
+
+def synthetic_chunks(count, seed=3):
+    from benchmarks.synthetic import generate_chunks
+
+    from langchain_core.documents import Document
+
+    chunks = generate_chunks(count, seed=seed)
+    sources = [{"filename": "synthetic-gaqp-manual.pdf", "sha256": "0" * 64, "size": 1}]
+    return sources, (Document(page_content=c["text"], metadata=c["metadata"]) for c in chunks)
+
+
+class TestGenerations(unittest.TestCase):
+    """Test promotion, validation and garbage collection"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="likai-test-")
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def add_generation(self, chunk_count=30):
+        from modules.index_generations import new_generation_dir
+
+        path = new_generation_dir(self.root)
+        build_test_artifact(path, chunk_count=chunk_count)
+        return os.path.basename(path)
+
+    def test_promote_and_resolve(self):
+        from modules.index_generations import promote, resolve_index_dir
+
+        self.assertIsNone(resolve_index_dir(self.root))
+        first, second = self.add_generation(), self.add_generation()
+        promote(self.root, first)
+        self.assertEqual(resolve_index_dir(self.root), os.path.join(self.root, first))
+        promote(self.root, second)
+        self.assertEqual(resolve_index_dir(self.root), os.path.join(self.root, second))
+        self.assertEqual(sorted(n for n in os.listdir(self.root) if not n.startswith("gen-")), ["CURRENT"])
+
+    def test_validation(self):
+        """Test that an index that shrank by more than half is refused"""
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        from modules.index_artifact import IndexArtifactError
+        from modules.index_generations import validate_generation
+
+        name = self.add_generation(chunk_count=10)
+        path, embeddings = os.path.join(self.root, name), DeterministicFakeEmbedding(size=384)
+
+        report = validate_generation(path, embeddings, "fake-384", previous={"chunk_count": 15})
+        self.assertEqual(report["chunk_count"], 10)
+        with self.assertRaisesRegex(IndexArtifactError, "down from 30"):
+            validate_generation(path, embeddings, "fake-384", previous={"chunk_count": 30})
+        with self.assertRaises(IndexArtifactError):
+            validate_generation(path, embeddings, "other-model")
+
+    def test_garbage_collection_keeps_current(self):
+        """Test that GC keeps the newest generations and the current one after a rollback"""
+        from modules.index_generations import collect_garbage, list_generations, previous_generation, promote
+
+        names = [self.add_generation(chunk_count=5) for _ in range(4)]
+        promote(self.root, names[3])
+        self.assertEqual(previous_generation(self.root), names[2])
+
+        promote(self.root, names[1])
+        removed = collect_garbage(self.root, keep=2)
+
+        self.assertEqual(removed, [names[0]])
+        self.assertEqual(list_generations(self.root), names[1:])
+
+
+class TestBuildGeneration(unittest.TestCase):
+    """Test build_index.py's build, validate and promote flow"""
+
+    def setUp(self):
+        self.root = os.path.join(tempfile.mkdtemp(prefix="likai-test-"), "index")
+        self.patches = [mock.patch("modules.embedding.EMBEDDING_BACKEND", "fake")]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        shutil.rmtree(os.path.dirname(self.root), ignore_errors=True)
+
+    def test_rebuild_promotes_and_shrink_is_refused(self):
+        from build_index import build_generation, rollback
+        from modules.index_generations import current_generation, list_generations
+
+        with mock.patch("build_index.stream_chunks", return_value=synthetic_chunks(40)):
+            first = build_generation(self.root)
+        with mock.patch("build_index.stream_chunks", return_value=synthetic_chunks(10, seed=4)):
+            with self.assertRaisesRegex(ValueError, "down from 40"):
+                build_generation(self.root)
+
+        # The refused generation is gone and the first one is still served
+        self.assertEqual(list_generations(self.root), [first["generation"]])
+        self.assertEqual(current_generation(self.root), first["generation"])
+        self.assertEqual(first["segments"], 5600)
+
+        with mock.patch("build_index.stream_chunks", return_value=synthetic_chunks(10, seed=4)):
+            second = build_generation(self.root, force=True)
+        self.assertEqual(second["previous_generation"], first["generation"])
+        self.assertEqual(rollback(self.root)["generation"], first["generation"])
+
+
+class TestHotSwap(unittest.TestCase):
+    """Test that a running process swaps in a promoted generation"""
+
+    def setUp(self):
+        import modules.rag_pipeline as rag_pipeline
+
+        self.root = tempfile.mkdtemp(prefix="likai-test-")
+        self.patches = [
+            mock.patch("modules.embedding.EMBEDDING_BACKEND", "fake"),
+            mock.patch.object(rag_pipeline, "INDEX_ARTIFACT_PATH", self.root),
+            mock.patch.object(rag_pipeline, "INDEX_RELOAD_SECONDS", 0.01),
+            mock.patch.object(rag_pipeline, "_vector_db", None),
+            mock.patch.object(rag_pipeline, "_index_dir", None),
+            mock.patch.object(rag_pipeline, "_segment_table", None),
+            mock.patch.object(rag_pipeline, "_reload_state", {"next_check": 0.0, "loading": False, "failed": None}),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def wait_for_version(self, version, timeout=10):
+        from modules.rag_pipeline import get_vector_db
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if get_vector_db().version == version:
+                return
+            time.sleep(0.02)
+        self.fail(f"index version {version} was never swapped in")
+
+    def test_swap_while_old_index_in_use(self):
+        """Test that new requests get the new index while a held old one keeps working"""
+        from modules.index_generations import collect_garbage, new_generation_dir, promote
+        from modules.rag_pipeline import get_vector_db, search_documents
+
+        first_dir = new_generation_dir(self.root)
+        build_test_artifact(first_dir, chunk_count=20)
+        promote(self.root, os.path.basename(first_dir))
+        in_flight = get_vector_db()
+
+        second_dir = new_generation_dir(self.root)
+        second = build_test_artifact(second_dir, chunk_count=25)
+        promote(self.root, os.path.basename(second_dir))
+        self.wait_for_version(second["index_version"])
+
+        # The old generation is removed from disk; the request holding it still finishes
+        collect_garbage(self.root, keep=1)
+        self.assertFalse(os.path.exists(first_dir))
+        self.assertEqual(len(search_documents(in_flight, "pond preparation", k=4)), 4)
+        self.assertEqual(len(get_vector_db()), 25)
+
+    def test_broken_generation_is_not_swapped_in(self):
+        from modules.index_generations import new_generation_dir, promote
+        from modules.index_artifact import VECTORS_FILE
+        from modules.rag_pipeline import get_vector_db
+
+        good_dir = new_generation_dir(self.root)
+        good = build_test_artifact(good_dir, chunk_count=20)
+        promote(self.root, os.path.basename(good_dir))
+        get_vector_db()
+
+        bad_dir = new_generation_dir(self.root)
+        build_test_artifact(bad_dir, chunk_count=20)
+        with open(os.path.join(bad_dir, VECTORS_FILE), "r+b") as f:
+            f.write(b"\0" * 16)
+        promote(self.root, os.path.basename(bad_dir))
+
+        deadline = time.monotonic() + 2
+        while time.monotonic() < deadline:
+            get_vector_db()
+            time.sleep(0.02)
+        self.assertEqual(get_vector_db().version, good["index_version"])
+
+
+if __name__ == "__main__":
+    result = unittest.main(exit=False, verbosity=2).result
+    sys.exit(0 if result.wasSuccessful() else 1)
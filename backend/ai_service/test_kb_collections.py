@@ -0,0 +1,243 @@
+"""
+Knowledge-Base Collections Test Suite
+Tests routing requests to collections by their attributes, lazy loading, the
+memory-bounded LRU of resident collections, picking up new generations, and
+assessments and questions answered from the routed collection. Uses fake
+embeddings and synthetic index artifacts.
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from test_index_artifact import build_test_artifact
+
+
+def build_collection(root, name, source=None, chunk_count=30):
+    """A collection generation; chunks carry `source` so tests can see where context came from"""
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+    from benchmarks.synthetic import generate_chunks
+    from modules.index_artifact import build_artifact
+    from modules.index_generations import new_generation_dir, promote
+
+    path = os.path.join(root, name)
+    os.makedirs(path, exist_ok=True)
+    generation = new_generation_dir(path)
+    if source is None:
+        build_test_artifact(generation, chunk_count=chunk_count)
+    else:
+        chunks = generate_chunks(chunk_count, seed=3)
+        build_artifact(
+            generation,
+            [c["text"] for c in chunks],
+            [dict(c["metadata"], source=source) for c in chunks],
+            embeddings=DeterministicFakeEmbedding(size=384),
+            embedding_model="fake-384",
+            sources=[{"filename": source, "sha256": "1" * 64, "size": 1}],
+        )
+    promote(path, os.path.basename(generation))
+
+
+def write_routes(root, routes):
+    with open(os.path.join(root, "routes.json"), "w") as f:
+        json.dump({"routes": routes}, f)
+
+
+class TestCollectionManager(unittest.TestCase):
+    """Test routing, lazy loading and LRU residency"""
+
+    def setUp(self):
+        from modules.kb_collections import CollectionManager
+
+        self.root = tempfile.mkdtemp(prefix="likai-test-")
+        self.patch = mock.patch("modules.embedding.EMBEDDING_BACKEND", "fake")
+        self.patch.start()
+        for name in ("vannamei", "monodon", "visayas"):
+            build_collection(self.root, name)
+        self.manager = CollectionManager(self.root)
+
+    def tearDown(self):
+        self.patch.stop()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_routing(self):
+        from modules.kb_collections import CollectionNotFound
+
+        write_routes(self.root, [
+            {"collection": "missing", "match": {"primarySpecies": "vannamei"}},
+            {"collection": "vannamei", "match": {"primarySpecies": "vannamei|whiteleg"}},
+            {"collection": "visayas", "match": {"location": "iloilo|negros", "farmType": "extensive"}},
+        ])
+
+        self.assertEqual(self.manager.names(), ["monodon", "vannamei", "visayas"])
+        self.assertEqual(self.manager.route({"primarySpecies": "Vannamei", "location": "Iloilo"}), "vannamei")
+        self.assertEqual(self.manager.route({"location": "Bacolod, Negros", "farmType": "Extensive"}), "visayas")
+        self.assertIsNone(self.manager.route({"location": "Iloilo", "farmType": "intensive"}))
+        self.assertEqual(self.manager.select("monodon", {"primarySpecies": "vannamei"}), "monodon")
+        self.assertIsNone(self.manager.select("default", {"primarySpecies": "vannamei"}))
+        with self.assertRaises(CollectionNotFound):
+            self.manager.select("../index", {})
+
+    def test_invalid_routes_keep_last_good(self):
+        self.manager.reload_seconds = 0
+        write_routes(self.root, [{"collection": "vannamei", "match": {"primarySpecies": "vannamei"}}])
+        self.assertEqual(self.manager.route({"primarySpecies": "vannamei"}), "vannamei")
+
+        with open(os.path.join(self.root, "routes.json"), "w") as f:
+            f.write('{"routes": [{"collection": "vannamei", "match": {"primarySpecies": "("}}]}')
+        os.utime(os.path.join(self.root, "routes.json"), (1, 1))
+
+        self.assertEqual(self.manager.route({"primarySpecies": "vannamei"}), "vannamei")
+
+    def test_routing_filesystem_checks_cached(self):
+        """Test that routing rechecks routes.json and the collections only once per reload interval"""
+        from modules.index_generations import resolve_index_dir
+
+        write_routes(self.root, [{"collection": "vannamei", "match": {"primarySpecies": "vannamei"}}])
+        with mock.patch("modules.kb_collections.resolve_index_dir", wraps=resolve_index_dir) as resolve, \
+                mock.patch("modules.kb_collections.os.path.getmtime", wraps=os.path.getmtime) as getmtime:
+            for _ in range(5):
+                self.assertEqual(self.manager.route({"primarySpecies": "vannamei"}), "vannamei")
+                self.assertEqual(self.manager.select("monodon", {}), "monodon")
+
+        self.assertEqual((resolve.call_count, getmtime.call_count), (2, 1))
+
+    def test_lazy_load_and_lru_budget(self):
+        self.assertIsNone(self.manager.loaded("vannamei"))
+        first = self.manager.get("vannamei")
+        # Room for two collections: the least recently used one is closed for a third
+        self.manager.max_bytes = int(first.size_bytes * 2.5)
+        self.manager.get("monodon")
+        self.assertIs(self.manager.get("vannamei"), first)
+        self.manager.get("visayas")
+
+        self.assertIsNone(self.manager.loaded("monodon"))
+        self.assertIsNotNone(self.manager.loaded("vannamei"))
+        stats = {row["name"]: row for row in self.manager.stats()["collections"]}
+        self.assertEqual(stats["monodon"], {"name": "monodon", "resident": False, "loads": 1, "evictions": 1})
+        self.assertEqual((stats["vannamei"]["chunks"], stats["vannamei"]["loads"]), (30, 1))
+
+        self.manager.get("monodon")
+        self.assertIsNone(self.manager.loaded("vannamei"))
+        self.assertIsNotNone(self.manager.loaded("visayas"))
+
+    def test_new_generation_reloaded(self):
+        self.manager.reload_seconds = 0.001
+        before = self.manager.get("vannamei")
+        build_collection(self.root, "vannamei", chunk_count=20)
+
+        after = self.manager.get("vannamei")
+
+        self.assertEqual(len(after.index), 20)
+        self.assertNotEqual(after.index.version, before.index.version)
+        stats = {row["name"]: row for row in self.manager.stats()["collections"]}
+        self.assertEqual((stats["vannamei"]["loads"], stats["vannamei"]["reloads"]), (2, 1))
+
+
+class TestRoutedPipeline(unittest.TestCase):
+    """Test assessments and questions answered from the routed collection"""
+
+    @classmethod
+    def setUpClass(cls):
+        from fastapi.testclient import TestClient
+        from app import app
+        cls.client = TestClient(app)
+
+    def setUp(self):
+        import modules.rag_pipeline as rag_pipeline
+        from modules.cache import TieredCache
+        from modules.index_generations import new_generation_dir, promote
+        from modules.kb_collections import CollectionManager
+
+        self.root = tempfile.mkdtemp(prefix="likai-test-")
+        self.index_root = os.path.join(self.root, "index")
+        collections_root = os.path.join(self.root, "collections")
+        build_collection(collections_root, "vannamei", source="vannamei-guide.pdf")
+        write_routes(collections_root, [{"collection": "vannamei", "match": {"primarySpecies": "vannamei"}}])
+        self.collections = CollectionManager(collections_root)
+        self.prompts = []
+        self.patches = [
+            mock.patch("modules.embedding.EMBEDDING_BACKEND", "fake"),
+            mock.patch.object(rag_pipeline, "INDEX_ARTIFACT_PATH", self.index_root),
+            mock.patch.object(rag_pipeline, "INDEX_RELOAD_SECONDS", 0),
+            mock.patch.object(rag_pipeline, "_vector_db", None),
+            mock.patch.object(rag_pipeline, "_index_dir", None),
+            mock.patch.object(rag_pipeline, "_segment_table", None),
+            mock.patch.object(rag_pipeline, "invoke_llm", side_effect=self.fake_llm),
+            mock.patch.object(rag_pipeline, "ANSWER_CACHE", TieredCache("answer", 60)),
+            mock.patch.object(rag_pipeline, "ASSESSMENT_CACHE", TieredCache("assessment", 60, enabled=False)),
+            mock.patch.object(rag_pipeline, "COLLECTIONS", self.collections),
+            mock.patch("app.COLLECTIONS", self.collections),
+            mock.patch("app.lookup_faq_answer", return_value=None),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+        generation = new_generation_dir(self.index_root)
+        build_test_artifact(generation)
+        promote(self.index_root, os.path.basename(generation))
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def fake_llm(self, prompt):
+        from modules.stub_llm import build_stub_assessment
+
+        self.prompts.append(prompt)
+        return build_stub_assessment() if "Overall Score" in prompt else f"Answer {len(self.prompts)}"
+
+    def test_assessment_uses_routed_collection(self):
+        from modules.rag_pipeline import process_farm_assessment
+        from modules.schemas import AssessmentData
+        from benchmarks.synthetic import generate_profiles
+
+        profile = generate_profiles(1, seed=5)[0]
+        process_farm_assessment(AssessmentData(**dict(profile, primarySpecies="vannamei")))
+        process_farm_assessment(AssessmentData(**dict(profile, primarySpecies="monodon")))
+
+        self.assertIn("vannamei-guide.pdf", self.prompts[0])
+        self.assertNotIn("vannamei-guide.pdf", self.prompts[1])
+        self.assertIn("synthetic-gaqp-manual.pdf", self.prompts[1])
+
+    def test_query_routing_and_stats(self):
+        question = "How do I prepare my pond before stocking?"
+        self.assertIsNone(self.collections.loaded("vannamei"))
+
+        routed = self.client.post("/query", json={"question": question, "primarySpecies": "Vannamei"})
+        default = self.client.post("/query", json={"question": question})
+        # Answers are cached per collection once its index is open
+        named = self.client.post("/query", json={"question": question, "collection": "vannamei"})
+        cached = self.client.post("/query", json={"question": question, "collection": "vannamei"})
+        unknown = self.client.post("/query", json={"question": question, "collection": "tilapia"})
+
+        self.assertEqual([r.status_code for r in (routed, default, named, cached, unknown)], [200] * 4 + [404])
+        self.assertEqual(len(self.prompts), 3)
+        self.assertIn("[From vannamei-guide.pdf]", self.prompts[0])
+        self.assertNotIn("vannamei-guide.pdf", self.prompts[1])
+        self.assertEqual(cached.json()["answer"], named.json()["answer"])
+        self.assertNotEqual(cached.json()["answer"], default.json()["answer"])
+
+        stats = self.client.get("/collections").json()
+        self.assertEqual(stats["default"]["retrievals"], 1)
+        self.assertTrue(stats["default"]["resident"])
+        self.assertEqual(stats["collections"][0]["name"], "vannamei")
+        self.assertEqual((stats["collections"][0]["resident"], stats["collections"][0]["retrievals"]), (True, 2))
+
+    def test_session_chunks_not_reused_across_collections(self):
+        from modules.rag_pipeline import query_farm_knowledge
+
+        query_farm_knowledge("How do I prepare my pond before stocking?", session_id="s1")
+        query_farm_knowledge("How do I prepare my pond before stocking?", session_id="s1", collection="vannamei")
+
+        self.assertIn("[From vannamei-guide.pdf]", self.prompts[1])
+
+
+if __name__ == "__main__":
+    result = unittest.main(exit=False, verbosity=2).result
+    sys.exit(0 if result.wasSuccessful() else 1)
@@ -0,0 +1,87 @@
+"""
+Structured Logging Test Suite
+Tests the JSON/text formatters and per-request stage timing collection.
+"""
+
+import json
+import logging
+import sys
+import unittest
+
+
+class TestStructuredLogging(unittest.TestCase):
+    """Test structured log events"""
+
+    def make_record(self, **fields):
+        record = logging.LogRecord("likai.test", logging.INFO, __file__, 1, "assessment_completed", None, None)
+        record.fields = fields
+        return record
+
+    def test_json_formatter_single_line(self):
+        """Test that an event is rendered as one compact JSON object"""
+        from modules.logging_config import JsonFormatter
+
+        line = JsonFormatter().format(self.make_record(request_id="abc", stages_ms={"llm_call": 812.4}))
+
+        self.assertNotIn("\n", line)
+        entry = json.loads(line)
+        self.assertEqual(entry["msg"], "assessment_completed")
+        self.assertEqual(entry["request_id"], "abc")
+        self.assertEqual(entry["stages_ms"]["llm_call"], 812.4)
+
+    def test_text_formatter_key_values(self):
+        """Test that the text formatter appends fields as key=value pairs"""
+        from modules.logging_config import TextFormatter
+
+        line = TextFormatter("%(message)s").format(self.make_record(status=200, path="/query"))
+
+        self.assertEqual(line, 'assessment_completed status=200 path="/query"')
+
+    def test_exception_kept_through_queue(self):
+        """Test that a traceback logged through the queue reaches the JSON exc field"""
+        import io
+        from unittest import mock
+        from modules import logging_config
+
+        stream = io.StringIO()
+        root = logging.getLogger()
+        saved_handlers, saved_level = list(root.handlers), root.level
+        with mock.patch.object(logging_config, "LOG_FORMAT", "json"), \
+                mock.patch.object(logging_config, "_listener", None), \
+                mock.patch("sys.stderr", stream):
+            logging_config.configure_logging()
+            try:
+                try:
+                    raise ValueError("pond sensor offline")
+                except ValueError:
+                    logging.getLogger("likai.test").error("sensor_failed", exc_info=True)
+            finally:
+                logging_config.shutdown_logging()
+                for handler in list(root.handlers):
+                    root.removeHandler(handler)
+                for handler in saved_handlers:
+                    root.addHandler(handler)
+                root.setLevel(saved_level)
+
+        entry = json.loads(stream.getvalue().strip())
+        self.assertEqual(entry["msg"], "sensor_failed")
+        self.assertIn("ValueError: pond sensor offline", entry["exc"])
+
+    def test_stage_timings_collected_per_request(self):
+        """Test that track_stage fills the collector of the current request"""
+        from modules.metrics import start_stage_timings, track_stage
+        from modules.logging_config import stage_timings_ms
+
+        timings = start_stage_timings()
+        with track_stage("similarity_search"):
+            pass
+        with track_stage("similarity_search"):
+            pass
+
+        self.assertEqual(list(timings), ["similarity_search"])
+        self.assertIn("similarity_search", stage_timings_ms(timings))
+
+
+if __name__ == "__main__":
+    result = unittest.main(exit=False, verbosity=2).result
+    sys.exit(0 if result.wasSuccessful() else 1)
@@ -0,0 +1,147 @@
+"""
+Profiling Test Suite
+Tests opt-in request profiling: the admin header, the overhead budget,
+downloading a profile through the API and aggregating profiles into
+collapsed stacks for flame graphs.
+"""
+
+import os
+import pstats
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+
+def parse_step():
+    return sum(i * i for i in range(20000))
+
+
+def assessment_like():
+    time.sleep(0.01)
+    return parse_step()
+
+
+class TestRequestProfiler(unittest.TestCase):
+    """Test which requests are profiled and how profiles are stored"""
+
+    def setUp(self):
+        from modules.profiling import RequestProfiler
+
+        self.dir = tempfile.TemporaryDirectory(prefix="likai-test-")
+        self.profiler = RequestProfiler(enabled=True, token="secret", sample_rate=0.0,
+                                        max_overhead=0.5, window_seconds=60, directory=self.dir.name, max_files=2)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_header_requests_profile(self):
+        self.assertEqual(self.profiler.wants_profile("secret"), "requested")
+        self.assertIsNone(self.profiler.wants_profile("wrong"))
+        self.assertIsNone(self.profiler.wants_profile(None))
+
+        result, profile_id = self.profiler.run("requested", "assessment", assessment_like)
+
+        self.assertEqual(result, assessment_like())
+        stats = pstats.Stats(self.profiler.path_for(profile_id))
+        self.assertTrue(any(name == "parse_step" for _, _, name in stats.stats))
+        self.assertIsNone(self.profiler.path_for("../" + profile_id))
+
+    def test_disabled_ignores_header(self):
+        from modules.profiling import RequestProfiler
+
+        profiler = RequestProfiler(enabled=False, token="secret", directory=self.dir.name)
+
+        self.assertIsNone(profiler.wants_profile("secret"))
+        self.assertFalse(profiler.authorized("secret"))
+        self.assertEqual(profiler.run(None, "query", parse_step), (parse_step(), None))
+
+    def test_overhead_budget_and_retention(self):
+        self.profiler.max_overhead = 0.1 / 60  # 100 ms of profiled time per window
+        ids = [self.profiler.run("requested", "query", time.sleep, 0.06)[1] for _ in range(3)]
+
+        self.assertIsNotNone(ids[0])
+        self.assertIsNotNone(ids[1])
+        self.assertIsNone(ids[2])
+
+        self.profiler.max_overhead = 1.0
+        self.profiler.run("requested", "query", parse_step)
+        self.assertEqual(len(os.listdir(self.dir.name)), 2)
+        self.assertIsNone(self.profiler.path_for(ids[0]))
+
+
+class TestProfileEndpoints(unittest.TestCase):
+    """Test profiling /process-assessment and downloading the profile"""
+
+    @classmethod
+    def setUpClass(cls):
+        from fastapi.testclient import TestClient
+        from app import app
+        cls.client = TestClient(app)
+
+    def test_profile_round_trip(self):
+        from modules.profiling import RequestProfiler
+        from benchmarks.bench_serialization import typical_assessment
+        from benchmarks.synthetic import generate_profiles
+
+        def slow_assessment(data):
+            parse_step()
+            return typical_assessment()
+
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch("app.PROFILER", RequestProfiler(enabled=True, token="secret", directory=tmp)), \
+                mock.patch("app.lookup_cached_assessment", return_value=None), \
+                mock.patch("app.process_farm_assessment", side_effect=slow_assessment):
+            plain = self.client.post("/process-assessment", json=generate_profiles(1)[0])
+            profiled = self.client.post("/process-assessment", json=generate_profiles(1)[0],
+                                        headers={"X-Profile": "secret"})
+            profile_id = profiled.headers["X-Profile-Id"]
+
+            forbidden = self.client.get(f"/profiles/{profile_id}")
+            missing = self.client.get("/profiles/nothing-here", headers={"X-Profile": "secret"})
+            download = self.client.get(f"/profiles/{profile_id}", headers={"X-Profile": "secret"})
+            path = os.path.join(tmp, "downloaded.prof")
+            with open(path, "wb") as f:
+                f.write(download.content)
+            stats = pstats.Stats(path)
+
+        self.assertNotIn("X-Profile-Id", plain.headers)
+        self.assertEqual(profiled.status_code, 200)
+        self.assertEqual((forbidden.status_code, missing.status_code, download.status_code), (403, 404, 200))
+        self.assertTrue(any(name == "parse_step" for _, _, name in stats.stats))
+
+
+class TestAggregation(unittest.TestCase):
+    """Test merging profiles into a table and collapsed stacks"""
+
+    def test_collapsed_stacks(self):
+        import aggregate_profiles
+        from modules.profiling import RequestProfiler
+
+        with tempfile.TemporaryDirectory() as tmp:
+            profiler = RequestProfiler(enabled=True, token="secret", max_overhead=1.0, directory=tmp)
+            for label in ("assessment", "assessment", "query"):
+                profiler.run("requested", label, assessment_like)
+
+            paths = aggregate_profiles.find_profiles([tmp], label="assessment")
+            stats = aggregate_profiles.load_stats(paths)
+            collapsed = os.path.join(tmp, "out.folded")
+            self.assertGreater(aggregate_profiles.write_collapsed(stats, collapsed), 0)
+            with open(collapsed) as f:
+                lines = f.read().splitlines()
+            self.assertEqual(aggregate_profiles.main([tmp, "--label", "none"]), 1)
+
+        self.assertEqual(len(paths), 2)
+        stacks = {stack: int(us) for stack, us in (line.rsplit(" ", 1) for line in lines)}
+        self.assertGreaterEqual(stacks["test_profiling.py:assessment_like;time.sleep"], 20000)
+        self.assertIn("test_profiling.py:assessment_like;test_profiling.py:parse_step;builtins.sum;"
+                      "test_profiling.py:<genexpr>", stacks)
+        self.assertFalse(any("_lsprof" in stack for stack in stacks))
+        top = aggregate_profiles.top_functions(stats, top=5)
+        self.assertEqual(next(row for row in top if row["function"].endswith("assessment_like"))["calls"], 2)
+
+
+if __name__ == "__main__":
+    result = unittest.main(exit=False, verbosity=2).result
+    sys.exit(0 if result.wasSuccessful() else 1)
@@ -0,0 +1,194 @@
+"""
+Segment Cache Test Suite
+Tests batched multi-query retrieval and the precomputed assessment retrieval
+table offline, using deterministic fake embeddings and a synthetic index
+artifact.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from test_index_artifact import build_test_artifact
+
+
+def make_assessment(**overrides):
+    from modules.schemas import AssessmentData
+
+    fields = {
+        "farmName": "Test Farm", "location": "Pampanga", "primarySpecies": "vannamei",
+        "farmType": "intensive", "farmSize": "2 hectares", "isNewFarmer": "New Setup",
+        "waterSource": ["River"], "initialBudget": "50k-100k", "hasElectricity": "Yes",
+        "topConcerns": ["Water quality issues", "Disease outbreaks"],
+    }
+    fields.update(overrides)
+    return AssessmentData(**fields)
+
+
+class TestSegmentKeys(unittest.TestCase):
+    """Test segment keys and queries"""
+
+    def test_concern_order_does_not_matter(self):
+        from modules.segment_cache import segment_key, segment_query
+
+        first = ("vannamei", "intensive", "New Setup", ["Water quality issues", "Disease outbreaks"])
+        second = ("vannamei", "intensive", "New Setup", ["Disease outbreaks", "Water quality issues"])
+        self.assertEqual(segment_key(*first), segment_key(*second))
+        self.assertEqual(segment_query(*first), segment_query(*second))
+
+    def test_unknown_profiles_have_no_key(self):
+        """Test that values outside the form's options fall back to live search"""
+        from modules.segment_cache import segment_key
+
+        self.assertIsNone(segment_key("tilapia", "intensive", "New Setup", ["Market access"]))
+        self.assertIsNone(segment_key("vannamei", "intensive", "New Setup", []))
+        self.assertIsNone(segment_key("vannamei", "intensive", "New Setup",
+                                      ["Market access", "Limited capital", "High feed costs", "Equipment failures"]))
+
+    def test_every_segment_enumerated(self):
+        from modules.segment_cache import enumerate_segments
+
+        keys = [key for key, _ in enumerate_segments(max_concerns=2)]
+        self.assertEqual(len(keys), 4 * 4 * 2 * (10 + 45))
+        self.assertEqual(len(set(keys)), len(keys))
+
+    def test_queries_per_concern_and_category(self):
+        from modules.segment_cache import CATEGORIES, PROFILE_QUOTA, SEGMENT_K, segment_queries
+
+        profile = ("vannamei", "intensive", "New Setup", ["Water quality issues", "Disease outbreaks"])
+        queries = segment_queries(*profile, k=10)
+
+        self.assertEqual(queries[0], ("vannamei intensive New Setup Disease outbreaks Water quality issues", PROFILE_QUOTA))
+        self.assertEqual([q for q, _ in queries[1:3]], ["vannamei Disease outbreaks", "vannamei Water quality issues"])
+        self.assertEqual(len(queries), 3 + len(CATEGORIES))
+        # Queries past the k-th would never get a turn in the merge
+        self.assertEqual(segment_queries(*profile), queries[:SEGMENT_K])
+
+
+class TestMultiQuerySearch(unittest.TestCase):
+    """Test batched embedding, batched scoring and merging rankings"""
+
+    @classmethod
+    def setUpClass(cls):
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        from modules.index_artifact import load_artifact
+
+        cls.tmp = tempfile.mkdtemp(prefix="likai-test-")
+        build_test_artifact(os.path.join(cls.tmp, "index"), chunk_count=40)
+        cls.embeddings = DeterministicFakeEmbedding(size=384)
+        cls.index = load_artifact(os.path.join(cls.tmp, "index"), cls.embeddings)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    def test_batch_matches_single_searches(self):
+        queries = ["pond preparation", "water quality", "disease outbreaks"]
+        vectors = self.embeddings.embed_documents(queries)
+
+        positions, scores = self.index.search_positions_batch(vectors, 6)
+
+        self.assertEqual(positions.shape, (3, 6))
+        for row, vector in enumerate(vectors):
+            single, single_scores = self.index.search_positions(vector, 6)
+            self.assertEqual(positions[row].tolist(), single.tolist())
+            self.assertTrue((scores[row][:-1] >= scores[row][1:]).all())
+            self.assertAlmostEqual(float(scores[row][0]), float(single_scores[0]), places=5)
+
+    def test_merge_quotas_and_duplicates(self):
+        from modules.vector_index import merge_ranked
+
+        rankings = [["a", "b", "c", "d"], ["b", "e", "f"], ["a", "g"]]
+
+        # Each query's best unseen item first: "a" is taken, so the third query gets "g"
+        self.assertEqual(merge_ranked(rankings, [2, 1, 1], 10), ["a", "b", "g", "c"])
+        self.assertEqual(merge_ranked(rankings, [3, 2, 2], 4), ["a", "b", "g", "c"])
+        self.assertEqual(merge_ranked(rankings, [9, 9, 9], 100), ["a", "b", "g", "c", "e", "d", "f"])
+
+    def test_queries_embedded_in_one_call(self):
+        import modules.rag_pipeline as rag_pipeline
+        from modules.cache import TieredCache
+
+        model = mock.Mock(embed_documents=mock.Mock(side_effect=self.embeddings.embed_documents))
+        with mock.patch("modules.embedding.EMBEDDING_CACHE", TieredCache("query_embedding", 60)), \
+                mock.patch.object(self.index, "embeddings", model):
+            queries = [("pond preparation", 3), ("water quality", 2), ("pond preparation", 1)]
+            docs = rag_pipeline.multi_query_search(self.index, queries, k=4)
+            again = rag_pipeline.multi_query_search(self.index, queries, k=4)
+            rag_pipeline.multi_query_search(self.index, queries + [("stocking density", 1)], k=4)
+        batch, single = model.embed_documents, model.embed_query
+
+        self.assertEqual([c.args[0] for c in batch.call_args_list], [["pond preparation", "water quality"],
+                                                                     ["stocking density"]])
+        self.assertEqual(single.call_count, 0)
+        ids = [doc.metadata["chunk_id"] for doc in docs]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(ids, [doc.metadata["chunk_id"] for doc in again])
+
+
+class TestSegmentTable(unittest.TestCase):
+    """Test building, storing and serving the table"""
+
+    @classmethod
+    def setUpClass(cls):
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        from modules.index_artifact import load_artifact
+        from modules.segment_cache import build_segment_table
+
+        cls.tmp = tempfile.mkdtemp(prefix="likai-test-")
+        cls.path = os.path.join(cls.tmp, "index")
+        build_test_artifact(cls.path, chunk_count=40)
+        cls.embeddings = DeterministicFakeEmbedding(size=384)
+        cls.index = load_artifact(cls.path, cls.embeddings)
+        cls.table = build_segment_table(cls.index, cls.embeddings, max_concerns=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    def test_table_matches_live_search(self):
+        """Test that a stored segment ranks chunks exactly like a live search"""
+        from modules.rag_pipeline import multi_query_search
+        from modules.segment_cache import SEGMENT_K, segment_key, segment_queries
+
+        profile = ("monodon", "extensive", "Existing Pond", ["High feed costs"])
+        ids = self.table.lookup(segment_key(*profile), self.index.version, SEGMENT_K)
+        live = multi_query_search(self.index, segment_queries(*profile), k=SEGMENT_K)
+
+        # One chunk each for the profile, the concern and the first three categories
+        self.assertEqual(len(ids), SEGMENT_K)
+        self.assertEqual(ids, [doc.metadata["chunk_id"] for doc in live])
+
+    def test_round_trip_and_stale_version(self):
+        """Test that a stored table loads only for the index version it was built from"""
+        from modules.segment_cache import load_segment_table, write_segment_table
+
+        write_segment_table(self.path, self.table)
+        loaded = load_segment_table(self.path, self.index.version)
+        self.assertEqual(loaded.segments, self.table.segments)
+        self.assertIsNone(load_segment_table(self.path, "0" * 12))
+
+    def test_assessment_context_uses_table(self):
+        """Test that a form profile is served from the table and an unseen one searches live"""
+        import modules.rag_pipeline as rag_pipeline
+
+        with mock.patch.object(rag_pipeline, "_vector_db", self.index), \
+                mock.patch.object(rag_pipeline, "_segment_table", self.table), \
+                mock.patch.object(rag_pipeline, "multi_query_search", wraps=rag_pipeline.multi_query_search) as search:
+            cached = rag_pipeline.get_relevant_context(make_assessment())
+            self.assertEqual(search.call_count, 0)
+
+            rag_pipeline.get_relevant_context(make_assessment(primarySpecies="tilapia"))
+            self.assertEqual(search.call_count, 1)
+
+            # Without the table the same profile gives the same context
+            with mock.patch.object(rag_pipeline, "_segment_table", None):
+                self.assertEqual(rag_pipeline.get_relevant_context(make_assessment()), cached)
+
+
+if __name__ == "__main__":
+    result = unittest.main(exit=False, verbosity=2).result
+    sys.exit(0 if result.wasSuccessful() else 1)
@@ -0,0 +1,106 @@
+"""
+Pre-fork Server Test Suite
+Tests per-process memory accounting and runs serve.py with two workers
+offline (stub LLM, fake embeddings, synthetic index artifact).
+"""
+
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import httpx
+
+
+class TestProcessMemory(unittest.TestCase):
+    """Test RSS/PSS/USS accounting"""
+
+    @unittest.skipUnless(os.path.exists("/proc/self/smaps_rollup"), "needs /proc/<pid>/smaps_rollup")
+    def test_memory_usage_of_self(self):
+        """Test that unique memory never exceeds resident memory"""
+        from modules.process_memory import memory_usage
+
+        usage = memory_usage()
+        self.assertGreater(usage["rss_mb"], 0)
+        self.assertLessEqual(usage["uss_mb"], usage["rss_mb"])
+        self.assertLessEqual(usage["pss_mb"], usage["rss_mb"])
+
+    def test_missing_process(self):
+        """Test that an unknown PID reports no numbers instead of raising"""
+        from modules.process_memory import memory_usage
+
+        self.assertIsNone(memory_usage(2 ** 22 + 12345)["rss_mb"])
+
+
+class TestWorkerExit(unittest.TestCase):
+    """Test how a worker reports the way it stopped"""
+
+    def test_crash_logged_and_exit_status(self):
+        import serve
+
+        with mock.patch("uvicorn.Server.run", side_effect=RuntimeError("port in use")), \
+                mock.patch("modules.logging_config.shutdown_logging"), \
+                mock.patch("serve.os._exit") as exit_, \
+                self.assertLogs("serve", level="ERROR") as logs, \
+                self.assertRaises(RuntimeError):
+            serve.run_worker(mock.Mock(), mock.Mock(), "warning")
+
+        exit_.assert_called_once_with(1)
+        self.assertIn("port in use", logs.output[0])
+        self.assertEqual(serve.exit_code(None), 0)
+        self.assertEqual(serve.exit_code(SystemExit(3)), 3)
+        self.assertEqual(serve.exit_code(KeyboardInterrupt()), 130)
+
+
+@unittest.skipUnless(hasattr(os, "fork") and os.path.exists("/proc/self/smaps_rollup"), "needs fork and /proc")
+class TestPreforkServer(unittest.TestCase):
+    """Test that pre-forked workers serve requests from the parent's model and index"""
+
+    def test_workers_serve_shared_index(self):
+        """Test that both workers answer and share pages with the parent"""
+        from benchmarks.bench_pipeline import SERVICE_DIR
+        from benchmarks.load_test import free_port, wait_until_healthy
+        from modules.process_memory import child_pids, workers_memory
+
+        with tempfile.TemporaryDirectory(prefix="likai-test-") as tmp:
+            env = dict(os.environ, EMBEDDING_BACKEND="fake", LLM_PROVIDER="stub", STUB_LLM_LATENCY_MS="0",
+                       INDEX_ARTIFACT_PATH=os.path.join(tmp, "index"), LOG_LEVEL="WARNING")
+            env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+            subprocess.run(
+                [sys.executable, "-c", "from benchmarks.bench_pipeline import build_synthetic_artifact; "
+                 f"build_synthetic_artifact({env['INDEX_ARTIFACT_PATH']!r}, 50, 1)"],
+                cwd=SERVICE_DIR, env=env, check=True,
+            )
+
+            port = free_port()
+            process = subprocess.Popen(
+                [sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(port),
+                 "--workers", "2", "--memory-log-seconds", "0"],
+                cwd=SERVICE_DIR, env=env,
+            )
+            try:
+                base_url = f"http://127.0.0.1:{port}"
+                wait_until_healthy(f"{base_url}/ready", timeout=60)
+                for _ in range(4):
+                    response = httpx.post(f"{base_url}/query", json={"question": "How do I lime my pond?"}, timeout=30)
+                    self.assertEqual(response.status_code, 200)
+
+                metrics = httpx.get(f"{base_url}/metrics", timeout=10).text
+                self.assertIn('likai_request_duration_seconds_count{method="POST",path="/query",status="200"} 4.0', metrics)
+
+                report = workers_memory(child_pids(process.pid))
+                self.assertEqual(len(report["workers"]), 2)
+                for usage in report["workers"].values():
+                    self.assertGreater(usage["shared_mb"], 0)
+                    self.assertLess(usage["uss_mb"], usage["rss_mb"])
+            finally:
+                process.send_signal(signal.SIGTERM)
+                self.assertEqual(process.wait(timeout=30), 0)
+
+
+if __name__ == "__main__":
+    result = unittest.main(exit=False, verbosity=2).result
+    sys.exit(0 if result.wasSuccessful() else 1)
@@ -0,0 +1,231 @@
+"""
+Chat Session Memory Test Suite
+Tests the bounded session store and session-aware /query answering offline,
+using the stub LLM, deterministic fake embeddings and a synthetic index.
+"""
+
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestSessionStore(unittest.TestCase):
+    """Test per-session budgets, TTL, LRU and the global memory cap"""
+
+    def test_old_turns_folded_into_summary(self):
+        """Test that turns beyond the token budget are summarized, keeping recent turns"""
+        from modules.session_store import SessionStore
+
+        store = SessionStore(token_budget=100, keep_recent_turns=2)
+        for i in range(6):
+            store.record_turn("s1", f"Question {i} about pond liming?", f"Answer {i}. " + "Detail. " * 40)
+
+        session = store.get("s1")
+        self.assertEqual([t.question for t in session.turns], ["Question 4 about pond liming?", "Question 5 about pond liming?"])
+        self.assertIn("Question 0 about pond liming?", session.summary)
+        self.assertIn("Answer 0.", session.summary)
+        self.assertIn("Earlier in this conversation", session.history_text())
+
+    def test_summary_is_capped(self):
+        """Test that the rolling summary keeps only its newest lines"""
+        from modules.session_store import SessionStore
+
+        store = SessionStore(token_budget=10, keep_recent_turns=1, summary_tokens=30)
+        for i in range(20):
+            store.record_turn("s1", f"Question number {i}?", f"Answer number {i}.")
+
+        summary = store.get("s1").summary
+        self.assertLessEqual(len(summary), 30 * 4)
+        self.assertIn("Question number 18?", summary)
+        self.assertNotIn("Question number 0?", summary)
+
+    def test_readers_never_see_half_compacted_turns(self):
+        """Test that turns being summarized stay visible until the summary replaces them"""
+        import threading
+        from modules.session_store import SessionStore, extractive_summary
+
+        summarizing, release = threading.Event(), threading.Event()
+
+        def slow_summary(turns):
+            summarizing.set()
+            release.wait(5)
+            return extractive_summary(turns)
+
+        store = SessionStore(token_budget=30, keep_recent_turns=1, summarizer=slow_summary)
+        store.record_turn("s1", "Question 0 about liming?", "Answer 0. " + "Detail. " * 10)
+        writer = threading.Thread(target=store.record_turn,
+                                  args=("s1", "Question 1 about feeding?", "Answer 1. " + "Detail. " * 10))
+        writer.start()
+        self.assertTrue(summarizing.wait(5))
+        during = store.get("s1").history_text()
+        release.set()
+        writer.join()
+        after = store.get("s1").history_text()
+
+        self.assertIn("Farmer: Question 0 about liming?", during)
+        self.assertIn("Farmer: Question 1 about feeding?", during)
+        self.assertNotIn("Earlier in this conversation", during)
+        self.assertIn("Earlier in this conversation:\n- Asked: Question 0 about liming?", after)
+        self.assertNotIn("Farmer: Question 0", after)
+
+    def test_idle_sessions_expire(self):
+        """Test TTL expiry of idle sessions"""
+        from modules.session_store import SessionStore
+
+        clock = FakeClock()
+        store = SessionStore(ttl_seconds=60, clock=clock)
+        store.record_turn("s1", "q", "a")
+        clock.now = 30
+        self.assertIsNotNone(store.get("s1"))
+        clock.now = 100
+        self.assertIsNone(store.get("s1"))
+        self.assertEqual(store.total_tokens, 0)
+
+    def test_expiry_stops_at_first_live_session(self):
+        """Test that expiry walks only the idle end of the LRU order"""
+        from modules.session_store import SessionStore
+
+        clock = FakeClock()
+        store = SessionStore(ttl_seconds=60, clock=clock)
+        for name, now in (("s0", 0), ("s1", 50), ("s2", 90)):
+            clock.now = now
+            store.record_turn(name, "q", "a")
+        # Out of LRU order on purpose: a full scan would expire it too
+        store._sessions["s2"].last_access = 0
+
+        clock.now = 100
+        self.assertIsNone(store.get("s0"))
+        self.assertEqual(list(store._sessions), ["s1", "s2"])
+
+    def test_running_token_total(self):
+        """Test that the token total follows appends, compaction and evictions"""
+        from modules.session_store import SessionStore
+
+        store = SessionStore(max_sessions=3, token_budget=40, keep_recent_turns=1)
+        for i in range(12):
+            store.record_turn(f"s{i % 4}", f"Question {i} about liming?", "Spread lime evenly. " * (i + 1))
+            self.assertEqual(store.total_tokens, sum(s.tokens for s in store._sessions.values()))
+        store.clear("s3")
+        self.assertEqual(store.total_tokens, sum(s.tokens for s in store._sessions.values()))
+        store.clear()
+        self.assertEqual(store.total_tokens, 0)
+
+    def test_least_recently_used_evicted(self):
+        """Test that the session limit evicts the least recently used session"""
+        from modules.session_store import SessionStore
+
+        store = SessionStore(max_sessions=2)
+        store.record_turn("a", "q", "a")
+        store.record_turn("b", "q", "a")
+        store.get("a")
+        store.record_turn("c", "q", "a")
+
+        self.assertIsNone(store.get("b"))
+        self.assertIsNotNone(store.get("a"))
+        self.assertIsNotNone(store.get("c"))
+
+    def test_global_token_cap(self):
+        """Test that the memory cap across sessions evicts old sessions"""
+        from modules.session_store import SessionStore
+
+        store = SessionStore(max_total_tokens=250, token_budget=1000)
+        for name in ("a", "b", "c"):
+            store.record_turn(name, "q", "x" * 400)
+
+        self.assertEqual(len(store), 2)
+        self.assertIsNone(store.get("a"))
+        self.assertLessEqual(store.total_tokens, 250)
+
+
+class TestSessionQueries(unittest.TestCase):
+    """Test that /query answers use and update session memory"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Build a synthetic index with fake embeddings"""
+        cls.index_dir = tempfile.TemporaryDirectory(prefix="likai-test-")
+        cls.patches = [
+            mock.patch("modules.embedding.EMBEDDING_BACKEND", "fake"),
+            mock.patch("modules.rag_pipeline.VECTOR_DB_PATH", cls.index_dir.name),
+        ]
+        for patch in cls.patches:
+            patch.start()
+
+        from benchmarks.bench_pipeline import build_synthetic_index
+        build_synthetic_index(cls.index_dir.name, chunk_count=40, seed=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        for patch in cls.patches:
+            patch.stop()
+        cls.index_dir.cleanup()
+
+    def setUp(self):
+        import modules.embedding
+        import modules.rag_pipeline
+        from modules.session_store import SessionStore
+        from modules.stub_llm import StubChatModel
+
+        modules.embedding._embeddings_model = None
+        modules.rag_pipeline._vector_db = None
+        self.llm = StubChatModel(latency_ms=0, tokens_per_sec=1e9)
+        self.store = SessionStore()
+        self.session_patches = [
+            mock.patch("modules.rag_pipeline.SESSIONS", self.store),
+            mock.patch("modules.rag_pipeline.get_llm", return_value=self.llm),
+        ]
+        for patch in self.session_patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.session_patches:
+            patch.stop()
+
+    def test_follow_up_reuses_chunks_and_history(self):
+        """Test that a relevant follow-up skips the search and sees earlier turns"""
+        from modules.rag_pipeline import invoke_llm, query_farm_knowledge, search_documents
+
+        question = "How should I prepare my pond before stocking?"
+        with mock.patch("modules.rag_pipeline.search_documents", side_effect=search_documents) as search:
+            query_farm_knowledge(question, session_id="farmer-1")
+            self.assertEqual(search.call_count, 1)
+
+            with mock.patch("modules.rag_pipeline.invoke_llm", side_effect=invoke_llm) as invoke:
+                query_farm_knowledge(question, session_id="farmer-1")
+            self.assertEqual(search.call_count, 1)
+
+        prompt = invoke.call_args.args[0]
+        self.assertIn("CONVERSATION SO FAR", prompt)
+        self.assertIn(f"Farmer: {question}", prompt)
+        self.assertEqual(len(self.store.get("farmer-1").turns), 2)
+
+    def test_unrelated_follow_up_searches_again(self):
+        """Test that stored chunks are not reused for a different question"""
+        from modules.rag_pipeline import query_farm_knowledge, search_documents
+
+        with mock.patch("modules.rag_pipeline.search_documents", side_effect=search_documents) as search:
+            query_farm_knowledge("How should I prepare my pond before stocking?", session_id="farmer-2")
+            query_farm_knowledge("What causes white spot disease in shrimp?", session_id="farmer-2")
+
+        self.assertEqual(search.call_count, 2)
+
+    def test_no_session_id_keeps_no_state(self):
+        """Test that questions without a session_id are answered statelessly"""
+        from modules.rag_pipeline import query_farm_knowledge
+
+        query_farm_knowledge("How should I prepare my pond before stocking?")
+        self.assertEqual(len(self.store), 0)
+
+
+if __name__ == "__main__":
+    result = unittest.main(exit=False, verbosity=2).result
+    sys.exit(0 if result.wasSuccessful() else 1)
@@ -0,0 +1,340 @@
+"""
+Single-flight Test Suite
+Tests that identical in-flight chat questions are computed once and shared,
+for both /query and the streamed /query/stream.
+"""
+
+import asyncio
+import json
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+
+class TestNormalizeQuestion(unittest.TestCase):
+    """Test the coalescing key"""
+
+    def test_case_punctuation_and_spacing_ignored(self):
+        from modules.singleflight import normalize_question
+
+        self.assertEqual(normalize_question("  How do I LIME my pond?"), normalize_question("how do i lime my pond"))
+        self.assertNotEqual(normalize_question("How do I lime my pond?"), normalize_question("How do I drain my pond?"))
+
+
+class TestSingleFlight(unittest.IsolatedAsyncioTestCase):
+    """Test async coalescing"""
+
+    async def test_concurrent_callers_share_one_computation(self):
+        """Test that five concurrent calls for one key run the function once"""
+        from modules.singleflight import SingleFlight
+
+        flight, calls = SingleFlight("test"), []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "answer"
+
+        results = await asyncio.gather(*(flight.do("key", compute) for _ in range(5)))
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([answer for answer, _ in results], ["answer"] * 5)
+        self.assertEqual(sum(shared for _, shared in results), 4)
+        self.assertFalse(flight.in_flight("key"))
+
+    async def test_errors_are_shared_and_not_kept(self):
+        """Test that followers get the leader's exception and the next call recomputes"""
+        from modules.singleflight import SingleFlight
+
+        flight = SingleFlight("test")
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+
+        results = await asyncio.gather(flight.do("key", fail), flight.do("key", fail), return_exceptions=True)
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+
+        async def succeed():
+            return "ok"
+
+        self.assertEqual(await flight.do("key", succeed), ("ok", False))
+
+    async def test_leader_cancellation_does_not_cancel_followers(self):
+        """Test that the leader disconnecting leaves the shared computation running"""
+        from modules.singleflight import SingleFlight
+
+        flight = SingleFlight("test")
+
+        async def compute():
+            await asyncio.sleep(0.05)
+            return "answer"
+
+        leader = asyncio.create_task(flight.do("key", compute))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("key", compute))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+
+        self.assertEqual(await follower, ("answer", True))
+
+
+async def collect(subscription):
+    return [piece async for piece in subscription]
+
+
+class TestStreamFlight(unittest.IsolatedAsyncioTestCase):
+    """Test streamed coalescing"""
+
+    async def test_subscribers_receive_identical_streams(self):
+        """Test that a late subscriber replays the pieces it missed"""
+        from modules.singleflight import StreamFlight
+
+        flight, started, release = StreamFlight("test"), [], threading.Event()
+
+        def produce():
+            started.append(1)
+            yield "first "
+            release.wait(5)
+            yield "second"
+            return "prepared"
+
+        first = flight.subscribe("key", produce)
+        await asyncio.sleep(0.05)
+        second = flight.subscribe("key", produce)
+        release.set()
+
+        streams = await asyncio.gather(collect(first), collect(second))
+
+        self.assertEqual(len(started), 1)
+        self.assertEqual(streams, [["first ", "second"], ["first ", "second"]])
+        self.assertEqual((first.shared, second.shared), (False, True))
+        self.assertEqual(second.result, "prepared")
+
+    async def test_subscribers_hold_no_threads(self):
+        """Test that only the producer occupies a thread, however many callers subscribe"""
+        from modules.singleflight import StreamFlight
+
+        flight, release = StreamFlight("test"), threading.Event()
+
+        def produce():
+            yield "first "
+            release.wait(5)
+            yield "second"
+
+        threads = threading.active_count()
+        subscriptions = [flight.subscribe("key", produce) for _ in range(50)]
+        readers = asyncio.gather(*(collect(subscription) for subscription in subscriptions))
+        await asyncio.sleep(0.05)
+        self.assertLessEqual(threading.active_count(), threads + 1)
+        release.set()
+
+        self.assertEqual(await readers, [["first ", "second"]] * 50)
+
+    async def test_no_key_never_shares(self):
+        from modules.singleflight import StreamFlight
+
+        flight, started = StreamFlight("test"), []
+
+        def produce():
+            started.append(1)
+            yield "piece"
+
+        subscriptions = [flight.subscribe(None, produce) for _ in range(2)]
+        self.assertEqual([await collect(s) for s in subscriptions], [["piece"], ["piece"]])
+        self.assertEqual(len(started), 2)
+
+    async def test_producer_cancelled_when_everyone_leaves(self):
+        """Test that the producer stops and releases its slot once the last subscriber has gone"""
+        from modules.singleflight import StreamFlight
+
+        flight, closed, done = StreamFlight("test"), threading.Event(), threading.Event()
+
+        def produce():
+            try:
+                while True:
+                    yield "piece "
+                    time.sleep(0.01)
+            finally:
+                closed.set()
+
+        self.assertIsNone(flight.join("key"))
+        leader = flight.subscribe("key", produce, on_done=done.set)
+        follower = flight.join("key")
+        self.assertTrue(follower.shared)
+        stream = aiter(leader)
+        await anext(stream)
+        await stream.aclose()
+        leader.close()
+        self.assertTrue(flight.in_flight("key"))
+        follower.close()
+
+        self.assertTrue(await asyncio.to_thread(done.wait, 2))
+        self.assertTrue(closed.is_set())
+        self.assertFalse(flight.in_flight("key"))
+
+    async def test_producer_error_reaches_subscribers(self):
+        from modules.singleflight import StreamFlight
+
+        def produce():
+            yield "partial"
+            raise RuntimeError("upstream failed")
+
+        pieces = []
+        with self.assertRaises(RuntimeError):
+            async for piece in StreamFlight("test").subscribe("key", produce):
+                pieces.append(piece)
+        self.assertEqual(pieces, ["partial"])
+
+
+class TestCoalescedEndpoints(unittest.IsolatedAsyncioTestCase):
+    """Test coalescing through the API with the stub LLM"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Build a synthetic index with fake embeddings"""
+        cls.index_dir = tempfile.TemporaryDirectory(prefix="likai-test-")
+        cls.patches = [
+            mock.patch("modules.embedding.EMBEDDING_BACKEND", "fake"),
+            mock.patch("modules.rag_pipeline.VECTOR_DB_PATH", cls.index_dir.name),
+        ]
+        for patch in cls.patches:
+            patch.start()
+
+        from benchmarks.bench_pipeline import build_synthetic_index
+        build_synthetic_index(cls.index_dir.name, chunk_count=40, seed=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        for patch in cls.patches:
+            patch.stop()
+        cls.index_dir.cleanup()
+
+    def setUp(self):
+        import modules.embedding
+        import modules.rag_pipeline
+        from modules.session_store import SessionStore
+        from modules.stub_llm import StubChatModel
+
+        modules.embedding._embeddings_model = None
+        modules.rag_pipeline._vector_db = None
+        # Slow enough that concurrent requests overlap
+        self.llm = StubChatModel(latency_ms=300, tokens_per_sec=1e9)
+        self.store = SessionStore()
+        self.session_patches = [
+            mock.patch("app.SESSIONS", self.store),
+            mock.patch("modules.rag_pipeline.SESSIONS", self.store),
+            mock.patch("modules.rag_pipeline.get_llm", return_value=self.llm),
+        ]
+        for patch in self.session_patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.session_patches:
+            patch.stop()
+
+    def slow_query(self, calls):
+        def run(question, session_id=None, collection=None):
+            calls.append(question)
+            time.sleep(0.2)
+            return f"answer to {question}"
+        return run
+
+    async def post_all(self, path, payloads):
+        """Send requests concurrently on one event loop, as a server would see them"""
+        import httpx
+        from app import app
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await asyncio.gather(*(client.post(path, json=payload) for payload in payloads))
+
+    async def test_identical_questions_computed_once(self):
+        """Test that concurrent identical /query requests share one pipeline run"""
+        calls = []
+        questions = ["How do I lime my pond?", "how do I lime my pond", "How should I feed my shrimp?"]
+        with mock.patch("app.query_farm_knowledge", side_effect=self.slow_query(calls)):
+            responses = await self.post_all("/query", [{"question": q} for q in questions])
+
+        self.assertEqual([r.status_code for r in responses], [200, 200, 200])
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(responses[0].json()["answer"], responses[1].json()["answer"])
+        # Each caller still gets its own question back
+        self.assertEqual(responses[1].json()["question"], questions[1])
+
+    async def test_session_questions_not_coalesced(self):
+        """Test that questions asked within a session are computed separately"""
+        calls = []
+        payloads = [{"question": "How do I lime my pond?", "session_id": sid} for sid in ("single-a", "single-b")]
+        with mock.patch("app.query_farm_knowledge", side_effect=self.slow_query(calls)):
+            responses = await self.post_all("/query", payloads)
+
+        self.assertEqual([r.status_code for r in responses], [200, 200])
+        self.assertEqual(len(calls), 2)
+
+    def stream_tokens(self, response):
+        self.assertEqual(response.headers["content-type"].split(";")[0], "text/event-stream")
+        events = [line[len("data: "):] for line in response.text.splitlines() if line.startswith("data: ")]
+        self.assertEqual(events[-1], "[DONE]")
+        return "".join(json.loads(event)["token"] for event in events[:-1])
+
+    async def test_streamed_answers_coalesced(self):
+        """Test that concurrent identical streams run the LLM once and get the same tokens"""
+        from modules.rag_pipeline import stream_llm
+
+        calls = []
+
+        def counting_stream(prompt):
+            calls.append(prompt)
+            yield from stream_llm(prompt)
+
+        with mock.patch("modules.rag_pipeline.stream_llm", side_effect=counting_stream):
+            responses = await self.post_all("/query/stream", [{"question": "How do I test my pond water pH?"}] * 2)
+
+        answers = [self.stream_tokens(response) for response in responses]
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(answers[0], answers[1])
+        self.assertTrue(answers[0])
+
+    async def test_stream_producer_holds_chat_slot(self):
+        """Test that the chat slot is held by the producer until it finishes, not by the leader's connection"""
+        from modules.admission import CHAT_POOL
+        from modules.rag_pipeline import stream_llm
+
+        held = []
+
+        def observing_stream(prompt):
+            held.append(CHAT_POOL.in_flight)
+            yield from stream_llm(prompt)
+
+        with mock.patch("modules.rag_pipeline.stream_llm", side_effect=observing_stream):
+            await self.post_all("/query/stream", [{"question": "How do I test my pond water pH?"}] * 3)
+            for _ in range(100):
+                if CHAT_POOL.in_flight == 0:
+                    break
+                await asyncio.sleep(0.01)
+
+        self.assertEqual(held, [1])
+        self.assertEqual(CHAT_POOL.in_flight, 0)
+
+    async def test_streamed_session_turn_recorded(self):
+        """Test that a streamed answer within a session is remembered like a /query answer"""
+        payload = {"question": "How do I test my pond water pH?", "session_id": "stream-session"}
+        answer = self.stream_tokens((await self.post_all("/query/stream", [payload]))[0])
+        session = self.store.get("stream-session")
+
+        self.assertEqual(len(session.turns), 1)
+        self.assertEqual(session.turns[0].answer, answer.strip())
+        self.assertTrue(session.retrieved_docs)
+
+    async def test_off_topic_streamed(self):
+        from modules.guardrail import OFF_TOPIC_MESSAGE
+
+        response = (await self.post_all("/query/stream", [{"question": "Who won the basketball game last night?"}]))[0]
+        self.assertEqual(self.stream_tokens(response), OFF_TOPIC_MESSAGE)
+
+if __name__ == "__main__":
+    result = unittest.main(exit=False, verbosity=2).result
+    sys.exit(0 if result.wasSuccessful() else 1)
@@ -0,0 +1,136 @@
+"""
+Tracing Test Suite
+Tests that a request produces one trace with a child span per pipeline stage,
+carrying the search, prompt, LLM and parse attributes, and that sampling and
+the default (off) configuration record nothing. Uses the stub LLM, fake
+embeddings, a synthetic index and an in-memory span exporter.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from test_index_artifact import build_test_artifact
+
+
+class TestRequestTrace(unittest.TestCase):
+    """Test the spans of /process-assessment and /query/stream"""
+
+    @classmethod
+    def setUpClass(cls):
+        from fastapi.testclient import TestClient
+        from app import app
+        cls.client = TestClient(app)
+
+    def setUp(self):
+        import modules.rag_pipeline as rag_pipeline
+        from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+        from modules.cache import TieredCache
+        from modules.index_generations import new_generation_dir, promote
+        from modules.stub_llm import StubChatModel
+        from modules.tracing import configure_tracing
+
+        self.root = tempfile.mkdtemp(prefix="likai-test-")
+        self.patches = [
+            mock.patch("modules.embedding.EMBEDDING_BACKEND", "fake"),
+            mock.patch.object(rag_pipeline, "INDEX_ARTIFACT_PATH", self.root),
+            mock.patch.object(rag_pipeline, "INDEX_RELOAD_SECONDS", 0),
+            mock.patch.object(rag_pipeline, "_vector_db", None),
+            mock.patch.object(rag_pipeline, "_index_dir", None),
+            mock.patch.object(rag_pipeline, "_segment_table", None),
+            mock.patch.object(rag_pipeline, "get_llm", return_value=StubChatModel(latency_ms=0, tokens_per_sec=1e9)),
+            mock.patch.object(rag_pipeline, "ANSWER_CACHE", TieredCache("answer", 60, enabled=False)),
+            mock.patch.object(rag_pipeline, "ASSESSMENT_CACHE", TieredCache("assessment", 60, enabled=False)),
+            mock.patch("app.lookup_faq_answer", return_value=None),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+        generation = new_generation_dir(self.root)
+        build_test_artifact(generation)
+        promote(self.root, os.path.basename(generation))
+
+        self.exporter = InMemorySpanExporter()
+        configure_tracing(span_exporter=self.exporter)
+
+    def tearDown(self):
+        from modules.tracing import shutdown_tracing
+
+        shutdown_tracing()
+        for patch in self.patches:
+            patch.stop()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def spans(self):
+        return {span.name: span for span in self.exporter.get_finished_spans()}
+
+    def test_assessment_stages_share_request_trace(self):
+        from modules.ai_models import llm_model_id
+        from benchmarks.synthetic import generate_profiles
+
+        traceparent = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+        response = self.client.post("/process-assessment", json=generate_profiles(1)[0],
+                                    headers={"traceparent": traceparent})
+        self.assertEqual(response.status_code, 200)
+
+        spans = self.spans()
+        request = spans["POST /process-assessment"]
+        self.assertEqual(request.attributes["http.response.status_code"], 200)
+        self.assertEqual(format(request.context.trace_id, "032x"), "0af7651916cd43dd8448eb211c80319c")
+        for name in ("query_embedding", "similarity_search", "prompt_build", "llm_call", "parse_response"):
+            self.assertEqual(spans[name].context.trace_id, request.context.trace_id, name)
+
+        search = spans["similarity_search"].attributes
+        self.assertEqual(search["search.results"], search["search.k"])
+        self.assertTrue(all("#" in source for source in search["search.sources"]))
+        self.assertGreater(spans["prompt_build"].attributes["prompt.tokens_estimated"], 0)
+        self.assertEqual(spans["llm_call"].attributes["llm.model"], llm_model_id())
+        self.assertGreater(spans["llm_call"].attributes["llm.output_tokens"], 0)
+        self.assertEqual(spans["parse_response"].attributes["parse.recommendations"], 8)
+
+    def test_streamed_answer_records_time_to_first_token(self):
+        response = self.client.post("/query/stream", json={"question": "How do I prepare my pond before stocking?"})
+        self.assertEqual(response.status_code, 200)
+
+        spans = self.spans()
+        self.assertTrue(spans["guardrail"].attributes["guardrail.on_topic"])
+        self.assertEqual(spans["guardrail"].attributes["guardrail.reason"], "keyword")
+        self.assertIn("llm.time_to_first_token_ms", spans["llm_call"].attributes)
+        self.assertIn("llm_first_token", spans)
+        self.assertEqual({span.context.trace_id for span in spans.values()},
+                         {spans["POST /query/stream"].context.trace_id})
+
+    def test_unsampled_requests_record_nothing(self):
+        from modules.tracing import configure_tracing
+
+        configure_tracing(sample_rate=0.0, span_exporter=self.exporter)
+        self.client.post("/query", json={"question": "How do I prepare my pond before stocking?"})
+
+        self.assertEqual(self.exporter.get_finished_spans(), ())
+
+
+class TestTracingOff(unittest.TestCase):
+    """Test the default configuration"""
+
+    def test_stages_run_without_spans(self):
+        from modules.metrics import track_stage
+        from modules.tracing import configure_tracing, set_span_attributes, tracing_enabled
+
+        self.assertFalse(configure_tracing(exporter="none"))
+        self.assertFalse(tracing_enabled())
+        with track_stage("similarity_search"):
+            set_span_attributes({"search.k": 4})
+
+    def test_unknown_exporter(self):
+        from modules.tracing import create_exporter
+
+        with self.assertRaises(ValueError):
+            create_exporter("zipkin")
+
+
+if __name__ == "__main__":
+    result = unittest.main(exit=False, verbosity=2).result
+    sys.exit(0 if result.wasSuccessful() else 1)
@@ -0,0 +1,123 @@
+"""
+Warm-up and Readiness Test Suite
+Tests the startup warm-up pipeline and the /ready endpoint offline, using
+deterministic fake embeddings and a small synthetic vector index.
+"""
+
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+
+class TestWarmup(unittest.TestCase):
+    """Test warm-up of the embedding model, vector store and probe query"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Build a synthetic index with fake embeddings"""
+        cls.index_dir = tempfile.TemporaryDirectory(prefix="likai-test-")
+        cls.patches = [
+            mock.patch("modules.embedding.EMBEDDING_BACKEND", "fake"),
+            mock.patch("modules.rag_pipeline.VECTOR_DB_PATH", cls.index_dir.name),
+        ]
+        for patch in cls.patches:
+            patch.start()
+
+        from benchmarks.bench_pipeline import build_synthetic_index
+        build_synthetic_index(cls.index_dir.name, chunk_count=40, seed=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        for patch in cls.patches:
+            patch.stop()
+        cls.index_dir.cleanup()
+
+    def setUp(self):
+        """Start every test from a cold process state"""
+        import modules.embedding
+        import modules.rag_pipeline
+        modules.embedding._embeddings_model = None
+        modules.rag_pipeline._vector_db = None
+
+    def test_warmup_loads_all_components(self):
+        """Test that warm-up marks every component ready with a timing"""
+        from modules.warmup import ReadinessState, run_warmup
+        import modules.rag_pipeline
+
+        state = run_warmup(prime_llm=False, state=ReadinessState())
+        snapshot = state.snapshot()
+
+        self.assertTrue(state.is_ready)
+        for name in ("embedding_model", "vector_db", "query_probe"):
+            self.assertEqual(snapshot["components"][name]["status"], "ready")
+            self.assertIn("duration_ms", snapshot["components"][name])
+        self.assertEqual(snapshot["components"]["llm"]["status"], "skipped")
+        self.assertIsNotNone(modules.rag_pipeline._vector_db)
+
+    def test_warmup_failure_not_ready(self):
+        """Test that a failing component leaves the instance not ready"""
+        from modules.warmup import ReadinessState, run_warmup
+
+        with mock.patch("modules.warmup.warm_vector_db", side_effect=ValueError("No documents found to process")):
+            state = run_warmup(prime_llm=False, state=ReadinessState())
+        snapshot = state.snapshot()
+
+        self.assertFalse(state.is_ready)
+        self.assertEqual(snapshot["status"], "failed")
+        self.assertIn("No documents", snapshot["components"]["vector_db"]["error"])
+        self.assertEqual(snapshot["components"]["query_probe"]["status"], "skipped")
+
+
+    def test_resume_keeps_warm_components(self):
+        """Test that a forked worker keeps the parent's warm-up instead of going back to pending"""
+        from modules.warmup import ReadinessState, run_warmup
+
+        state = run_warmup(prime_llm=False, state=ReadinessState())
+        completed_at = state.snapshot()["completed_at"]
+        with mock.patch("modules.warmup.warm_embedding_model", side_effect=AssertionError("rerun")), \
+                mock.patch.object(state, "reset", side_effect=AssertionError("reset")), \
+                mock.patch("modules.warmup.warm_llm") as warm_llm:
+            run_warmup(prime_llm=True, state=state, resume=True)
+
+        self.assertTrue(state.is_ready)
+        self.assertEqual(state.snapshot()["components"]["llm"]["status"], "ready")
+        self.assertEqual(warm_llm.call_count, 1)
+        self.assertGreaterEqual(state.snapshot()["completed_at"], completed_at)
+
+
+class TestReadyEndpoint(unittest.TestCase):
+    """Test the /ready endpoint"""
+
+    @classmethod
+    def setUpClass(cls):
+        from fastapi.testclient import TestClient
+        from app import app
+        cls.client = TestClient(app)
+
+    def test_ready_reflects_warmup_state(self):
+        """Test 503 while warming and 200 once all components are ready"""
+        from modules.warmup import READINESS
+
+        READINESS.reset(["embedding_model", "vector_db"])
+        READINESS.update("embedding_model", status="ready", duration_ms=10.0)
+        response = self.client.get("/ready")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()["status"], "warming")
+
+        READINESS.update("vector_db", status="ready", duration_ms=5.0)
+        response = self.client.get("/ready")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["components"]["vector_db"]["duration_ms"], 5.0)
+
+    def test_health_is_liveness_only(self):
+        """Test that /health answers even when the instance is not ready"""
+        from modules.warmup import READINESS
+
+        READINESS.reset(["vector_db"])
+        self.assertEqual(self.client.get("/health").status_code, 200)
+
+
+if __name__ == "__main__":
+    result = unittest.main(exit=False, verbosity=2).result
+    sys.exit(0 if result.wasSuccessful() else 1)